@@ -1,10 +1,101 @@
+import logging
+import threading
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger('hospyflow.notifications')
+
+class Dispatcher:
+    """
+    Bounded thread pool running asynchronous observers (and analyses) off the
+    request thread. Back-pressure: once `threads + file_max` tasks are
+    pending, submitters wait up to `attente` seconds, then run the task
+    themselves. A failing task is logged and never affects the others.
+    """
+
+    def __init__(self, threads, file_max, attente):
+        self.threads = threads
+        self.attente = attente
+        self._places = threading.BoundedSemaphore(threads + file_max)
+        self._pool = None
+        self._verrou = threading.Lock()
+        self._en_cours = 0
+        self._termine = threading.Condition()
+
+    def _obtenir_pool(self):
+        with self._verrou:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='notifications')
+            return self._pool
+
+    def executer(self, nom, fonction, *args):
+        """Runs a task inline, isolating and logging its errors."""
+        try:
+            fonction(*args)
+        except Exception:
+            logger.exception("task failed task=%s", nom)
+
+    def soumettre(self, nom, fonction, *args):
+        """Queues a task on the pool (inline when the queue stays full)."""
+        if not self._places.acquire(timeout=self.attente):
+            logger.warning("queue full, running inline task=%s", nom)
+            self.executer(nom, fonction, *args)
+            return
+        with self._termine:
+            self._en_cours += 1
+        try:
+            self._obtenir_pool().submit(self._tache, nom, fonction, *args)
+        except RuntimeError:
+            # Pool shut down (interpreter exit)
+            self._liberer()
+            self.executer(nom, fonction, *args)
+
+    def _tache(self, nom, fonction, *args):
+        # Worker threads own their database connections
+        close_old_connections()
+        try:
+            self.executer(nom, fonction, *args)
+        finally:
+            close_old_connections()
+            self._liberer()
+
+    def _liberer(self):
+        self._places.release()
+        with self._termine:
+            self._en_cours -= 1
+            self._termine.notify_all()
+
+    def attendre(self, timeout=None):
+        """Waits until no task is pending, including tasks queued by tasks (scripts, tests)."""
+        with self._termine:
+            return self._termine.wait_for(lambda: self._en_cours == 0, timeout)
+
+# Shared by the analysis engine and its observers
+dispatcher = Dispatcher(
+    threads=getattr(settings, 'NOTIFICATIONS_THREADS', 4),
+    file_max=getattr(settings, 'NOTIFICATIONS_FILE_MAX', 200),
+    attente=getattr(settings, 'NOTIFICATIONS_ATTENTE_SECONDES', 2)
+)
 
 class Observer(ABC):
+    # Asynchronous observers run on the dispatcher pool, after commit
+    asynchronous = False
+
     @abstractmethod
     def update(self, alert_data):
         pass
 
+    def update_batch(self, alerts):
+        """
+        Receives every alert raised by one analysis batch.
+        Default behaviour: one update() per alert.
+        """
+        for alert_data in alerts:
+            self.update(alert_data)
+
 class Subject(ABC):
     def __init__(self):
         self._observers = []
@@ -17,31 +108,55 @@ class Subject(ABC):
         self._observers.remove(observer)
 
     def notify(self, alert_data):
-        print(f"[DEBUG] Notifying {len(self._observers)} observers with: {alert_data['message']}")
+        self.notify_batch([alert_data])
+
+    def notify_batch(self, alerts):
+        """Dispatches the alerts to the observers once the current transaction commits."""
+        if not alerts:
+            return
+        alerts = list(alerts)
+        transaction.on_commit(lambda: self._dispatch(alerts))
+
+    def _dispatch(self, alerts):
+        logger.info("notifying observers=%d alerts=%d", len(self._observers), len(alerts))
         for observer in self._observers:
-            observer.update(alert_data)
+            nom = type(observer).__name__
+            if observer.asynchronous:
+                dispatcher.soumettre(nom, observer.update_batch, alerts)
+            else:
+                dispatcher.executer(nom, observer.update_batch, alerts)
 
 class AdminNotifier(Observer):
+    asynchronous = True
+
     def update(self, alert_data):
+        self.update_batch([alert_data])
+
+    def update_batch(self, alerts):
         from ops.models import Alerte, Service
-        
-        # 1. Create the alert in the database
-        service_id = alert_data.get('service_id')
-        try:
-            service = Service.objects.get(id=service_id)
-            Alerte.objects.create(
-                service=service,
+
+        services = Service.objects.in_bulk({a.get('service_id') for a in alerts})
+        for alert_data in alerts:
+            if alert_data.get('service_id') not in services:
+                logger.error("service not found service_id=%s", alert_data.get('service_id'))
+
+        # 1. Persist the alerts in one query. The idempotency key is unique:
+        # an event that was already analysed cannot raise a second alert.
+        Alerte.objects.bulk_create([
+            Alerte(
+                service_id=alert_data['service_id'],
                 message=alert_data['message'],
-                niveau_gravite=alert_data.get('type', 'HIGH') # Map type to gravity or use a default
+                niveau_gravite=alert_data.get('gravite', 'HIGH'),
+                cle_idempotence=alert_data.get('cle')
             )
-            
-            # 2. Update service state to TENSION (State Pattern)
-            if service.etat != 'TENSION':
-                service.etat = 'TENSION'
-                service.save()
-                print(f"[STATE] Service {service.nom} switched to TENSION")
-
-            print(f"[NOTIF] Alert persisted: {alert_data['message']} for {service.nom}")
-            
-        except Service.DoesNotExist:
-            print(f"[ERROR] Service ID {service_id} not found for alert")
+            for alert_data in alerts if alert_data.get('service_id') in services
+        ], ignore_conflicts=True)
+
+        # 2. Switch the affected services to TENSION (State Pattern), once each
+        a_basculer = [s for s in services.values() if s.etat != 'TENSION']
+        if a_basculer:
+            Service.objects.filter(id__in=[s.id for s in a_basculer]).update(etat='TENSION')
+            for service in a_basculer:
+                logger.info("service state changed service=%s etat=TENSION", service.nom)
+
+        logger.info("alerts persisted alerts=%d services=%d", len(alerts), len(services))
@@ -1,4 +1,160 @@
-from .alert_service import Subject, AdminNotifier
+import logging
+import threading
+
+from django.conf import settings
+from django.db import transaction
+
+from .alert_service import Subject, AdminNotifier, dispatcher
+
+logger = logging.getLogger('hospyflow.analyse')
+
+
+def cle_idempotence(evenement_id):
+    """Idempotency key of the analysis of one event (unique on Alerte)."""
+    return f"ops.evenement:{evenement_id}"
+
+
+def _minute(horodatage):
+    """Absolute minute index of a timestamp."""
+    return int(horodatage.timestamp() // 60)
+
+
+class FenetreGlissante:
+    """
+    Per-minute ring buffer of event counts over the reference window, with
+    running totals for the reference and the recent window. Adding an event
+    costs O(1) (amortised: each minute bucket is cleared once).
+    """
+
+    def __init__(self, fenetre, reference):
+        self.fenetre = fenetre
+        self.reference = reference
+        self.compteurs = [0] * reference
+        self.minute = None
+        self.total_reference = 0
+        self.total_fenetre = 0
+
+    def _avancer(self, minute):
+        """Moves the head to `minute`, dropping buckets that leave the windows."""
+        if self.minute is None or minute - self.minute >= self.reference:
+            self.compteurs = [0] * self.reference
+            self.total_reference = self.total_fenetre = 0
+            self.minute = minute
+            return
+        while self.minute < minute:
+            self.minute += 1
+            self.total_fenetre -= self.compteurs[(self.minute - self.fenetre) % self.reference]
+            self.total_reference -= self.compteurs[self.minute % self.reference]
+            self.compteurs[self.minute % self.reference] = 0
+
+    def ajouter(self, minute, nombre=1):
+        """Counts `nombre` events at `minute` (late events land in their own bucket)."""
+        if self.minute is None or minute > self.minute:
+            self._avancer(minute)
+        age = self.minute - minute
+        if age >= self.reference:
+            return
+        self.compteurs[minute % self.reference] += nombre
+        self.total_reference += nombre
+        if age < self.fenetre:
+            self.total_fenetre += nombre
+
+    def taux(self):
+        """(recent rate, baseline rate) in events per minute."""
+        recent = self.total_fenetre / self.fenetre
+        base = (self.total_reference - self.total_fenetre) / (self.reference - self.fenetre)
+        return recent, base
+
+
+class DetecteurFrequence:
+    """
+    Sliding-window frequency detection per (Service, TypeFlux).
+
+    The buffers are seeded from the database (one grouped query) on first
+    use, then kept up to date in memory: no count query per event.
+    """
+
+    def __init__(self):
+        self.fenetre = getattr(settings, 'ANALYSE_FREQUENCE_FENETRE_MINUTES', 15)
+        self.reference = max(
+            getattr(settings, 'ANALYSE_FREQUENCE_REFERENCE_MINUTES', 24 * 60), self.fenetre + 1
+        )
+        self.multiple = getattr(settings, 'ANALYSE_FREQUENCE_MULTIPLE', 3.0)
+        self.minimum = getattr(settings, 'ANALYSE_FREQUENCE_MINIMUM', 5)
+        self._fenetres = {}
+        self._dernier_id_initial = None
+        self._verrou = threading.Lock()
+
+    def _fenetre(self, cle):
+        if cle not in self._fenetres:
+            self._fenetres[cle] = FenetreGlissante(self.fenetre, self.reference)
+        return self._fenetres[cle]
+
+    def _initialiser(self):
+        """Seeds the buffers with the events of the reference window."""
+        from datetime import timedelta
+
+        from django.db.models import Count, Max
+        from django.db.models.functions import TruncMinute
+        from django.utils import timezone
+
+        from ops.models import MicroEvenement
+
+        recents = MicroEvenement.objects.filter(
+            horodatage__gte=timezone.now() - timedelta(minutes=self.reference)
+        )
+        self._dernier_id_initial = recents.aggregate(dernier=Max('id'))['dernier'] or 0
+        for ligne in recents.filter(id__lte=self._dernier_id_initial).annotate(
+            minute=TruncMinute('horodatage')
+        ).values('service_id', 'type_flux_id', 'minute').annotate(nombre=Count('id')).order_by('minute'):
+            self._fenetre((ligne['service_id'], ligne['type_flux_id'])).ajouter(
+                _minute(ligne['minute']), ligne['nombre']
+            )
+
+    def evaluer(self, evenement):
+        """
+        Counts the event and evaluates its (service, flow type) window.
+
+        Returns:
+            (recent events, recent rate, baseline rate) when the rate exceeds
+            the threshold, None otherwise
+        """
+        with self._verrou:
+            if self._dernier_id_initial is None:
+                self._initialiser()
+            fenetre = self._fenetre((evenement.service_id, evenement.type_flux_id))
+            # Events already counted by the seeding query
+            if evenement.pk > self._dernier_id_initial:
+                fenetre.ajouter(_minute(evenement.horodatage))
+            recent, base = fenetre.taux()
+            if fenetre.total_fenetre >= self.minimum and recent > self.multiple * base:
+                return fenetre.total_fenetre, recent, base
+        return None
+
+
+class _LotAnalyse:
+    """
+    Events saved during one transaction, analysed together once it commits.
+    """
+
+    def __init__(self, moteur):
+        self.moteur = moteur
+        self.ids = []
+
+    def __call__(self):
+        if getattr(self.moteur._local, 'lot', None) is self:
+            self.moteur._local.lot = None
+        # The request thread returns right away: analysis runs on the pool
+        dispatcher.soumettre('analyse', self.analyser)
+
+    def analyser(self):
+        from ops.models import MicroEvenement
+
+        # Events rolled back with a savepoint are simply not found
+        self.moteur.analyser_lot(
+            MicroEvenement.objects.select_related('service', 'type_flux').filter(pk__in=self.ids)
+        )
+
 
 class MoteurAnalyse(Subject):
     _instance = None
@@ -8,36 +164,109 @@ class MoteurAnalyse(Subject):
             cls._instance = super(MoteurAnalyse, cls).__new__(cls)
             # Initialize Subject part
             super(MoteurAnalyse, cls._instance).__init__()
+            cls._instance._local = threading.local()
+            cls._instance.detecteur = DetecteurFrequence()
+            # (service, flow type) -> last window period already alerted
+            cls._instance._frequences_signalees = {}
             # Attach default observers
             cls._instance.attach(AdminNotifier())
         return cls._instance
 
+    def __init__(self):
+        # Already initialised by __new__: Subject.__init__ would detach the observers
+        pass
+
+    def planifier(self, evenement):
+        """
+        Queues the analysis of a saved event until the current transaction
+        commits (immediately in autocommit), then runs it on the dispatcher
+        pool. Events of the same transaction are analysed, and their alerts
+        notified, as a single batch.
+        """
+        connexion = transaction.get_connection()
+        lot = getattr(self._local, 'lot', None)
+        # The pending batch is reused only while its callback is still
+        # registered (a rollback discards it)
+        if lot is None or not connexion.in_atomic_block or not any(
+            entree[1] is lot for entree in connexion.run_on_commit
+        ):
+            lot = self._local.lot = _LotAnalyse(self)
+            lot.ids.append(evenement.pk)
+            transaction.on_commit(lot)
+        else:
+            lot.ids.append(evenement.pk)
+
     def analyser_evenement(self, evenement):
         """
         Analyses a MicroEvenement instance to detect bottlenecks.
         """
-        print(f"[ANALYSE] Processing event: {evenement.type_flux.nom} for {evenement.service.nom}")
-        
-        is_bottleneck = False
-        
-        # Logic 1: Immediate bottleneck if severity is CRITICAL
-        if evenement.niveau_gravite == 'CRITICAL':
-            is_bottleneck = True
-            reason = f"Critical event detected: {evenement.description}"
-        
-        # Logic 2: Detection by frequency (could be added here)
-        # For now, let's stick to gravity for the POC
-            
-        if is_bottleneck:
-            alert_data = {
-                'message': reason,
-                'service_id': evenement.service.id,
-                'type': 'BOTTLENECK'
-            }
-            self.notify(alert_data)
-            return "TENSION"
-            
-        return "NORMAL"
+        return self.analyser_lot([evenement])[evenement.pk]
+
+    def analyser_lot(self, evenements):
+        """
+        Analyses MicroEvenement instances: CRITICAL gravity, then frequency of
+        the event's (service, flow type) pair. A critical event whose
+        idempotency key already has an alert is not notified nor counted again.
+
+        Returns:
+            {event pk: "TENSION" | "NORMAL"}
+        """
+        from ops.models import Alerte
+
+        evenements = list(evenements)
+        critiques = [cle_idempotence(e.pk) for e in evenements if e.niveau_gravite == 'CRITICAL']
+        deja_traites = set(Alerte.objects.filter(
+            cle_idempotence__in=critiques
+        ).values_list('cle_idempotence', flat=True)) if critiques else set()
+
+        etats = {}
+        alertes = {}
+        for evenement in evenements:
+            logger.debug(
+                "processing event evenement=%s type_flux=%s service=%s",
+                evenement.pk, evenement.type_flux.nom, evenement.service.nom
+            )
+            etats[evenement.pk] = "NORMAL"
+            cle = cle_idempotence(evenement.pk)
+
+            # Logic 1: Immediate bottleneck if severity is CRITICAL
+            if evenement.niveau_gravite == 'CRITICAL':
+                etats[evenement.pk] = "TENSION"
+                if cle in deja_traites:
+                    continue
+                alertes[cle] = {
+                    'message': f"Critical event detected: {evenement.description}",
+                    'service_id': evenement.service_id,
+                    'type': 'BOTTLENECK',
+                    'gravite': evenement.niveau_gravite,
+                    'cle': cle
+                }
+
+            # Logic 2: Detection by frequency (one alert per service, flow
+            # type and window period)
+            depassement = self.detecteur.evaluer(evenement)
+            if depassement:
+                nombre, recent, base = depassement
+                etats[evenement.pk] = "TENSION"
+                periode = _minute(evenement.horodatage) // self.detecteur.fenetre
+                paire = (evenement.service_id, evenement.type_flux_id)
+                if self._frequences_signalees.get(paire) == periode:
+                    continue
+                self._frequences_signalees[paire] = periode
+                cle = f"ops.frequence:{paire[0]}:{paire[1]}:{periode}"
+                alertes[cle] = {
+                    'message': (
+                        f"High frequency of {evenement.type_flux.nom} events: {nombre} in "
+                        f"{self.detecteur.fenetre} min ({recent:.2f}/min, baseline {base:.2f}/min)"
+                    ),
+                    'service_id': evenement.service_id,
+                    'type': 'FREQUENCY',
+                    'gravite': 'HIGH',
+                    'cle': cle
+                }
+
+        self.notify_batch(list(alertes.values()))
+        return etats
 
 # Global access point (Singleton)
 moteur_analyse = MoteurAnalyse()
@@ -2,8 +2,10 @@ import csv
 import os
 from abc import ABC, abstractmethod
 from django.conf import settings
+from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
 
 class ExportStrategy(ABC):
     @abstractmethod
@@ -15,19 +17,26 @@ class PDFExportStrategy(ExportStrategy):
         os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
         filepath = os.path.join(settings.MEDIA_ROOT, filename)
         
-        c = canvas.Canvas(filepath, pagesize=letter)
-        c.setFont("Helvetica-Bold", 16)
-        c.drawString(100, 750, "Rapport ClinicFlow Analytics")
-        c.setFont("Helvetica", 12)
-        c.drawString(100, 730, f"Plage de dates: {data['plage_date']}")
-        c.drawString(100, 710, "Métriques clés:")
-        
-        y = 690
-        for key, value in data['metrics'].items():
-            c.drawString(120, y, f"- {key}: {value}")
-            y -= 20
-        
-        c.save()
+        # Mise en page platypus: le tableau des métriques continue sur les pages suivantes
+        styles = getSampleStyleSheet()
+        doc = SimpleDocTemplate(filepath, pagesize=letter, title=f"Rapport {data['plage_date']}")
+        table = Table(
+            [['Métrique', 'Valeur']] + [[key, str(value)] for key, value in data['metrics'].items()],
+            repeatRows=1,
+            hAlign='LEFT'
+        )
+        table.setStyle(TableStyle([
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#e8eef7')),
+            ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor('#bbbbbb')),
+        ]))
+        doc.build([
+            Paragraph("Rapport ClinicFlow Analytics", styles['Title']),
+            Paragraph(f"Plage de dates: {data['plage_date']}", styles['Normal']),
+            Spacer(1, 12),
+            Paragraph("Métriques clés:", styles['Heading2']),
+            table,
+        ])
         print(f"[EXPORT] PDF generated at {filepath}")
         return filepath
 
@@ -79,7 +79,7 @@ class GestionAlerteService:
         # Obtenir les abonnés éligibles
         abonnes = AbonnementAlerte.objects.filter(
             est_actif=True
-        )
+        ).prefetch_related('departements')
         
         # Filtrer par priorité
         priorites_ordre = ['BASSE', 'NORMALE', 'HAUTE', 'URGENTE']
@@ -91,8 +91,9 @@ class GestionAlerteService:
                 continue
             
             # Vérifier le département
-            if abonne.departements.exists():
-                if alerte.departement_id and alerte.departement_id not in abonne.departements.values_list('id', flat=True):
+            departements = {d.id for d in abonne.departements.all()}
+            if departements:
+                if alerte.departement_id and alerte.departement_id not in departements:
                     continue
             
             # TODO: Implémenter l'envoi réel (push, email, SMS)
@@ -172,15 +173,29 @@ class GestionAlerteService:
         Returns:
             Liste des alertes
         """
+        return list(self._requete_alertes_utilisateur(utilisateur, non_lues_seulement))
+    
+    async def aobtenir_alertes_utilisateur(
+        self,
+        utilisateur,
+        non_lues_seulement: bool = False
+    ) -> List[Alerte]:
+        """Version asynchrone (ORM async) de obtenir_alertes_utilisateur."""
+        return [
+            alerte async for alerte in
+            self._requete_alertes_utilisateur(utilisateur, non_lues_seulement)
+        ]
+    
+    def _requete_alertes_utilisateur(self, utilisateur, non_lues_seulement: bool):
         queryset = Alerte.objects.all()
         
         if non_lues_seulement:
             queryset = queryset.filter(statut='NOUVELLE')
         
         # Filtrer par département de l'utilisateur si applicable
-        if utilisateur.department:
+        if utilisateur.department_id:
             queryset = queryset.filter(
-                Q(departement=utilisateur.department) |
+                Q(departement_id=utilisateur.department_id) |
                 Q(departement__isnull=True)
             )
         
@@ -190,7 +205,10 @@ class GestionAlerteService:
                 statut='NOUVELLE'
             ) if non_lues_seulement else Alerte.objects.all()
         
-        return list(queryset.order_by('-cree_le')[:50])
+        # Relations lues par AlerteSerializer
+        return queryset.select_related(
+            'departement', 'regle', 'acquittee_par'
+        ).order_by('-cree_le')[:50]
 
 
 class MoteurReglesService:
@@ -205,7 +223,7 @@ class MoteurReglesService:
     def evaluer_toutes_regles(self):
         """
         Évalue toutes les règles actives.
-        À exécuter périodiquement via tâche planifiée.
+        Exécutée périodiquement par le planificateur (tâche evaluation_regles).
         """
         regles = RegleAlerte.objects.filter(est_actif=True)
         alertes_generees = []
@@ -0,0 +1,18 @@
+"""
+Tâches planifiées des alertes (commande planificateur, apps/core/planificateur.py).
+"""
+from django.conf import settings
+
+from apps.core.planificateur import tache
+from .services import MoteurReglesService
+
+
+@tache(
+    'evaluation_regles',
+    intervalle=settings.PLANIFICATEUR_REGLES_SECONDES,
+    gigue=settings.PLANIFICATEUR_GIGUE_SECONDES
+)
+def evaluer_regles():
+    """Évaluation de toutes les règles d'alerte actives."""
+    alertes = MoteurReglesService().evaluer_toutes_regles()
+    return f'{len(alertes)} alerte(s) générée(s).'
@@ -0,0 +1,51 @@
+"""
+Tests des alertes de l'utilisateur: budget de requêtes et lectures
+conditionnelles (vues synchrone et asynchrone).
+"""
+import pytest
+
+from .models import Alerte
+
+pytestmark = pytest.mark.django_db
+
+URL_MES_ALERTES = '/api/alerts/mes-alertes/'
+
+
+@pytest.fixture
+def creer_alerte(departement):
+    def creer(**champs):
+        valeurs = {
+            'titre': 'Retard laboratoire',
+            'message': 'Résultats en attente depuis 2 heures.',
+            'departement': departement,
+        }
+        valeurs.update(champs)
+        return Alerte.objects.create(**valeurs)
+    return creer
+
+
+@pytest.mark.parametrize('url', [URL_MES_ALERTES, URL_MES_ALERTES + 'async/'])
+def test_mes_alertes_dans_leur_budget(client_medecin, creer_alerte, budget_requetes, url):
+    for _ in range(5):
+        creer_alerte()
+    reponse = client_medecin.get(url)
+    assert reponse.status_code == 200
+    assert reponse.json()['nombre'] == 5
+
+
+@pytest.mark.parametrize('url', [URL_MES_ALERTES, URL_MES_ALERTES + 'async/'])
+def test_mes_alertes_304_puis_200_apres_nouvelle_alerte(client_medecin, creer_alerte, url):
+    creer_alerte()
+    etag = client_medecin.get(url).headers['ETag']
+    assert client_medecin.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    creer_alerte(titre='Scanner indisponible')
+    reponse = client_medecin.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert reponse.status_code == 200
+    assert reponse.json()['nombre'] == 2
+
+
+def test_etag_propre_a_chaque_utilisateur(client_medecin, client_admin, creer_alerte):
+    creer_alerte()
+    etag = client_medecin.get(URL_MES_ALERTES).headers['ETag']
+    assert client_admin.get(URL_MES_ALERTES, HTTP_IF_NONE_MATCH=etag).status_code == 200
@@ -4,6 +4,7 @@ from .views import (
     AlerteListView,
     AlerteDetailView,
     MesAlertesView,
+    MesAlertesAsyncView,
     AcquitterAlerteView,
     ResoudreAlerteView,
     IgnorerAlerteView,
@@ -20,6 +21,7 @@ urlpatterns = [
     path('', AlerteListView.as_view(), name='alerte_list'),
     path('<int:pk>/', AlerteDetailView.as_view(), name='alerte_detail'),
     path('mes-alertes/', MesAlertesView.as_view(), name='mes_alertes'),
+    path('mes-alertes/async/', MesAlertesAsyncView.as_view(), name='mes_alertes_async'),
     path('<int:pk>/acquitter/', AcquitterAlerteView.as_view(), name='acquitter_alerte'),
     path('<int:pk>/resoudre/', ResoudreAlerteView.as_view(), name='resoudre_alerte'),
     path('<int:pk>/ignorer/', IgnorerAlerteView.as_view(), name='ignorer_alerte'),
@@ -3,6 +3,10 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.db import transaction
 
+from apps.core.asynchrone import VueAsync, reponse_json
+from apps.core.conditionnel import LectureConditionnelleMixin
+from apps.core.planificateur import PlanificateurService
+
 from .models import Alerte, RegleAlerte, AbonnementAlerte
 from .serializers import (
     AlerteSerializer,
@@ -10,14 +14,18 @@ from .serializers import (
     AbonnementAlerteSerializer,
     CreerAbonnementSerializer
 )
-from .services import GestionAlerteService, MoteurReglesService, AlerteException
+from .services import GestionAlerteService, AlerteException
 from apps.accounts.permissions import IsAdminUser
 
+# Étiquettes des lectures d'alertes (ETag des requêtes conditionnelles)
+ETIQUETTES_ALERTES = ['alertes', 'regles', 'departements', 'personnel']
+
 
-class AlerteListView(generics.ListAPIView):
+class AlerteListView(LectureConditionnelleMixin, generics.ListAPIView):
     """Liste les alertes."""
     serializer_class = AlerteSerializer
     permission_classes = [permissions.IsAuthenticated]
+    etiquettes_etag = ETIQUETTES_ALERTES
     filterset_fields = ['statut', 'priorite', 'departement']
     ordering = ['-cree_le']
     
@@ -46,9 +54,11 @@ class AlerteDetailView(generics.RetrieveAPIView):
         return response
 
 
-class MesAlertesView(APIView):
+class MesAlertesView(LectureConditionnelleMixin, APIView):
     """Alertes non lues de l'utilisateur connecté."""
     permission_classes = [permissions.IsAuthenticated]
+    budget_requetes = 5
+    etiquettes_etag = ETIQUETTES_ALERTES
     
     def get(self, request):
         service = GestionAlerteService()
@@ -63,6 +73,24 @@ class MesAlertesView(APIView):
         })
 
 
+class MesAlertesAsyncView(VueAsync):
+    """Alertes non lues de l'utilisateur connecté, version asynchrone (ASGI)."""
+    budget_requetes = 5
+    etiquettes_etag = ETIQUETTES_ALERTES
+    
+    async def get(self, request):
+        service = GestionAlerteService()
+        alertes = await service.aobtenir_alertes_utilisateur(
+            request.utilisateur,
+            non_lues_seulement=True
+        )
+        
+        return reponse_json({
+            'nombre': len(alertes),
+            'alertes': AlerteSerializer(alertes, many=True).data
+        })
+
+
 class AcquitterAlerteView(APIView):
     """Acquitte une alerte."""
     permission_classes = [permissions.IsAuthenticated]
@@ -139,17 +167,20 @@ class RegleAlerteDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 class EvaluerReglesView(APIView):
-    """Évalue manuellement toutes les règles (admin)."""
+    """
+    Demande l'évaluation immédiate de toutes les règles (admin), exécutée
+    par le planificateur (tâche evaluation_regles).
+    """
     permission_classes = [permissions.IsAuthenticated, IsAdminUser]
     
     def post(self, request):
-        service = MoteurReglesService()
-        alertes = service.evaluer_toutes_regles()
+        tache = PlanificateurService().demander_execution('evaluation_regles')
         
         return Response({
-            'message': f'{len(alertes)} alerte(s) générée(s).',
-            'alertes': AlerteSerializer(alertes, many=True).data
-        })
+            'message': 'Évaluation des règles planifiée.',
+            'tache': tache.nom,
+            'prochaine_execution': tache.prochaine_execution
+        }, status=status.HTTP_202_ACCEPTED)
 
 
 class MesAbonnementsView(generics.ListAPIView):
@@ -1,5 +1,12 @@
 from django.contrib import admin
-from .models import AnalyseGoulotEtranglement, MetriqueDepartement, StatistiqueGlobale
+from .models import (
+    AnalyseGoulotEtranglement,
+    MetriqueDepartement,
+    StatistiqueGlobale,
+    AnalyseProcessus,
+    CompteurEtape,
+    DebitEtapeIntervalle
+)
 
 
 @admin.register(AnalyseGoulotEtranglement)
@@ -41,9 +48,9 @@ class MetriqueDepartementAdmin(admin.ModelAdmin):
         'departement', 'date',
         'workflows_demarre', 'workflows_termines',
         'evenements_signales', 'evenements_critiques',
-        'score_efficacite'
+        'score_efficacite', 'definitif'
     ]
-    list_filter = ['departement', 'date']
+    list_filter = ['departement', 'date', 'definitif']
     ordering = ['-date', 'departement']
 
 
@@ -57,3 +64,28 @@ class StatistiqueGlobaleAdmin(admin.ModelAdmin):
     ]
     list_filter = ['date']
     ordering = ['-date']
+
+
+@admin.register(AnalyseProcessus)
+class AnalyseProcessusAdmin(admin.ModelAdmin):
+    list_display = [
+        'type_workflow', 'periode_debut', 'periode_fin',
+        'nombre_instances', 'nombre_transitions', 'calcule_le'
+    ]
+    list_filter = ['type_workflow']
+    ordering = ['-calcule_le']
+    readonly_fields = ['calcule_le']
+
+
+@admin.register(CompteurEtape)
+class CompteurEtapeAdmin(admin.ModelAdmin):
+    list_display = ['etape', 'en_cours', 'entrees_total', 'sorties_total', 'modifie_le']
+    list_filter = ['etape__type_workflow']
+    readonly_fields = ['modifie_le']
+
+
+@admin.register(DebitEtapeIntervalle)
+class DebitEtapeIntervalleAdmin(admin.ModelAdmin):
+    list_display = ['etape', 'debut', 'entrees', 'sorties', 'en_cours_fin']
+    list_filter = ['etape__type_workflow', 'debut']
+    ordering = ['-debut']
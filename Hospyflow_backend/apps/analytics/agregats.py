@@ -0,0 +1,257 @@
+"""
+Service Pattern - Agrégats quotidiens par département (MetriqueDepartement).
+
+Les rapports et tableaux de bord lisent ces agrégats plutôt que les tables
+brutes. consolider() (re)calcule uniquement les jours manquants ou encore
+ouverts, par requêtes groupées, et n'écrit que les lignes qui ont changé:
+modifie_le sert ainsi de filigrane de données fiable.
+
+Un jour est définitif lorsqu'il est passé et que plus aucun workflow ni
+événement démarré ce jour n'est ouvert, ou au-delà de JOURS_CLOTURE jours.
+Un jour définitif n'est plus jamais recalculé.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Max, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import MetriqueDepartement
+from apps.accounts.models import Department
+from apps.core.cache import etiquette, invalider
+from apps.events.models import MicroEvenement
+from apps.workflows.archivage import sources_instances
+
+
+# Champs recalculés depuis les tables brutes (personnel_en_service et
+# score_efficacite restent des relevés instantanés)
+CHAMPS_AGREGES = [
+    'workflows_demarre', 'workflows_termines', 'workflows_abandonnes',
+    'duree_moyenne_workflow_minutes',
+    'evenements_signales', 'evenements_resolus', 'evenements_critiques',
+    'delai_resolution_moyen_minutes',
+]
+
+STATUTS_WORKFLOW_OUVERTS = ['INITIE', 'EN_COURS', 'EN_PAUSE']
+STATUTS_EVENEMENT_OUVERTS = ['SIGNALE', 'EN_COURS']
+
+
+def _bornes(date_debut: date, date_fin: date) -> Tuple[datetime, datetime]:
+    """Bornes horaires locales [début, fin[ d'une période de jours inclus."""
+    return (
+        timezone.make_aware(datetime.combine(date_debut, time.min)),
+        timezone.make_aware(datetime.combine(date_fin + timedelta(days=1), time.min))
+    )
+
+
+def _minutes(duree: Optional[timedelta]) -> Optional[int]:
+    """Convertit une durée moyenne en minutes entières."""
+    return int(duree.total_seconds() / 60) if duree is not None else None
+
+
+class AgregationService:
+    """
+    Service de consolidation des agrégats quotidiens par département.
+    """
+
+    JOURS_CLOTURE = 31
+
+    @staticmethod
+    def departements(departement_ids: Optional[Iterable[int]] = None) -> List[int]:
+        """Départements du périmètre: ceux demandés, sinon tous les départements actifs."""
+        if departement_ids:
+            return sorted(set(departement_ids))
+        return list(Department.objects.filter(is_active=True).order_by('pk').values_list('pk', flat=True))
+
+    def agregats(
+        self,
+        date_debut: date,
+        date_fin: date,
+        departement_ids: Optional[Iterable[int]] = None
+    ):
+        """Lignes MetriqueDepartement de la période et du périmètre."""
+        return MetriqueDepartement.objects.filter(
+            date__gte=date_debut,
+            date__lte=date_fin,
+            departement_id__in=self.departements(departement_ids)
+        )
+
+    def filigrane(
+        self,
+        date_debut: date,
+        date_fin: date,
+        departement_ids: Optional[Iterable[int]] = None
+    ) -> Dict[str, Optional[str]]:
+        """
+        Filigrane des données: dernière modification et nombre de lignes.
+        Change dès qu'un agrégat du périmètre est créé ou modifié.
+        """
+        etat = self.agregats(date_debut, date_fin, departement_ids).aggregate(
+            modifie_le=Max('modifie_le'),
+            lignes=Count('id')
+        )
+        return {
+            'modifie_le': etat['modifie_le'].isoformat() if etat['modifie_le'] else None,
+            'lignes': etat['lignes'],
+        }
+
+    def est_definitif(
+        self,
+        date_debut: date,
+        date_fin: date,
+        departement_ids: Optional[Iterable[int]] = None
+    ) -> bool:
+        """Vrai si tous les agrégats de la période existent et sont définitifs."""
+        departements = self.departements(departement_ids)
+        attendus = ((date_fin - date_debut).days + 1) * len(departements)
+        return self.agregats(date_debut, date_fin, departements).filter(
+            definitif=True
+        ).count() == attendus
+
+    def consolider(
+        self,
+        date_debut: date,
+        date_fin: date,
+        departement_ids: Optional[Iterable[int]] = None
+    ) -> int:
+        """
+        Calcule les agrégats manquants ou non définitifs de la période.
+
+        Returns:
+            Nombre de lignes créées ou modifiées
+        """
+        departements = self.departements(departement_ids)
+        aujourdhui = timezone.localdate()
+        date_fin = min(date_fin, aujourdhui)
+        if not departements or date_debut > date_fin:
+            return 0
+
+        existants = {
+            (m.departement_id, m.date): m
+            for m in self.agregats(date_debut, date_fin, departements)
+        }
+        jours = [
+            date_debut + timedelta(days=i)
+            for i in range((date_fin - date_debut).days + 1)
+        ]
+        a_calculer = [
+            jour for jour in jours
+            if any(
+                (d, jour) not in existants or not existants[(d, jour)].definitif
+                for d in departements
+            )
+        ]
+        if not a_calculer:
+            return 0
+
+        valeurs = self._calculer(a_calculer[0], a_calculer[-1], departements)
+        limite_cloture = aujourdhui - timedelta(days=self.JOURS_CLOTURE)
+        maintenant = timezone.now()
+
+        creations, modifications = [], []
+        for jour in a_calculer:
+            for departement_id in departements:
+                calcul = valeurs.get((departement_id, jour), {})
+                ouverts = calcul.pop('ouverts', 0)
+                champs = {
+                    c: calcul.get(c) if c.endswith('_minutes') else calcul.get(c, 0)
+                    for c in CHAMPS_AGREGES
+                }
+                definitif = jour < aujourdhui and (ouverts == 0 or jour < limite_cloture)
+
+                existant = existants.get((departement_id, jour))
+                if existant is None:
+                    creations.append(MetriqueDepartement(
+                        departement_id=departement_id, date=jour, definitif=definitif, **champs
+                    ))
+                elif existant.definitif:
+                    continue
+                elif definitif or any(getattr(existant, c) != v for c, v in champs.items()):
+                    for champ, valeur in champs.items():
+                        setattr(existant, champ, valeur)
+                    existant.definitif = definitif
+                    existant.modifie_le = maintenant
+                    modifications.append(existant)
+
+        MetriqueDepartement.objects.bulk_create(creations, batch_size=500)
+        MetriqueDepartement.objects.bulk_update(
+            modifications, CHAMPS_AGREGES + ['definitif', 'modifie_le'], batch_size=500
+        )
+        # Opérations groupées sans signaux: invalidation explicite du cache des lectures
+        if creations or modifications:
+            invalider('metriques', *{
+                etiquette('metriques', departement=metrique.departement_id)
+                for metrique in creations + modifications
+            })
+        return len(creations) + len(modifications)
+
+    def _calculer(
+        self,
+        date_debut: date,
+        date_fin: date,
+        departements: List[int]
+    ) -> Dict[Tuple[int, date], Dict[str, int]]:
+        """Compteurs par (département, jour), par requêtes groupées (archives incluses)."""
+        debut, fin = _bornes(date_debut, date_fin)
+        valeurs: Dict[Tuple[int, date], Dict[str, int]] = {}
+
+        def cumul(departement_id, jour):
+            return valeurs.setdefault((departement_id, jour), {
+                c: 0 for c in CHAMPS_AGREGES if not c.endswith('_minutes')
+            } | {'ouverts': 0})
+
+        duree_workflow = ExpressionWrapper(F('termine_le') - F('demarre_le'), output_field=DurationField())
+        durees: Dict[Tuple[int, date], List[Tuple[timedelta, int]]] = {}
+        for source in sources_instances(debut):
+            for ligne in source.filter(
+                departement_id__in=departements,
+                demarre_le__gte=debut,
+                demarre_le__lt=fin
+            ).annotate(jour=TruncDate('demarre_le')).values('departement_id', 'jour').annotate(
+                demarres=Count('id'),
+                termines=Count('id', filter=Q(statut='TERMINE')),
+                abandonnes=Count('id', filter=Q(statut='ABANDONNE')),
+                ouverts=Count('id', filter=Q(statut__in=STATUTS_WORKFLOW_OUVERTS)),
+                termines_dates=Count('id', filter=Q(statut='TERMINE', termine_le__isnull=False)),
+                duree=Avg(duree_workflow, filter=Q(statut='TERMINE', termine_le__isnull=False))
+            ):
+                compteurs = cumul(ligne['departement_id'], ligne['jour'])
+                compteurs['workflows_demarre'] += ligne['demarres']
+                compteurs['workflows_termines'] += ligne['termines']
+                compteurs['workflows_abandonnes'] += ligne['abandonnes']
+                compteurs['ouverts'] += ligne['ouverts']
+                if ligne['duree'] is not None:
+                    durees.setdefault((ligne['departement_id'], ligne['jour']), []).append(
+                        (ligne['duree'], ligne['termines_dates'])
+                    )
+
+        for ligne in MicroEvenement.objects.filter(
+            departement_id__in=departements,
+            signale_le__gte=debut,
+            signale_le__lt=fin
+        ).annotate(jour=TruncDate('signale_le')).values('departement_id', 'jour').annotate(
+            signales=Count('id'),
+            resolus=Count('id', filter=Q(statut='RESOLU')),
+            critiques=Count('id', filter=Q(severite='CRITIQUE')),
+            ouverts=Count('id', filter=Q(statut__in=STATUTS_EVENEMENT_OUVERTS)),
+            delai=Avg(
+                ExpressionWrapper(F('resolu_le') - F('signale_le'), output_field=DurationField()),
+                filter=Q(statut='RESOLU', resolu_le__isnull=False)
+            )
+        ):
+            compteurs = cumul(ligne['departement_id'], ligne['jour'])
+            compteurs['evenements_signales'] += ligne['signales']
+            compteurs['evenements_resolus'] += ligne['resolus']
+            compteurs['evenements_critiques'] += ligne['critiques']
+            compteurs['ouverts'] += ligne['ouverts']
+            compteurs['delai_resolution_moyen_minutes'] = _minutes(ligne['delai'])
+
+        # Moyenne pondérée des durées (tables actives et archive)
+        for cle, mesures in durees.items():
+            total = sum(n for _, n in mesures)
+            valeurs[cle]['duree_moyenne_workflow_minutes'] = _minutes(
+                sum((d * n for d, n in mesures), timedelta()) / total
+            ) if total else None
+
+        return valeurs
@@ -0,0 +1,323 @@
+"""
+Service Pattern - Indicateurs de files d'attente par étape.
+
+Chaque transition met à jour, par requêtes F(), le travail en cours (WIP)
+de l'étape quittée et de l'étape atteinte ainsi que les compteurs de
+l'intervalle de 15 minutes concerné. Les temps d'attente sont estimés par
+la loi de Little (W = L / λ) à partir de ces compteurs, sans relire les
+transitions brutes. Les compteurs sont écrits par update() et bulk_create,
+sans signaux: chaque écriture invalide l'étiquette `files_attente` des
+lectures conditionnelles.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import Any, Dict, List, Optional
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+
+from .models import CompteurEtape, DebitEtapeIntervalle
+from apps.core.cache import invalider
+from apps.workflows.models import EtapeWorkflow, InstanceWorkflow
+from apps.workflows.archivage import sources_transitions
+
+
+INTERVALLE_MINUTES = 15
+
+
+def debut_intervalle(moment: datetime) -> datetime:
+    """Début de l'intervalle de 15 minutes contenant le moment."""
+    return moment.replace(
+        minute=moment.minute - moment.minute % INTERVALLE_MINUTES,
+        second=0,
+        microsecond=0
+    )
+
+
+class FilesAttenteService:
+    """
+    Service des indicateurs de files d'attente (WIP, débit, attente estimée).
+    """
+
+    # Fenêtre glissante des estimations (4 intervalles = 1 heure)
+    FENETRE_INTERVALLES = 4
+    HEURES_SERIE = 24
+    JOURS_RECONSTRUCTION = 30
+    TAILLE_LOT = 1000
+
+    # ------------------------------------------------------------------
+    # Mise à jour incrémentale
+    # ------------------------------------------------------------------
+
+    def enregistrer_transition(
+        self,
+        etape_source_id: Optional[int],
+        etape_destination_id: Optional[int],
+        horodatage: datetime,
+        duree_etape_minutes: Optional[int] = None
+    ) -> None:
+        """
+        Répercute une transition sur les compteurs des deux étapes.
+
+        Args:
+            etape_source_id: Étape quittée (sortie)
+            etape_destination_id: Étape atteinte (entrée)
+            horodatage: Moment de la transition
+            duree_etape_minutes: Durée passée à l'étape quittée
+        """
+        intervalle = debut_intervalle(horodatage)
+
+        if etape_source_id:
+            self._incrementer(
+                etape_source_id, intervalle, -1,
+                sorties=1, sejour=duree_etape_minutes or 0
+            )
+        if etape_destination_id:
+            self._incrementer(etape_destination_id, intervalle, 1, entrees=1)
+        invalider('files_attente')
+
+    def _incrementer(
+        self,
+        etape_id: int,
+        intervalle: datetime,
+        delta: int,
+        entrees: int = 0,
+        sorties: int = 0,
+        sejour: int = 0
+    ) -> None:
+        """Mise à jour atomique du compteur et de l'intervalle d'une étape."""
+        compteurs = CompteurEtape.objects.filter(etape_id=etape_id)
+        maj_compteur = {
+            'en_cours': F('en_cours') + delta,
+            'entrees_total': F('entrees_total') + entrees,
+            'sorties_total': F('sorties_total') + sorties,
+            'modifie_le': timezone.now(),
+        }
+        if not compteurs.update(**maj_compteur):
+            CompteurEtape.objects.get_or_create(etape_id=etape_id)
+            compteurs.update(**maj_compteur)
+
+        intervalles = DebitEtapeIntervalle.objects.filter(etape_id=etape_id, debut=intervalle)
+        maj_intervalle = {
+            'entrees': F('entrees') + entrees,
+            'sorties': F('sorties') + sorties,
+            'sejour_total_minutes': F('sejour_total_minutes') + sejour,
+            'en_cours_fin': Subquery(
+                CompteurEtape.objects.filter(
+                    etape_id=OuterRef('etape_id')
+                ).values('en_cours')[:1]
+            ),
+        }
+        if not intervalles.update(**maj_intervalle):
+            DebitEtapeIntervalle.objects.get_or_create(etape_id=etape_id, debut=intervalle)
+            intervalles.update(**maj_intervalle)
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def obtenir_instantane(
+        self,
+        type_workflow_id: Optional[int] = None,
+        departement_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        État courant de chaque étape: WIP, débit sur l'heure écoulée et
+        attente estimée. Coût proportionnel au nombre d'étapes.
+
+        Args:
+            type_workflow_id: Filtrer par type de workflow (optionnel)
+            departement_id: Filtrer par département responsable (optionnel)
+
+        Returns:
+            Liste d'indicateurs par étape
+        """
+        etapes = EtapeWorkflow.objects.filter(type_workflow__est_actif=True)
+        if type_workflow_id:
+            etapes = etapes.filter(type_workflow_id=type_workflow_id)
+        if departement_id:
+            etapes = etapes.filter(departement_responsable_id=departement_id)
+        etapes = list(etapes.order_by('type_workflow_id', 'ordre').values(
+            'id', 'nom', 'type_workflow_id', 'departement_responsable_id',
+            'duree_estimee_minutes', 'compteur__en_cours'
+        ))
+
+        # Deux fenêtres: l'heure écoulée et l'heure précédente
+        duree_fenetre = timedelta(minutes=INTERVALLE_MINUTES * self.FENETRE_INTERVALLES)
+        limite = debut_intervalle(timezone.now()) + timedelta(minutes=INTERVALLE_MINUTES)
+        debut_fenetre = limite - duree_fenetre
+        debut_precedente = debut_fenetre - duree_fenetre
+
+        sorties = defaultdict(int)
+        sorties_precedentes = defaultdict(int)
+        entrees = defaultdict(int)
+        for etape_id, debut, nb_entrees, nb_sorties in DebitEtapeIntervalle.objects.filter(
+            etape_id__in=[e['id'] for e in etapes],
+            debut__gte=debut_precedente
+        ).values_list('etape_id', 'debut', 'entrees', 'sorties'):
+            if debut >= debut_fenetre:
+                sorties[etape_id] += nb_sorties
+                entrees[etape_id] += nb_entrees
+            else:
+                sorties_precedentes[etape_id] += nb_sorties
+
+        minutes_fenetre = duree_fenetre.total_seconds() / 60
+        resultat = []
+        for etape in etapes:
+            en_cours = max(etape['compteur__en_cours'] or 0, 0)
+            debit = sorties[etape['id']] / minutes_fenetre
+            resultat.append({
+                'etape_id': etape['id'],
+                'etape_nom': etape['nom'],
+                'type_workflow_id': etape['type_workflow_id'],
+                'departement_id': etape['departement_responsable_id'],
+                'duree_estimee_minutes': etape['duree_estimee_minutes'],
+                'en_cours': en_cours,
+                'entrees_heure': entrees[etape['id']],
+                'sorties_heure': sorties[etape['id']],
+                'sorties_heure_precedente': sorties_precedentes[etape['id']],
+                # WIP au début de la fenêtre = WIP actuel - (entrées - sorties)
+                'variation_en_cours': entrees[etape['id']] - sorties[etape['id']],
+                'attente_estimee_minutes': round(en_cours / debit, 1) if debit else None,
+            })
+        return resultat
+
+    def obtenir_serie(
+        self,
+        etape_id: int,
+        heures: int = HEURES_SERIE
+    ) -> List[Dict[str, Any]]:
+        """
+        Série temporelle par intervalle de 15 minutes pour une étape.
+
+        Les intervalles sans transition sont complétés (débit nul, WIP
+        inchangé). L'attente estimée utilise la moyenne glissante du WIP et
+        du débit sur FENETRE_INTERVALLES intervalles.
+
+        Args:
+            etape_id: Étape concernée
+            heures: Profondeur de la série
+
+        Returns:
+            Liste de points, du plus ancien au plus récent
+        """
+        pas = timedelta(minutes=INTERVALLE_MINUTES)
+        fin = debut_intervalle(timezone.now())
+        debut = fin - timedelta(hours=heures) + pas
+
+        lignes = {
+            ligne['debut']: ligne
+            for ligne in DebitEtapeIntervalle.objects.filter(
+                etape_id=etape_id,
+                debut__gte=debut,
+                debut__lte=fin
+            ).values('debut', 'entrees', 'sorties', 'en_cours_fin', 'sejour_total_minutes')
+        }
+        precedent = DebitEtapeIntervalle.objects.filter(
+            etape_id=etape_id,
+            debut__lt=debut
+        ).order_by('-debut').values_list('en_cours_fin', flat=True).first()
+        en_cours = precedent or 0
+
+        serie = []
+        fenetre_en_cours: List[int] = []
+        fenetre_sorties: List[int] = []
+        moment = debut
+        while moment <= fin:
+            ligne = lignes.get(moment)
+            nb_sorties = ligne['sorties'] if ligne else 0
+            if ligne:
+                en_cours = ligne['en_cours_fin']
+
+            fenetre_en_cours = (fenetre_en_cours + [max(en_cours, 0)])[-self.FENETRE_INTERVALLES:]
+            fenetre_sorties = (fenetre_sorties + [nb_sorties])[-self.FENETRE_INTERVALLES:]
+            wip_moyen = sum(fenetre_en_cours) / len(fenetre_en_cours)
+            debit = sum(fenetre_sorties) / (len(fenetre_sorties) * INTERVALLE_MINUTES)
+
+            serie.append({
+                'debut': moment,
+                'entrees': ligne['entrees'] if ligne else 0,
+                'sorties': nb_sorties,
+                'en_cours': max(en_cours, 0),
+                'debit_horaire': round(debit * 60, 2),
+                'attente_estimee_minutes': round(wip_moyen / debit, 1) if debit else None,
+                'sejour_moyen_minutes': (
+                    round(ligne['sejour_total_minutes'] / nb_sorties, 1)
+                    if nb_sorties else None
+                ),
+            })
+            moment += pas
+        return serie
+
+    # ------------------------------------------------------------------
+    # Reconstruction
+    # ------------------------------------------------------------------
+
+    @transaction.atomic
+    def reconstruire(self, jours: int = JOURS_RECONSTRUCTION) -> int:
+        """
+        Recalcule les compteurs depuis les instances actives et l'historique.
+
+        Le WIP actuel est compté sur InstanceWorkflow.etape_actuelle; le WIP de
+        fin de chaque intervalle en est déduit en remontant le temps.
+
+        Args:
+            jours: Profondeur d'historique reconstruite
+
+        Returns:
+            Nombre d'intervalles enregistrés
+        """
+        en_cours = defaultdict(int)
+        for etape_id in InstanceWorkflow.objects.filter(
+            statut__in=[
+                InstanceWorkflow.Statut.INITIE,
+                InstanceWorkflow.Statut.EN_COURS,
+                InstanceWorkflow.Statut.EN_PAUSE,
+            ],
+            etape_actuelle__isnull=False
+        ).values_list('etape_actuelle_id', flat=True).iterator(chunk_size=self.TAILLE_LOT):
+            en_cours[etape_id] += 1
+
+        depuis = debut_intervalle(timezone.now() - timedelta(days=jours))
+        intervalles: Dict[int, Dict[datetime, List[int]]] = defaultdict(dict)
+        for source_id, destination_id, horodatage, duree in chain.from_iterable(
+            source.filter(horodatage__gte=depuis).values_list(
+                'etape_source_id', 'etape_destination_id', 'horodatage', 'duree_etape_minutes'
+            ).iterator(chunk_size=self.TAILLE_LOT)
+            for source in sources_transitions(depuis)
+        ):
+            debut = debut_intervalle(horodatage)
+            if source_id:
+                compteurs = intervalles[source_id].setdefault(debut, [0, 0, 0])
+                compteurs[1] += 1
+                compteurs[2] += duree or 0
+            if destination_id:
+                intervalles[destination_id].setdefault(debut, [0, 0, 0])[0] += 1
+
+        etape_ids = list(EtapeWorkflow.objects.values_list('id', flat=True))
+        CompteurEtape.objects.all().delete()
+        CompteurEtape.objects.bulk_create(
+            [CompteurEtape(etape_id=i, en_cours=en_cours[i]) for i in etape_ids],
+            batch_size=self.TAILLE_LOT
+        )
+
+        DebitEtapeIntervalle.objects.filter(debut__gte=depuis).delete()
+        lignes = []
+        for etape_id, par_intervalle in intervalles.items():
+            wip = en_cours[etape_id]
+            for debut in sorted(par_intervalle, reverse=True):
+                nb_entrees, nb_sorties, sejour = par_intervalle[debut]
+                lignes.append(DebitEtapeIntervalle(
+                    etape_id=etape_id,
+                    debut=debut,
+                    entrees=nb_entrees,
+                    sorties=nb_sorties,
+                    en_cours_fin=wip,
+                    sejour_total_minutes=sejour
+                ))
+                wip -= nb_entrees - nb_sorties
+        DebitEtapeIntervalle.objects.bulk_create(lignes, batch_size=self.TAILLE_LOT)
+        invalider('files_attente')
+        return len(lignes)
@@ -0,0 +1,436 @@
+"""
+Service Pattern - Fouille de processus sur l'historique des transitions.
+
+Le modèle suppose un parcours linéaire (EtapeWorkflow.ordre) alors que les
+parcours réels sautent, répètent ou abandonnent des étapes. Ce module
+reconstitue les parcours à partir de TransitionEtape et calcule:
+- le graphe des successions directes (fréquence et durées par arc);
+- les variantes de parcours et leur fréquence.
+
+Les transitions sont lues par lots ordonnés (instance, horodatage) et les
+étapes sont encodées en entiers: la mémoire utilisée dépend du nombre
+d'étapes et de variantes, pas du nombre de transitions.
+"""
+from datetime import date, datetime, time, timedelta
+from itertools import chain, islice
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from django.utils import timezone
+
+from .models import AnalyseProcessus
+from apps.workflows.models import EtapeWorkflow, InstanceWorkflow, TypeWorkflow
+from apps.workflows.archivage import sources_transitions
+
+
+class FouilleProcessusException(Exception):
+    """Exception pour les erreurs de fouille de processus."""
+    pass
+
+
+DEBUT = 'DEBUT'
+FIN = 'FIN'
+ABANDON = 'ABANDON'
+
+
+class _Accumulateur:
+    """
+    Compteurs du graphe des successions directes et des variantes.
+
+    Les activités sont encodées de 0 à n-1 (étapes) puis n, n+1, n+2
+    (DEBUT, FIN, ABANDON); un arc (a, b) correspond à l'indice a * m + b.
+    """
+
+    def __init__(self, nombre_etapes: int):
+        self.debut = nombre_etapes
+        self.fin = nombre_etapes + 1
+        self.abandon = nombre_etapes + 2
+        self.m = nombre_etapes + 3
+        taille = self.m * self.m
+
+        self.frequences = np.zeros(taille, dtype=np.int64)
+        self.nombre_durees = np.zeros(taille, dtype=np.int64)
+        self.sommes = np.zeros(taille, dtype=np.float64)
+        self.sommes_carres = np.zeros(taille, dtype=np.float64)
+        self.minima = np.full(taille, np.inf)
+        self.maxima = np.full(taille, -np.inf)
+
+        # Variante (séquence encodée) -> [fréquence, somme des durées]
+        self.variantes: Dict[bytes, List[float]] = {}
+        self.nombre_instances = 0
+        self.nombre_transitions = 0
+
+        # Parcours en cours (l'instance peut être à cheval sur deux lots)
+        self._instance = -1
+        self._trace: List[np.ndarray] = []
+        self._premier_horodatage = 0.0
+        self._derniere_activite = -1
+        self._dernier_horodatage = 0.0
+
+    def ajouter_lot(
+        self,
+        instances: np.ndarray,
+        sources: np.ndarray,
+        activites: np.ndarray,
+        horodatages: np.ndarray,
+        durees: np.ndarray
+    ) -> None:
+        """
+        Intègre un lot de transitions ordonnées par (instance, horodatage).
+
+        Args:
+            instances: ID d'instance par transition
+            sources: Étape source encodée (-1 si absente)
+            activites: Activité atteinte encodée (étape, FIN ou ABANDON)
+            horodatages: Horodatages en secondes
+            durees: Durée enregistrée de l'étape source en minutes (NaN si absente)
+        """
+        self.nombre_transitions += instances.size
+
+        instances_precedentes = np.r_[self._instance, instances[:-1]]
+        activites_precedentes = np.r_[self._derniere_activite, activites[:-1]]
+        horodatages_precedents = np.r_[self._dernier_horodatage, horodatages[:-1]]
+        nouvelles = instances != instances_precedentes
+
+        # Arcs entre deux transitions consécutives d'une même instance
+        suite = ~nouvelles
+        origines = [activites_precedentes[suite]]
+        cibles = [activites[suite]]
+        valeurs = [(horodatages[suite] - horodatages_precedents[suite]) / 60.0]
+
+        # Début de parcours: DEBUT -> première activité; si la source est
+        # connue (parcours commencé avant la période), DEBUT -> source -> activité
+        sans_source = nouvelles & (sources < 0)
+        avec_source = nouvelles & (sources >= 0)
+        origines += [
+            np.full(np.count_nonzero(sans_source), self.debut),
+            np.full(np.count_nonzero(avec_source), self.debut),
+            sources[avec_source],
+        ]
+        cibles += [activites[sans_source], sources[avec_source], activites[avec_source]]
+        valeurs += [
+            np.full(np.count_nonzero(sans_source), np.nan),
+            np.full(np.count_nonzero(avec_source), np.nan),
+            durees[avec_source],
+        ]
+
+        arcs = np.concatenate(origines) * self.m + np.concatenate(cibles)
+        valeurs = np.concatenate(valeurs)
+        taille = self.m * self.m
+
+        self.frequences += np.bincount(arcs, minlength=taille)
+        mesurees = ~np.isnan(valeurs)
+        arcs, valeurs = arcs[mesurees], valeurs[mesurees]
+        self.nombre_durees += np.bincount(arcs, minlength=taille)
+        self.sommes += np.bincount(arcs, weights=valeurs, minlength=taille)
+        self.sommes_carres += np.bincount(arcs, weights=valeurs * valeurs, minlength=taille)
+        np.minimum.at(self.minima, arcs, valeurs)
+        np.maximum.at(self.maxima, arcs, valeurs)
+
+        self._ajouter_traces(instances, sources, activites, horodatages, nouvelles)
+
+    def _ajouter_traces(
+        self,
+        instances: np.ndarray,
+        sources: np.ndarray,
+        activites: np.ndarray,
+        horodatages: np.ndarray,
+        nouvelles: np.ndarray
+    ) -> None:
+        """Découpe le lot en parcours par instance et compte les variantes."""
+        debuts = np.flatnonzero(nouvelles)
+        bornes = np.r_[debuts, instances.size]
+
+        # Suite du parcours ouvert au lot précédent
+        premier = bornes[0]
+        if premier > 0:
+            self._trace.append(activites[:premier])
+
+        for i, debut in enumerate(debuts):
+            if debut > 0:
+                self._dernier_horodatage = float(horodatages[debut - 1])
+            self._clore_trace()
+            fin = bornes[i + 1]
+            prefixe = [self.debut] if sources[debut] < 0 else [self.debut, sources[debut]]
+            self._instance = int(instances[debut])
+            self._trace = [np.array(prefixe, dtype=np.int32), activites[debut:fin]]
+            self._premier_horodatage = float(horodatages[debut])
+
+        self._derniere_activite = int(activites[-1])
+        self._dernier_horodatage = float(horodatages[-1])
+
+    def _clore_trace(self) -> None:
+        """Enregistre la variante du parcours ouvert."""
+        if not self._trace:
+            return
+        cle = np.concatenate(self._trace).astype(np.int32).tobytes()
+        variante = self.variantes.setdefault(cle, [0, 0.0])
+        variante[0] += 1
+        variante[1] += (self._dernier_horodatage - self._premier_horodatage) / 60.0
+        self.nombre_instances += 1
+        self._trace = []
+
+    def terminer(self) -> None:
+        """Clôt le dernier parcours ouvert."""
+        self._clore_trace()
+
+
+class FouilleProcessusService:
+    """
+    Service de fouille de processus par type de workflow.
+
+    Les résultats sont conservés dans AnalyseProcessus: une période close est
+    calculée une seule fois, une période ouverte est recalculée après
+    DUREE_VALIDITE_MINUTES.
+    """
+
+    JOURS_DEFAUT = 30
+    TAILLE_LOT = 10000
+    MAX_VARIANTES = 50
+    DUREE_VALIDITE_MINUTES = 15
+
+    def obtenir_analyse(
+        self,
+        type_workflow_id: int,
+        debut: datetime,
+        fin: datetime,
+        recalculer: bool = False
+    ) -> AnalyseProcessus:
+        """
+        Retourne l'analyse de la période, depuis le cache si elle est à jour.
+
+        Args:
+            type_workflow_id: Type de workflow analysé
+            debut: Début de période (inclus)
+            fin: Fin de période (exclue)
+            recalculer: Ignorer le résultat en cache
+
+        Returns:
+            AnalyseProcessus: L'analyse enregistrée
+        """
+        if debut >= fin:
+            raise FouilleProcessusException("La période analysée est vide.")
+        if not TypeWorkflow.objects.filter(pk=type_workflow_id).exists():
+            raise FouilleProcessusException("Type de workflow introuvable.")
+
+        maintenant = timezone.now()
+        analyse = AnalyseProcessus.objects.filter(
+            type_workflow_id=type_workflow_id,
+            periode_debut=debut,
+            periode_fin=fin
+        ).first()
+
+        if analyse and not recalculer:
+            periode_close = fin <= analyse.calcule_le
+            a_jour = analyse.calcule_le >= maintenant - timedelta(minutes=self.DUREE_VALIDITE_MINUTES)
+            if periode_close or a_jour:
+                return analyse
+
+        resultat = self.analyser(type_workflow_id, debut, fin)
+        analyse, _ = AnalyseProcessus.objects.update_or_create(
+            type_workflow_id=type_workflow_id,
+            periode_debut=debut,
+            periode_fin=fin,
+            defaults={
+                'nombre_instances': resultat['nombre_instances'],
+                'nombre_transitions': resultat['nombre_transitions'],
+                'resultat': resultat,
+            }
+        )
+        return analyse
+
+    def analyser(self, type_workflow_id: int, debut: datetime, fin: datetime) -> Dict[str, Any]:
+        """
+        Calcule le graphe des successions directes et les variantes.
+
+        Args:
+            type_workflow_id: Type de workflow analysé
+            debut: Début de période (inclus)
+            fin: Fin de période (exclue)
+
+        Returns:
+            Dictionnaire sérialisable (activités, arcs, variantes)
+        """
+        etapes = list(EtapeWorkflow.objects.filter(
+            type_workflow_id=type_workflow_id
+        ).order_by('ordre').values_list('id', 'nom'))
+        identifiants = np.array(sorted(e[0] for e in etapes), dtype=np.int64)
+        accumulateur = _Accumulateur(identifiants.size)
+
+        # Archive puis tables actives: une instance n'est jamais dans les deux,
+        # chaque parcours reste donc contigu dans le flux
+        lignes = chain.from_iterable(
+            source.filter(
+                instance__type_workflow_id=type_workflow_id,
+                horodatage__gte=debut,
+                horodatage__lt=fin
+            ).order_by('instance_id', 'horodatage', 'id').values_list(
+                'instance_id',
+                'etape_source_id',
+                'etape_destination_id',
+                'instance__statut',
+                'horodatage',
+                'duree_etape_minutes'
+            ).iterator(chunk_size=self.TAILLE_LOT)
+            for source in sources_transitions(debut)
+        )
+
+        while True:
+            lot = list(islice(lignes, self.TAILLE_LOT))
+            if not lot:
+                break
+            tableaux = self._encoder_lot(lot, identifiants, accumulateur)
+            if tableaux[0].size:
+                accumulateur.ajouter_lot(*tableaux)
+        accumulateur.terminer()
+
+        return self._construire_resultat(
+            type_workflow_id, debut, fin, etapes, identifiants, accumulateur
+        )
+
+    @staticmethod
+    def _encoder_lot(
+        lot: List[tuple],
+        identifiants: np.ndarray,
+        accumulateur: _Accumulateur
+    ) -> Tuple[np.ndarray, ...]:
+        """Convertit un lot de lignes en tableaux d'entiers encodés."""
+        instances, sources, destinations, statuts, horodatages, durees = zip(*lot)
+
+        def encoder(ids) -> np.ndarray:
+            valeurs = np.array([-1 if i is None else i for i in ids], dtype=np.int64)
+            positions = np.searchsorted(identifiants, valeurs)
+            positions = np.minimum(positions, max(identifiants.size - 1, 0))
+            connues = identifiants.size > 0
+            trouvees = (identifiants[positions] == valeurs) if connues else np.zeros(valeurs.size, bool)
+            return np.where(trouvees, positions, -1).astype(np.int32)
+
+        sources = encoder(sources)
+        activites = encoder(destinations)
+
+        # Transition sans destination: fin de parcours ou abandon
+        abandon = np.array(
+            [s == InstanceWorkflow.Statut.ABANDONNE for s in statuts], dtype=bool
+        )
+        sans_destination = np.array([d is None for d in destinations], dtype=bool)
+        activites[sans_destination & abandon] = accumulateur.abandon
+        activites[sans_destination & ~abandon] = accumulateur.fin
+
+        # Étapes hors du type de workflow (données incohérentes): ignorées
+        valides = activites >= 0
+        return (
+            np.array(instances, dtype=np.int64)[valides],
+            sources[valides],
+            activites[valides],
+            np.array([h.timestamp() for h in horodatages], dtype=np.float64)[valides],
+            np.array([np.nan if d is None else d for d in durees], dtype=np.float64)[valides],
+        )
+
+    def _construire_resultat(
+        self,
+        type_workflow_id: int,
+        debut: datetime,
+        fin: datetime,
+        etapes: List[Tuple[int, str]],
+        identifiants: np.ndarray,
+        acc: _Accumulateur
+    ) -> Dict[str, Any]:
+        """Décode les compteurs en activités, arcs et variantes."""
+        noms = dict(etapes)
+        cles: List[Any] = [int(i) for i in identifiants] + [DEBUT, FIN, ABANDON]
+        libelles = [noms[int(i)] for i in identifiants] + ['Début', 'Fin', 'Abandon']
+
+        frequences = acc.frequences.reshape(acc.m, acc.m)
+        activites = [
+            {'cle': cles[i], 'nom': libelles[i], 'frequence': int(frequences[:, i].sum())}
+            for i in range(acc.m - 3)
+        ]
+
+        arcs = []
+        for indice in np.flatnonzero(acc.frequences):
+            source, destination = divmod(int(indice), acc.m)
+            n = int(acc.nombre_durees[indice])
+            arc = {
+                'source': cles[source],
+                'source_nom': libelles[source],
+                'destination': cles[destination],
+                'destination_nom': libelles[destination],
+                'frequence': int(acc.frequences[indice]),
+                'duree_moyenne_minutes': None,
+                'duree_ecart_type_minutes': None,
+                'duree_min_minutes': None,
+                'duree_max_minutes': None,
+            }
+            if n:
+                moyenne = acc.sommes[indice] / n
+                variance = max(acc.sommes_carres[indice] / n - moyenne * moyenne, 0.0)
+                arc.update({
+                    'duree_moyenne_minutes': round(float(moyenne), 1),
+                    'duree_ecart_type_minutes': round(float(np.sqrt(variance)), 1),
+                    'duree_min_minutes': round(float(acc.minima[indice]), 1),
+                    'duree_max_minutes': round(float(acc.maxima[indice]), 1),
+                })
+            arcs.append(arc)
+        arcs.sort(key=lambda a: -a['frequence'])
+
+        # Parcours nominal: toutes les étapes dans l'ordre défini
+        positions = {int(i): p for p, i in enumerate(identifiants)}
+        nominale = np.array(
+            [acc.debut] + [positions[e[0]] for e in etapes] + [acc.fin], dtype=np.int32
+        ).tobytes()
+
+        total = acc.nombre_instances or 1
+        variantes = []
+        for cle, (frequence, somme_durees) in sorted(
+            acc.variantes.items(), key=lambda v: -v[1][0]
+        )[:self.MAX_VARIANTES]:
+            sequence = np.frombuffer(cle, dtype=np.int32)
+            variantes.append({
+                'sequence': [cles[a] for a in sequence],
+                'noms': [libelles[a] for a in sequence],
+                'frequence': int(frequence),
+                'pourcentage': round(100.0 * frequence / total, 1),
+                'duree_moyenne_minutes': round(somme_durees / frequence, 1),
+                'est_nominale': cle == nominale,
+            })
+
+        instances_nominales = acc.variantes.get(nominale, [0])[0]
+
+        return {
+            'type_workflow': type_workflow_id,
+            'periode_debut': debut.isoformat(),
+            'periode_fin': fin.isoformat(),
+            'nombre_instances': acc.nombre_instances,
+            'nombre_transitions': acc.nombre_transitions,
+            'nombre_variantes': len(acc.variantes),
+            'taux_conformite': round(100.0 * instances_nominales / total, 1),
+            'activites': activites,
+            'arcs': arcs,
+            'variantes': variantes,
+        }
+
+    @classmethod
+    def calculer_periode(
+        cls,
+        date_debut: Optional[date] = None,
+        date_fin: Optional[date] = None,
+        jours: Optional[int] = None
+    ) -> Tuple[datetime, datetime]:
+        """
+        Bornes de période à minuit local, pour que les demandes identiques
+        partagent le même résultat en cache.
+
+        Args:
+            date_debut: Premier jour inclus (défaut: date_fin - jours)
+            date_fin: Dernier jour inclus (défaut: aujourd'hui)
+            jours: Nombre de jours si date_debut est absente
+
+        Returns:
+            (début inclus, fin exclue)
+        """
+        date_fin = date_fin or timezone.localdate()
+        date_debut = date_debut or date_fin - timedelta(days=(jours or cls.JOURS_DEFAUT) - 1)
+        return (
+            timezone.make_aware(datetime.combine(date_debut, time.min)),
+            timezone.make_aware(datetime.combine(date_fin + timedelta(days=1), time.min)),
+        )
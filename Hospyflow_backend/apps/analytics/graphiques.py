@@ -0,0 +1,86 @@
+"""
+Graphiques de tendance des rapports, rastérisés avec Pillow.
+
+Chaque graphique est identifié par le hachage de ses données: il est dessiné
+une seule fois puis relu depuis MEDIA_ROOT/rapports/graphiques/ par tous les
+rapports (et tous les processus) qui en ont besoin.
+"""
+import hashlib
+import json
+import os
+from typing import Dict, List, Sequence
+
+from django.conf import settings
+from PIL import Image, ImageDraw, ImageFont
+
+DOSSIER_GRAPHIQUES = os.path.join('rapports', 'graphiques')
+
+LARGEUR = 900
+HAUTEUR = 260
+MARGE_GAUCHE = 50
+MARGE = 20
+HAUTEUR_LEGENDE = 24
+
+COULEURS = ['#1f77b4', '#2ca02c', '#d62728', '#ff7f0e']
+
+
+def chemin_graphique(series: Dict[str, Sequence[int]]) -> str:
+    """
+    Chemin absolu du graphique des séries, dessiné s'il n'existe pas encore.
+
+    Args:
+        series: Libellé -> valeurs quotidiennes (même longueur pour toutes)
+    """
+    contenu = json.dumps(series, sort_keys=True, default=list).encode()
+    nom = hashlib.sha256(contenu).hexdigest()[:32] + '.png'
+    chemin = os.path.join(settings.MEDIA_ROOT, DOSSIER_GRAPHIQUES, nom)
+    if not os.path.exists(chemin):
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        temporaire = f"{chemin}.{os.getpid()}.tmp"
+        try:
+            tracer_tendance(series).save(temporaire, format='PNG')
+            os.replace(temporaire, chemin)
+        finally:
+            if os.path.exists(temporaire):
+                os.remove(temporaire)
+    return chemin
+
+
+def tracer_tendance(series: Dict[str, Sequence[int]]) -> Image.Image:
+    """Courbes quotidiennes des séries sur un même axe."""
+    image = Image.new('RGB', (LARGEUR, HAUTEUR), 'white')
+    dessin = ImageDraw.Draw(image)
+    police = ImageFont.load_default()
+
+    zone = (MARGE_GAUCHE, MARGE, LARGEUR - MARGE, HAUTEUR - MARGE - HAUTEUR_LEGENDE)
+    gauche, haut, droite, bas = zone
+    valeurs: List[int] = [v for serie in series.values() for v in serie]
+    maximum = max(max(valeurs, default=0), 1)
+    points = max((len(serie) for serie in series.values()), default=0)
+
+    # Axes et graduations horizontales
+    for fraction in (0, 0.5, 1):
+        y = bas - fraction * (bas - haut)
+        dessin.line([(gauche, y), (droite, y)], fill='#dddddd')
+        dessin.text((5, y - 6), f"{maximum * fraction:g}", fill='#555555', font=police)
+    dessin.line([(gauche, haut), (gauche, bas), (droite, bas)], fill='#333333')
+
+    pas = (droite - gauche) / max(points - 1, 1)
+    for index, (libelle, serie) in enumerate(series.items()):
+        couleur = COULEURS[index % len(COULEURS)]
+        coordonnees = [
+            (gauche + i * pas, bas - v / maximum * (bas - haut))
+            for i, v in enumerate(serie)
+        ]
+        if len(coordonnees) > 1:
+            dessin.line(coordonnees, fill=couleur, width=2)
+        elif coordonnees:
+            x, y = coordonnees[0]
+            dessin.ellipse([x - 2, y - 2, x + 2, y + 2], fill=couleur)
+
+        x_legende = gauche + index * 200
+        y_legende = HAUTEUR - HAUTEUR_LEGENDE + 6
+        dessin.rectangle([x_legende, y_legende, x_legende + 12, y_legende + 10], fill=couleur)
+        dessin.text((x_legende + 18, y_legende - 1), libelle, fill='#333333', font=police)
+
+    return image
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from apps.analytics.files_attente import FilesAttenteService
+
+
+class Command(BaseCommand):
+    help = "Reconstruit le WIP par étape et les débits par intervalle de 15 minutes depuis l'historique"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--jours',
+            type=int,
+            default=FilesAttenteService.JOURS_RECONSTRUCTION,
+            help="Profondeur d'historique reconstruite (jours)"
+        )
+
+    def handle(self, *args, **options):
+        nombre = FilesAttenteService().reconstruire(jours=options['jours'])
+        self.stdout.write(self.style.SUCCESS(f'{nombre} intervalle(s) reconstruit(s).'))
@@ -0,0 +1,74 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from apps.analytics.rapports import RapportService, traiter_rapport
+
+
+def _initialiser_worker():
+    """Chaque processus ouvre ses propres connexions à la base."""
+    django.setup()
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Worker de génération des rapports en attente (PDF/CSV)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.RAPPORTS_WORKERS,
+            help='Nombre de processus de génération (défaut: RAPPORTS_WORKERS)'
+        )
+        parser.add_argument(
+            '--intervalle',
+            type=float,
+            default=2.0,
+            help='Délai entre deux recherches de rapports en attente (secondes)'
+        )
+        parser.add_argument(
+            '--une-fois',
+            action='store_true',
+            help='Traiter les rapports en attente puis quitter'
+        )
+
+    def handle(self, *args, **options):
+        service = RapportService()
+        workers = max(options['workers'], 1)
+
+        relances = service.relancer_expires()
+        if relances:
+            self.stdout.write(f'{relances} rapport(s) expiré(s) remis en attente.')
+
+        # Les processus fils ne doivent pas hériter des connexions ouvertes
+        connections.close_all()
+        en_cours = {}
+        with ProcessPoolExecutor(max_workers=workers, initializer=_initialiser_worker) as pool:
+            self.stdout.write(f'Worker de rapports démarré ({workers} processus).')
+            try:
+                while True:
+                    libres = workers - len(en_cours)
+                    if libres > 0:
+                        for rapport_id in service.ids_en_attente(libres, exclure=list(en_cours.values())):
+                            en_cours[pool.submit(traiter_rapport, rapport_id)] = rapport_id
+
+                    if not en_cours:
+                        if options['une_fois']:
+                            break
+                        time.sleep(options['intervalle'])
+                        continue
+
+                    termines, _ = wait(list(en_cours), timeout=options['intervalle'], return_when=FIRST_COMPLETED)
+                    for future in termines:
+                        rapport_id = en_cours.pop(future)
+                        if future.exception():
+                            self.stderr.write(f'Rapport {rapport_id}: {future.exception()}')
+                        elif future.result():
+                            self.stdout.write(f'Rapport {rapport_id} traité.')
+            except KeyboardInterrupt:
+                self.stdout.write('Arrêt du worker de rapports.')
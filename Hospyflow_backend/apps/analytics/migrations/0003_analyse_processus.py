@@ -0,0 +1,34 @@
+# Generated by Django 5.0.1 on 2026-10-18 23:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_rapport'),
+        ('workflows', '0002_prediction_eta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyseProcessus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periode_debut', models.DateTimeField(verbose_name='Début de période')),
+                ('periode_fin', models.DateTimeField(verbose_name='Fin de période')),
+                ('nombre_instances', models.PositiveIntegerField(default=0, verbose_name='Instances analysées')),
+                ('nombre_transitions', models.PositiveIntegerField(default=0, verbose_name='Transitions analysées')),
+                ('resultat', models.JSONField(help_text='Activités, arcs et variantes calculés', verbose_name='Résultat')),
+                ('calcule_le', models.DateTimeField(auto_now=True, verbose_name='Calculé le')),
+                ('type_workflow', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='analyses_processus', to='workflows.typeworkflow', verbose_name='Type de workflow')),
+            ],
+            options={
+                'verbose_name': 'Analyse de processus',
+                'verbose_name_plural': 'Analyses de processus',
+                'ordering': ['-calcule_le'],
+                'unique_together': {('type_workflow', 'periode_debut', 'periode_fin')},
+            },
+        ),
+    ]
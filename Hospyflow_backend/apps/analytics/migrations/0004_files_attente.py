@@ -0,0 +1,48 @@
+# Generated by Django 5.0.1 on 2026-10-18 23:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_analyse_processus'),
+        ('workflows', '0002_prediction_eta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompteurEtape',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('en_cours', models.IntegerField(default=0, verbose_name="Patients à l'étape")),
+                ('entrees_total', models.PositiveIntegerField(default=0, verbose_name='Entrées cumulées')),
+                ('sorties_total', models.PositiveIntegerField(default=0, verbose_name='Sorties cumulées')),
+                ('modifie_le', models.DateTimeField(auto_now=True, verbose_name='Modifié le')),
+                ('etape', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='compteur', to='workflows.etapeworkflow', verbose_name='Étape')),
+            ],
+            options={
+                'verbose_name': "Compteur d'étape",
+                'verbose_name_plural': "Compteurs d'étapes",
+            },
+        ),
+        migrations.CreateModel(
+            name='DebitEtapeIntervalle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('debut', models.DateTimeField(verbose_name="Début de l'intervalle")),
+                ('entrees', models.PositiveIntegerField(default=0, verbose_name='Entrées')),
+                ('sorties', models.PositiveIntegerField(default=0, verbose_name='Sorties')),
+                ('en_cours_fin', models.IntegerField(default=0, help_text="Patients à l'étape après la dernière transition de l'intervalle", verbose_name="WIP en fin d'intervalle")),
+                ('sejour_total_minutes', models.PositiveIntegerField(default=0, verbose_name='Séjour cumulé des sorties (minutes)')),
+                ('etape', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='debits', to='workflows.etapeworkflow', verbose_name='Étape')),
+            ],
+            options={
+                'verbose_name': "Débit d'étape par intervalle",
+                'verbose_name_plural': "Débits d'étapes par intervalle",
+                'ordering': ['etape', 'debut'],
+                'unique_together': {('etape', 'debut')},
+            },
+        ),
+    ]
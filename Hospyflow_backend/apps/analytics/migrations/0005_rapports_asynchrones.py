@@ -0,0 +1,66 @@
+# Generated by Django 5.0.1 on 2026-10-19 00:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def marquer_rapports_existants(apps, schema_editor):
+    """Les rapports antérieurs ne contenaient que des métadonnées: ne pas les régénérer."""
+    Rapport = apps.get_model('analytics', 'Rapport')
+    Rapport.objects.update(statut='TERMINE', progression=100)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_files_attente'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rapport',
+            name='date_debut',
+            field=models.DateField(blank=True, null=True, verbose_name='Date de début'),
+        ),
+        migrations.AddField(
+            model_name='rapport',
+            name='date_fin',
+            field=models.DateField(blank=True, null=True, verbose_name='Date de fin'),
+        ),
+        migrations.AddField(
+            model_name='rapport',
+            name='demarre_le',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Démarré le'),
+        ),
+        migrations.AddField(
+            model_name='rapport',
+            name='erreur',
+            field=models.TextField(blank=True, verbose_name='Erreur'),
+        ),
+        migrations.AddField(
+            model_name='rapport',
+            name='progression',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Progression (%)'),
+        ),
+        migrations.AddField(
+            model_name='rapport',
+            name='statut',
+            field=models.CharField(choices=[('EN_ATTENTE', 'En attente'), ('EN_COURS', 'En cours'), ('TERMINE', 'Terminé'), ('ECHEC', 'Échec')], default='EN_ATTENTE', max_length=20, verbose_name='Statut'),
+        ),
+        migrations.AddField(
+            model_name='rapport',
+            name='termine_le',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Terminé le'),
+        ),
+        migrations.AlterField(
+            model_name='rapport',
+            name='donnees_metriques',
+            field=models.JSONField(blank=True, default=dict, help_text='Statistiques agrégées, calculées par le serveur', verbose_name='Données métriques'),
+        ),
+        migrations.AddIndex(
+            model_name='rapport',
+            index=models.Index(fields=['statut', 'genere_le'], name='analytics_r_statut_27da84_idx'),
+        ),
+        migrations.RunPython(marquer_rapports_existants, migrations.RunPython.noop),
+    ]
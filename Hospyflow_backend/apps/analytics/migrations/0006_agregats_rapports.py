@@ -0,0 +1,29 @@
+# Generated by Django 5.0.1 on 2026-10-19 00:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('analytics', '0005_rapports_asynchrones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='metriquedepartement',
+            name='definitif',
+            field=models.BooleanField(default=False, help_text="Jour clos: l'agrégat n'est plus recalculé", verbose_name='Définitif'),
+        ),
+        migrations.AddField(
+            model_name='rapport',
+            name='departements',
+            field=models.ManyToManyField(blank=True, help_text='Périmètre du rapport (tous les départements actifs si vide)', related_name='rapports', to='accounts.department', verbose_name='Départements'),
+        ),
+        migrations.AddField(
+            model_name='rapport',
+            name='empreinte',
+            field=models.CharField(blank=True, db_index=True, help_text='SHA-256 de la période, du périmètre, du format et du filigrane des données', max_length=64, verbose_name='Empreinte'),
+        ),
+    ]
@@ -177,6 +177,12 @@ class MetriqueDepartement(models.Model):
         help_text=_('Score de 0 à 100')
     )
     
+    definitif = models.BooleanField(
+        _('Définitif'),
+        default=False,
+        help_text=_('Jour clos: l\'agrégat n\'est plus recalculé')
+    )
+    
     cree_le = models.DateTimeField(_('Créé le'), auto_now_add=True)
     modifie_le = models.DateTimeField(_('Modifié le'), auto_now=True)
     
@@ -259,6 +265,99 @@ class StatistiqueGlobale(models.Model):
         return f"Statistiques {self.date}"
 
 
+class AnalyseProcessus(models.Model):
+    """
+    Résultat de fouille de processus (graphe des successions directes et
+    variantes de parcours) mis en cache par type de workflow et par période.
+    """
+    
+    type_workflow = models.ForeignKey(
+        'workflows.TypeWorkflow',
+        on_delete=models.CASCADE,
+        related_name='analyses_processus',
+        verbose_name=_('Type de workflow')
+    )
+    periode_debut = models.DateTimeField(_('Début de période'))
+    periode_fin = models.DateTimeField(_('Fin de période'))
+    
+    nombre_instances = models.PositiveIntegerField(_('Instances analysées'), default=0)
+    nombre_transitions = models.PositiveIntegerField(_('Transitions analysées'), default=0)
+    resultat = models.JSONField(
+        _('Résultat'),
+        help_text=_('Activités, arcs et variantes calculés')
+    )
+    
+    calcule_le = models.DateTimeField(_('Calculé le'), auto_now=True)
+    
+    class Meta:
+        verbose_name = _('Analyse de processus')
+        verbose_name_plural = _('Analyses de processus')
+        unique_together = ['type_workflow', 'periode_debut', 'periode_fin']
+        ordering = ['-calcule_le']
+    
+    def __str__(self):
+        return f"Processus {self.type_workflow_id} ({self.periode_debut:%Y-%m-%d} - {self.periode_fin:%Y-%m-%d})"
+
+
+class CompteurEtape(models.Model):
+    """
+    Travail en cours (WIP) d'une étape, tenu à jour à chaque transition.
+    """
+    
+    etape = models.OneToOneField(
+        'workflows.EtapeWorkflow',
+        on_delete=models.CASCADE,
+        related_name='compteur',
+        verbose_name=_('Étape')
+    )
+    en_cours = models.IntegerField(_('Patients à l\'étape'), default=0)
+    entrees_total = models.PositiveIntegerField(_('Entrées cumulées'), default=0)
+    sorties_total = models.PositiveIntegerField(_('Sorties cumulées'), default=0)
+    modifie_le = models.DateTimeField(_('Modifié le'), auto_now=True)
+    
+    class Meta:
+        verbose_name = _('Compteur d\'étape')
+        verbose_name_plural = _('Compteurs d\'étapes')
+    
+    def __str__(self):
+        return f"{self.etape} - {self.en_cours} en cours"
+
+
+class DebitEtapeIntervalle(models.Model):
+    """
+    Entrées, sorties et WIP d'une étape par intervalle de 15 minutes.
+    Base des séries temporelles de débit et des estimations par la loi de Little.
+    """
+    
+    etape = models.ForeignKey(
+        'workflows.EtapeWorkflow',
+        on_delete=models.CASCADE,
+        related_name='debits',
+        verbose_name=_('Étape')
+    )
+    debut = models.DateTimeField(_('Début de l\'intervalle'))
+    entrees = models.PositiveIntegerField(_('Entrées'), default=0)
+    sorties = models.PositiveIntegerField(_('Sorties'), default=0)
+    en_cours_fin = models.IntegerField(
+        _('WIP en fin d\'intervalle'),
+        default=0,
+        help_text=_('Patients à l\'étape après la dernière transition de l\'intervalle')
+    )
+    sejour_total_minutes = models.PositiveIntegerField(
+        _('Séjour cumulé des sorties (minutes)'),
+        default=0
+    )
+    
+    class Meta:
+        verbose_name = _('Débit d\'étape par intervalle')
+        verbose_name_plural = _('Débits d\'étapes par intervalle')
+        unique_together = ['etape', 'debut']
+        ordering = ['etape', 'debut']
+    
+    def __str__(self):
+        return f"{self.etape} - {self.debut:%Y-%m-%d %H:%M}"
+
+
 class Rapport(models.Model):
     """
     Rapport généré par le système.
@@ -269,15 +368,32 @@ class Rapport(models.Model):
         PDF = 'pdf', _('PDF')
         CSV = 'csv', _('CSV')
     
+    class Statut(models.TextChoices):
+        EN_ATTENTE = 'EN_ATTENTE', _('En attente')
+        EN_COURS = 'EN_COURS', _('En cours')
+        TERMINE = 'TERMINE', _('Terminé')
+        ECHEC = 'ECHEC', _('Échec')
+    
     plage_date = models.CharField(
         _('Plage de dates'),
         max_length=100,
         help_text=_('Ex: 2026-01-20 to 2026-01-27')
     )
+    date_debut = models.DateField(_('Date de début'), null=True, blank=True)
+    date_fin = models.DateField(_('Date de fin'), null=True, blank=True)
+    departements = models.ManyToManyField(
+        'accounts.Department',
+        blank=True,
+        related_name='rapports',
+        verbose_name=_('Départements'),
+        help_text=_('Périmètre du rapport (tous les départements actifs si vide)')
+    )
     
     donnees_metriques = models.JSONField(
         _('Données métriques'),
-        help_text=_('Statistiques agrégées')
+        default=dict,
+        blank=True,
+        help_text=_('Statistiques agrégées, calculées par le serveur')
     )
     
     format = models.CharField(
@@ -293,6 +409,28 @@ class Rapport(models.Model):
         null=True,
         blank=True
     )
+    empreinte = models.CharField(
+        _('Empreinte'),
+        max_length=64,
+        blank=True,
+        db_index=True,
+        help_text=_('SHA-256 de la période, du périmètre, du format et du filigrane des données')
+    )
+    
+    # Suivi de la génération (voir apps/analytics/rapports.py)
+    statut = models.CharField(
+        _('Statut'),
+        max_length=20,
+        choices=Statut.choices,
+        default=Statut.EN_ATTENTE
+    )
+    progression = models.PositiveSmallIntegerField(
+        _('Progression (%)'),
+        default=0
+    )
+    erreur = models.TextField(_('Erreur'), blank=True)
+    demarre_le = models.DateTimeField(_('Démarré le'), null=True, blank=True)
+    termine_le = models.DateTimeField(_('Terminé le'), null=True, blank=True)
     
     genere_le = models.DateTimeField(
         _('Généré le'),
@@ -312,6 +450,9 @@ class Rapport(models.Model):
         verbose_name = _('Rapport')
         verbose_name_plural = _('Rapports')
         ordering = ['-genere_le']
+        indexes = [
+            models.Index(fields=['statut', 'genere_le']),
+        ]
     
     def __str__(self):
         return f"Rapport {self.plage_date} ({self.get_format_display()})"
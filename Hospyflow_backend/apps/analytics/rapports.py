@@ -0,0 +1,768 @@
+"""
+Service Pattern - Génération asynchrone des rapports.
+
+La requête POST ne fait qu'enregistrer un Rapport EN_ATTENTE. Les workers
+(commande traiter_rapports) réclament les rapports par mise à jour
+conditionnelle, calculent donnees_metriques côté serveur à partir des
+agrégats quotidiens (MetriqueDepartement) de la période et du périmètre
+demandés, puis écrivent le fichier PDF/CSV sur disque au fil de l'eau.
+Le client suit l'avancement via statut/progression.
+
+Chaque rapport porte une empreinte (période, périmètre, format, filigrane des
+agrégats). Un rapport terminé de même empreinte est réutilisé tel quel: son
+fichier est partagé au lieu d'être régénéré. Sur une période close, les
+agrégats sont définitifs et la réutilisation est décidée dès la requête POST.
+
+Pattern Strategy: StrategieExport / ExportPDF / ExportCSV / GenerateurRapport
+reprennent l'organisation de l'ancien report_service (ops/).
+"""
+import csv
+import hashlib
+import io
+import itertools
+import json
+import os
+import re
+import tempfile
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import django
+from django.conf import settings
+from django.db import close_old_connections
+from pypdf import PdfWriter
+from reportlab import rl_config
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import (
+    CondPageBreak, Flowable, Image, KeepTogether, Paragraph,
+    SimpleDocTemplate, Spacer, Table, TableStyle
+)
+from django.utils import timezone
+
+from .agregats import AgregationService
+from .graphiques import chemin_graphique, HAUTEUR as HAUTEUR_GRAPHIQUE, LARGEUR as LARGEUR_GRAPHIQUE
+from .models import Rapport
+from apps.accounts.models import Department
+
+
+class RapportException(Exception):
+    """Exception pour les erreurs de génération de rapport."""
+    pass
+
+
+Progression = Callable[[int], None]
+
+DOSSIER_RAPPORTS = 'rapports'
+JOURS_PAR_DEFAUT = 7
+# À incrémenter quand la mise en forme change: les anciens fichiers ne sont plus réutilisés
+VERSION_RENDU = 2
+
+# Libellés des métriques du résumé, dans l'ordre d'affichage
+LIBELLES_RESUME = {
+    'workflows_demarres': 'Workflows démarrés',
+    'workflows_termines': 'Workflows terminés',
+    'workflows_abandonnes': 'Workflows abandonnés',
+    'duree_moyenne_workflow_minutes': 'Durée moyenne workflow (minutes)',
+    'evenements_signales': 'Événements signalés',
+    'evenements_critiques': 'Événements critiques',
+    'evenements_resolus': 'Événements résolus',
+    'delai_resolution_moyen_minutes': 'Délai résolution moyen (minutes)',
+}
+COLONNES_JOUR = [
+    'date', 'workflows_demarres', 'workflows_termines', 'workflows_abandonnes',
+    'evenements_signales', 'evenements_critiques',
+]
+ENTETES_JOUR = ['Date', 'Démarrés', 'Terminés', 'Abandonnés', 'Événements', 'Critiques']
+# Séries tracées dans les graphiques de tendance
+SERIES_GRAPHIQUE = {
+    'workflows_demarres': 'Workflows démarrés',
+    'workflows_termines': 'Workflows terminés',
+    'evenements_signales': 'Événements signalés',
+}
+
+
+def analyser_plage(plage_date: str) -> Optional[Tuple[date, date]]:
+    """
+    Extrait les dates d'une plage texte (ex: '2026-01-20 to 2026-01-27').
+
+    Returns:
+        (début, fin) inclus, ou None si aucune date ISO n'est présente
+    """
+    dates = re.findall(r'\d{4}-\d{2}-\d{2}', plage_date or '')
+    try:
+        bornes = sorted(date.fromisoformat(d) for d in dates[:2])
+    except ValueError:
+        return None
+    if not bornes:
+        return None
+    return bornes[0], bornes[-1]
+
+
+def _moyenne(total: Optional[int], effectif: Optional[int]) -> Optional[int]:
+    """Moyenne entière d'un total pondéré, None sans effectif."""
+    return int(total / effectif) if total is not None and effectif else None
+
+
+class _Cumul:
+    """Cumul des agrégats quotidiens d'un périmètre (résumé et séries par jour)."""
+
+    CHAMPS = (
+        'departement_id', 'date',
+        'workflows_demarre', 'workflows_termines', 'workflows_abandonnes',
+        'duree_moyenne_workflow_minutes',
+        'evenements_signales', 'evenements_resolus', 'evenements_critiques',
+        'delai_resolution_moyen_minutes',
+    )
+
+    def __init__(self, nombre_jours: int):
+        self.series = {c: [0] * nombre_jours for c in COLONNES_JOUR[1:]}
+        self.resolus = 0
+        self.duree_ponderee = self.termines_dates = 0
+        self.delai_pondere = self.resolus_dates = 0
+
+    def ajouter(self, ligne: tuple, index: int):
+        (_, _, demarres, termines, abandonnes, duree,
+         signales, resolus, critiques, delai) = ligne
+        self.series['workflows_demarres'][index] += demarres
+        self.series['workflows_termines'][index] += termines
+        self.series['workflows_abandonnes'][index] += abandonnes
+        self.series['evenements_signales'][index] += signales
+        self.series['evenements_critiques'][index] += critiques
+        self.resolus += resolus
+        # Moyennes quotidiennes pondérées par leur effectif
+        if duree is not None:
+            self.duree_ponderee += duree * termines
+            self.termines_dates += termines
+        if delai is not None:
+            self.delai_pondere += delai * resolus
+            self.resolus_dates += resolus
+
+    def resume(self) -> Dict[str, Optional[int]]:
+        return {
+            'workflows_demarres': sum(self.series['workflows_demarres']),
+            'workflows_termines': sum(self.series['workflows_termines']),
+            'workflows_abandonnes': sum(self.series['workflows_abandonnes']),
+            'duree_moyenne_workflow_minutes': _moyenne(self.duree_ponderee, self.termines_dates),
+            'evenements_signales': sum(self.series['evenements_signales']),
+            'evenements_critiques': sum(self.series['evenements_critiques']),
+            'evenements_resolus': self.resolus,
+            'delai_resolution_moyen_minutes': _moyenne(self.delai_pondere, self.resolus_dates),
+        }
+
+
+# ----------------------------------------------------------------------
+# Stratégies d'export
+# ----------------------------------------------------------------------
+
+class StrategieExport(ABC):
+    """Interface des formats d'export (Pattern Strategy)."""
+
+    extension = ''
+
+    @abstractmethod
+    def exporter(
+        self,
+        rapport: Rapport,
+        donnees: Dict[str, Any],
+        fichier: io.BufferedWriter,
+        progression: Progression
+    ) -> None:
+        """Écrit le rapport dans le fichier binaire ouvert."""
+        pass
+
+
+class ExportCSV(StrategieExport):
+    """Export CSV écrit ligne par ligne."""
+
+    extension = 'csv'
+    TAILLE_LOT = 500
+
+    def exporter(self, rapport, donnees, fichier, progression):
+        texte = io.TextIOWrapper(fichier, encoding='utf-8', newline='', write_through=False)
+        writer = csv.writer(texte)
+
+        writer.writerow(['Metrique', 'Valeur'])
+        writer.writerow(['Plage de dates', rapport.plage_date])
+        writer.writerow(['Départements', donnees.get('perimetre', '')])
+        for cle, libelle in LIBELLES_RESUME.items():
+            writer.writerow([libelle, donnees['resume'].get(cle)])
+
+        jours = donnees['par_jour']
+        writer.writerow([])
+        writer.writerow(COLONNES_JOUR)
+        for index, jour in enumerate(jours, start=1):
+            writer.writerow([jour[c] for c in COLONNES_JOUR])
+            if index % self.TAILLE_LOT == 0:
+                texte.flush()
+                progression(index * 100 // len(jours))
+
+        departements = donnees.get('departements', [])
+        if departements:
+            writer.writerow([])
+            writer.writerow(['departement'] + list(LIBELLES_RESUME))
+            for departement in departements:
+                writer.writerow([departement['nom']] + [
+                    departement['resume'].get(cle) for cle in LIBELLES_RESUME
+                ])
+
+        texte.flush()
+        texte.detach()
+
+
+class _FlowablesIncrementaux(list):
+    """
+    Liste de flowables alimentée à la demande par un générateur de sections.
+    platypus consomme la liste par le début: seule la section en cours de mise
+    en page est en mémoire, quel que soit le nombre de départements.
+    """
+
+    def __init__(self, sections: Iterator[List[Flowable]]):
+        super().__init__()
+        self._sections: Optional[Iterator[List[Flowable]]] = sections
+
+    def __len__(self):
+        # Deux éléments au moins: keepWithNext regarde le flowable suivant
+        while list.__len__(self) < 2 and self._sections is not None:
+            try:
+                self.extend(next(self._sections))
+            except StopIteration:
+                self._sections = None
+        return list.__len__(self)
+
+
+# Flux binaires dans le PDF: l'encodage ASCII85 des images (Python pur sans
+# l'extension _rl_accel) coûtait l'essentiel du temps de rendu
+rl_config.useA85 = 0
+
+
+class ExportPDF(StrategieExport):
+    """
+    Export PDF paginé (platypus): synthèse globale puis une section par
+    département, avec graphiques de tendance pré-rendus (voir graphiques.py).
+    """
+
+    extension = 'pdf'
+    MARGE = 40
+    LIGNES_PAR_TABLEAU = 40
+
+    STYLE_TABLEAU = TableStyle([
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#e8eef7')),
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor('#bbbbbb')),
+        ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+    ])
+
+    LARGEUR_UTILE = A4[0] - 2 * MARGE
+
+    def exporter(self, rapport, donnees, fichier, progression):
+        self.rendre(fichier, rapport.plage_date, itertools.chain(
+            self.sections_synthese(rapport.plage_date, donnees),
+            self.sections_departements(donnees.get('departements', []), progression)
+        ))
+
+    def rendre(self, fichier, plage_date: str, sections: Iterator[List[Flowable]]):
+        """Met en page les sections dans le fichier, au fur et à mesure."""
+        document = SimpleDocTemplate(
+            fichier,
+            pagesize=A4,
+            leftMargin=self.MARGE,
+            rightMargin=self.MARGE,
+            topMargin=self.MARGE,
+            bottomMargin=self.MARGE,
+            title=f"Rapport {plage_date}"
+        )
+
+        # Pas de numéro de page: les parties rendues en parallèle sont fusionnées ensuite
+        def pied_de_page(pdf, doc):
+            pdf.saveState()
+            pdf.setFont('Helvetica', 8)
+            pdf.drawString(self.MARGE, self.MARGE / 2, f"Rapport {plage_date}")
+            pdf.restoreState()
+
+        document.build(
+            _FlowablesIncrementaux(sections),
+            onFirstPage=pied_de_page,
+            onLaterPages=pied_de_page
+        )
+
+    def sections_synthese(self, plage_date: str, donnees: Dict[str, Any]) -> Iterator[List[Flowable]]:
+        """Synthèse globale: métriques clés, tendance et détail quotidien."""
+        styles = getSampleStyleSheet()
+        jours = donnees['par_jour']
+
+        yield [
+            Paragraph('Rapport ClinicFlow Analytics', styles['Title']),
+            Paragraph(f"Plage de dates: {plage_date}", styles['Normal']),
+            Paragraph(f"Départements: {donnees.get('perimetre', '')}", styles['Normal']),
+            Spacer(1, 12),
+            Paragraph('Métriques clés', styles['Heading2']),
+            self._tableau_resume(donnees['resume']),
+            Spacer(1, 12),
+            self._graphique({c: [j[c] for j in jours] for c in SERIES_GRAPHIQUE}),
+        ]
+
+        # Détail quotidien en tableaux d'une page au plus (en-tête répété)
+        for debut in range(0, len(jours), self.LIGNES_PAR_TABLEAU):
+            bloc = jours[debut:debut + self.LIGNES_PAR_TABLEAU]
+            titre = [Paragraph('Détail quotidien', styles['Heading2'])] if debut == 0 else []
+            tableau = Table(
+                [ENTETES_JOUR] + [[jour[c] for c in COLONNES_JOUR] for jour in bloc],
+                repeatRows=1,
+                hAlign='LEFT'
+            )
+            tableau.setStyle(self.STYLE_TABLEAU)
+            yield titre + [tableau]
+
+    def sections_departements(
+        self,
+        departements: List[Dict[str, Any]],
+        progression: Progression
+    ) -> Iterator[List[Flowable]]:
+        """Une section par département: métriques et tendance."""
+        styles = getSampleStyleSheet()
+        for index, departement in enumerate(departements, start=1):
+            yield [
+                CondPageBreak(self.LARGEUR_UTILE * 0.6),
+                KeepTogether([
+                    Paragraph(departement['nom'], styles['Heading2']),
+                    self._tableau_resume(departement['resume']),
+                    Spacer(1, 6),
+                    self._graphique(departement['series']),
+                ]),
+            ]
+            progression(index * 100 // len(departements))
+
+    def _tableau_resume(self, resume: Dict[str, Any]) -> Table:
+        """Résumé sur deux colonnes de paires (métrique, valeur)."""
+        cellules = [
+            [libelle, '-' if resume.get(cle) is None else resume[cle]]
+            for cle, libelle in LIBELLES_RESUME.items()
+        ]
+        moitie = (len(cellules) + 1) // 2
+        lignes = [
+            gauche + (cellules[moitie + i] if moitie + i < len(cellules) else ['', ''])
+            for i, gauche in enumerate(cellules[:moitie])
+        ]
+        tableau = Table([['Métrique', 'Valeur', 'Métrique', 'Valeur']] + lignes, hAlign='LEFT')
+        tableau.setStyle(self.STYLE_TABLEAU)
+        return tableau
+
+    def _graphique(self, series: Dict[str, List[int]]) -> Image:
+        """Graphique de tendance (rastérisé une fois, relu du cache ensuite)."""
+        chemin = chemin_graphique({SERIES_GRAPHIQUE[c]: v for c, v in series.items()})
+        return Image(
+            chemin,
+            width=self.LARGEUR_UTILE,
+            height=self.LARGEUR_UTILE * HAUTEUR_GRAPHIQUE / LARGEUR_GRAPHIQUE
+        )
+
+
+def rendre_partie(plage_date: str, departements: List[Dict[str, Any]], chemin: str) -> str:
+    """
+    Rend les sections d'un lot de départements dans un PDF séparé.
+    Exécuté dans un processus de rendu: entrées sérialisables, aucun accès base.
+    """
+    with open(chemin, 'wb') as fichier:
+        strategie = ExportPDF()
+        strategie.rendre(fichier, plage_date, strategie.sections_departements(departements, lambda p: None))
+    return chemin
+
+
+def _initialiser_processus_rendu(memoire_mo: int):
+    """Plafonne la mémoire du processus de rendu puis initialise Django."""
+    if memoire_mo:
+        import resource
+        limite = memoire_mo * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limite, limite))
+    django.setup()
+
+
+_pool_rendu: Optional[ProcessPoolExecutor] = None
+
+
+def _obtenir_pool_rendu() -> ProcessPoolExecutor:
+    """
+    Pool de processus de rendu partagé (créé à la première utilisation).
+    Chaque processus est remplacé après RAPPORTS_SECTIONS_TACHES_PAR_PROCESSUS
+    parties, ce qui rend au système la mémoire accumulée par reportlab et Pillow.
+    """
+    global _pool_rendu
+    if _pool_rendu is None:
+        _pool_rendu = ProcessPoolExecutor(
+            max_workers=settings.RAPPORTS_SECTIONS_WORKERS or os.cpu_count(),
+            max_tasks_per_child=settings.RAPPORTS_SECTIONS_TACHES_PAR_PROCESSUS,
+            initializer=_initialiser_processus_rendu,
+            initargs=(settings.RAPPORTS_SECTIONS_MEMOIRE_MO,)
+        )
+    return _pool_rendu
+
+
+class ExportPDFParallele(ExportPDF):
+    """
+    Export PDF dont les sections par département sont rendues en parallèle
+    (une partie par lot de départements) puis fusionnées avec pypdf.
+    La synthèse est rendue par ce processus pendant ce temps.
+    """
+
+    SEUIL_DEPARTEMENTS = 20
+    DEPARTEMENTS_PAR_PARTIE = 10
+
+    def exporter(self, rapport, donnees, fichier, progression):
+        departements = donnees.get('departements', [])
+        if len(departements) < self.SEUIL_DEPARTEMENTS:
+            return super().exporter(rapport, donnees, fichier, progression)
+
+        lots = [
+            departements[i:i + self.DEPARTEMENTS_PAR_PARTIE]
+            for i in range(0, len(departements), self.DEPARTEMENTS_PAR_PARTIE)
+        ]
+        with tempfile.TemporaryDirectory(prefix='rapport_parties_') as dossier:
+            pool = _obtenir_pool_rendu()
+            taches = [
+                pool.submit(rendre_partie, rapport.plage_date, lot, os.path.join(dossier, f'partie_{i:04d}.pdf'))
+                for i, lot in enumerate(lots)
+            ]
+
+            synthese = os.path.join(dossier, 'synthese.pdf')
+            with open(synthese, 'wb') as partie:
+                self.rendre(partie, rapport.plage_date, self.sections_synthese(rapport.plage_date, donnees))
+
+            for termines, tache in enumerate(as_completed(taches), start=1):
+                tache.result()
+                progression(termines * 90 // len(taches))
+
+            # Fusion dans l'ordre des départements
+            fusion = PdfWriter()
+            for chemin in [synthese] + [tache.result() for tache in taches]:
+                fusion.append(chemin)
+            fusion.add_metadata({'/Title': f"Rapport {rapport.plage_date}"})
+            fusion.write(fichier)
+
+
+class GenerateurRapport:
+    """
+    Contexte du Pattern Strategy: écrit le fichier d'un rapport.
+    Le fichier est écrit sous un nom temporaire puis renommé.
+    """
+
+    STRATEGIES = {
+        Rapport.Format.PDF: ExportPDF,
+        Rapport.Format.CSV: ExportCSV,
+    }
+    STRATEGIES_PARALLELES = {
+        Rapport.Format.PDF: ExportPDFParallele,
+    }
+
+    def __init__(self, strategie: Optional[StrategieExport] = None, parallele: Optional[bool] = None):
+        """
+        Args:
+            strategie: Format imposé (sinon déduit du rapport)
+            parallele: Rendre les sections par département en parallèle
+                (par défaut: sauf si RAPPORTS_SECTIONS_WORKERS vaut 1)
+        """
+        self._strategie = strategie
+        self.parallele = settings.RAPPORTS_SECTIONS_WORKERS != 1 if parallele is None else parallele
+
+    def definir_strategie(self, strategie: StrategieExport):
+        self._strategie = strategie
+
+    def generer(
+        self,
+        rapport: Rapport,
+        donnees: Dict[str, Any],
+        progression: Progression
+    ) -> str:
+        """
+        Génère le fichier du rapport, nommé d'après son empreinte
+        (partagé par les rapports identiques).
+
+        Returns:
+            Chemin relatif à MEDIA_ROOT (valeur de Rapport.fichier)
+        """
+        strategies = dict(self.STRATEGIES, **self.STRATEGIES_PARALLELES) if self.parallele else self.STRATEGIES
+        strategie = self._strategie or strategies[rapport.format]()
+        base = rapport.empreinte or f"rapport_{rapport.id}"
+        nom = f"{DOSSIER_RAPPORTS}/{base}.{strategie.extension}"
+        chemin = os.path.join(settings.MEDIA_ROOT, nom)
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+
+        temporaire = f"{chemin}.{os.getpid()}.tmp"
+        try:
+            with open(temporaire, 'wb') as fichier:
+                strategie.exporter(rapport, donnees, fichier, progression)
+            os.replace(temporaire, chemin)
+        finally:
+            if os.path.exists(temporaire):
+                os.remove(temporaire)
+        return nom
+
+
+# ----------------------------------------------------------------------
+# Service
+# ----------------------------------------------------------------------
+
+class RapportService:
+    """
+    Service de file d'attente et de génération des rapports.
+    """
+
+    # Un rapport EN_COURS depuis plus longtemps est considéré abandonné par son worker
+    DELAI_EXPIRATION_MINUTES = 30
+
+    @staticmethod
+    def determiner_periode(
+        plage_date: str,
+        date_debut: Optional[date] = None,
+        date_fin: Optional[date] = None
+    ) -> Tuple[date, date]:
+        """
+        Période du rapport: dates explicites, sinon dates de plage_date,
+        sinon les JOURS_PAR_DEFAUT derniers jours.
+        """
+        if not (date_debut and date_fin):
+            bornes = analyser_plage(plage_date)
+            if bornes:
+                date_debut, date_fin = date_debut or bornes[0], date_fin or bornes[1]
+        date_fin = date_fin or timezone.localdate()
+        date_debut = date_debut or date_fin - timedelta(days=JOURS_PAR_DEFAUT - 1)
+        if date_debut > date_fin:
+            raise RapportException("La date de début doit précéder la date de fin.")
+        return date_debut, date_fin
+
+    def creer_rapport(
+        self,
+        plage_date: str,
+        format: str,
+        utilisateur=None,
+        date_debut: Optional[date] = None,
+        date_fin: Optional[date] = None,
+        departements: Optional[List[Department]] = None
+    ) -> Rapport:
+        """
+        Enregistre un rapport EN_ATTENTE; la génération est faite par un worker.
+        Sur une période close déjà rapportée, le rapport est servi immédiatement.
+        """
+        date_debut, date_fin = self.determiner_periode(plage_date, date_debut, date_fin)
+        rapport = Rapport.objects.create(
+            plage_date=plage_date or f"{date_debut} to {date_fin}",
+            date_debut=date_debut,
+            date_fin=date_fin,
+            format=format,
+            genere_par=utilisateur,
+            statut=Rapport.Statut.EN_ATTENTE
+        )
+        if departements:
+            rapport.departements.set(departements)
+
+        departement_ids = [d.pk for d in departements or []]
+        if AgregationService().est_definitif(date_debut, date_fin, departement_ids):
+            rapport.empreinte = self.calculer_empreinte(rapport, date_debut, date_fin, departement_ids)
+            if self.reutiliser(rapport):
+                rapport.refresh_from_db()
+            else:
+                rapport.save(update_fields=['empreinte'])
+        return rapport
+
+    @staticmethod
+    def calculer_empreinte(
+        rapport: Rapport,
+        date_debut: date,
+        date_fin: date,
+        departement_ids: List[int]
+    ) -> str:
+        """SHA-256 de la période, du périmètre, du format et du filigrane des agrégats."""
+        contenu = {
+            'debut': date_debut.isoformat(),
+            'fin': date_fin.isoformat(),
+            'departements': sorted(departement_ids),
+            'format': rapport.format,
+            'version': VERSION_RENDU,
+            'filigrane': AgregationService().filigrane(date_debut, date_fin, departement_ids),
+        }
+        return hashlib.sha256(json.dumps(contenu, sort_keys=True).encode()).hexdigest()
+
+    @staticmethod
+    def reutiliser(rapport: Rapport) -> bool:
+        """
+        Termine le rapport avec le fichier d'un rapport identique déjà généré.
+
+        Returns:
+            True si un rapport de même empreinte a été trouvé
+        """
+        identique = Rapport.objects.filter(
+            empreinte=rapport.empreinte,
+            statut=Rapport.Statut.TERMINE
+        ).exclude(pk=rapport.pk).exclude(fichier='').order_by('-termine_le').first()
+        if identique is None or not identique.fichier.storage.exists(identique.fichier.name):
+            return False
+
+        maintenant = timezone.now()
+        Rapport.objects.filter(pk=rapport.pk).update(
+            empreinte=rapport.empreinte,
+            donnees_metriques=identique.donnees_metriques,
+            fichier=identique.fichier.name,
+            statut=Rapport.Statut.TERMINE,
+            progression=100,
+            erreur='',
+            demarre_le=rapport.demarre_le or maintenant,
+            termine_le=maintenant
+        )
+        return True
+
+    @staticmethod
+    def ids_en_attente(limite: int, exclure: Optional[List[int]] = None) -> List[int]:
+        """Plus anciens rapports en attente."""
+        return list(Rapport.objects.filter(
+            statut=Rapport.Statut.EN_ATTENTE
+        ).exclude(pk__in=exclure or []).order_by('genere_le').values_list('pk', flat=True)[:limite])
+
+    def relancer_expires(self) -> int:
+        """Remet en attente les rapports bloqués EN_COURS (worker arrêté)."""
+        limite = timezone.now() - timedelta(minutes=self.DELAI_EXPIRATION_MINUTES)
+        return Rapport.objects.filter(
+            statut=Rapport.Statut.EN_COURS,
+            demarre_le__lt=limite
+        ).update(statut=Rapport.Statut.EN_ATTENTE, progression=0)
+
+    @staticmethod
+    def reclamer(rapport_id: int) -> bool:
+        """Réserve un rapport pour ce worker (mise à jour conditionnelle)."""
+        return Rapport.objects.filter(
+            pk=rapport_id,
+            statut=Rapport.Statut.EN_ATTENTE
+        ).update(
+            statut=Rapport.Statut.EN_COURS,
+            progression=0,
+            erreur='',
+            demarre_le=timezone.now()
+        ) == 1
+
+    def traiter(self, rapport_id: int) -> bool:
+        """
+        Calcule les métriques puis écrit le fichier d'un rapport.
+
+        Returns:
+            True si le rapport a été traité par ce worker
+        """
+        if not self.reclamer(rapport_id):
+            return False
+
+        rapport = Rapport.objects.get(pk=rapport_id)
+        avancement = {'valeur': 0}
+
+        def progresser(valeur: int):
+            valeur = max(0, min(int(valeur), 99))
+            if valeur > avancement['valeur']:
+                avancement['valeur'] = valeur
+                Rapport.objects.filter(pk=rapport_id).update(progression=valeur)
+
+        try:
+            date_debut, date_fin = self.determiner_periode(
+                rapport.plage_date, rapport.date_debut, rapport.date_fin
+            )
+            departement_ids = list(rapport.departements.values_list('pk', flat=True))
+
+            # Agrégats à jour: seuls les jours manquants ou ouverts sont recalculés
+            AgregationService().consolider(date_debut, date_fin, departement_ids)
+            progresser(20)
+
+            rapport.empreinte = self.calculer_empreinte(rapport, date_debut, date_fin, departement_ids)
+            if self.reutiliser(rapport):
+                return True
+
+            donnees = self.calculer_metriques(date_debut, date_fin, departement_ids)
+            Rapport.objects.filter(pk=rapport_id).update(
+                donnees_metriques=donnees,
+                empreinte=rapport.empreinte
+            )
+            progresser(30)
+
+            # Rendu: 30% -> 99%
+            fichier = GenerateurRapport().generer(
+                rapport, donnees, lambda p: progresser(30 + p * 69 // 100)
+            )
+        except Exception as e:
+            Rapport.objects.filter(pk=rapport_id).update(
+                statut=Rapport.Statut.ECHEC,
+                erreur=str(e),
+                termine_le=timezone.now()
+            )
+            return True
+
+        Rapport.objects.filter(pk=rapport_id).update(
+            statut=Rapport.Statut.TERMINE,
+            fichier=fichier,
+            progression=100,
+            termine_le=timezone.now()
+        )
+        return True
+
+    def calculer_metriques(
+        self,
+        date_debut: date,
+        date_fin: date,
+        departement_ids: Optional[List[int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Métriques du rapport lues dans les agrégats quotidiens (MetriqueDepartement):
+        résumé et série quotidienne globaux, puis une section par département.
+        Les agrégats doivent avoir été consolidés pour la période.
+        """
+        nombre_jours = (date_fin - date_debut).days + 1
+        par_jour = [
+            dict({c: 0 for c in COLONNES_JOUR}, date=(date_debut + timedelta(days=i)).isoformat())
+            for i in range(nombre_jours)
+        ]
+        total = _Cumul(nombre_jours)
+        cumuls: Dict[int, _Cumul] = {}
+
+        agregats = AgregationService().agregats(date_debut, date_fin, departement_ids)
+        for ligne in agregats.order_by().values_list(*_Cumul.CHAMPS).iterator(chunk_size=2000):
+            index = (ligne[1] - date_debut).days
+            total.ajouter(ligne, index)
+            cumuls.setdefault(ligne[0], _Cumul(nombre_jours)).ajouter(ligne, index)
+
+        for index, jour in enumerate(par_jour):
+            for colonne in COLONNES_JOUR[1:]:
+                jour[colonne] = total.series[colonne][index]
+
+        noms = dict(Department.objects.filter(pk__in=list(cumuls)).values_list('pk', 'name'))
+        departements = [
+            {
+                'id': departement_id,
+                'nom': noms.get(departement_id, str(departement_id)),
+                'resume': cumul.resume(),
+                'series': {c: cumul.series[c] for c in SERIES_GRAPHIQUE},
+            }
+            for departement_id, cumul in sorted(cumuls.items(), key=lambda e: noms.get(e[0], ''))
+        ]
+
+        return {
+            'periode': {'debut': date_debut.isoformat(), 'fin': date_fin.isoformat()},
+            'perimetre': self.decrire_perimetre(departement_ids),
+            'resume': total.resume(),
+            'par_jour': par_jour,
+            'departements': departements,
+        }
+
+    @staticmethod
+    def decrire_perimetre(departement_ids: Optional[List[int]] = None) -> str:
+        """Libellé du périmètre affiché dans le rapport."""
+        if not departement_ids:
+            return 'Tous les départements'
+        return ', '.join(Department.objects.filter(
+            pk__in=departement_ids
+        ).order_by('name').values_list('name', flat=True))
+
+
+def traiter_rapport(rapport_id: int) -> bool:
+    """Point d'entrée des processus workers (commande traiter_rapports)."""
+    try:
+        return RapportService().traiter(rapport_id)
+    finally:
+        close_old_connections()
@@ -1,5 +1,7 @@
 from rest_framework import serializers
 from .models import AnalyseGoulotEtranglement, MetriqueDepartement, StatistiqueGlobale, Rapport
+from .rapports import RapportService, RapportException
+from .simulation import SimulationService
 
 
 class AnalyseGoulotSerializer(serializers.ModelSerializer):
@@ -109,19 +111,106 @@ class RapportSerializer(serializers.ModelSerializer):
         read_only=True
     )
     
+    statut_display = serializers.CharField(
+        source='get_statut_display',
+        read_only=True
+    )
+    
     genere_par_nom = serializers.SerializerMethodField()
     
     class Meta:
         model = Rapport
         fields = [
-            'id', 'plage_date', 'donnees_metriques',
+            'id', 'plage_date', 'date_debut', 'date_fin', 'departements',
+            'donnees_metriques', 'empreinte',
             'format', 'format_display',
-            'fichier', 'genere_le', 'genere_par', 'genere_par_nom'
+            'statut', 'statut_display', 'progression', 'erreur',
+            'fichier', 'genere_le', 'demarre_le', 'termine_le',
+            'genere_par', 'genere_par_nom'
+        ]
+        # Les métriques sont calculées par le serveur (donnees_metriques envoyées: ignorées)
+        read_only_fields = [
+            'id', 'donnees_metriques', 'empreinte', 'statut', 'progression', 'erreur',
+            'fichier', 'genere_le', 'demarre_le', 'termine_le', 'genere_par'
         ]
-        read_only_fields = ['id', 'genere_le', 'genere_par']
+    
+    def validate(self, attrs):
+        try:
+            RapportService.determiner_periode(
+                attrs.get('plage_date', ''),
+                attrs.get('date_debut'),
+                attrs.get('date_fin')
+            )
+        except RapportException as e:
+            raise serializers.ValidationError(str(e))
+        return attrs
     
     def get_genere_par_nom(self, obj):
         """Retourne le nom complet de l'utilisateur qui a généré le rapport."""
         if obj.genere_par:
             return obj.genere_par.get_full_name()
         return None
+
+
+class ScenarioSimulationSerializer(serializers.Serializer):
+    """Scénario d'effectifs pour la simulation."""
+    
+    nom = serializers.CharField(max_length=100)
+    personnel = serializers.DictField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        default=dict,
+        help_text="Effectif par étape: {etape_id: nombre}"
+    )
+    
+    def validate_personnel(self, personnel):
+        """Les clés sont des identifiants d'étape."""
+        try:
+            return {int(etape_id): effectif for etape_id, effectif in personnel.items()}
+        except ValueError:
+            raise serializers.ValidationError("Les clés doivent être des identifiants d'étape (entiers).")
+
+
+class SimulationSerializer(serializers.Serializer):
+    """Serializer pour lancer une simulation des effectifs."""
+    
+    type_workflow = serializers.IntegerField(
+        help_text="ID du type de workflow simulé"
+    )
+    scenarios = ScenarioSimulationSerializer(
+        many=True,
+        required=False,
+        default=list,
+        max_length=SimulationService.MAX_SCENARIOS
+    )
+    replications = serializers.IntegerField(min_value=1, max_value=200, default=20)
+    duree_heures = serializers.IntegerField(min_value=1, max_value=24 * 14, default=24)
+    jours_historique = serializers.IntegerField(min_value=1, max_value=365, default=30)
+
+
+class AnalyseProcessusParametresSerializer(serializers.Serializer):
+    """Paramètres de requête de l'analyse des processus."""
+    
+    type_workflow = serializers.IntegerField(min_value=1)
+    debut = serializers.DateField(required=False)
+    fin = serializers.DateField(required=False)
+    jours = serializers.IntegerField(min_value=1, max_value=365, required=False)
+    recalculer = serializers.BooleanField(default=False)
+    
+    def validate(self, attrs):
+        if attrs.get('debut') and attrs.get('fin') and attrs['debut'] > attrs['fin']:
+            raise serializers.ValidationError("La date de début doit précéder la date de fin.")
+        return attrs
+
+
+class FilesAttenteParametresSerializer(serializers.Serializer):
+    """Paramètres de requête de l'instantané des files d'attente."""
+    
+    type_workflow = serializers.IntegerField(min_value=1, required=False)
+    departement = serializers.IntegerField(min_value=1, required=False)
+
+
+class SerieFileAttenteParametresSerializer(serializers.Serializer):
+    """Paramètres de requête de la série d'une file d'attente."""
+    
+    heures = serializers.IntegerField(min_value=1, max_value=24 * 14, required=False)
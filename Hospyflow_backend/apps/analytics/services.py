@@ -2,17 +2,24 @@
 Service Pattern - Moteur d'analyse et détection des goulots d'étranglement.
 Implémente le pattern Observer pour la détection automatique.
 """
+from collections import Counter
 from typing import Dict, Any, List, Optional
 from django.utils import timezone
 from django.db import transaction
-from django.db.models import Count, Avg, Q, F
+from django.db.models import Count, Avg, Sum, Q, F
+from django.db.models.functions import TruncDate
 from datetime import timedelta
 from decimal import Decimal
 
 from .models import AnalyseGoulotEtranglement, MetriqueDepartement, StatistiqueGlobale
-from apps.workflows.models import InstanceWorkflow, TransitionEtape
+from .agregats import AgregationService
+from .files_attente import FilesAttenteService
+from apps.workflows.models import InstanceWorkflow
+from apps.workflows.archivage import sources_transitions
 from apps.events.models import MicroEvenement
 from apps.accounts.models import Department, User
+from apps.core.cache import alire_ou_calculer, etiquettes_ecriture, invalider, lire_ou_calculer
+from apps.core.instrumentation import mesurer
 
 
 class AnalyseException(Exception):
@@ -65,8 +72,37 @@ class MoteurAnalyseService:
         )
         goulots_detectes.extend(goulots_evenements)
         
+        # Analyser les files d'attente (WIP en hausse, débit stable)
+        goulots_files = self._analyser_files_attente(
+            periode_debut, periode_fin, departement_id
+        )
+        goulots_detectes.extend(goulots_files)
+        
         return goulots_detectes
     
+    @staticmethod
+    def _enregistrer_goulot(**champs) -> AnalyseGoulotEtranglement:
+        """
+        Crée le goulot, ou met à jour le goulot encore actif de même département,
+        étape et titre: les détections périodiques portent sur des périodes
+        qui se chevauchent.
+        """
+        existant = AnalyseGoulotEtranglement.objects.filter(
+            departement_id=champs['departement_id'],
+            etape_concernee_id=champs.get('etape_concernee_id'),
+            titre=champs['titre'],
+            statut__in=['DETECTE', 'EN_ANALYSE', 'CONFIRME']
+        ).order_by('-detecte_le').first()
+        if existant is None:
+            return AnalyseGoulotEtranglement.objects.create(**champs)
+        
+        # Le début de la période reste celui de la première détection
+        champs.pop('periode_debut')
+        for champ, valeur in champs.items():
+            setattr(existant, champ, valeur)
+        existant.save(update_fields=list(champs))
+        return existant
+    
     def _analyser_temps_etapes(
         self,
         debut,
@@ -74,19 +110,8 @@ class MoteurAnalyseService:
         departement_id: Optional[int]
     ) -> List[AnalyseGoulotEtranglement]:
         """Analyse les temps de passage par étape."""
-        # Calculer les temps moyens par étape
-        transitions = TransitionEtape.objects.filter(
-            horodatage__gte=debut,
-            horodatage__lte=fin,
-            duree_etape_minutes__isnull=False
-        )
-        
-        if departement_id:
-            transitions = transitions.filter(
-                instance__departement_id=departement_id
-            )
-        
-        temps_par_etape = transitions.values(
+        # Calculer les temps moyens par étape (archives incluses si la période les couvre)
+        champs = (
             'etape_source__id',
             'etape_source__nom',
             'etape_source__type_workflow__id',
@@ -94,12 +119,34 @@ class MoteurAnalyseService:
             'etape_source__duree_estimee_minutes',
             'instance__departement__id',
             'instance__departement__name'
-        ).annotate(
-            duree_moyenne=Avg('duree_etape_minutes'),
-            occurrences=Count('id')
-        ).filter(
-            occurrences__gte=5  # Minimum 5 occurrences pour analyse
         )
+        cumuls = {}
+        for source in sources_transitions(debut):
+            transitions = source.filter(
+                horodatage__gte=debut,
+                horodatage__lte=fin,
+                duree_etape_minutes__isnull=False
+            )
+            
+            if departement_id:
+                transitions = transitions.filter(
+                    instance__departement_id=departement_id
+                )
+            
+            for data in transitions.values(*champs).annotate(
+                duree_totale=Sum('duree_etape_minutes'),
+                occurrences=Count('id')
+            ):
+                cle = tuple(data[c] for c in champs)
+                cumul = cumuls.setdefault(cle, dict(data, duree_totale=0, occurrences=0))
+                cumul['duree_totale'] += data['duree_totale']
+                cumul['occurrences'] += data['occurrences']
+        
+        temps_par_etape = [
+            dict(data, duree_moyenne=data['duree_totale'] / data['occurrences'])
+            for data in cumuls.values()
+            if data['occurrences'] >= 5  # Minimum 5 occurrences pour analyse
+        ]
         
         goulots = []
         for data in temps_par_etape:
@@ -110,7 +157,7 @@ class MoteurAnalyseService:
             if duree_moyenne and duree_moyenne > duree_estimee * 1.5:
                 gravite = self._calculer_gravite_temps(duree_moyenne, duree_estimee)
                 
-                goulot = AnalyseGoulotEtranglement.objects.create(
+                goulot = self._enregistrer_goulot(
                     departement_id=data.get('instance__departement__id'),
                     type_workflow_id=data.get('etape_source__type_workflow__id'),
                     etape_concernee_id=data.get('etape_source__id'),
@@ -168,7 +215,7 @@ class MoteurAnalyseService:
                     data.get('critiques', 0)
                 )
                 
-                goulot = AnalyseGoulotEtranglement.objects.create(
+                goulot = self._enregistrer_goulot(
                     departement_id=data.get('departement__id'),
                     titre=f"Concentration d'événements: {data.get('categorie__nom')}",
                     description=f"Le département '{data.get('departement__name')}' "
@@ -189,6 +236,62 @@ class MoteurAnalyseService:
         
         return goulots
     
+    def _analyser_files_attente(
+        self,
+        debut,
+        fin,
+        departement_id: Optional[int]
+    ) -> List[AnalyseGoulotEtranglement]:
+        """
+        Détecte les étapes dont le WIP augmente sans hausse du débit.
+        Lit uniquement les compteurs par étape (pas les transitions brutes).
+        """
+        etapes = FilesAttenteService().obtenir_instantane(departement_id=departement_id)
+        
+        goulots = []
+        for data in etapes:
+            duree_estimee = data['duree_estimee_minutes'] or 15
+            attente = data['attente_estimee_minutes']
+            
+            # Minimum 3 patients en attente, WIP en hausse et débit non croissant
+            if not data['departement_id'] or data['en_cours'] < 3:
+                continue
+            if data['variation_en_cours'] <= 0:
+                continue
+            if data['sorties_heure'] > data['sorties_heure_precedente']:
+                continue
+            if attente is not None and attente <= duree_estimee * 1.5:
+                continue
+            
+            gravite = (
+                self._calculer_gravite_temps(attente, duree_estimee)
+                if attente is not None else 'ELEVEE'
+            )
+            
+            goulot = self._enregistrer_goulot(
+                departement_id=data['departement_id'],
+                type_workflow_id=data['type_workflow_id'],
+                etape_concernee_id=data['etape_id'],
+                titre=f"File d'attente croissante: {data['etape_nom']}",
+                description=f"{data['en_cours']} patients à l'étape '{data['etape_nom']}' "
+                           f"(+{data['variation_en_cours']} sur la dernière heure) pour "
+                           f"{data['sorties_heure']} sortie(s) par heure"
+                           + (f"; attente estimée {int(attente)} minutes." if attente is not None
+                              else "; aucune sortie sur la dernière heure."),
+                gravite=gravite,
+                delai_moyen_minutes=int(attente or 0),
+                nombre_occurrences=data['en_cours'],
+                impact_patients=data['en_cours'],
+                periode_debut=debut,
+                periode_fin=fin,
+                recommandations=self._generer_recommandations_temps(
+                    attente or duree_estimee * 2, duree_estimee
+                )
+            )
+            goulots.append(goulot)
+        
+        return goulots
+    
     def _calculer_gravite_temps(
         self,
         duree_moyenne: float,
@@ -272,177 +375,235 @@ class TableauBordService:
     """
     Service pour la génération des données du tableau de bord.
     Agrège les métriques pour les administrateurs.
+    
+    Les compteurs sont calculés en nombre de requêtes constant (Count filtrés,
+    regroupements par département et par jour), par les mêmes requêtes pour
+    les versions synchrone et asynchrone.
     """
     
+    # Écritures qui périment le tableau de bord en cache (apps/core/cache.py)
+    ETIQUETTES = ['evenements', 'workflows', 'goulots', 'personnel', 'departements']
+    
+    @staticmethod
+    def _cle_cache() -> str:
+        # Une entrée par jour: compteurs « aujourd'hui » et tendances glissantes
+        return f'analytics:tableau_bord:{timezone.localdate().isoformat()}'
+    
     def obtenir_donnees_tableau_bord(self) -> Dict[str, Any]:
         """
-        Génère les données complètes du tableau de bord.
+        Données complètes du tableau de bord, depuis le cache tant qu'aucune
+        écriture ne les a périmées (au plus LECTURES_CACHE_SECONDES).
         
         Returns:
             Dict avec toutes les métriques du tableau de bord
         """
+        return lire_ou_calculer(self._cle_cache(), self.calculer_donnees_tableau_bord, self.ETIQUETTES)
+    
+    async def aobtenir_donnees_tableau_bord(self) -> Dict[str, Any]:
+        """Version asynchrone de obtenir_donnees_tableau_bord (même entrée de cache)."""
+        return await alire_ou_calculer(
+            self._cle_cache(), self.acalculer_donnees_tableau_bord, self.ETIQUETTES
+        )
+    
+    @mesurer('tableau_bord')
+    def calculer_donnees_tableau_bord(self) -> Dict[str, Any]:
+        """Calcule les données complètes du tableau de bord."""
         maintenant = timezone.now()
         debut_journee = maintenant.replace(hour=0, minute=0, second=0, microsecond=0)
         
-        return {
-            'resume': self._obtenir_resume(),
-            'workflows': self._obtenir_stats_workflows(debut_journee),
-            'evenements': self._obtenir_stats_evenements(debut_journee),
-            'goulots': self._obtenir_stats_goulots(),
-            'departements': self._obtenir_stats_departements(),
-            'tendances': self._obtenir_tendances(7)
+        agregats = {
+            nom: requete.aggregate(**compteurs)
+            for nom, (requete, compteurs) in self._agregats(debut_journee).items()
         }
+        listes = {nom: list(requete) for nom, requete in self._listes(debut_journee).items()}
+        return self._assembler(maintenant, debut_journee, agregats, listes)
+    
+    @mesurer('tableau_bord')
+    async def acalculer_donnees_tableau_bord(self) -> Dict[str, Any]:
+        """Version asynchrone (ORM async) de calculer_donnees_tableau_bord, mêmes requêtes."""
+        maintenant = timezone.now()
+        debut_journee = maintenant.replace(hour=0, minute=0, second=0, microsecond=0)
+        
+        agregats = {
+            nom: await requete.aaggregate(**compteurs)
+            for nom, (requete, compteurs) in self._agregats(debut_journee).items()
+        }
+        listes = {
+            nom: [ligne async for ligne in requete]
+            for nom, requete in self._listes(debut_journee).items()
+        }
+        return self._assembler(maintenant, debut_journee, agregats, listes)
     
     def _obtenir_resume(self) -> Dict[str, Any]:
         """Résumé global."""
-        workflows_actifs = InstanceWorkflow.objects.filter(
-            statut__in=['INITIE', 'EN_COURS', 'EN_PAUSE']
-        ).count()
-        
-        evenements_ouverts = MicroEvenement.objects.filter(
-            statut__in=['SIGNALE', 'EN_COURS']
-        ).count()
-        
-        evenements_critiques = MicroEvenement.objects.filter(
-            statut__in=['SIGNALE', 'EN_COURS'],
-            severite='CRITIQUE'
-        ).count()
-        
-        goulots_actifs = AnalyseGoulotEtranglement.objects.filter(
-            statut__in=['DETECTE', 'EN_ANALYSE', 'CONFIRME']
-        ).count()
-        
-        personnel_en_service = User.objects.filter(
-            is_on_duty=True,
-            is_active=True
-        ).count()
-        
-        return {
-            'workflows_actifs': workflows_actifs,
-            'evenements_ouverts': evenements_ouverts,
-            'evenements_critiques': evenements_critiques,
-            'goulots_actifs': goulots_actifs,
-            'personnel_en_service': personnel_en_service
+        agregats = {
+            nom: requete.aggregate(**compteurs)
+            for nom, (requete, compteurs) in self._agregats(None).items()
         }
+        return self._resume(agregats)
     
-    def _obtenir_stats_workflows(self, debut_journee) -> Dict[str, Any]:
-        """Statistiques des workflows."""
-        workflows_jour = InstanceWorkflow.objects.filter(
-            demarre_le__gte=debut_journee
-        )
+    @staticmethod
+    def _agregats(debut_journee) -> Dict[str, tuple]:
+        """
+        Requêtes agrégées du tableau de bord: nom -> (queryset, compteurs).
+        Sans debut_journee, seulement celles du résumé.
+        """
+        requetes = {
+            'workflows': (InstanceWorkflow.objects.all(), {
+                'actifs': Count('id', filter=Q(statut__in=['INITIE', 'EN_COURS', 'EN_PAUSE'])),
+            }),
+            'evenements_ouverts': (MicroEvenement.objects.filter(statut__in=['SIGNALE', 'EN_COURS']), {
+                'total': Count('id'),
+                'critique': Count('id', filter=Q(severite='CRITIQUE')),
+                'eleve': Count('id', filter=Q(severite='ELEVE')),
+                'moyen': Count('id', filter=Q(severite='MOYEN')),
+                'faible': Count('id', filter=Q(severite='FAIBLE')),
+            }),
+            'goulots': (AnalyseGoulotEtranglement.objects.filter(
+                statut__in=['DETECTE', 'EN_ANALYSE', 'CONFIRME']
+            ), {
+                'total': Count('id'),
+                'critique': Count('id', filter=Q(gravite='CRITIQUE')),
+                'elevee': Count('id', filter=Q(gravite='ELEVEE')),
+                'moderee': Count('id', filter=Q(gravite='MODEREE')),
+                'faible': Count('id', filter=Q(gravite='FAIBLE')),
+            }),
+            'personnel': (User.objects.filter(is_on_duty=True, is_active=True), {
+                'en_service': Count('id'),
+            }),
+        }
+        if debut_journee is not None:
+            requetes['workflows_jour'] = (InstanceWorkflow.objects.filter(
+                demarre_le__gte=debut_journee
+            ), {
+                'demarres': Count('id'),
+                'termines': Count('id', filter=Q(statut='TERMINE')),
+            })
+            requetes['evenements_jour'] = (MicroEvenement.objects.filter(
+                Q(signale_le__gte=debut_journee) | Q(resolu_le__gte=debut_journee)
+            ), {
+                'signales': Count('id', filter=Q(signale_le__gte=debut_journee)),
+                'resolus': Count('id', filter=Q(resolu_le__gte=debut_journee)),
+            })
+        return requetes
+    
+    @staticmethod
+    def _listes(debut_journee, jours: int = 7) -> Dict[str, Any]:
+        """Requêtes regroupées du tableau de bord (par département, par jour)."""
+        # Mêmes journées que timezone.now(): minuit dans son fuseau
+        fuseau = debut_journee.tzinfo
+        debut = debut_journee - timedelta(days=jours - 1)
+        fin = debut_journee + timedelta(days=1)
         
         return {
-            'demarres_aujourdhui': workflows_jour.count(),
-            'termines_aujourdhui': workflows_jour.filter(statut='TERMINE').count(),
-            'en_retard': sum(1 for w in InstanceWorkflow.objects.filter(
+            'workflows_en_cours': InstanceWorkflow.objects.filter(
                 statut__in=['INITIE', 'EN_COURS']
-            ) if w.est_en_retard)
+            ).values_list('departement', 'demarre_le', 'type_workflow__seuil_alerte_minutes'),
+            'evenements_departements': MicroEvenement.objects.filter(
+                statut__in=['SIGNALE', 'EN_COURS']
+            ).values('departement').annotate(nombre=Count('id')).order_by(),
+            'departements': Department.objects.filter(is_active=True).annotate(
+                en_service=Count('staff', filter=Q(staff__is_on_duty=True))
+            ).order_by(*Department._meta.ordering),
+            'tendances_workflows': InstanceWorkflow.objects.filter(
+                demarre_le__gte=debut, demarre_le__lt=fin
+            ).annotate(jour=TruncDate('demarre_le', tzinfo=fuseau)).values('jour').annotate(
+                demarres=Count('id'),
+                termines=Count('id', filter=Q(statut='TERMINE'))
+            ).order_by(),
+            'tendances_evenements': MicroEvenement.objects.filter(
+                signale_le__gte=debut, signale_le__lt=fin
+            ).annotate(jour=TruncDate('signale_le', tzinfo=fuseau)).values('jour').annotate(
+                signales=Count('id'),
+                critiques=Count('id', filter=Q(severite='CRITIQUE'))
+            ).order_by(),
         }
     
-    def _obtenir_stats_evenements(self, debut_journee) -> Dict[str, Any]:
-        """Statistiques des événements."""
+    @staticmethod
+    def _resume(agregats) -> Dict[str, Any]:
         return {
-            'signales_aujourdhui': MicroEvenement.objects.filter(
-                signale_le__gte=debut_journee
-            ).count(),
-            'resolus_aujourdhui': MicroEvenement.objects.filter(
-                resolu_le__gte=debut_journee
-            ).count(),
-            'par_severite': {
-                'critique': MicroEvenement.objects.filter(
-                    statut__in=['SIGNALE', 'EN_COURS'], severite='CRITIQUE'
-                ).count(),
-                'eleve': MicroEvenement.objects.filter(
-                    statut__in=['SIGNALE', 'EN_COURS'], severite='ELEVE'
-                ).count(),
-                'moyen': MicroEvenement.objects.filter(
-                    statut__in=['SIGNALE', 'EN_COURS'], severite='MOYEN'
-                ).count(),
-                'faible': MicroEvenement.objects.filter(
-                    statut__in=['SIGNALE', 'EN_COURS'], severite='FAIBLE'
-                ).count()
-            }
+            'workflows_actifs': agregats['workflows']['actifs'],
+            'evenements_ouverts': agregats['evenements_ouverts']['total'],
+            'evenements_critiques': agregats['evenements_ouverts']['critique'],
+            'goulots_actifs': agregats['goulots']['total'],
+            'personnel_en_service': agregats['personnel']['en_service']
         }
     
-    def _obtenir_stats_goulots(self) -> Dict[str, Any]:
-        """Statistiques des goulots."""
-        goulots = AnalyseGoulotEtranglement.objects.filter(
-            statut__in=['DETECTE', 'EN_ANALYSE', 'CONFIRME']
-        )
-        
-        return {
-            'total_actifs': goulots.count(),
-            'par_gravite': {
-                'critique': goulots.filter(gravite='CRITIQUE').count(),
-                'elevee': goulots.filter(gravite='ELEVEE').count(),
-                'moderee': goulots.filter(gravite='MODEREE').count(),
-                'faible': goulots.filter(gravite='FAIBLE').count()
-            }
+    def _assembler(self, maintenant, debut_journee, agregats, listes, jours: int = 7) -> Dict[str, Any]:
+        """Données du tableau de bord à partir des résultats des requêtes."""
+        evenements = agregats['evenements_ouverts']
+        goulots = agregats['goulots']
+        
+        # Même règle que InstanceWorkflow.est_en_retard, sans charger les instances
+        en_retard = 0
+        workflows_departements = Counter()
+        for departement_id, demarre_le, seuil in listes['workflows_en_cours']:
+            en_retard += (maintenant - demarre_le).total_seconds() / 60 > seuil
+            workflows_departements[departement_id] += 1
+        evenements_departements = {
+            ligne['departement']: ligne['nombre'] for ligne in listes['evenements_departements']
         }
-    
-    def _obtenir_stats_departements(self) -> List[Dict[str, Any]]:
-        """Statistiques par département."""
-        departements = Department.objects.filter(is_active=True)
-        stats = []
         
-        for dept in departements:
-            workflows_actifs = InstanceWorkflow.objects.filter(
-                departement=dept,
-                statut__in=['INITIE', 'EN_COURS']
-            ).count()
-            
-            evenements_ouverts = MicroEvenement.objects.filter(
-                departement=dept,
-                statut__in=['SIGNALE', 'EN_COURS']
-            ).count()
-            
-            stats.append({
-                'id': dept.id,
-                'nom': dept.name,
-                'code': dept.code,
-                'workflows_actifs': workflows_actifs,
-                'evenements_ouverts': evenements_ouverts,
-                'personnel_en_service': dept.staff.filter(is_on_duty=True).count()
-            })
-        
-        return stats
-    
-    def _obtenir_tendances(self, jours: int) -> List[Dict[str, Any]]:
-        """Obtient les tendances sur plusieurs jours."""
+        tendances_workflows = {ligne['jour']: ligne for ligne in listes['tendances_workflows']}
+        tendances_evenements = {ligne['jour']: ligne for ligne in listes['tendances_evenements']}
         tendances = []
-        maintenant = timezone.now()
-        
-        for i in range(jours):
-            date_debut = (maintenant - timedelta(days=i)).replace(
-                hour=0, minute=0, second=0, microsecond=0
-            )
-            date_fin = date_debut + timedelta(days=1)
-            
-            workflows = InstanceWorkflow.objects.filter(
-                demarre_le__gte=date_debut,
-                demarre_le__lt=date_fin
-            )
-            
-            evenements = MicroEvenement.objects.filter(
-                signale_le__gte=date_debut,
-                signale_le__lt=date_fin
-            )
-            
+        for i in range(jours - 1, -1, -1):
+            jour = (debut_journee - timedelta(days=i)).date()
+            w = tendances_workflows.get(jour, {})
+            e = tendances_evenements.get(jour, {})
             tendances.append({
-                'date': date_debut.date().isoformat(),
-                'workflows_demarres': workflows.count(),
-                'workflows_termines': workflows.filter(statut='TERMINE').count(),
-                'evenements_signales': evenements.count(),
-                'evenements_critiques': evenements.filter(severite='CRITIQUE').count()
+                'date': jour.isoformat(),
+                'workflows_demarres': w.get('demarres', 0),
+                'workflows_termines': w.get('termines', 0),
+                'evenements_signales': e.get('signales', 0),
+                'evenements_critiques': e.get('critiques', 0)
             })
         
-        return list(reversed(tendances))
+        return {
+            'resume': self._resume(agregats),
+            'workflows': {
+                'demarres_aujourdhui': agregats['workflows_jour']['demarres'],
+                'termines_aujourdhui': agregats['workflows_jour']['termines'],
+                'en_retard': en_retard
+            },
+            'evenements': {
+                'signales_aujourdhui': agregats['evenements_jour']['signales'],
+                'resolus_aujourdhui': agregats['evenements_jour']['resolus'],
+                'par_severite': {
+                    'critique': evenements['critique'],
+                    'eleve': evenements['eleve'],
+                    'moyen': evenements['moyen'],
+                    'faible': evenements['faible']
+                }
+            },
+            'goulots': {
+                'total_actifs': goulots['total'],
+                'par_gravite': {
+                    'critique': goulots['critique'],
+                    'elevee': goulots['elevee'],
+                    'moderee': goulots['moderee'],
+                    'faible': goulots['faible']
+                }
+            },
+            'departements': [
+                {
+                    'id': dept.id,
+                    'nom': dept.name,
+                    'code': dept.code,
+                    'workflows_actifs': workflows_departements[dept.id],
+                    'evenements_ouverts': evenements_departements.get(dept.id, 0),
+                    'personnel_en_service': dept.en_service
+                }
+                for dept in listes['departements']
+            ],
+            'tendances': tendances
+        }
     
     @transaction.atomic
     def generer_statistiques_quotidiennes(self):
         """
         Génère et sauvegarde les statistiques quotidiennes.
-        À exécuter via une tâche planifiée (cron).
+        Exécutée par le planificateur (tâche statistiques_quotidiennes).
         """
         aujourdhui = timezone.now().date()
         
@@ -459,37 +620,20 @@ class TableauBordService:
             }
         )
         
-        # Générer métriques par département
-        for dept in Department.objects.filter(is_active=True):
-            self._generer_metrique_departement(dept, aujourdhui)
-    
-    def _generer_metrique_departement(self, departement, date):
-        """Génère les métriques pour un département."""
-        debut_journee = timezone.datetime.combine(
-            date, timezone.datetime.min.time()
-        ).replace(tzinfo=timezone.get_current_timezone())
-        fin_journee = debut_journee + timedelta(days=1)
-        
-        workflows = InstanceWorkflow.objects.filter(
-            departement=departement,
-            demarre_le__date=date
-        )
-        
-        evenements = MicroEvenement.objects.filter(
-            departement=departement,
-            signale_le__date=date
-        )
-        
-        MetriqueDepartement.objects.update_or_create(
-            departement=departement,
-            date=date,
-            defaults={
-                'workflows_demarre': workflows.count(),
-                'workflows_termines': workflows.filter(statut='TERMINE').count(),
-                'workflows_abandonnes': workflows.filter(statut='ABANDONNE').count(),
-                'evenements_signales': evenements.count(),
-                'evenements_resolus': evenements.filter(statut='RESOLU').count(),
-                'evenements_critiques': evenements.filter(severite='CRITIQUE').count(),
-                'personnel_en_service': departement.staff.filter(is_on_duty=True).count()
-            }
-        )
+        # Agrégats du jour par département (requêtes groupées), puis relevé du personnel
+        departements = Department.objects.filter(is_active=True)
+        AgregationService().consolider(aujourdhui, aujourdhui, [d.pk for d in departements])
+        for dept in departements.annotate(
+            en_service=Count('staff', filter=Q(staff__is_on_duty=True))
+        ):
+            if MetriqueDepartement.objects.filter(
+                departement=dept,
+                date=aujourdhui
+            ).exclude(
+                personnel_en_service=dept.en_service
+            ).update(
+                personnel_en_service=dept.en_service,
+                modifie_le=timezone.now()
+            ):
+                # update() n'émet pas de signal: invalidation explicite du cache
+                invalider(*etiquettes_ecriture('metriques', dept.pk, aujourdhui))
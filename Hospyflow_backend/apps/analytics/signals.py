@@ -0,0 +1,96 @@
+from datetime import datetime
+from typing import Iterable, List
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.accounts.models import Department, User
+from apps.alerts.models import Alerte, RegleAlerte
+from apps.core.cache import etiquettes_ecriture, invalider
+from apps.events.models import CategorieEvenement, MicroEvenement
+from apps.services.models import ServiceHospitalier
+from apps.workflows.models import EtapeWorkflow, InstanceWorkflow, TransitionEtape, TypeWorkflow
+from .files_attente import FilesAttenteService
+from .models import AnalyseGoulotEtranglement, MetriqueDepartement, StatistiqueGlobale
+
+
+@receiver(post_save, sender=TransitionEtape)
+def mettre_a_jour_files_attente(sender, instance, created, **kwargs):
+    """
+    Met à jour le WIP et le débit des étapes à chaque nouvelle transition.
+    """
+    if created:
+        FilesAttenteService().enregistrer_transition(
+            instance.etape_source_id,
+            instance.etape_destination_id,
+            instance.horodatage,
+            instance.duree_etape_minutes
+        )
+
+
+# Écritures qui périment le cache des lectures (apps/core/cache.py) et les
+# ETag des lectures conditionnelles (apps/core/conditionnel.py):
+# modèle -> (ressource, champ du département, champ du jour)
+ETIQUETTES_ECRITURES = {
+    MicroEvenement: ('evenements', 'departement_id', 'signale_le'),
+    InstanceWorkflow: ('workflows', 'departement_id', 'demarre_le'),
+    Alerte: ('alertes', 'departement_id', 'cree_le'),
+    AnalyseGoulotEtranglement: ('goulots', 'departement_id', None),
+    MetriqueDepartement: ('metriques', 'departement_id', 'date'),
+    StatistiqueGlobale: ('statistiques', None, 'date'),
+    ServiceHospitalier: ('services', 'department_id', None),
+    Department: ('departements', 'id', None),
+    # Référentiels dont les noms figurent dans les listes
+    CategorieEvenement: ('categories', None, None),
+    TypeWorkflow: ('types_workflow', None, None),
+    EtapeWorkflow: ('types_workflow', None, None),
+    RegleAlerte: ('regles', None, None),
+}
+
+
+def etiquettes_objet(modele, objet) -> List[str]:
+    """Étiquettes périmées par l'écriture d'un objet: ressource, département et jour."""
+    ressource, champ_departement, champ_jour = ETIQUETTES_ECRITURES[modele]
+    jour = getattr(objet, champ_jour) if champ_jour else None
+    if isinstance(jour, datetime):
+        jour = timezone.localdate(jour)
+    return etiquettes_ecriture(
+        ressource,
+        getattr(objet, champ_departement) if champ_departement else None,
+        jour
+    )
+
+
+def invalider_lectures(sender, instance, **kwargs):
+    """
+    Invalide les étiquettes de l'écriture: ressource, département et jour
+    de l'instance (les opérations groupées sans signaux invalident elles-mêmes).
+    """
+    invalider(*etiquettes_objet(sender, instance))
+
+
+def invalider_ecritures(modele, objets: Iterable):
+    """
+    Invalide en une fois les étiquettes d'objets écrits sans signaux
+    (bulk_create, bulk_update, update).
+    """
+    if modele is User:
+        etiquettes = {e for objet in objets for e in etiquettes_ecriture('personnel', objet.department_id)}
+    else:
+        etiquettes = {e for objet in objets for e in etiquettes_objet(modele, objet)}
+    invalider(*etiquettes)
+
+
+for modele in ETIQUETTES_ECRITURES:
+    post_save.connect(invalider_lectures, sender=modele, dispatch_uid=f'lectures.{modele.__name__}.save')
+    post_delete.connect(invalider_lectures, sender=modele, dispatch_uid=f'lectures.{modele.__name__}.delete')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalider_personnel(sender, instance, update_fields=None, **kwargs):
+    """Invalide les effectifs en service, sauf pour la seule mise à jour de last_login."""
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    invalider(*etiquettes_ecriture('personnel', instance.department_id))
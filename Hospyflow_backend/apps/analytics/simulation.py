@@ -0,0 +1,349 @@
+"""
+Service Pattern - Simulation à événements discrets des files d'attente par étape.
+Permet d'évaluer l'effet des effectifs sur l'attente avant de modifier un planning.
+
+Les paramètres (taux d'arrivée, durées de service, effectifs) sont ajustés sur
+l'historique puis transmis sous forme de dictionnaires simples aux processus de
+simulation: aucun accès à la base de données n'a lieu pendant les réplications.
+"""
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+import django
+import numpy as np
+from django.conf import settings
+from django.db.models import Count
+from django.db.models.functions import ExtractHour
+from django.utils import timezone
+
+from .models import MetriqueDepartement
+from apps.workflows.models import EtapeWorkflow
+from apps.workflows.archivage import sources_instances, sources_transitions
+
+
+class SimulationException(Exception):
+    """Exception pour les erreurs de simulation."""
+    pass
+
+
+# ----------------------------------------------------------------------
+# Moteur de simulation (sans accès base de données)
+# ----------------------------------------------------------------------
+
+def _generer_arrivees(
+    rng: np.random.Generator,
+    taux_horaires: np.ndarray,
+    heure_debut: int,
+    duree_minutes: float
+) -> np.ndarray:
+    """Arrivées d'un processus de Poisson non homogène (taux par heure de la journée)."""
+    nombre_heures = int(np.ceil(duree_minutes / 60))
+    taux = taux_horaires[(np.arange(nombre_heures) + heure_debut) % 24]
+    comptes = rng.poisson(taux)
+    arrivees = np.repeat(np.arange(nombre_heures) * 60.0, comptes)
+    arrivees += rng.uniform(0.0, 60.0, arrivees.size)
+    arrivees.sort()
+    return arrivees[arrivees < duree_minutes]
+
+
+def _servir_file(
+    arrivees: np.ndarray,
+    services: np.ndarray,
+    serveurs: int
+) -> np.ndarray:
+    """
+    Calcule les instants de sortie d'une file FIFO à plusieurs serveurs.
+
+    Avec un seul serveur, la récurrence de Lindley D(n) = max(D(n-1), A(n)) + S(n)
+    se résout sans boucle: D = C + max cumulé(A - C(n-1)), C étant la somme cumulée
+    des services. Au-delà, on conserve les instants de libération dans un tas.
+    """
+    if serveurs <= 1:
+        cumul = np.cumsum(services)
+        cumul_precedent = cumul - services
+        return cumul + np.maximum.accumulate(arrivees - cumul_precedent)
+
+    departs = np.empty_like(arrivees)
+    liberations = [0.0] * serveurs
+    for i, (arrivee, service) in enumerate(zip(arrivees.tolist(), services.tolist())):
+        debut = max(liberations[0], arrivee)
+        departs[i] = debut + service
+        heapq.heapreplace(liberations, departs[i])
+    return departs
+
+
+def simuler_replication(parametres: Dict[str, Any], graine: int) -> List[Dict[str, float]]:
+    """
+    Exécute une réplication de la simulation du graphe d'étapes.
+
+    Args:
+        parametres: Paramètres préparés par SimulationService.preparer_parametres
+            et l'effectif du scénario (clé 'personnel' de chaque étape)
+        graine: Graine du générateur aléatoire
+
+    Returns:
+        Indicateurs par étape, dans l'ordre des étapes
+    """
+    rng = np.random.default_rng(graine)
+    duree = parametres['duree_minutes']
+    arrivees = _generer_arrivees(
+        rng,
+        np.asarray(parametres['taux_arrivee_horaire'], dtype=np.float64),
+        parametres['heure_debut'],
+        duree
+    )
+
+    resultats = []
+    for etape in parametres['etapes']:
+        echantillons = np.asarray(etape['durees'], dtype=np.float64)
+        if echantillons.size:
+            services = rng.choice(echantillons, size=arrivees.size)
+        else:
+            services = rng.exponential(etape['duree_estimee'], size=arrivees.size)
+
+        serveurs = max(int(etape['personnel']), 1)
+        departs = _servir_file(arrivees, services, serveurs)
+        attentes = np.maximum(departs - services - arrivees, 0.0)
+
+        occupation = np.clip(np.minimum(departs, duree) - (departs - services), 0, None).sum()
+        resultats.append({
+            'patients': int(arrivees.size),
+            'attente_moyenne': float(attentes.mean()) if attentes.size else 0.0,
+            'attente_p90': float(np.percentile(attentes, 90)) if attentes.size else 0.0,
+            'utilisation': float(min(occupation / (serveurs * duree), 1.0)),
+        })
+
+        # Les patients arrivent à l'étape suivante dans l'ordre de sortie
+        arrivees = np.sort(departs)
+
+    return resultats
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _obtenir_pool() -> ProcessPoolExecutor:
+    """Pool de processus partagé entre les requêtes (créé à la première utilisation)."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=getattr(settings, 'SIMULATION_MAX_WORKERS', None) or os.cpu_count(),
+            initializer=django.setup
+        )
+    return _pool
+
+
+# ----------------------------------------------------------------------
+# Service
+# ----------------------------------------------------------------------
+
+class SimulationService:
+    """
+    Service de simulation des effectifs par étape (analyse « et si »).
+    """
+
+    JOURS_HISTORIQUE = 30
+    MAX_ECHANTILLONS = 2000
+    MIN_TACHES_PARALLELES = 4
+    # Chaque scénario occupe jusqu'à `replications` tâches du pool partagé
+    MAX_SCENARIOS = 10
+
+    def preparer_parametres(
+        self,
+        type_workflow_id: int,
+        jours: int = JOURS_HISTORIQUE,
+        duree_heures: int = 24
+    ) -> Dict[str, Any]:
+        """
+        Ajuste les paramètres de simulation sur l'historique.
+
+        Args:
+            type_workflow_id: Type de workflow simulé
+            jours: Profondeur d'historique
+            duree_heures: Horizon simulé
+
+        Returns:
+            Paramètres sérialisables (sans objets Django)
+        """
+        etapes = list(EtapeWorkflow.objects.filter(
+            type_workflow_id=type_workflow_id
+        ).order_by('ordre').values(
+            'id', 'nom', 'duree_estimee_minutes', 'departement_responsable_id'
+        ))
+        if not etapes:
+            raise SimulationException("Ce type de workflow n'a aucune étape.")
+
+        depuis = timezone.now() - timedelta(days=jours)
+
+        # Taux d'arrivée par heure de la journée
+        taux = np.zeros(24)
+        for source in sources_instances(depuis):
+            for ligne in source.filter(
+                type_workflow_id=type_workflow_id,
+                demarre_le__gte=depuis
+            ).annotate(
+                heure=ExtractHour('demarre_le')
+            ).values('heure').annotate(total=Count('id')):
+                taux[ligne['heure']] += ligne['total'] / jours
+
+        # Durées de service observées par étape (échantillon borné)
+        rng = np.random.default_rng(0)
+        durees: Dict[int, List[float]] = {etape['id']: [] for etape in etapes}
+        for source in sources_transitions(depuis):
+            for etape_id, duree in source.filter(
+                etape_source_id__in=list(durees),
+                horodatage__gte=depuis,
+                duree_etape_minutes__isnull=False
+            ).values_list('etape_source_id', 'duree_etape_minutes').iterator(chunk_size=5000):
+                durees[etape_id].append(float(duree))
+        for etape_id, valeurs in durees.items():
+            if len(valeurs) > self.MAX_ECHANTILLONS:
+                durees[etape_id] = rng.choice(valeurs, self.MAX_ECHANTILLONS, replace=False).tolist()
+
+        personnel = self._personnel_par_departement(
+            {e['departement_responsable_id'] for e in etapes if e['departement_responsable_id']}
+        )
+
+        return {
+            'duree_minutes': duree_heures * 60.0,
+            'heure_debut': timezone.localtime().hour,
+            'taux_arrivee_horaire': taux.tolist(),
+            'etapes': [
+                {
+                    'id': etape['id'],
+                    'nom': etape['nom'],
+                    'duree_estimee': float(etape['duree_estimee_minutes']),
+                    'durees': durees[etape['id']],
+                    'personnel': personnel.get(etape['departement_responsable_id'], 1),
+                }
+                for etape in etapes
+            ]
+        }
+
+    @staticmethod
+    def _personnel_par_departement(departement_ids) -> Dict[int, int]:
+        """Dernier effectif en service connu (MetriqueDepartement) par département."""
+        personnel = {}
+        for departement_id, effectif in MetriqueDepartement.objects.filter(
+            departement_id__in=departement_ids
+        ).order_by('departement_id', '-date').values_list(
+            'departement_id', 'personnel_en_service'
+        ):
+            personnel.setdefault(departement_id, effectif or 1)
+        return personnel
+
+    def simuler(
+        self,
+        type_workflow_id: int,
+        scenarios: List[Dict[str, Any]],
+        replications: int = 20,
+        duree_heures: int = 24,
+        jours: int = JOURS_HISTORIQUE
+    ) -> Dict[str, Any]:
+        """
+        Simule plusieurs scénarios d'effectifs.
+
+        Args:
+            type_workflow_id: Type de workflow simulé
+            scenarios: Liste de {'nom': str, 'personnel': {etape_id: effectif}}
+            replications: Nombre de réplications par scénario
+            duree_heures: Horizon simulé
+            jours: Profondeur d'historique pour l'ajustement
+
+        Returns:
+            Paramètres ajustés et indicateurs moyens par scénario et par étape
+        """
+        scenarios = scenarios or [{'nom': 'Actuel', 'personnel': {}}]
+        if len(scenarios) > self.MAX_SCENARIOS:
+            raise SimulationException(f"{self.MAX_SCENARIOS} scénarios au plus par simulation.")
+        base = self.preparer_parametres(type_workflow_id, jours, duree_heures)
+
+        taches = []
+        for scenario in scenarios:
+            parametres = dict(base)
+            effectifs = self._effectifs(scenario.get('personnel') or {})
+            parametres['etapes'] = [
+                dict(etape, personnel=effectifs.get(etape['id'], etape['personnel']))
+                for etape in base['etapes']
+            ]
+            # Mêmes graines pour chaque scénario: comparaison à aléa commun
+            taches.extend((parametres, graine) for graine in range(replications))
+
+        if len(taches) >= self.MIN_TACHES_PARALLELES:
+            pool = _obtenir_pool()
+            resultats = list(pool.map(
+                simuler_replication,
+                [t[0] for t in taches],
+                [t[1] for t in taches],
+                chunksize=max(len(taches) // (os.cpu_count() or 1), 1)
+            ))
+        else:
+            resultats = [simuler_replication(p, g) for p, g in taches]
+
+        return {
+            'type_workflow': type_workflow_id,
+            'duree_heures': duree_heures,
+            'replications': replications,
+            'arrivees_par_jour': round(sum(base['taux_arrivee_horaire']), 2),
+            'scenarios': [
+                self._agreger_scenario(
+                    scenario,
+                    taches[i * replications][0]['etapes'],
+                    resultats[i * replications:(i + 1) * replications]
+                )
+                for i, scenario in enumerate(scenarios)
+            ]
+        }
+
+    @staticmethod
+    def _effectifs(personnel: Dict[Any, Any]) -> Dict[int, int]:
+        """Effectifs {etape_id: nombre} d'un scénario, validés."""
+        try:
+            effectifs = {int(etape_id): int(effectif) for etape_id, effectif in personnel.items()}
+        except (TypeError, ValueError):
+            raise SimulationException("Effectifs invalides: {etape_id: nombre} attendu.")
+        if any(effectif < 1 for effectif in effectifs.values()):
+            raise SimulationException("Les effectifs doivent être supérieurs ou égaux à 1.")
+        return effectifs
+
+    @staticmethod
+    def _agreger_scenario(
+        scenario: Dict[str, Any],
+        etapes: List[Dict[str, Any]],
+        replications: List[List[Dict[str, float]]]
+    ) -> Dict[str, Any]:
+        """Moyenne des indicateurs sur les réplications d'un scénario."""
+        resultat_etapes = []
+        for index, etape in enumerate(etapes):
+            attentes = np.array([r[index]['attente_moyenne'] for r in replications])
+            demi_intervalle = (
+                1.96 * attentes.std(ddof=1) / np.sqrt(attentes.size)
+                if attentes.size > 1 else 0.0
+            )
+            resultat_etapes.append({
+                'etape_id': etape['id'],
+                'etape_nom': etape['nom'],
+                'personnel': etape['personnel'],
+                'attente_moyenne_minutes': round(float(attentes.mean()), 1),
+                'attente_ic95_minutes': round(float(demi_intervalle), 1),
+                'attente_p90_minutes': round(float(np.mean(
+                    [r[index]['attente_p90'] for r in replications]
+                )), 1),
+                'utilisation': round(float(np.mean(
+                    [r[index]['utilisation'] for r in replications]
+                )), 3),
+                'patients': round(float(np.mean(
+                    [r[index]['patients'] for r in replications]
+                )), 1),
+            })
+
+        return {
+            'nom': scenario.get('nom', ''),
+            'etapes': resultat_etapes,
+            'attente_totale_minutes': round(
+                sum(e['attente_moyenne_minutes'] for e in resultat_etapes), 1
+            )
+        }
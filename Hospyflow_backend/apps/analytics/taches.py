@@ -0,0 +1,25 @@
+"""
+Tâches planifiées des analyses (commande planificateur, apps/core/planificateur.py).
+"""
+from django.conf import settings
+
+from apps.core.planificateur import tache
+from .services import MoteurAnalyseService, TableauBordService
+
+
+@tache('statistiques_quotidiennes', cron=settings.PLANIFICATEUR_STATISTIQUES_CRON)
+def generer_statistiques_quotidiennes():
+    """Statistiques globales et agrégats par département du jour."""
+    TableauBordService().generer_statistiques_quotidiennes()
+    return 'Statistiques quotidiennes générées.'
+
+
+@tache(
+    'detection_goulots',
+    intervalle=settings.PLANIFICATEUR_GOULOTS_SECONDES,
+    gigue=settings.PLANIFICATEUR_GIGUE_SECONDES
+)
+def detecter_goulots():
+    """Détection des goulots sur les 7 derniers jours, tous départements."""
+    goulots = MoteurAnalyseService().detecter_goulots_etranglement(jours=7)
+    return f'{len(goulots)} goulot(s) détecté(s).'
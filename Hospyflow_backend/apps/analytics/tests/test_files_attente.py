@@ -0,0 +1,111 @@
+"""
+Tests des files d'attente: compteurs incrémentaux, loi de Little,
+reconstruction depuis l'historique, paramètres des vues et lectures
+conditionnelles.
+"""
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from apps.workflows.models import InstanceWorkflow
+
+from ..files_attente import INTERVALLE_MINUTES, FilesAttenteService, debut_intervalle
+from ..models import CompteurEtape
+
+pytestmark = pytest.mark.django_db
+
+
+def par_etape(instantane):
+    return {etape['etape_nom']: etape for etape in instantane}
+
+
+def test_compteurs_incrementaux_et_loi_de_little(type_workflow):
+    accueil, examen, sortie = type_workflow.etapes.order_by('ordre')
+    service = FilesAttenteService()
+    maintenant = timezone.now()
+    for _ in range(3):
+        service.enregistrer_transition(None, accueil.pk, maintenant)
+    for _ in range(2):
+        service.enregistrer_transition(accueil.pk, examen.pk, maintenant, duree_etape_minutes=10)
+
+    etapes = par_etape(service.obtenir_instantane(type_workflow_id=type_workflow.pk))
+    assert etapes['Accueil']['en_cours'] == 1
+    assert etapes['Accueil']['entrees_heure'] == 3
+    assert etapes['Accueil']['sorties_heure'] == 2
+    assert etapes['Accueil']['variation_en_cours'] == 1
+    # W = L / λ = 1 / (2 sorties / 60 minutes)
+    assert etapes['Accueil']['attente_estimee_minutes'] == 30.0
+    assert etapes['Examen']['en_cours'] == 2
+    assert etapes['Examen']['attente_estimee_minutes'] is None
+    assert etapes['Sortie']['en_cours'] == 0
+
+
+def test_serie_complete_les_intervalles_sans_transition(type_workflow):
+    accueil = type_workflow.etapes.order_by('ordre').first()
+    service = FilesAttenteService()
+    service.enregistrer_transition(None, accueil.pk, timezone.now() - timedelta(minutes=50))
+
+    serie = service.obtenir_serie(accueil.pk, heures=2)
+    assert len(serie) == 2 * 60 // INTERVALLE_MINUTES
+    assert serie[-1]['debut'] == debut_intervalle(timezone.now())
+    assert sum(point['entrees'] for point in serie) == 1
+    # Le WIP est reporté sur les intervalles suivants
+    assert serie[-1]['en_cours'] == 1
+    assert all(point['attente_estimee_minutes'] is None for point in serie)
+
+
+def test_reconstruction_depuis_l_historique(type_workflow, creer_parcours, departement):
+    accueil, examen, sortie = type_workflow.etapes.order_by('ordre')
+    debut = timezone.now() - timedelta(hours=3)
+    creer_parcours(type_workflow, [accueil, examen, sortie], debut)
+    creer_parcours(type_workflow, [accueil, examen, sortie], debut + timedelta(minutes=30))
+    InstanceWorkflow.objects.create(
+        type_workflow=type_workflow,
+        reference_patient='PAT-EN-COURS',
+        statut=InstanceWorkflow.Statut.EN_COURS,
+        etape_actuelle=examen,
+        departement=departement
+    )
+
+    service = FilesAttenteService()
+    assert service.reconstruire() > 0
+
+    assert dict(CompteurEtape.objects.values_list('etape_id', 'en_cours')) == {
+        accueil.pk: 0, examen.pk: 1, sortie.pk: 0
+    }
+    serie = service.obtenir_serie(accueil.pk, heures=4)
+    assert sum(point['entrees'] for point in serie) == 2
+    assert sum(point['sorties'] for point in serie) == 2
+    assert [p['sejour_moyen_minutes'] for p in serie if p['sorties']] == [10.0, 10.0]
+
+
+def test_instantane_filtre_par_departement(client_medecin, type_workflow, autre_departement):
+    type_workflow.etapes.filter(ordre=3).update(departement_responsable=autre_departement)
+
+    reponse = client_medecin.get(f'/api/analytics/files-attente/?departement={autre_departement.pk}')
+    assert reponse.status_code == 200
+    assert [etape['etape_nom'] for etape in reponse.json()['etapes']] == ['Sortie']
+
+
+@pytest.mark.parametrize('parametres', ['type_workflow=abc', 'departement=abc', 'departement=0'])
+def test_instantane_parametres_invalides(client_medecin, parametres):
+    assert client_medecin.get(f'/api/analytics/files-attente/?{parametres}').status_code == 400
+
+
+@pytest.mark.parametrize('heures', ['abc', '0', '100000'])
+def test_serie_heures_invalides(client_medecin, type_workflow, heures):
+    etape = type_workflow.etapes.first()
+    url = f'/api/analytics/files-attente/etapes/{etape.pk}/?heures={heures}'
+    assert client_medecin.get(url).status_code == 400
+
+
+def test_files_attente_304_puis_200_apres_reconstruction(client_medecin, type_workflow, creer_parcours, periode_etag_figee):
+    creer_parcours(type_workflow, list(type_workflow.etapes.order_by('ordre')), timezone.now() - timedelta(hours=2))
+    url = '/api/analytics/files-attente/'
+    etag = client_medecin.get(url).headers['ETag']
+    assert client_medecin.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    # Reconstruction en masse (sans signal): les lectures sont invalidées
+    FilesAttenteService().reconstruire()
+    assert client_medecin.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
@@ -0,0 +1,93 @@
+"""
+Tests de la fouille de processus: variantes, arcs, conformité, résultats
+conservés et paramètres de la vue.
+"""
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from apps.workflows.models import InstanceWorkflow
+
+from ..fouille_processus import ABANDON, DEBUT, FIN, FouilleProcessusService
+from ..models import AnalyseProcessus
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def parcours_fouille(type_workflow, creer_parcours):
+    """Deux parcours nominaux et un parcours abandonné après l'accueil."""
+    accueil, examen, sortie = type_workflow.etapes.order_by('ordre')
+    debut = timezone.now() - timedelta(hours=3)
+    creer_parcours(type_workflow, [accueil, examen, sortie], debut)
+    creer_parcours(type_workflow, [accueil, examen, sortie], debut + timedelta(minutes=5), duree=20)
+    creer_parcours(
+        type_workflow, [accueil], debut + timedelta(minutes=10),
+        statut=InstanceWorkflow.Statut.ABANDONNE
+    )
+    return accueil, examen, sortie
+
+
+@pytest.mark.parametrize('taille_lot', [FouilleProcessusService.TAILLE_LOT, 2])
+def test_fouille_processus_variantes_et_conformite(type_workflow, parcours_fouille, monkeypatch, taille_lot):
+    # Petits lots: les parcours sont coupés entre deux lots de l'accumulateur
+    monkeypatch.setattr(FouilleProcessusService, 'TAILLE_LOT', taille_lot)
+    accueil, examen, sortie = parcours_fouille
+    maintenant = timezone.now()
+
+    resultat = FouilleProcessusService().analyser(
+        type_workflow.pk, maintenant - timedelta(days=1), maintenant + timedelta(hours=1)
+    )
+
+    assert resultat['nombre_instances'] == 3
+    assert resultat['nombre_transitions'] == 10
+    assert resultat['nombre_variantes'] == 2
+    assert resultat['taux_conformite'] == 66.7
+
+    nominale, abandon = resultat['variantes']
+    assert nominale['sequence'] == [DEBUT, accueil.pk, examen.pk, sortie.pk, FIN]
+    assert nominale['est_nominale'] and nominale['frequence'] == 2
+    assert abandon['sequence'] == [DEBUT, accueil.pk, ABANDON]
+
+    arcs = {(a['source'], a['destination']): a for a in resultat['arcs']}
+    assert arcs[(accueil.pk, examen.pk)]['frequence'] == 2
+    assert arcs[(accueil.pk, examen.pk)]['duree_moyenne_minutes'] == 15.0
+    assert arcs[(accueil.pk, ABANDON)]['frequence'] == 1
+
+    activites = {a['cle']: a['frequence'] for a in resultat['activites']}
+    assert activites == {accueil.pk: 3, examen.pk: 2, sortie.pk: 2}
+
+
+def test_periode_close_calculee_une_fois(type_workflow, parcours_fouille, monkeypatch):
+    service = FouilleProcessusService()
+    debut, fin = service.calculer_periode(jours=7)
+    fin_close = timezone.now() - timedelta(minutes=1)
+
+    premiere = service.obtenir_analyse(type_workflow.pk, debut, fin_close)
+    monkeypatch.setattr(service, 'analyser', lambda *args: pytest.fail('période close recalculée'))
+    assert service.obtenir_analyse(type_workflow.pk, debut, fin_close).pk == premiere.pk
+    assert AnalyseProcessus.objects.count() == 1
+    assert premiere.nombre_instances == 3
+
+
+def test_analyse_processus_par_l_api(client_medecin, type_workflow, parcours_fouille):
+    reponse = client_medecin.get(f'/api/analytics/processus/?type_workflow={type_workflow.pk}&jours=2')
+
+    assert reponse.status_code == 200
+    assert reponse.json()['nombre_variantes'] == 2
+
+
+@pytest.mark.parametrize('parametres', [
+    'type_workflow=abc',
+    'type_workflow=1&jours=abc',
+    'type_workflow=1&jours=0',
+    'type_workflow=1&debut=2024-13-40',
+    'type_workflow=1&debut=2024-05-10&fin=2024-05-01',
+])
+def test_analyse_processus_parametres_invalides(client_admin, parametres):
+    assert client_admin.get(f'/api/analytics/processus/?{parametres}').status_code == 400
+
+
+def test_analyse_processus_type_inconnu(client_admin):
+    assert client_admin.get('/api/analytics/processus/?type_workflow=999').status_code == 400
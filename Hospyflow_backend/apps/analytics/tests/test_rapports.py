@@ -0,0 +1,379 @@
+"""
+Tests des rapports: génération en arrière-plan, progression, échecs, accès
+restreint au demandeur, métriques lues dans les agrégats quotidiens,
+réutilisation des rapports identiques et rendu PDF paginé (séquentiel ou
+par parties fusionnées).
+"""
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time, timedelta
+from types import SimpleNamespace
+
+import pytest
+from django.utils import timezone
+from pypdf import PdfReader
+
+from apps.events.models import MicroEvenement
+
+from .. import graphiques, rapports
+from ..agregats import AgregationService
+from ..models import MetriqueDepartement, Rapport
+from ..rapports import ExportCSV, ExportPDF, LIBELLES_RESUME, RapportService
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def medias(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+@pytest.fixture
+def activite(type_workflow, creer_parcours, creer_evenement):
+    """Parcours et événements des derniers jours."""
+    etapes = list(type_workflow.etapes.order_by('ordre'))
+    for jour in range(1, 4):
+        debut = timezone.now() - timedelta(days=jour, hours=2)
+        creer_parcours(type_workflow, etapes, debut)
+        creer_evenement(survenu_le=debut)
+    return etapes
+
+
+def semaine_close():
+    hier = timezone.localdate() - timedelta(days=1)
+    return hier - timedelta(days=6), hier
+
+
+def test_rapport_genere_par_le_worker(activite, medecin, medias):
+    service = RapportService()
+    debut, fin = semaine_close()
+    rapport = service.creer_rapport('', Rapport.Format.CSV, medecin, debut, fin)
+
+    assert rapport.statut == Rapport.Statut.EN_ATTENTE
+    assert rapport.progression == 0
+    assert service.traiter(rapport.pk)
+    # Déjà réservé: un second worker ne le traite pas
+    assert not service.traiter(rapport.pk)
+
+    rapport.refresh_from_db()
+    assert rapport.statut == Rapport.Statut.TERMINE, rapport.erreur
+    assert rapport.progression == 100
+    assert rapport.termine_le is not None
+    assert rapport.fichier.storage.exists(rapport.fichier.name)
+
+
+def test_progression_enregistree_pendant_le_rendu(activite, medecin, medias, monkeypatch):
+    service = RapportService()
+    rapport = service.creer_rapport('', Rapport.Format.CSV, medecin, *semaine_close())
+    lues = []
+
+    def exporter(strategie, rapport, donnees, fichier, progression):
+        lues.append(Rapport.objects.get(pk=rapport.pk).progression)
+        progression(50)
+        lues.append(Rapport.objects.get(pk=rapport.pk).progression)
+        # Jamais de recul
+        progression(10)
+        lues.append(Rapport.objects.get(pk=rapport.pk).progression)
+        fichier.write(b'Metrique,Valeur\n')
+    monkeypatch.setattr(ExportCSV, 'exporter', exporter)
+
+    assert service.traiter(rapport.pk)
+    # Métriques: 30%, rendu: 30% -> 99%
+    assert lues == [30, 30 + 50 * 69 // 100, 30 + 50 * 69 // 100]
+    rapport.refresh_from_db()
+    assert rapport.progression == 100
+
+
+def test_rapport_en_echec(medecin, medias, monkeypatch):
+    service = RapportService()
+    rapport = service.creer_rapport('', Rapport.Format.CSV, medecin, *semaine_close())
+
+    def echouer(*args, **kwargs):
+        raise RuntimeError('base indisponible')
+    monkeypatch.setattr(RapportService, 'calculer_metriques', echouer)
+
+    assert service.traiter(rapport.pk)
+    rapport.refresh_from_db()
+    assert rapport.statut == Rapport.Statut.ECHEC
+    assert rapport.erreur == 'base indisponible'
+
+
+def test_rapport_bloque_remis_en_attente(medecin):
+    rapport = RapportService().creer_rapport('', Rapport.Format.CSV, medecin, *semaine_close())
+    assert RapportService.reclamer(rapport.pk)
+    Rapport.objects.filter(pk=rapport.pk).update(
+        demarre_le=timezone.now() - timedelta(minutes=RapportService.DELAI_EXPIRATION_MINUTES + 1)
+    )
+
+    assert RapportService().relancer_expires() == 1
+    rapport.refresh_from_db()
+    assert rapport.statut == Rapport.Statut.EN_ATTENTE
+
+
+def test_demande_par_l_api_mise_en_file(client_medecin):
+    reponse = client_medecin.post(
+        '/api/analytics/rapports/', {'plage_date': '7 derniers jours', 'format': Rapport.Format.CSV}
+    )
+    assert reponse.status_code == 202
+    assert reponse.json()['statut'] == Rapport.Statut.EN_ATTENTE
+
+
+def test_rapport_reserve_au_demandeur_et_aux_administrateurs(
+    activite, medecin, administrateur, client_medecin, client_admin, client, medias
+):
+    service = RapportService()
+    rapport = service.creer_rapport('', Rapport.Format.CSV, medecin, *semaine_close())
+    service.traiter(rapport.pk)
+    autre = service.creer_rapport('', Rapport.Format.PDF, administrateur, *semaine_close())
+    detail = f'/api/analytics/rapports/{rapport.pk}/'
+    telechargement = f'{detail}telecharger/'
+
+    assert client.get(detail).status_code in (401, 403)
+    assert client.get(telechargement).status_code in (401, 403)
+
+    assert client_medecin.get(detail).status_code == 200
+    reponse = client_medecin.get(telechargement)
+    assert reponse.status_code == 200
+    assert b''.join(reponse.streaming_content)
+    # Rapport d'un autre utilisateur: introuvable
+    assert client_medecin.get(f'/api/analytics/rapports/{autre.pk}/').status_code == 404
+    assert client_medecin.get(f'/api/analytics/rapports/{autre.pk}/telecharger/').status_code == 404
+
+    assert client_admin.get(detail).status_code == 200
+    assert client_admin.get(telechargement).status_code == 200
+    # Pas encore généré
+    assert client_admin.get(f'/api/analytics/rapports/{autre.pk}/telecharger/').status_code == 409
+
+
+@pytest.mark.django_db(transaction=True)
+def test_telechargement_par_blocs_sous_asgi(activite, medecin, client_medecin, medias, appel_asgi, recwarn):
+    service = RapportService()
+    rapport = service.creer_rapport('', Rapport.Format.CSV, medecin, *semaine_close())
+    service.traiter(rapport.pk)
+    rapport.refresh_from_db()
+    # Plusieurs blocs de lecture (sous ASGI, FileResponse lit par 64 Kio)
+    with rapport.fichier.open('wb') as fichier:
+        fichier.write(b'Metrique,Valeur\n' * 12500)
+
+    journal = appel_asgi(client_medecin, f'/api/analytics/rapports/{rapport.pk}/telecharger/')
+
+    assert journal[0]['status'] == 200
+    assert (b'Content-Length', b'200000') in journal[0]['headers']
+    corps = [message['body'] for message in journal[1:] if message.get('body')]
+    assert len(corps) == 4
+    assert b''.join(corps) == b'Metrique,Valeur\n' * 12500
+    assert not [w for w in recwarn if 'synchronous iterators' in str(w.message)]
+
+
+@pytest.fixture
+def historique_clos(type_workflow, creer_parcours, creer_evenement):
+    """
+    Un parcours terminé (3 x 10 minutes) et un événement résolu en 20 minutes
+    par jour, il y a 2 à 4 jours: ces jours sont définitifs.
+    """
+    etapes = list(type_workflow.etapes.order_by('ordre'))
+    jours = []
+    for recul in range(2, 5):
+        jour = timezone.localdate() - timedelta(days=recul)
+        debut = timezone.make_aware(datetime.combine(jour, time(10)))
+        creer_parcours(type_workflow, etapes, debut)
+        evenement = creer_evenement(survenu_le=debut, statut=MicroEvenement.Statut.RESOLU)
+        MicroEvenement.objects.filter(pk=evenement.pk).update(
+            signale_le=debut, resolu_le=debut + timedelta(minutes=20)
+        )
+        jours.append(jour)
+    return sorted(jours)
+
+
+def test_agregats_consolides_une_seule_fois(historique_clos, departement):
+    debut, fin = semaine_close()
+    service = AgregationService()
+
+    assert service.consolider(debut, fin) == 7
+    assert service.est_definitif(debut, fin)
+    # Jours définitifs: jamais recalculés
+    assert service.consolider(debut, fin) == 0
+
+    metrique = MetriqueDepartement.objects.get(departement=departement, date=historique_clos[0])
+    assert (metrique.workflows_demarre, metrique.workflows_termines) == (1, 1)
+    assert metrique.duree_moyenne_workflow_minutes == 30
+    assert (metrique.evenements_signales, metrique.evenements_resolus) == (1, 1)
+    assert metrique.delai_resolution_moyen_minutes == 20
+
+
+def test_metriques_lues_dans_les_agregats(historique_clos, departement):
+    debut, fin = semaine_close()
+    AgregationService().consolider(debut, fin)
+    # Les métriques ne relisent pas les tables brutes
+    MetriqueDepartement.objects.filter(departement=departement, date=historique_clos[0]).update(
+        workflows_demarre=5
+    )
+
+    donnees = RapportService().calculer_metriques(debut, fin, [departement.pk])
+    assert donnees['perimetre'] == 'Urgences'
+    assert donnees['resume']['workflows_demarres'] == 7
+    assert donnees['resume']['workflows_termines'] == 3
+    assert donnees['resume']['duree_moyenne_workflow_minutes'] == 30
+    assert donnees['resume']['evenements_resolus'] == 3
+    assert donnees['resume']['delai_resolution_moyen_minutes'] == 20
+    assert len(donnees['par_jour']) == 7
+    par_date = {jour['date']: jour['workflows_demarres'] for jour in donnees['par_jour']}
+    assert par_date[historique_clos[0].isoformat()] == 5
+    assert [d['nom'] for d in donnees['departements']] == ['Urgences']
+
+
+def test_rapport_identique_reutilise(historique_clos, medecin, client_medecin, medias):
+    service = RapportService()
+    premier = service.creer_rapport('', Rapport.Format.CSV, medecin, *semaine_close())
+    assert premier.statut == Rapport.Statut.EN_ATTENTE
+    service.traiter(premier.pk)
+    premier.refresh_from_db()
+
+    # Même période close, même périmètre, même format: servi immédiatement
+    second = service.creer_rapport('', Rapport.Format.CSV, medecin, *semaine_close())
+    assert second.statut == Rapport.Statut.TERMINE
+    assert second.empreinte == premier.empreinte
+    assert second.fichier.name == premier.fichier.name
+    assert second.donnees_metriques == premier.donnees_metriques
+
+    debut, fin = semaine_close()
+    reponse = client_medecin.post('/api/analytics/rapports/', {
+        'plage_date': f'{debut} to {fin}', 'format': Rapport.Format.CSV
+    })
+    assert reponse.status_code == 201
+
+    # Autre format: nouvelle génération
+    pdf = service.creer_rapport('', Rapport.Format.PDF, medecin, *semaine_close())
+    assert pdf.statut == Rapport.Statut.EN_ATTENTE
+
+
+def test_rapport_non_reutilise_sans_fichier_ou_periode_ouverte(historique_clos, medecin, medias):
+    service = RapportService()
+    premier = service.creer_rapport('', Rapport.Format.CSV, medecin, *semaine_close())
+    service.traiter(premier.pk)
+    premier.refresh_from_db()
+    premier.fichier.storage.delete(premier.fichier.name)
+
+    assert service.creer_rapport('', Rapport.Format.CSV, medecin, *semaine_close()).statut == (
+        Rapport.Statut.EN_ATTENTE
+    )
+
+    # Période incluant aujourd'hui: pas d'empreinte, toujours générée
+    ouvert = service.creer_rapport(
+        '', Rapport.Format.CSV, medecin, timezone.localdate() - timedelta(days=2), timezone.localdate()
+    )
+    assert ouvert.statut == Rapport.Statut.EN_ATTENTE
+    assert not ouvert.empreinte
+
+
+# ----------------------------------------------------------------------
+# Rendu PDF
+# ----------------------------------------------------------------------
+
+def donnees_rapport(nombre_jours, nombre_departements):
+    """Métriques de rapport synthétiques (sans base de données)."""
+    debut = date(2024, 1, 1)
+    par_jour = [
+        {
+            'date': (debut + timedelta(days=i)).isoformat(),
+            'workflows_demarres': i % 7, 'workflows_termines': i % 5, 'workflows_abandonnes': 0,
+            'evenements_signales': i % 3, 'evenements_critiques': 0,
+        }
+        for i in range(nombre_jours)
+    ]
+    resume = {cle: 1 for cle in LIBELLES_RESUME}
+    return {
+        'perimetre': 'Tous les départements',
+        'resume': resume,
+        'par_jour': par_jour,
+        'departements': [
+            {
+                'id': numero,
+                'nom': f'Service {numero:02d}',
+                'resume': resume,
+                'series': {
+                    'workflows_demarres': [(numero + i) % 4 for i in range(nombre_jours)],
+                    'workflows_termines': [0] * nombre_jours,
+                    'evenements_signales': [0] * nombre_jours,
+                },
+            }
+            for numero in range(nombre_departements)
+        ],
+    }
+
+
+def textes_pages(contenu):
+    return [page.extract_text() for page in PdfReader(io.BytesIO(contenu)).pages]
+
+
+def test_pdf_pagine_avec_sections_par_departement(medias):
+    rapport = SimpleNamespace(plage_date='2024-01-01 to 2024-04-09')
+    fichier = io.BytesIO()
+    progressions = []
+
+    ExportPDF().exporter(rapport, donnees_rapport(100, 5), fichier, progressions.append)
+
+    pages = textes_pages(fichier.getvalue())
+    assert len(pages) > 3
+    texte = '\n'.join(pages)
+    assert texte.count('Détail quotidien') == 1
+    # Détail quotidien découpé en tableaux d'une page au plus: toutes les dates présentes
+    assert '2024-01-01' in texte and '2024-04-09' in texte
+    assert [f'Service {n:02d}' in texte for n in range(5)] == [True] * 5
+    assert progressions == [20, 40, 60, 80, 100]
+
+
+def test_graphiques_dessines_une_seule_fois(medias, monkeypatch):
+    dessins = []
+    tracer = graphiques.tracer_tendance
+
+    def compter(series):
+        dessins.append(series)
+        return tracer(series)
+    monkeypatch.setattr(graphiques, 'tracer_tendance', compter)
+    rapport = SimpleNamespace(plage_date='2024-01')
+
+    for _ in range(2):
+        ExportPDF().exporter(rapport, donnees_rapport(30, 4), io.BytesIO(), lambda p: None)
+
+    # Synthèse + 4 départements (séries distinctes), au premier rendu seulement
+    assert len(dessins) == 5
+    assert len(os.listdir(medias / graphiques.DOSSIER_GRAPHIQUES)) == 5
+
+
+@pytest.fixture
+def pool_rendu(monkeypatch, medias):
+    """Pool de processus de rendu propre au test (MEDIA_ROOT du test hérité)."""
+    pool = ProcessPoolExecutor(max_workers=2)
+    monkeypatch.setattr(rapports, '_obtenir_pool_rendu', lambda: pool)
+    yield pool
+    pool.shutdown()
+
+
+def test_pdf_parallele_fusionne_dans_l_ordre(pool_rendu):
+    rapport = SimpleNamespace(plage_date='2024-01')
+    nombre = rapports.ExportPDFParallele.SEUIL_DEPARTEMENTS + 5
+    fichier = io.BytesIO()
+    progressions = []
+
+    rapports.ExportPDFParallele().exporter(rapport, donnees_rapport(30, nombre), fichier, progressions.append)
+
+    lecteur = PdfReader(io.BytesIO(fichier.getvalue()))
+    assert lecteur.metadata.title == 'Rapport 2024-01'
+    texte = '\n'.join(page.extract_text() for page in lecteur.pages)
+    assert texte.index('Métriques clés') < texte.index('Service 00')
+    positions = [texte.index(f'Service {n:02d}') for n in range(nombre)]
+    assert positions == sorted(positions)
+    assert progressions[-1] == 90
+
+
+def test_pdf_parallele_sous_le_seuil_rendu_sequentiel(medias, monkeypatch):
+    monkeypatch.setattr(rapports, '_obtenir_pool_rendu', lambda: pytest.fail('pool inutile'))
+    fichier = io.BytesIO()
+
+    rapports.ExportPDFParallele().exporter(
+        SimpleNamespace(plage_date='2024-01'), donnees_rapport(30, 3), fichier, lambda p: None
+    )
+    assert 'Service 02' in '\n'.join(textes_pages(fichier.getvalue()))
@@ -0,0 +1,155 @@
+"""
+Tests de la simulation des effectifs: moteur de files, réplications,
+scénarios et validation des paramètres.
+"""
+from datetime import timedelta
+
+import numpy as np
+import pytest
+from django.utils import timezone
+
+from ..simulation import SimulationException, SimulationService, _servir_file, simuler_replication
+
+
+def departs_lindley(arrivees, services):
+    """Récurrence de Lindley, une itération par patient (référence)."""
+    departs, precedent = [], 0.0
+    for arrivee, service in zip(arrivees, services):
+        precedent = max(precedent, arrivee) + service
+        departs.append(precedent)
+    return departs
+
+
+def test_file_a_un_serveur_egale_la_recurrence_de_lindley():
+    rng = np.random.default_rng(1)
+    arrivees = np.sort(rng.uniform(0, 600, 200))
+    services = rng.exponential(4.0, 200)
+
+    np.testing.assert_allclose(_servir_file(arrivees, services, 1), departs_lindley(arrivees, services))
+
+
+def test_file_a_plusieurs_serveurs():
+    arrivees = np.array([0.0, 0.0, 0.0, 1.0])
+    services = np.array([10.0, 10.0, 10.0, 1.0])
+
+    # Deux serveurs: le troisième patient attend la première libération (t=10)
+    assert _servir_file(arrivees, services, 2).tolist() == [10.0, 10.0, 20.0, 11.0]
+
+
+@pytest.fixture
+def parametres():
+    return {
+        'duree_minutes': 8 * 60.0,
+        'heure_debut': 8,
+        'taux_arrivee_horaire': [6.0] * 24,
+        'etapes': [
+            {'id': 1, 'nom': 'Accueil', 'duree_estimee': 5.0, 'durees': [], 'personnel': 1},
+            {'id': 2, 'nom': 'Examen', 'duree_estimee': 15.0, 'durees': [12.0, 15.0, 20.0], 'personnel': 1},
+        ],
+    }
+
+
+def test_replication_reproductible_par_graine(parametres):
+    premiere = simuler_replication(parametres, 3)
+
+    assert simuler_replication(parametres, 3) == premiere
+    assert [etape['patients'] for etape in premiere] == [premiere[0]['patients']] * 2
+    assert all(0.0 <= etape['utilisation'] <= 1.0 for etape in premiere)
+
+
+def test_plus_de_personnel_reduit_l_attente(parametres):
+    renforce = dict(parametres, etapes=[dict(e, personnel=3) for e in parametres['etapes']])
+
+    attente = simuler_replication(parametres, 0)[1]['attente_moyenne']
+    # Aléa commun (même graine): seul l'effectif change
+    assert simuler_replication(renforce, 0)[1]['attente_moyenne'] < attente
+
+
+@pytest.fixture
+def historique(type_workflow, creer_parcours):
+    """Parcours de la veille, une arrivée toutes les 20 minutes."""
+    etapes = list(type_workflow.etapes.order_by('ordre'))
+    debut = timezone.now() - timedelta(days=1)
+    for i in range(36):
+        creer_parcours(type_workflow, etapes, debut + timedelta(minutes=20 * i), duree=25)
+    return etapes
+
+
+@pytest.fixture
+def sans_pool(monkeypatch):
+    """Réplications dans le processus du test."""
+    monkeypatch.setattr(SimulationService, 'MIN_TACHES_PARALLELES', 10 ** 6)
+
+
+@pytest.mark.django_db
+def test_parametres_ajustes_sur_l_historique(type_workflow, historique):
+    parametres = SimulationService().preparer_parametres(type_workflow.pk, jours=2)
+
+    assert sum(parametres['taux_arrivee_horaire']) == pytest.approx(36 / 2)
+    assert [e['nom'] for e in parametres['etapes']] == ['Accueil', 'Examen', 'Sortie']
+    assert set(parametres['etapes'][1]['durees']) == {25.0}
+    assert all(e['personnel'] == 1 for e in parametres['etapes'])
+
+
+@pytest.mark.django_db
+def test_scenarios_compares_a_alea_commun(type_workflow, historique, sans_pool):
+    examen = historique[1]
+    resultat = SimulationService().simuler(
+        type_workflow.pk,
+        [{'nom': 'Actuel', 'personnel': {}}, {'nom': 'Renfort', 'personnel': {examen.pk: 4}}],
+        replications=5,
+        duree_heures=12,
+        jours=2
+    )
+
+    actuel, renfort = resultat['scenarios']
+    assert [s['nom'] for s in resultat['scenarios']] == ['Actuel', 'Renfort']
+    assert renfort['etapes'][1]['personnel'] == 4
+    assert renfort['etapes'][1]['attente_moyenne_minutes'] <= actuel['etapes'][1]['attente_moyenne_minutes']
+    # L'étape en amont ne dépend pas de l'effectif de l'examen
+    assert renfort['etapes'][0] == actuel['etapes'][0]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('personnel', [{'accueil': 2}, {'1': 0}, {'1': 'deux'}])
+def test_effectifs_invalides(type_workflow, personnel):
+    with pytest.raises(SimulationException):
+        SimulationService().simuler(type_workflow.pk, [{'nom': 'Invalide', 'personnel': personnel}])
+
+
+@pytest.mark.django_db
+def test_nombre_de_scenarios_plafonne(type_workflow):
+    scenarios = [{'nom': str(i)} for i in range(SimulationService.MAX_SCENARIOS + 1)]
+    with pytest.raises(SimulationException):
+        SimulationService().simuler(type_workflow.pk, scenarios)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('scenarios', [
+    [{'nom': 'cle', 'personnel': {'accueil': 2}}],
+    [{'nom': 'negatif', 'personnel': {'1': -1}}],
+    [{'nom': f'scenario {i}'} for i in range(SimulationService.MAX_SCENARIOS + 1)],
+])
+def test_simulation_parametres_invalides(client_admin, type_workflow, scenarios):
+    reponse = client_admin.post(
+        '/api/analytics/simulation/',
+        {'type_workflow': type_workflow.pk, 'scenarios': scenarios},
+        content_type='application/json'
+    )
+    assert reponse.status_code == 400
+
+
+@pytest.mark.django_db
+def test_simulation_par_l_api(client_admin, client_medecin, type_workflow, historique, sans_pool):
+    corps = {
+        'type_workflow': type_workflow.pk,
+        'scenarios': [{'nom': 'Renfort', 'personnel': {str(historique[1].pk): 2}}],
+        'replications': 3,
+        'duree_heures': 4,
+    }
+    url = '/api/analytics/simulation/'
+
+    assert client_medecin.post(url, corps, content_type='application/json').status_code == 403
+    reponse = client_admin.post(url, corps, content_type='application/json')
+    assert reponse.status_code == 200
+    assert reponse.json()['scenarios'][0]['etapes'][1]['personnel'] == 2
@@ -0,0 +1,51 @@
+"""
+Tests du tableau de bord analytique: budget de requêtes et lectures
+conditionnelles (vues synchrone et asynchrone).
+"""
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from ..services import TableauBordService
+
+pytestmark = pytest.mark.django_db
+
+URL_TABLEAU_BORD = '/api/analytics/tableau-de-bord/'
+
+
+@pytest.fixture
+def activite(type_workflow, creer_parcours, creer_evenement):
+    """Quelques parcours et événements, pour qu'une requête N+1 se voie."""
+    etapes = list(type_workflow.etapes.order_by('ordre'))
+    debut = timezone.now() - timedelta(hours=6)
+    for i in range(3):
+        creer_parcours(type_workflow, etapes, debut + timedelta(minutes=i))
+    for _ in range(3):
+        creer_evenement()
+    return etapes
+
+
+@pytest.mark.parametrize('url', [URL_TABLEAU_BORD, URL_TABLEAU_BORD + 'async/'])
+def test_tableau_bord_dans_son_budget(client_admin, activite, budget_requetes, url):
+    assert client_admin.get(url).status_code == 200
+
+
+@pytest.mark.parametrize('url', [URL_TABLEAU_BORD, URL_TABLEAU_BORD + 'async/'])
+def test_tableau_bord_304_puis_200_apres_ecriture(client_admin, activite, creer_evenement, periode_etag_figee, url):
+    etag = client_admin.get(url).headers['ETag']
+    assert client_admin.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    creer_evenement(titre='Panne scanner')
+    reponse = client_admin.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert reponse.status_code == 200
+    assert reponse.headers['ETag'] != etag
+
+
+def test_tableau_bord_304_sans_calcul(client_admin, activite, periode_etag_figee, monkeypatch):
+    etag = client_admin.get(URL_TABLEAU_BORD).headers['ETag']
+
+    def calcul_interdit(service):
+        raise AssertionError('Tableau de bord recalculé pour une réponse 304')
+    monkeypatch.setattr(TableauBordService, 'obtenir_donnees_tableau_bord', calcul_interdit)
+    assert client_admin.get(URL_TABLEAU_BORD, HTTP_IF_NONE_MATCH=etag).status_code == 304
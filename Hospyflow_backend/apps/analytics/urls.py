@@ -2,6 +2,7 @@ from django.urls import path
 
 from .views import (
     TableauBordView,
+    TableauBordAsyncView,
     GoulotListView,
     GoulotDetailView,
     DetecterGoulotsView,
@@ -12,12 +13,19 @@ from .views import (
     MetriquesDepartementDetailView,
     StatistiquesGlobalesView,
     GenererStatistiquesView,
-    RapportViewSet
+    RapportViewSet,
+    RapportDetailView,
+    RapportTelechargementView,
+    SimulationEffectifsView,
+    AnalyseProcessusView,
+    FilesAttenteView,
+    SerieFileAttenteView
 )
 
 urlpatterns = [
     # Tableau de bord principal
     path('tableau-de-bord/', TableauBordView.as_view(), name='tableau_bord'),
+    path('tableau-de-bord/async/', TableauBordAsyncView.as_view(), name='tableau_bord_async'),
     
     # Goulots d'étranglement
     path('goulots/', GoulotListView.as_view(), name='goulot_list'),
@@ -33,6 +41,18 @@ urlpatterns = [
     path('statistiques/', StatistiquesGlobalesView.as_view(), name='statistiques_globales'),
     path('statistiques/generer/', GenererStatistiquesView.as_view(), name='generer_statistiques'),
     
+    # Simulation des effectifs
+    path('simulation/', SimulationEffectifsView.as_view(), name='simulation_effectifs'),
+    
+    # Fouille de processus (parcours réels)
+    path('processus/', AnalyseProcessusView.as_view(), name='analyse_processus'),
+    
+    # Files d'attente par étape (WIP, débit, loi de Little)
+    path('files-attente/', FilesAttenteView.as_view(), name='files_attente'),
+    path('files-attente/etapes/<int:etape_id>/', SerieFileAttenteView.as_view(), name='serie_file_attente'),
+    
     # Rapports (compatible avec ancien backend)
     path('rapports/', RapportViewSet.as_view(), name='rapports'),
+    path('rapports/<int:pk>/', RapportDetailView.as_view(), name='rapport_detail'),
+    path('rapports/<int:pk>/telecharger/', RapportTelechargementView.as_view(), name='rapport_telecharger'),
 ]
@@ -1,7 +1,11 @@
+import os
+from typing import List
+
 from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.utils import timezone
+from django.http import FileResponse
 
 from .models import AnalyseGoulotEtranglement, MetriqueDepartement, StatistiqueGlobale, Rapport
 from .serializers import (
@@ -10,15 +14,34 @@ from .serializers import (
     StatistiqueGlobaleSerializer,
     ConfirmerGoulotSerializer,
     ResoudreGoulotSerializer,
-    RapportSerializer
+    RapportSerializer,
+    SimulationSerializer,
+    AnalyseProcessusParametresSerializer,
+    FilesAttenteParametresSerializer,
+    SerieFileAttenteParametresSerializer
 )
 from .services import MoteurAnalyseService, TableauBordService
+from .simulation import SimulationService, SimulationException
+from .fouille_processus import FouilleProcessusService, FouilleProcessusException
+from .files_attente import FilesAttenteService
+from .rapports import RapportService
 from apps.accounts.permissions import IsAdminUser
+from apps.core.asynchrone import VueAsync, reponse_json
+from apps.core.cache import etiquette, lire_ou_calculer
+from apps.core.conditionnel import LectureConditionnelleMixin
+from apps.core.exports import flux_asynchrone, servie_par_asgi
+from apps.core.planificateur import PlanificateurService
+
+# Étiquettes des lectures de files d'attente (ETag des requêtes conditionnelles)
+ETIQUETTES_FILES_ATTENTE = ['files_attente', 'types_workflow', 'departements']
 
 
-class TableauBordView(APIView):
+class TableauBordView(LectureConditionnelleMixin, APIView):
     """Endpoint principal du tableau de bord analytique."""
     permission_classes = [permissions.IsAuthenticated]
+    budget_requetes = 15
+    etiquettes_etag = TableauBordService.ETIQUETTES
+    periode_etag = 60  # Indicateurs du jour et retards
     
     def get(self, request):
         service = TableauBordService()
@@ -26,6 +49,17 @@ class TableauBordView(APIView):
         return Response(donnees)
 
 
+class TableauBordAsyncView(VueAsync):
+    """Tableau de bord analytique, version asynchrone (ASGI)."""
+    budget_requetes = 15
+    etiquettes_etag = TableauBordService.ETIQUETTES
+    periode_etag = 60
+    
+    async def get(self, request):
+        donnees = await TableauBordService().aobtenir_donnees_tableau_bord()
+        return reponse_json(donnees)
+
+
 class GoulotListView(generics.ListAPIView):
     """Liste les goulots d'étranglement."""
     serializer_class = AnalyseGoulotSerializer
@@ -148,57 +182,105 @@ class MarquerFauxPositifView(APIView):
         })
 
 
-class MetriquesDepartementView(generics.ListAPIView):
+class ListeEnCacheMixin(LectureConditionnelleMixin):
+    """
+    Liste (filtres et pagination compris) servie depuis le cache des lectures,
+    périmée par les écritures portant ses étiquettes (apps/core/cache.py),
+    qui sont aussi celles de son ETag.
+    """
+    etiquettes_cache: List[str] = []
+    
+    def get_etiquettes_cache(self) -> List[str]:
+        return self.etiquettes_cache
+    
+    def get_etiquettes_etag(self) -> List[str]:
+        return self.get_etiquettes_cache()
+    
+    def list(self, request, *args, **kwargs):
+        donnees = lire_ou_calculer(
+            f'analytics:{type(self).__name__}:{request.build_absolute_uri()}',
+            lambda: super(ListeEnCacheMixin, self).list(request, *args, **kwargs).data,
+            self.get_etiquettes_cache()
+        )
+        return Response(donnees)
+
+
+class MetriquesDepartementView(ListeEnCacheMixin, generics.ListAPIView):
     """Métriques par département."""
     serializer_class = MetriqueDepartementSerializer
     permission_classes = [permissions.IsAuthenticated]
     filterset_fields = ['departement', 'date']
     ordering = ['-date']
+    etiquettes_cache = ['metriques', 'departements']
     
     def get_queryset(self):
         return MetriqueDepartement.objects.select_related('departement')
+    
+    def get_etiquettes_cache(self) -> List[str]:
+        departement = self.request.query_params.get('departement', '')
+        if departement.isdigit():
+            return [etiquette('metriques', departement=int(departement)), 'departements']
+        return self.etiquettes_cache
 
 
-class MetriquesDepartementDetailView(APIView):
+class MetriquesDepartementDetailView(LectureConditionnelleMixin, APIView):
     """Métriques détaillées pour un département spécifique."""
     permission_classes = [permissions.IsAuthenticated]
     
+    def get_etiquettes_etag(self):
+        return [etiquette('metriques', departement=self.kwargs['departement_id']), 'departements']
+    
     def get(self, request, departement_id):
         jours = int(request.query_params.get('jours', 30))
         
-        metriques = MetriqueDepartement.objects.filter(
-            departement_id=departement_id
-        ).order_by('-date')[:jours]
+        def calculer():
+            metriques = MetriqueDepartement.objects.filter(
+                departement_id=departement_id
+            ).select_related('departement').order_by('-date')[:jours]
+            return MetriqueDepartementSerializer(metriques, many=True).data
         
         return Response({
             'departement_id': departement_id,
             'periode_jours': jours,
-            'metriques': MetriqueDepartementSerializer(metriques, many=True).data
+            'metriques': lire_ou_calculer(
+                f'analytics:metriques:{departement_id}:{jours}',
+                calculer,
+                self.get_etiquettes_etag()
+            )
         })
 
 
-class StatistiquesGlobalesView(generics.ListAPIView):
+class StatistiquesGlobalesView(ListeEnCacheMixin, generics.ListAPIView):
     """Statistiques globales historiques."""
     serializer_class = StatistiqueGlobaleSerializer
     permission_classes = [permissions.IsAuthenticated]
     ordering = ['-date']
+    etiquettes_cache = ['statistiques']
     
     def get_queryset(self):
+        return StatistiqueGlobale.objects.all()
+    
+    def filter_queryset(self, queryset):
+        # Limite appliquée après le tri (un queryset découpé ne peut plus être trié)
         jours = int(self.request.query_params.get('jours', 30))
-        return StatistiqueGlobale.objects.all()[:jours]
+        return super().filter_queryset(queryset)[:jours]
 
 
 class GenererStatistiquesView(APIView):
-    """Génère les statistiques quotidiennes (admin)."""
+    """
+    Demande la génération des statistiques quotidiennes (admin), exécutée
+    par le planificateur (tâche statistiques_quotidiennes).
+    """
     permission_classes = [permissions.IsAuthenticated, IsAdminUser]
     
     def post(self, request):
-        service = TableauBordService()
-        service.generer_statistiques_quotidiennes()
+        tache = PlanificateurService().demander_execution('statistiques_quotidiennes')
         
         return Response({
-            'message': 'Statistiques quotidiennes générées avec succès.'
-        })
+            'message': 'Génération des statistiques quotidiennes planifiée.',
+            'tache': tache.nom,
+            'prochaine_execution': tache.prochaine_execution
+        }, status=status.HTTP_202_ACCEPTED)
 
 
 class RapportViewSet(generics.ListCreateAPIView):
@@ -207,24 +289,189 @@ class RapportViewSet(generics.ListCreateAPIView):
     Compatible avec l'ancien backend ops/.
     
     GET /api/rapports/ - Liste des rapports
-    POST /api/rapports/ - Générer un nouveau rapport
+    POST /api/rapports/ - Demander un nouveau rapport (202: généré en arrière-plan,
+                          201: rapport identique déjà disponible)
     """
-    queryset = Rapport.objects.all()
+    queryset = Rapport.objects.select_related('genere_par')
     serializer_class = RapportSerializer
     permission_classes = [permissions.AllowAny]  # Temporairement sans auth
     ordering = ['-genere_le']
     
-    def perform_create(self, serializer):
+    def create(self, request, *args, **kwargs):
         """
-        Génère un rapport avec les données fournies.
-        Compatible avec l'ancien format de l'API ops/.
+        Met le rapport en file d'attente et répond immédiatement.
+        Les métriques et le fichier sont produits par la commande traiter_rapports.
         """
-        # Sauvegarder le rapport
-        rapport = serializer.save(genere_par=self.request.user if self.request.user.is_authenticated else None)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
         
-        # TODO: Implémenter la génération réelle du fichier PDF/CSV
-        # Pour l'instant, on sauvegarde juste les métadonnées
-        # Dans une version future, on peut utiliser reportlab pour PDF
-        # ou csv module pour CSV
+        rapport = RapportService().creer_rapport(
+            plage_date=serializer.validated_data.get('plage_date', ''),
+            format=serializer.validated_data.get('format', Rapport.Format.PDF),
+            utilisateur=request.user if request.user.is_authenticated else None,
+            date_debut=serializer.validated_data.get('date_debut'),
+            date_fin=serializer.validated_data.get('date_fin'),
+            departements=serializer.validated_data.get('departements')
+        )
         
-        return rapport
+        # Rapport identique déjà généré sur une période close: servi immédiatement
+        return Response(
+            self.get_serializer(rapport).data,
+            status=status.HTTP_201_CREATED if rapport.statut == Rapport.Statut.TERMINE
+            else status.HTTP_202_ACCEPTED
+        )
+
+
+def rapports_accessibles(utilisateur):
+    """Rapports demandés par l'utilisateur; tous pour un administrateur."""
+    rapports = Rapport.objects.select_related('genere_par')
+    if utilisateur.is_admin:
+        return rapports
+    return rapports.filter(genere_par=utilisateur)
+
+
+class RapportDetailView(generics.RetrieveAPIView):
+    """Détail d'un rapport: statut et progression de la génération."""
+    serializer_class = RapportSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        return rapports_accessibles(self.request.user)
+
+
+class RapportTelechargementView(APIView):
+    """Télécharge le fichier d'un rapport terminé (envoyé par blocs)."""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request, pk):
+        try:
+            rapport = rapports_accessibles(request.user).get(pk=pk)
+        except Rapport.DoesNotExist:
+            return Response({
+                'erreur': 'Rapport introuvable.'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        if rapport.statut != Rapport.Statut.TERMINE or not rapport.fichier:
+            return Response({
+                'erreur': 'Le rapport n\'est pas encore disponible.',
+                'statut': rapport.statut,
+                'progression': rapport.progression
+            }, status=status.HTTP_409_CONFLICT)
+        
+        reponse = FileResponse(
+            rapport.fichier.open('rb'),
+            as_attachment=True,
+            filename=os.path.basename(rapport.fichier.name)
+        )
+        if servie_par_asgi(request):
+            # En-têtes posés par FileResponse; le fichier (fermé par
+            # reponse.close()) est lu bloc par bloc au fil de l'envoi
+            reponse.streaming_content = flux_asynchrone(reponse.streaming_content)
+        return reponse
+
+
+class SimulationEffectifsView(APIView):
+    """Simule l'effet des effectifs par étape sur les files d'attente (admin)."""
+    permission_classes = [permissions.IsAuthenticated, IsAdminUser]
+    
+    def post(self, request):
+        serializer = SimulationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        service = SimulationService()
+        
+        try:
+            resultat = service.simuler(
+                type_workflow_id=serializer.validated_data['type_workflow'],
+                scenarios=serializer.validated_data['scenarios'],
+                replications=serializer.validated_data['replications'],
+                duree_heures=serializer.validated_data['duree_heures'],
+                jours=serializer.validated_data['jours_historique']
+            )
+        except SimulationException as e:
+            return Response({
+                'erreur': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(resultat)
+
+
+class AnalyseProcessusView(APIView):
+    """
+    Graphe des successions directes et variantes de parcours réels.
+    
+    GET /api/analytics/processus/?type_workflow=<id>&debut=AAAA-MM-JJ&fin=AAAA-MM-JJ&jours=<n>&recalculer=1
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        parametres = AnalyseProcessusParametresSerializer(data=request.query_params)
+        parametres.is_valid(raise_exception=True)
+        parametres = parametres.validated_data
+        
+        service = FouilleProcessusService()
+        debut, fin = service.calculer_periode(
+            date_debut=parametres.get('debut'),
+            date_fin=parametres.get('fin'),
+            jours=parametres.get('jours')
+        )
+        
+        try:
+            analyse = service.obtenir_analyse(
+                parametres['type_workflow'],
+                debut,
+                fin,
+                recalculer=parametres['recalculer']
+            )
+        except FouilleProcessusException as e:
+            return Response({
+                'erreur': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(dict(analyse.resultat, calcule_le=analyse.calcule_le))
+
+
+class FilesAttenteView(LectureConditionnelleMixin, APIView):
+    """
+    WIP, débit de la dernière heure et attente estimée (loi de Little) par étape.
+    
+    GET /api/analytics/files-attente/?type_workflow=<id>&departement=<id>
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    etiquettes_etag = ETIQUETTES_FILES_ATTENTE
+    periode_etag = 60  # Débit de la dernière heure
+    
+    def get(self, request):
+        parametres = FilesAttenteParametresSerializer(data=request.query_params)
+        parametres.is_valid(raise_exception=True)
+        etapes = FilesAttenteService().obtenir_instantane(
+            type_workflow_id=parametres.validated_data.get('type_workflow'),
+            departement_id=parametres.validated_data.get('departement')
+        )
+        
+        return Response({
+            'horodatage': timezone.now(),
+            'etapes': etapes
+        })
+
+
+class SerieFileAttenteView(LectureConditionnelleMixin, APIView):
+    """
+    Série temporelle par intervalle de 15 minutes pour une étape.
+    
+    GET /api/analytics/files-attente/etapes/<etape_id>/?heures=24
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    etiquettes_etag = ETIQUETTES_FILES_ATTENTE
+    periode_etag = 60  # Intervalles jusqu'à maintenant
+    
+    def get(self, request, etape_id):
+        parametres = SerieFileAttenteParametresSerializer(data=request.query_params)
+        parametres.is_valid(raise_exception=True)
+        heures = parametres.validated_data.get('heures', FilesAttenteService.HEURES_SERIE)
+        
+        return Response({
+            'etape_id': etape_id,
+            'intervalle_minutes': 15,
+            'serie': FilesAttenteService().obtenir_serie(etape_id, heures=heures)
+        })
@@ -0,0 +1,27 @@
+from django.contrib import admin
+from .models import TachePlanifiee, ExecutionTache
+
+
+@admin.register(TachePlanifiee)
+class TachePlanifieeAdmin(admin.ModelAdmin):
+    list_display = [
+        'nom', 'planification', 'est_active', 'prochaine_execution', 'dernier_statut',
+        'derniere_duree_ms', 'nombre_executions', 'nombre_echecs', 'verrouillee_par'
+    ]
+    list_filter = ['est_active', 'dernier_statut']
+    list_editable = ['est_active']
+    readonly_fields = [
+        'nom', 'planification', 'verrouillee_par', 'verrouillee_jusqua', 'derniere_execution',
+        'dernier_statut', 'derniere_duree_ms', 'nombre_executions', 'nombre_echecs'
+    ]
+
+
+@admin.register(ExecutionTache)
+class ExecutionTacheAdmin(admin.ModelAdmin):
+    list_display = ['tache', 'statut', 'demarree_le', 'duree_ms', 'requetes', 'instance', 'resultat']
+    list_filter = ['statut', 'tache']
+    ordering = ['-demarree_le']
+    readonly_fields = [
+        'tache', 'instance', 'statut', 'demarree_le', 'terminee_le',
+        'duree_ms', 'requetes', 'resultat', 'erreur'
+    ]
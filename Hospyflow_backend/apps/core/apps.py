@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.core'
+    verbose_name = 'Outils communs'
+
+    def ready(self):
+        import apps.core.instrumentation
+        # Tâches planifiées déclarées par les applications (commande planificateur)
+        autodiscover_modules('taches')
@@ -0,0 +1,80 @@
+"""
+Vues asynchrones en lecture, servies par ASGI sur les routes .../async/ de
+chaque application (/api/analytics/tableau-de-bord/async/,
+/api/services/summary/async/, /api/alerts/mes-alertes/async/).
+
+DRF 3.14 n'exécute pas de vues async: VueAsync est une vue Django native qui
+authentifie la requête comme DEFAULT_AUTHENTICATION_CLASSES (JWT puis
+session) et rend son JSON avec JSONRapideRenderer, comme l'API, pour des
+réponses identiques à celles des vues synchrones équivalentes, qui restent
+disponibles.
+"""
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from apps.core.conditionnel import (
+    ValidateursMixin, ajouter_validateurs, avalidateurs, lectures_conditionnelles_actives, reponse_non_modifiee
+)
+from apps.core.rendu_json import JSONRapideRenderer
+
+
+def reponse_json(donnees, status_code: int = status.HTTP_200_OK) -> HttpResponse:
+    """Réponse JSON rendue comme par les vues DRF."""
+    renderer = JSONRapideRenderer()
+    return HttpResponse(
+        renderer.render(donnees),
+        content_type=renderer.media_type,
+        status=status_code
+    )
+
+
+async def authentifier(request):
+    """Utilisateur authentifié par jeton JWT ou par session, sinon None."""
+    authentification = JWTAuthentication()
+    entete = authentification.get_header(request)
+    if entete is not None:
+        jeton = authentification.get_raw_token(entete)
+        if jeton is not None:
+            valide = authentification.get_validated_token(jeton)
+            return await sync_to_async(authentification.get_user)(valide)
+
+    utilisateur = await request.auser()
+    return utilisateur if utilisateur.is_authenticated else None
+
+
+class VueAsync(ValidateursMixin, View):
+    """
+    Vue asynchrone authentifiée. Les sous-classes définissent `async def get`
+    et lisent l'utilisateur dans request.utilisateur; avec `etiquettes_etag`,
+    elles répondent aux requêtes conditionnelles (apps/core/conditionnel.py).
+    """
+    authentification_requise = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            utilisateur: Optional[object] = await authentifier(request)
+        except exceptions.AuthenticationFailed as e:
+            # Même corps que le gestionnaire d'exceptions de DRF
+            detail = e.detail if isinstance(e.detail, (list, dict)) else {'detail': e.detail}
+            return reponse_json(detail, status.HTTP_401_UNAUTHORIZED)
+
+        if self.authentification_requise and utilisateur is None:
+            return reponse_json(
+                {'detail': exceptions.NotAuthenticated.default_detail},
+                status.HTTP_401_UNAUTHORIZED
+            )
+        request.utilisateur = utilisateur
+
+        etiquettes = self.get_etiquettes_etag()
+        if not etiquettes or not lectures_conditionnelles_actives(request):
+            return await super().dispatch(request, *args, **kwargs)
+        validateurs = await avalidateurs(request, utilisateur, etiquettes, self.periode_etag)
+        reponse = reponse_non_modifiee(request, validateurs)
+        if reponse is None:
+            reponse = await super().dispatch(request, *args, **kwargs)
+        return ajouter_validateurs(reponse, validateurs)
@@ -0,0 +1,253 @@
+"""
+Cache des lectures analytiques, invalidé par étiquettes.
+
+Une entrée est calculée une fois puis servie tant que ses étiquettes n'ont pas
+été invalidées (et au plus `duree` secondes). Chaque étiquette a une version
+dans le cache; l'entrée garde les versions lues avant son calcul et n'est
+valide que si elles n'ont pas changé. Invalider une étiquette, c'est lui
+donner une nouvelle version: toutes les entrées qui la portent deviennent
+périmées, sans avoir à les connaître.
+
+Étiquettes: une ressource (evenements, workflows, alertes, ...), éventuellement
+restreinte à un département et/ou un jour:
+
+    etiquette('evenements')                          -> 'evenements'
+    etiquette('evenements', departement=3)           -> 'evenements:departement:3'
+    etiquette('evenements', jour=date(2024, 5, 2))   -> 'evenements:jour:2024-05-02'
+
+Une écriture invalide toutes les portées qui la contiennent
+(etiquettes_ecriture), une lecture porte la plus étroite qui la couvre.
+
+Les versions commencent par leur date de création (microsecondes, hexadécimal):
+elles servent aussi de validateurs ETag / Last-Modified aux lectures
+conditionnelles (apps/core/conditionnel.py).
+
+Protection contre les ruées: à l'expiration, un seul appelant recalcule
+(verrou posé par cache.add); les autres attendent son résultat au plus
+ATTENTE_SECONDES, puis calculent eux-mêmes.
+
+Module sans dépendance aux modèles (utilisé par apps.core.indicateurs).
+"""
+import asyncio
+import secrets
+import time
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# Durée du verrou de calcul (au-delà, un calcul interrompu ne bloque plus)
+VERROU_SECONDES = 30
+# Attente maximale du calcul d'un autre appelant, et intervalle de relecture
+ATTENTE_SECONDES = 5
+INTERVALLE_SECONDES = 0.05
+
+
+def etiquette(ressource: str, departement: Optional[int] = None, jour: Optional[date] = None) -> str:
+    """Étiquette d'une ressource, restreinte à un département et/ou un jour."""
+    parties = [ressource]
+    if departement is not None:
+        parties.append(f'departement:{departement}')
+    if jour is not None:
+        parties.append(f'jour:{jour.isoformat()}')
+    return ':'.join(parties)
+
+
+def etiquettes_ecriture(
+    ressource: str,
+    departement: Optional[int] = None,
+    jour: Optional[date] = None
+) -> List[str]:
+    """Étiquettes invalidées par une écriture: la ressource et chacune de ses portées."""
+    etiquettes = [etiquette(ressource)]
+    if departement is not None:
+        etiquettes.append(etiquette(ressource, departement=departement))
+    if jour is not None:
+        etiquettes.append(etiquette(ressource, jour=jour))
+    if departement is not None and jour is not None:
+        etiquettes.append(etiquette(ressource, departement, jour))
+    return etiquettes
+
+
+def _cle_version(nom: str) -> str:
+    return f'etiquette:{nom}'
+
+
+def _nouvelle_version() -> str:
+    return f'{time.time_ns() // 1000:x}.{secrets.token_hex(4)}'
+
+
+def horodatage_version(version: Optional[str]) -> Optional[float]:
+    """Date de création (timestamp) d'une version d'étiquette, None si inconnue."""
+    if not version or '.' not in version:
+        return None
+    try:
+        return int(version.split('.', 1)[0], 16) / 1_000_000
+    except ValueError:
+        return None
+
+
+def duree_defaut() -> int:
+    return getattr(settings, 'LECTURES_CACHE_SECONDES', 60)
+
+
+def invalider(*etiquettes: str):
+    """
+    Périme les entrées portant l'une des étiquettes, immédiatement (lectures
+    de la transaction en cours) puis de nouveau à sa validation: une lecture
+    concurrente ne peut pas garder en cache l'état d'avant l'écriture.
+    """
+    if not etiquettes:
+        return
+    etiquettes = set(etiquettes)
+
+    def nouvelles_versions():
+        cache.set_many({_cle_version(e): _nouvelle_version() for e in etiquettes}, None)
+    nouvelles_versions.invalide_lectures = True
+
+    nouvelles_versions()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(nouvelles_versions)
+
+
+def _ecritures_en_attente() -> bool:
+    """
+    Vrai si la transaction en cours a invalidé des étiquettes: ce qu'elle lit
+    pourrait être annulé, le résultat n'est pas mis en cache.
+    """
+    connexion = transaction.get_connection()
+    return connexion.in_atomic_block and any(
+        getattr(entree[1], 'invalide_lectures', False) for entree in connexion.run_on_commit
+    )
+
+
+def _versions(etiquettes: Sequence[str], trouvees: Dict[str, Any]) -> Tuple[str, ...]:
+    """Versions courantes des étiquettes; une version absente (ou évincée) est créée."""
+    manquantes = [_cle_version(e) for e in etiquettes if _cle_version(e) not in trouvees]
+    if manquantes:
+        for cle in manquantes:
+            cache.add(cle, _nouvelle_version(), None)
+        trouvees = {**trouvees, **cache.get_many(manquantes)}
+    return tuple(trouvees.get(_cle_version(e)) for e in etiquettes)
+
+
+def versions_etiquettes(etiquettes: Iterable[str]) -> Tuple[str, ...]:
+    """Versions courantes des étiquettes, dans l'ordre de leurs noms."""
+    etiquettes = sorted(set(etiquettes))
+    return _versions(etiquettes, cache.get_many([_cle_version(e) for e in etiquettes]))
+
+
+async def _aversions(etiquettes: Sequence[str], trouvees: Dict[str, Any]) -> Tuple[str, ...]:
+    """Version asynchrone de _versions."""
+    manquantes = [_cle_version(e) for e in etiquettes if _cle_version(e) not in trouvees]
+    if manquantes:
+        for cle_version in manquantes:
+            await cache.aadd(cle_version, _nouvelle_version(), None)
+        trouvees = {**trouvees, **await cache.aget_many(manquantes)}
+    return tuple(trouvees.get(_cle_version(e)) for e in etiquettes)
+
+
+async def aversions_etiquettes(etiquettes: Iterable[str]) -> Tuple[str, ...]:
+    """Version asynchrone de versions_etiquettes."""
+    etiquettes = sorted(set(etiquettes))
+    return await _aversions(etiquettes, await cache.aget_many([_cle_version(e) for e in etiquettes]))
+
+
+def _lire(cle: str, etiquettes: Sequence[str]) -> Tuple[Tuple[str, ...], Optional[tuple]]:
+    """Versions courantes et entrée, si elle est encore valide (une lecture groupée)."""
+    trouvees = cache.get_many([cle] + [_cle_version(e) for e in etiquettes])
+    versions = _versions(etiquettes, trouvees)
+    entree = trouvees.get(cle)
+    if entree is not None and entree[0] == versions:
+        return versions, entree
+    return versions, None
+
+
+async def _alire(cle: str, etiquettes: Sequence[str]) -> Tuple[Tuple[str, ...], Optional[tuple]]:
+    """Version asynchrone de _lire."""
+    trouvees = await cache.aget_many([cle] + [_cle_version(e) for e in etiquettes])
+    versions = await _aversions(etiquettes, trouvees)
+    entree = trouvees.get(cle)
+    if entree is not None and entree[0] == versions:
+        return versions, entree
+    return versions, None
+
+
+def lire_ou_calculer(
+    cle: str,
+    calculer: Callable[[], Any],
+    etiquettes: Iterable[str] = (),
+    duree: Optional[int] = None
+) -> Any:
+    """
+    Valeur en cache sous `cle`, recalculée par `calculer` si absente, expirée
+    ou si l'une de ses étiquettes a été invalidée depuis son calcul.
+
+    Args:
+        cle: Clé de l'entrée (inclut les paramètres de la lecture)
+        calculer: Calcul de la valeur (sans argument)
+        etiquettes: Étiquettes dont dépend la valeur
+        duree: Durée de vie maximale en secondes (défaut: LECTURES_CACHE_SECONDES,
+            0 désactive le cache)
+    """
+    duree = duree_defaut() if duree is None else duree
+    if duree <= 0:
+        return calculer()
+    etiquettes = sorted(set(etiquettes))
+    verrou = f'{cle}:verrou'
+
+    def calculer_et_stocker(versions):
+        valeur = calculer()
+        if not _ecritures_en_attente():
+            cache.set(cle, (versions, valeur), duree)
+        return valeur
+
+    versions, entree = _lire(cle, etiquettes)
+    echeance = time.monotonic() + ATTENTE_SECONDES
+    while entree is None:
+        if cache.add(verrou, 1, VERROU_SECONDES):
+            try:
+                return calculer_et_stocker(versions)
+            finally:
+                cache.delete(verrou)
+        if time.monotonic() >= echeance:
+            # Calcul de l'autre appelant trop long: pas d'attente supplémentaire
+            return calculer_et_stocker(versions)
+        time.sleep(INTERVALLE_SECONDES)
+        versions, entree = _lire(cle, etiquettes)
+    return entree[1]
+
+
+async def alire_ou_calculer(
+    cle: str,
+    calculer: Callable[[], Awaitable[Any]],
+    etiquettes: Iterable[str] = (),
+    duree: Optional[int] = None
+) -> Any:
+    """Version asynchrone de lire_ou_calculer (mêmes entrées), `calculer` est une coroutine."""
+    duree = duree_defaut() if duree is None else duree
+    if duree <= 0:
+        return await calculer()
+    etiquettes = sorted(set(etiquettes))
+    verrou = f'{cle}:verrou'
+
+    async def calculer_et_stocker(versions):
+        valeur = await calculer()
+        await cache.aset(cle, (versions, valeur), duree)
+        return valeur
+
+    versions, entree = await _alire(cle, etiquettes)
+    echeance = time.monotonic() + ATTENTE_SECONDES
+    while entree is None:
+        if await cache.aadd(verrou, 1, VERROU_SECONDES):
+            try:
+                return await calculer_et_stocker(versions)
+            finally:
+                await cache.adelete(verrou)
+        if time.monotonic() >= echeance:
+            return await calculer_et_stocker(versions)
+        await asyncio.sleep(INTERVALLE_SECONDES)
+        versions, entree = await _alire(cle, etiquettes)
+    return entree[1]
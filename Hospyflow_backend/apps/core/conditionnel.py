@@ -0,0 +1,139 @@
+"""
+Lectures conditionnelles (ETag / Last-Modified) pour les clients qui
+interrogent l'API à intervalle régulier.
+
+Les validateurs sont calculés à partir des versions des étiquettes du cache
+des lectures (apps/core/cache.py), renouvelées à chaque écriture: ni requête
+SQL, ni sérialisation, ni empreinte du corps rendu. Un client qui renvoie
+l'ETag reçu (If-None-Match) ou sa date (If-Modified-Since) reçoit
+304 Not Modified avant que la vue ne lise la base.
+
+L'ETag couvre aussi ce qui distingue deux réponses à la même URL:
+utilisateur, format négocié et langue; et, pour les réponses qui dépendent
+de l'heure (durées écoulées, fenêtres glissantes, journée en cours), la
+période courante de `periode_etag` secondes.
+"""
+import hashlib
+import time
+from typing import Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils import translation
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .cache import aversions_etiquettes, horodatage_version, versions_etiquettes
+
+Validateurs = Tuple[str, Optional[int]]
+
+
+def _validateurs(request, utilisateur, versions: Tuple[str, ...], periode: Optional[int], format: str) -> Validateurs:
+    """ETag et date de dernière modification (timestamp) d'une réponse."""
+    horodatages = [horodatage_version(version) for version in versions]
+    derniere_modification = None if not horodatages or None in horodatages else max(horodatages)
+
+    variantes = [request.get_full_path(), getattr(utilisateur, 'pk', None), format, translation.get_language()]
+    if periode:
+        debut_periode = int(time.time() // periode * periode)
+        variantes.append(debut_periode)
+        if derniere_modification is not None:
+            derniere_modification = max(derniere_modification, debut_periode)
+
+    empreinte = hashlib.blake2b(repr((versions, variantes)).encode(), digest_size=16).hexdigest()
+    return quote_etag(empreinte), None if derniere_modification is None else int(derniere_modification)
+
+
+def validateurs(request, utilisateur, etiquettes: Sequence[str], periode: Optional[int] = None,
+                format: str = 'application/json') -> Validateurs:
+    """
+    Validateurs d'une lecture dépendant des étiquettes.
+
+    Args:
+        request: Requête (URL et paramètres compris dans l'ETag)
+        utilisateur: Utilisateur authentifié (ou None)
+        etiquettes: Étiquettes dont dépend la réponse
+        periode: Durée de validité (secondes) d'une réponse qui dépend de l'heure
+        format: Type de média de la réponse
+    """
+    return _validateurs(request, utilisateur, versions_etiquettes(etiquettes), periode, format)
+
+
+async def avalidateurs(request, utilisateur, etiquettes: Sequence[str], periode: Optional[int] = None,
+                       format: str = 'application/json') -> Validateurs:
+    """Version asynchrone de validateurs."""
+    return _validateurs(request, utilisateur, await aversions_etiquettes(etiquettes), periode, format)
+
+
+def reponse_non_modifiee(request, validateurs: Validateurs) -> Optional[HttpResponse]:
+    """304 (ou 412) si les validateurs du client sont encore valides, sinon None."""
+    etag, derniere_modification = validateurs
+    return get_conditional_response(request, etag=etag, last_modified=derniere_modification)
+
+
+def ajouter_validateurs(reponse, validateurs: Validateurs):
+    """En-têtes ETag / Last-Modified d'une réponse 200 ou 304, revalidée à chaque lecture."""
+    if reponse.status_code not in (200, 304):
+        return reponse
+    etag, derniere_modification = validateurs
+    reponse.headers['ETag'] = etag
+    if derniere_modification is not None:
+        reponse.headers['Last-Modified'] = http_date(derniere_modification)
+    patch_cache_control(reponse, private=True, no_cache=True)
+    patch_vary_headers(reponse, ('Accept', 'Accept-Language', 'Authorization', 'Cookie'))
+    return reponse
+
+
+def lectures_conditionnelles_actives(request) -> bool:
+    return request.method in ('GET', 'HEAD') and settings.LECTURES_CONDITIONNELLES
+
+
+class ValidateursMixin:
+    """
+    Étiquettes et période des validateurs d'une vue en lecture. Sans
+    étiquette (défaut), la vue ne répond pas aux requêtes conditionnelles.
+    """
+    etiquettes_etag: Sequence[str] = ()
+    periode_etag: Optional[int] = None
+
+    def get_etiquettes_etag(self) -> Sequence[str]:
+        return self.etiquettes_etag
+
+
+class NonModifie(Exception):
+    """Interrompt une vue DRF dont le client a déjà la réponse courante."""
+
+    def __init__(self, reponse):
+        self.reponse = reponse
+
+
+class LectureConditionnelleMixin(ValidateursMixin):
+    """
+    Vue DRF répondant aux requêtes conditionnelles: les validateurs sont
+    comparés après authentification, permissions et négociation du format,
+    avant l'exécution de la méthode de la vue.
+    """
+    validateurs_etag: Optional[Validateurs] = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        etiquettes = self.get_etiquettes_etag()
+        if not etiquettes or not lectures_conditionnelles_actives(request):
+            return
+        self.validateurs_etag = validateurs(
+            request, request.user, etiquettes, self.periode_etag, request.accepted_media_type
+        )
+        reponse = reponse_non_modifiee(request, self.validateurs_etag)
+        if reponse is not None:
+            raise NonModifie(reponse)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NonModifie):
+            return exc.reponse
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.validateurs_etag is not None:
+            ajouter_validateurs(response, self.validateurs_etag)
+        return response
@@ -0,0 +1,584 @@
+"""
+Service Pattern - Génération de données de charge à l'échelle d'un hôpital.
+
+Jeux de données synthétiques et reproductibles pour les benchmarks:
+départements et services, personnel, catégories d'événements, types de
+workflows et leurs étapes, abonnements aux alertes (références, écrites par
+bulk_create), puis instances de workflows avec l'historique complet de leurs
+TransitionEtape, micro-événements et alertes (volumineux).
+
+Les tables volumineuses sont générées par tranches indépendantes: chaque
+tranche a son propre générateur aléatoire (graine, table, numéro), le contenu
+ne dépend donc ni de l'ordre ni du nombre de processus. Les tranches sont
+écrites en parallèle par un pool de processus, en COPY sur PostgreSQL et par
+bulk_create ailleurs (un seul processus sur SQLite). Les identifiants sont
+réservés avant l'écriture (séquences PostgreSQL) pour écrire les transitions
+avec leurs instances sans relire la base.
+
+Les dates sont réparties sur les `jours` précédant `fin`, selon un profil
+horaire d'activité. Toutes les lignes de référence portent le préfixe dans
+leur code (ou leur email), les instances dans leur référence patient.
+"""
+import io
+import json
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .cache import etiquettes_ecriture, invalider
+from .horodatages import horodatages_conserves
+from apps.accounts.models import Department, User
+from apps.alerts.models import AbonnementAlerte, Alerte
+from apps.events.models import CategorieEvenement, MicroEvenement
+from apps.services.models import ServiceHospitalier
+from apps.workflows.models import EtapeWorkflow, InstanceWorkflow, TransitionEtape, TypeWorkflow
+
+
+class GenerationChargeException(Exception):
+    """Exception pour les erreurs de génération des données de charge."""
+    pass
+
+
+# Tables volumineuses, générées par tranches
+TABLES = ['workflows', 'evenements', 'alertes']
+
+CHAMPS_HORODATES = [
+    (InstanceWorkflow, 'demarre_le'),
+    (InstanceWorkflow, 'modifie_le'),
+    (TransitionEtape, 'horodatage'),
+    (MicroEvenement, 'signale_le'),
+    (MicroEvenement, 'modifie_le'),
+    (Alerte, 'cree_le'),
+]
+
+SPECIALITES = [
+    'Urgences', 'Cardiologie', 'Chirurgie', 'Pédiatrie', 'Radiologie', 'Neurologie',
+    'Oncologie', 'Maternité', 'Réanimation', 'Orthopédie', 'Gériatrie', 'Pneumologie',
+    'Néphrologie', 'Laboratoire', 'Pharmacie', 'Consultations externes',
+]
+PRENOMS = [
+    'Aïcha', 'Jean', 'Marie', 'Paul', 'Clarisse', 'Emmanuel', 'Brigitte', 'Samuel',
+    'Mireille', 'Patrick', 'Nadège', 'Hervé', 'Sandrine', 'Boris', 'Esther', 'Didier',
+]
+NOMS = [
+    'Mbarga', 'Ngono', 'Fotso', 'Kamga', 'Tchoupo', 'Essomba', 'Nkoulou', 'Atangana',
+    'Bello', 'Onana', 'Ndjock', 'Manga', 'Abena', 'Eto', 'Moukoko', 'Tagne',
+]
+NOMS_ETAPES = [
+    'Accueil', 'Triage', 'Enregistrement', 'Consultation', 'Prélèvement', 'Analyses',
+    'Imagerie', 'Avis spécialisé', 'Traitement', 'Observation', 'Validation', 'Sortie',
+]
+TITRES_EVENEMENTS = {
+    CategorieEvenement.TypeCategorie.RETARD: ['Retard de prise en charge', 'Résultats en attente'],
+    CategorieEvenement.TypeCategorie.BLOCAGE: ['Lit indisponible', 'Brancard manquant'],
+    CategorieEvenement.TypeCategorie.EQUIPEMENT: ['Panne moniteur', 'Scanner indisponible'],
+    CategorieEvenement.TypeCategorie.COORDINATION: ['Transfert non coordonné', 'Dossier incomplet'],
+    CategorieEvenement.TypeCategorie.RESSOURCE: ['Stock épuisé', 'Personnel insuffisant'],
+    CategorieEvenement.TypeCategorie.PATIENT: ['Patient agité', 'Patient absent'],
+    CategorieEvenement.TypeCategorie.AUTRE: ['Incident divers'],
+}
+
+# Répartitions (valeur, poids)
+ROLES = [(User.Role.NURSE, 55), (User.Role.DOCTOR, 25), (User.Role.LAB_TECH, 15), (User.Role.ADMIN, 5)]
+PRIORITES_WORKFLOW = [
+    (InstanceWorkflow.Priorite.BASSE, 15), (InstanceWorkflow.Priorite.NORMALE, 60),
+    (InstanceWorkflow.Priorite.HAUTE, 17), (InstanceWorkflow.Priorite.URGENTE, 6),
+    (InstanceWorkflow.Priorite.CRITIQUE, 2),
+]
+SEVERITES = [
+    (MicroEvenement.Severite.FAIBLE, 35), (MicroEvenement.Severite.MOYEN, 35),
+    (MicroEvenement.Severite.ELEVE, 20), (MicroEvenement.Severite.CRITIQUE, 10),
+]
+PRIORITES_ALERTE = [
+    (Alerte.Priorite.BASSE, 20), (Alerte.Priorite.NORMALE, 45),
+    (Alerte.Priorite.HAUTE, 25), (Alerte.Priorite.URGENTE, 10),
+]
+# Activité relative par heure de la journée (pic en fin de matinée)
+PROFIL_HORAIRE = [2, 1, 1, 1, 1, 2, 4, 7, 10, 12, 12, 11, 9, 9, 10, 10, 9, 8, 7, 6, 5, 4, 3, 2]
+
+# Probabilité d'abandon à chaque étape; dispersion des durées (loi log-normale)
+ABANDON_PAR_ETAPE = 0.01
+DISPERSION_DUREES = 0.6
+
+TAILLE_PREFIXE_MAX = 8
+
+
+def _choix(rng: random.Random, repartition: List[Tuple]) -> str:
+    valeurs, poids = zip(*repartition)
+    return rng.choices(valeurs, weights=poids)[0]
+
+
+def _instant(rng: random.Random, fin: datetime, jours: int) -> datetime:
+    """Instant des `jours` précédant `fin`, selon le profil horaire."""
+    jour = fin - timedelta(days=rng.randrange(jours))
+    heure = rng.choices(range(24), weights=PROFIL_HORAIRE)[0]
+    instant = jour.replace(hour=heure, minute=0, second=0, microsecond=0) + timedelta(
+        seconds=rng.randrange(3600)
+    )
+    # Le jour de `fin`, les heures à venir sont ramenées dans le passé
+    return instant if instant <= fin else instant - timedelta(days=1)
+
+
+def _duree(rng: random.Random, minutes_estimees: int) -> int:
+    return max(1, round(rng.lognormvariate(math.log(minutes_estimees), DISPERSION_DUREES)))
+
+
+# ----------------------------------------------------------------------
+# Écriture: identifiants réservés, COPY (PostgreSQL) ou bulk_create
+# ----------------------------------------------------------------------
+
+_prochains_identifiants: Dict[type, int] = {}
+
+
+def reserver_identifiants(modele: type, nombre: int) -> List[int]:
+    """
+    Identifiants pour `nombre` lignes à écrire: tirés de la séquence sur
+    PostgreSQL (sûr entre processus), à la suite du maximum ailleurs (un seul
+    écrivain).
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as curseur:
+            curseur.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+                [modele._meta.db_table, nombre]
+            )
+            return [ligne[0] for ligne in curseur.fetchall()]
+    if modele not in _prochains_identifiants:
+        _prochains_identifiants[modele] = (modele.objects.aggregate(dernier=Max('pk'))['dernier'] or 0) + 1
+    debut = _prochains_identifiants[modele]
+    _prochains_identifiants[modele] = debut + nombre
+    return list(range(debut, debut + nombre))
+
+
+_ECHAPPEMENTS_COPY = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def _valeur_copy(valeur) -> str:
+    """Valeur au format texte de COPY."""
+    if valeur is None:
+        return '\\N'
+    if type(valeur) is str:
+        return valeur.translate(_ECHAPPEMENTS_COPY)
+    if isinstance(valeur, bool):
+        return 't' if valeur else 'f'
+    if isinstance(valeur, (datetime, date)):
+        return valeur.isoformat()
+    if isinstance(valeur, (dict, list)):
+        return json.dumps(valeur, ensure_ascii=False).translate(_ECHAPPEMENTS_COPY)
+    return str(valeur)
+
+
+def ecrire(modele: type, lignes: List[Dict], copy: bool):
+    """
+    Écrit les lignes (champ -> valeur, identifiant compris) par COPY ou
+    bulk_create; les champs absents prennent leur valeur par défaut.
+    """
+    if not lignes:
+        return
+    if not copy:
+        modele.objects.bulk_create([modele(**ligne) for ligne in lignes], batch_size=5000)
+        return
+    champs = modele._meta.concrete_fields
+    defauts = {champ.attname: _valeur_copy(champ.get_default()) for champ in champs}
+    tampon = io.StringIO()
+    for ligne in lignes:
+        tampon.write('\t'.join(
+            _valeur_copy(ligne[attname]) if attname in ligne else defaut
+            for attname, defaut in defauts.items()
+        ))
+        tampon.write('\n')
+    tampon.seek(0)
+    colonnes = ', '.join(connection.ops.quote_name(champ.column) for champ in champs)
+    with connection.cursor() as curseur:
+        curseur.copy_expert(
+            f"COPY {connection.ops.quote_name(modele._meta.db_table)} ({colonnes}) FROM STDIN", tampon
+        )
+
+
+# ----------------------------------------------------------------------
+# Tranches (exécutées dans les processus du pool)
+# ----------------------------------------------------------------------
+
+def _initialiser_worker():
+    """Chaque processus ouvre ses propres connexions à la base."""
+    django.setup()
+    connections.close_all()
+
+
+def ecrire_tranche(table: str, numero: int, taille: int, contexte: Dict) -> int:
+    """Génère et écrit une tranche de `taille` lignes principales; rend le nombre de lignes écrites."""
+    rng = random.Random(f"{contexte['graine']}:{table}:{numero}")
+    generer = {
+        'workflows': _tranche_workflows,
+        'evenements': _tranche_evenements,
+        'alertes': _tranche_alertes,
+    }[table]
+    with horodatages_conserves(CHAMPS_HORODATES), transaction.atomic():
+        return generer(rng, numero, taille, contexte)
+
+
+def _tranche_workflows(rng: random.Random, numero: int, taille: int, contexte: Dict) -> int:
+    """Instances et l'historique de leurs transitions jusqu'à `fin`."""
+    fin, jours = contexte['fin'], contexte['jours']
+    departements, personnel = contexte['departements'], contexte['personnel']
+    instances, transitions = [], []
+
+    for j, identifiant in enumerate(reserver_identifiants(InstanceWorkflow, taille)):
+        type_id, etapes = rng.choice(contexte['types'])
+        departement_id = rng.choice(departements)
+        equipe = personnel[departement_id]
+        instant = _instant(rng, fin, jours)
+        demarre_le = instant
+
+        statut, etape_actuelle, termine_le = InstanceWorkflow.Statut.TERMINE, None, None
+        transitions.append(dict(
+            instance_id=identifiant, etape_source_id=None, etape_destination_id=etapes[0][0],
+            effectuee_par_id=rng.choice(equipe), horodatage=instant, commentaire='Démarrage du workflow'
+        ))
+        for k, (etape_id, minutes_estimees) in enumerate(etapes):
+            if rng.random() < ABANDON_PAR_ETAPE:
+                statut, etape_actuelle = InstanceWorkflow.Statut.ABANDONNE, etape_id
+                termine_le = min(instant + timedelta(minutes=rng.randint(1, minutes_estimees)), fin)
+                break
+            minutes = _duree(rng, minutes_estimees)
+            suivant = instant + timedelta(minutes=minutes)
+            if suivant > fin:
+                statut = InstanceWorkflow.Statut.EN_PAUSE if rng.random() < 0.05 else InstanceWorkflow.Statut.EN_COURS
+                etape_actuelle = etape_id
+                break
+            transitions.append(dict(
+                instance_id=identifiant, etape_source_id=etape_id,
+                etape_destination_id=etapes[k + 1][0] if k + 1 < len(etapes) else None,
+                effectuee_par_id=rng.choice(equipe), horodatage=suivant, duree_etape_minutes=minutes
+            ))
+            instant = suivant
+        else:
+            termine_le = instant
+
+        instances.append(dict(
+            id=identifiant, type_workflow_id=type_id,
+            reference_patient=f"{contexte['prefixe']}-{numero}-{j}",
+            etape_actuelle_id=etape_actuelle, statut=statut,
+            priorite=_choix(rng, PRIORITES_WORKFLOW), departement_id=departement_id,
+            initie_par_id=rng.choice(equipe), demarre_le=demarre_le,
+            termine_le=termine_le, modifie_le=termine_le or instant
+        ))
+
+    for transition, identifiant in zip(transitions, reserver_identifiants(TransitionEtape, len(transitions))):
+        transition['id'] = identifiant
+    ecrire(InstanceWorkflow, instances, contexte['copy'])
+    ecrire(TransitionEtape, transitions, contexte['copy'])
+    return len(instances) + len(transitions)
+
+
+def _tranche_evenements(rng: random.Random, numero: int, taille: int, contexte: Dict) -> int:
+    """Micro-événements, résolus pour la plupart au-delà d'une journée."""
+    fin, jours = contexte['fin'], contexte['jours']
+    evenements = []
+    for identifiant in reserver_identifiants(MicroEvenement, taille):
+        categorie_id, type_categorie = rng.choice(contexte['categories'])
+        departement_id = rng.choice(contexte['departements'])
+        equipe = contexte['personnel'][departement_id]
+        survenu_le = _instant(rng, fin, jours)
+        signale_le = min(survenu_le + timedelta(minutes=rng.randint(0, 30)), fin)
+
+        statut, resolu_le, resolu_par = MicroEvenement.Statut.SIGNALE, None, None
+        tirage = rng.random()
+        if fin - signale_le > timedelta(days=1) and tirage < 0.9:
+            statut = MicroEvenement.Statut.RESOLU if tirage < 0.8 else MicroEvenement.Statut.IGNORE
+        elif tirage < 0.5:
+            statut = MicroEvenement.Statut.EN_COURS
+        if statut == MicroEvenement.Statut.RESOLU:
+            resolu_le = signale_le + timedelta(minutes=_duree(rng, 90))
+            if resolu_le > fin:
+                statut, resolu_le = MicroEvenement.Statut.EN_COURS, None
+            else:
+                resolu_par = rng.choice(equipe)
+
+        evenements.append(dict(
+            id=identifiant, rapporteur_id=rng.choice(equipe), departement_id=departement_id,
+            categorie_id=categorie_id, titre=rng.choice(TITRES_EVENEMENTS[type_categorie]),
+            description='Événement généré (données de charge)',
+            severite=_choix(rng, SEVERITES), statut=statut,
+            delai_estime_minutes=rng.choice([None, 10, 15, 30, 60, 120]),
+            survenu_le=survenu_le, signale_le=signale_le, resolu_le=resolu_le,
+            modifie_le=resolu_le or signale_le, resolu_par_id=resolu_par,
+            est_recurrent=rng.random() < 0.1
+        ))
+    ecrire(MicroEvenement, evenements, contexte['copy'])
+    return len(evenements)
+
+
+def _tranche_alertes(rng: random.Random, numero: int, taille: int, contexte: Dict) -> int:
+    """Alertes: les plus anciennes vues, acquittées ou résolues."""
+    fin, jours = contexte['fin'], contexte['jours']
+    alertes = []
+    for identifiant in reserver_identifiants(Alerte, taille):
+        departement_id = rng.choice(contexte['departements'])
+        cree_le = _instant(rng, fin, jours)
+        priorite = _choix(rng, PRIORITES_ALERTE)
+
+        etapes_suivi = rng.choice([0, 1, 2, 3, 3, 3]) if fin - cree_le > timedelta(hours=12) else rng.choice([0, 0, 1])
+        suivi = [min(cree_le + timedelta(minutes=_duree(rng, 20) * (n + 1)), fin) for n in range(etapes_suivi)]
+        statut = [Alerte.Statut.NOUVELLE, Alerte.Statut.VUE, Alerte.Statut.ACQUITTEE, Alerte.Statut.RESOLUE][etapes_suivi]
+
+        alertes.append(dict(
+            id=identifiant, titre=f"Alerte {priorite.lower()} - département {departement_id}",
+            message='Alerte générée (données de charge)', priorite=priorite, statut=statut,
+            departement_id=departement_id, donnees_contexte={'source': 'charge'}, cree_le=cree_le,
+            vue_le=suivi[0] if etapes_suivi >= 1 else None,
+            acquittee_le=suivi[1] if etapes_suivi >= 2 else None,
+            resolue_le=suivi[2] if etapes_suivi >= 3 else None,
+            acquittee_par_id=rng.choice(contexte['personnel'][departement_id]) if etapes_suivi >= 2 else None
+        ))
+    ecrire(Alerte, alertes, contexte['copy'])
+    return len(alertes)
+
+
+# ----------------------------------------------------------------------
+# Service
+# ----------------------------------------------------------------------
+
+class GenerationChargeService:
+    """
+    Service de génération des données de charge.
+    """
+
+    def __init__(
+        self,
+        graine: int = 42,
+        prefixe: str = 'CHG',
+        jours: int = 90,
+        fin: Optional[datetime] = None,
+        taille_tranche: int = 20000,
+        processus: Optional[int] = None
+    ):
+        if not prefixe.isalnum() or len(prefixe) > TAILLE_PREFIXE_MAX:
+            raise GenerationChargeException(
+                f"Préfixe alphanumérique de {TAILLE_PREFIXE_MAX} caractères au plus attendu."
+            )
+        if jours < 1 or taille_tranche < 1:
+            raise GenerationChargeException("La période et la taille de tranche doivent être positives.")
+        self.graine = graine
+        self.prefixe = prefixe.upper()
+        self.jours = jours
+        self.fin = fin or timezone.now().replace(microsecond=0)
+        self.taille_tranche = taille_tranche
+        # SQLite n'accepte qu'un écrivain à la fois
+        self.processus = 1 if connection.vendor == 'sqlite' else max(processus or os.cpu_count() or 1, 1)
+        self.copy = connection.vendor == 'postgresql'
+
+    def generer(
+        self,
+        departements: int = 200,
+        personnel: int = 25,
+        types_workflow: int = 12,
+        workflows: int = 1000000,
+        evenements: int = 2000000,
+        alertes: int = 200000,
+        progression: Optional[Callable[[str, int], None]] = None
+    ) -> Dict[str, int]:
+        """
+        Génère un jeu de données complet.
+
+        Args:
+            departements: Départements (chacun avec son ServiceHospitalier)
+            personnel: Utilisateurs par département
+            types_workflow: Types de workflows (4 à 8 étapes chacun)
+            workflows, evenements, alertes: Lignes des tables volumineuses
+            progression: Fonction appelée après chaque tranche (table, lignes écrites)
+
+        Returns:
+            Nombre de lignes écrites par table
+        """
+        if departements < 1 or personnel < 1 or types_workflow < 1:
+            raise GenerationChargeException("Au moins un département, un membre du personnel et un type de workflow.")
+        if Department.objects.filter(code__startswith=f'{self.prefixe}-').exists():
+            raise GenerationChargeException(
+                f"Des données de charge de préfixe {self.prefixe} existent déjà: "
+                "choisir un autre préfixe ou repartir d'une base vide."
+            )
+
+        _prochains_identifiants.clear()
+        contexte, totaux = self.generer_references(departements, personnel, types_workflow)
+        tranches = [
+            (table, numero, min(self.taille_tranche, total - debut))
+            for table, total in (('workflows', workflows), ('evenements', evenements), ('alertes', alertes))
+            for numero, debut in enumerate(range(0, total, self.taille_tranche))
+        ]
+        totaux.update({table: 0 for table in TABLES})
+        try:
+            if self.processus == 1:
+                for table, numero, taille in tranches:
+                    lignes = ecrire_tranche(table, numero, taille, contexte)
+                    totaux[table] += lignes
+                    if progression:
+                        progression(table, lignes)
+            else:
+                # Les processus fils ne doivent pas hériter des connexions ouvertes
+                connections.close_all()
+                with ProcessPoolExecutor(max_workers=self.processus, initializer=_initialiser_worker) as pool:
+                    futures = {
+                        pool.submit(ecrire_tranche, table, numero, taille, contexte): table
+                        for table, numero, taille in tranches
+                    }
+                    for future in as_completed(futures):
+                        table = futures[future]
+                        lignes = future.result()
+                        totaux[table] += lignes
+                        if progression:
+                            progression(table, lignes)
+        finally:
+            # bulk_create et COPY n'émettent pas de signal: lectures en cache
+            # et ETag des données générées invalidés une fois
+            invalider(*self.etiquettes_generees(contexte))
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as curseur:
+                for modele in (InstanceWorkflow, TransitionEtape, MicroEvenement, Alerte):
+                    curseur.execute(f"ANALYZE {connection.ops.quote_name(modele._meta.db_table)}")
+        return totaux
+
+    def etiquettes_generees(self, contexte: Dict) -> Set[str]:
+        """Étiquettes du cache des lectures périmées par un jeu de données généré."""
+        derniere = timezone.localdate(self.fin)
+        # Un jour de marge: instants tirés sur des journées UTC, étiquettes en journées locales
+        jours = [derniere - timedelta(days=i) for i in range(self.jours + 2)]
+        etiquettes = set()
+        for departement in contexte['departements']:
+            for ressource in ('departements', 'services', 'personnel'):
+                etiquettes.update(etiquettes_ecriture(ressource, departement))
+            for ressource in ('workflows', 'evenements', 'alertes'):
+                for jour in jours:
+                    etiquettes.update(etiquettes_ecriture(ressource, departement, jour))
+        etiquettes.update(etiquettes_ecriture('categories') + etiquettes_ecriture('types_workflow'))
+        return etiquettes
+
+    @transaction.atomic
+    def generer_references(self, departements: int, personnel: int, types_workflow: int) -> Tuple[Dict, Dict[str, int]]:
+        """
+        Écrit les tables de référence et rend le contexte des tranches
+        (identifiants utiles, paramètres) et les lignes écrites.
+        """
+        rng = random.Random(f"{self.graine}:references")
+
+        depts = Department.objects.bulk_create([
+            Department(
+                name=f"{SPECIALITES[i % len(SPECIALITES)]} {i // len(SPECIALITES) + 1}",
+                code=f"{self.prefixe}-D{i:04d}",
+                building=f"Bâtiment {chr(65 + i % 8)}",
+                floor=str(rng.randint(0, 6))
+            )
+            for i in range(departements)
+        ])
+        ServiceHospitalier.objects.bulk_create([ServiceHospitalier(department=d) for d in depts])
+
+        mot_de_passe = make_password(None)
+        utilisateurs = User.objects.bulk_create([
+            User(
+                email=f"{self.prefixe.lower()}.{i:04d}.{j:03d}@charge.hospyflow.local",
+                password=mot_de_passe,
+                first_name=rng.choice(PRENOMS),
+                last_name=rng.choice(NOMS),
+                role=_choix(rng, ROLES),
+                department=dept,
+                employee_id=f"{self.prefixe}-{i:04d}{j:03d}",
+                is_on_duty=rng.random() < 0.3
+            )
+            for i, dept in enumerate(depts)
+            for j in range(personnel)
+        ], batch_size=5000)
+
+        categories = CategorieEvenement.objects.bulk_create([
+            CategorieEvenement(
+                nom=f"{libelle} ({self.prefixe})",
+                code=f"{self.prefixe}-E{k}",
+                type_categorie=valeur,
+                ordre_affichage=k
+            )
+            for k, (valeur, libelle) in enumerate(CategorieEvenement.TypeCategorie.choices)
+        ])
+
+        plans = []
+        for k in range(types_workflow):
+            indices = sorted(rng.sample(range(len(NOMS_ETAPES)), rng.randint(4, 8)))
+            durees = [rng.choice([5, 10, 15, 20, 30, 45, 60]) for _ in indices]
+            plans.append((indices, durees))
+        categories_workflow = TypeWorkflow.Categorie.choices
+        types = TypeWorkflow.objects.bulk_create([
+            TypeWorkflow(
+                nom=f"{categories_workflow[k % len(categories_workflow)][1]} {k // len(categories_workflow) + 1}",
+                code=f"{self.prefixe}-W{k:03d}",
+                categorie=categories_workflow[k % len(categories_workflow)][0],
+                duree_standard_minutes=sum(durees),
+                seuil_alerte_minutes=int(sum(durees) * 1.5),
+                ordre_affichage=k
+            )
+            for k, (_, durees) in enumerate(plans)
+        ])
+        etapes = EtapeWorkflow.objects.bulk_create([
+            EtapeWorkflow(
+                type_workflow=type_workflow,
+                nom=NOMS_ETAPES[indice],
+                code=f"E{ordre}",
+                ordre=ordre,
+                duree_estimee_minutes=duree,
+                departement_responsable=rng.choice(depts)
+            )
+            for type_workflow, (indices, durees) in zip(types, plans)
+            for ordre, (indice, duree) in enumerate(zip(indices, durees), start=1)
+        ])
+
+        # Abonnements: la moitié des médecins et administrateurs, à leur département
+        abonnes = [
+            u for u in utilisateurs
+            if u.role in (User.Role.DOCTOR, User.Role.ADMIN) and rng.random() < 0.5
+        ]
+        abonnements = AbonnementAlerte.objects.bulk_create([
+            AbonnementAlerte(
+                utilisateur=u,
+                priorite_minimum=rng.choice([Alerte.Priorite.NORMALE, Alerte.Priorite.HAUTE, Alerte.Priorite.URGENTE])
+            )
+            for u in abonnes
+        ], batch_size=5000)
+        Departements = AbonnementAlerte.departements.through
+        Departements.objects.bulk_create([
+            Departements(abonnementalerte_id=a.pk, department_id=u.department_id)
+            for a, u in zip(abonnements, abonnes)
+        ], batch_size=5000)
+
+        equipes: Dict[int, List[int]] = {}
+        for u in utilisateurs:
+            equipes.setdefault(u.department_id, []).append(u.pk)
+        etapes_par_type: Dict[int, List[Tuple[int, int]]] = {}
+        for etape in etapes:
+            etapes_par_type.setdefault(etape.type_workflow_id, []).append((etape.pk, etape.duree_estimee_minutes))
+
+        contexte = {
+            'graine': self.graine,
+            'prefixe': self.prefixe,
+            'fin': self.fin,
+            'jours': self.jours,
+            'copy': self.copy,
+            'departements': [d.pk for d in depts],
+            'personnel': equipes,
+            'types': [(t.pk, etapes_par_type[t.pk]) for t in types],
+            'categories': [(c.pk, c.type_categorie) for c in categories],
+        }
+        totaux = {
+            'departements': len(depts),
+            'utilisateurs': len(utilisateurs),
+            'types_workflow': len(types),
+            'etapes': len(etapes),
+            'abonnements': len(abonnements),
+        }
+        return contexte, totaux
@@ -0,0 +1,194 @@
+"""
+Exports bruts en flux (CSV ou NDJSON, compression gzip optionnelle).
+
+Les lignes sont lues par values_list().iterator(chunk_size=...) puis encodées
+au fil de l'eau dans une StreamingHttpResponse: la mémoire utilisée ne dépend
+pas du nombre de lignes exportées. Sous ASGI, le flux est passé en itérateur
+asynchrone (flux_asynchrone): Django lirait sinon tout l'itérateur synchrone
+en mémoire avant d'envoyer le premier octet.
+"""
+import csv
+import io
+import zlib
+from datetime import date, datetime, time, timedelta
+from typing import AsyncIterator, Iterable, Iterator, List, Optional, Sequence
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import serializers
+
+
+class ExportException(Exception):
+    """Exception pour les paramètres d'export invalides."""
+    pass
+
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Lignes lues par aller-retour base de données
+TAILLE_LOT = 2000
+# Taille approximative des blocs envoyés au client
+TAILLE_BLOC = 64 * 1024
+
+
+class PeriodeExportSerializer(serializers.Serializer):
+    """Période d'export (jours locaux inclus) passée en paramètres de requête."""
+
+    debut = serializers.DateField(required=False)
+    fin = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        if attrs.get('debut') and attrs.get('fin') and attrs['debut'] > attrs['fin']:
+            raise serializers.ValidationError("La date de début doit précéder la date de fin.")
+        return attrs
+
+
+def filtrer_periode(
+    queryset: QuerySet,
+    champ: str,
+    debut: Optional[date] = None,
+    fin: Optional[date] = None
+) -> QuerySet:
+    """Restreint un horodatage aux jours locaux [debut, fin] (bornes indexables)."""
+    if debut:
+        queryset = queryset.filter(**{
+            f'{champ}__gte': timezone.make_aware(datetime.combine(debut, time.min))
+        })
+    if fin:
+        queryset = queryset.filter(**{
+            f'{champ}__lt': timezone.make_aware(datetime.combine(fin + timedelta(days=1), time.min))
+        })
+    return queryset
+
+
+def parcourir(requetes: Iterable[QuerySet]) -> Iterator[tuple]:
+    """Lignes des requêtes, l'une après l'autre, sans mise en cache du queryset."""
+    for requete in requetes:
+        yield from requete.iterator(chunk_size=TAILLE_LOT)
+
+
+def _texte(valeur):
+    """Représentation CSV d'une valeur (dates au format ISO 8601)."""
+    if isinstance(valeur, (datetime, date)):
+        return valeur.isoformat()
+    return valeur
+
+
+def encoder_csv(entetes: Sequence[str], lignes: Iterable[tuple]) -> Iterator[bytes]:
+    """Encode les lignes en CSV, par blocs d'environ TAILLE_BLOC octets."""
+    tampon = io.StringIO()
+    writer = csv.writer(tampon)
+    writer.writerow(entetes)
+    for ligne in lignes:
+        writer.writerow([_texte(v) for v in ligne])
+        if tampon.tell() >= TAILLE_BLOC:
+            yield tampon.getvalue().encode('utf-8')
+            tampon.seek(0)
+            tampon.truncate()
+    yield tampon.getvalue().encode('utf-8')
+
+
+def encoder_ndjson(entetes: Sequence[str], lignes: Iterable[tuple]) -> Iterator[bytes]:
+    """Encode les lignes en JSON délimité par des retours à la ligne."""
+    encodeur = DjangoJSONEncoder(ensure_ascii=False)
+    bloc: List[str] = []
+    taille = 0
+    for ligne in lignes:
+        texte = encodeur.encode(dict(zip(entetes, ligne)))
+        bloc.append(texte)
+        taille += len(texte) + 1
+        if taille >= TAILLE_BLOC:
+            yield ('\n'.join(bloc) + '\n').encode('utf-8')
+            bloc, taille = [], 0
+    if bloc:
+        yield ('\n'.join(bloc) + '\n').encode('utf-8')
+
+
+def compresser_gzip(blocs: Iterable[bytes]) -> Iterator[bytes]:
+    """Compresse un flux d'octets au format gzip, bloc par bloc."""
+    compresseur = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for bloc in blocs:
+        donnees = compresseur.compress(bloc)
+        if donnees:
+            yield donnees
+    yield compresseur.flush()
+
+
+def servie_par_asgi(request) -> bool:
+    """Requête (Django ou DRF) reçue par le handler ASGI."""
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+async def flux_asynchrone(blocs: Iterable[bytes]) -> AsyncIterator[bytes]:
+    """
+    Itérateur asynchrone d'un flux synchrone, pour les réponses servies par ASGI.
+
+    Chaque bloc est produit à la demande dans le thread de la requête
+    (thread_sensitive: le curseur de la base y reste ouvert d'un bloc à
+    l'autre), puis envoyé avant la lecture du suivant.
+    """
+    blocs = iter(blocs)
+    suivant = sync_to_async(next, thread_sensitive=True)
+    try:
+        while True:
+            bloc = await suivant(blocs, None)
+            if bloc is None:
+                return
+            yield bloc
+    finally:
+        # Client déconnecté ou flux terminé: curseur et fichier libérés
+        if hasattr(blocs, 'close'):
+            await sync_to_async(blocs.close, thread_sensitive=True)()
+
+
+def reponse_export(
+    sources: Iterable[QuerySet],
+    colonnes: Sequence[str],
+    nom_fichier: str,
+    format: str = 'csv',
+    gzip: bool = False,
+    entetes: Optional[Sequence[str]] = None,
+    asynchrone: bool = False
+) -> StreamingHttpResponse:
+    """
+    Construit la réponse d'export en flux.
+
+    Args:
+        sources: Requêtes exportées à la suite (ex: archive puis table active)
+        colonnes: Champs passés à values_list (relations autorisées)
+        nom_fichier: Nom du fichier sans extension
+        format: 'csv' ou 'ndjson'
+        gzip: Compresser le flux (fichier .gz)
+        entetes: Noms de colonnes affichés (colonnes par défaut)
+        asynchrone: Réponse servie par ASGI (voir flux_asynchrone)
+    """
+    if format not in FORMATS:
+        raise ExportException(f"Format inconnu: {format} (csv ou ndjson).")
+
+    # Colonnes résolues ici: une erreur survient avant l'envoi des en-têtes
+    requetes = [source.values_list(*colonnes) for source in sources]
+    entetes = list(entetes or [c.replace('__', '_') for c in colonnes])
+    encodeur = encoder_csv if format == 'csv' else encoder_ndjson
+    flux = encodeur(entetes, parcourir(requetes))
+    nom = f"{nom_fichier}.{format}"
+
+    content_type = FORMATS[format]
+    if gzip:
+        flux = compresser_gzip(flux)
+        content_type = 'application/gzip'
+        nom += '.gz'
+    if asynchrone:
+        flux = flux_asynchrone(flux)
+
+    reponse = StreamingHttpResponse(flux, content_type=content_type)
+
+    reponse['Content-Disposition'] = f'attachment; filename="{nom}"'
+    reponse['X-Accel-Buffering'] = 'no'
+    return reponse
@@ -0,0 +1,25 @@
+"""
+Horodatages d'origine conservés lors des insertions en masse.
+
+bulk_create applique auto_now / auto_now_add comme save(): les migrations et
+les générateurs de données qui écrivent des dates passées les désactivent le
+temps de l'écriture.
+"""
+from contextlib import contextmanager
+from typing import Iterable, Tuple, Type
+
+from django.db import models
+
+
+@contextmanager
+def horodatages_conserves(champs: Iterable[Tuple[Type[models.Model], str]]):
+    """Désactive auto_now / auto_now_add des champs (modèle, nom) dans le bloc."""
+    champs = [modele._meta.get_field(nom) for modele, nom in champs]
+    etats = [(champ.auto_now, champ.auto_now_add) for champ in champs]
+    for champ in champs:
+        champ.auto_now = champ.auto_now_add = False
+    try:
+        yield
+    finally:
+        for champ, (auto_now, auto_now_add) in zip(champs, etats):
+            champ.auto_now, champ.auto_now_add = auto_now, auto_now_add
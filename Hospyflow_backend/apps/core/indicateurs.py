@@ -0,0 +1,101 @@
+"""
+Indicateurs du tableau de bord des services (GET /api/services/summary/).
+
+apps.services fournit ses compteurs par service (une requête annotée) et sa
+durée moyenne; ce module applique les formules (saturation, état, flux
+horaire, score de risque) et met le résumé en cache INDICATEURS_CACHE_SECONDES
+secondes (invalidé plus tôt par les écritures si des étiquettes sont
+fournies). Il ne dépend d'aucun modèle. L'ancien backend ops/ applique les
+mêmes formules dans ops/indicateurs.py: les garder alignées.
+"""
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from django.conf import settings
+
+from .cache import alire_ou_calculer, lire_ou_calculer
+
+# Fenêtre d'observation des événements
+FENETRE_HEURES = 24
+# Saturation: 10 % par événement actif, plafonnée à 100 %
+SATURATION_PAR_EVENEMENT = 10
+SEUIL_TENSION = 70
+
+
+def saturation(actifs: int) -> int:
+    """Saturation (%) d'un service selon ses événements actifs."""
+    return min(actifs * SATURATION_PAR_EVENEMENT, 100)
+
+
+def etat(saturation_service: int) -> str:
+    """État NORMAL / TENSION correspondant à une saturation."""
+    return 'TENSION' if saturation_service >= SEUIL_TENSION else 'NORMAL'
+
+
+def resume_services(
+    lignes: Iterable[Dict],
+    attente_minutes: Optional[float],
+    fenetre_heures: int = FENETRE_HEURES
+) -> Dict:
+    """
+    Résumé du tableau de bord au format de l'ancien endpoint ops/.
+
+    Args:
+        lignes: Par service: id, nom, etat, actifs, evenements, critiques
+            (compteurs sur la fenêtre)
+        attente_minutes: Durée moyenne de prise en charge sur la fenêtre
+        fenetre_heures: Durée de la fenêtre des compteurs
+    """
+    services: List[Dict] = []
+    evenements = critiques = tension = 0
+    for ligne in lignes:
+        services.append({
+            'id': ligne['id'],
+            'nom': ligne['nom'],
+            'etat': ligne['etat'],
+            'saturation': saturation(ligne['actifs']),
+            'event_count': ligne['evenements'],
+        })
+        evenements += ligne['evenements']
+        critiques += ligne['critiques']
+        tension += ligne['etat'] == 'TENSION'
+
+    # Score sur 10: part d'événements critiques et part de services en tension
+    part_critiques = critiques / evenements if evenements else 0
+    part_tension = tension / len(services) if services else 0
+    risque = 10 * (part_critiques + part_tension) / 2
+
+    return {
+        'services': services,
+        'kpis': {
+            'waiting_avg': f"{int(attente_minutes)}m" if attente_minutes else '--',
+            'flux_hour': round(evenements / fenetre_heures),
+            'risk_score': f"{risque:.1f}",
+        },
+    }
+
+
+def _duree_cache(duree: Optional[int]) -> int:
+    return getattr(settings, 'INDICATEURS_CACHE_SECONDES', 30) if duree is None else duree
+
+
+def en_cache(
+    cle: str,
+    calculer: Callable[[], Dict],
+    duree: Optional[int] = None,
+    etiquettes: Iterable[str] = ()
+) -> Dict:
+    """
+    Résumé en cache, recalculé par `calculer` à expiration ou à l'invalidation
+    de l'une des `etiquettes` (apps.core.cache).
+    """
+    return lire_ou_calculer(f'indicateurs:{cle}', calculer, etiquettes, _duree_cache(duree))
+
+
+async def aen_cache(
+    cle: str,
+    calculer: Callable[[], Awaitable[Dict]],
+    duree: Optional[int] = None,
+    etiquettes: Iterable[str] = ()
+) -> Dict:
+    """Version asynchrone de en_cache (même entrée), `calculer` est une coroutine."""
+    return await alire_ou_calculer(f'indicateurs:{cle}', calculer, etiquettes, _duree_cache(duree))
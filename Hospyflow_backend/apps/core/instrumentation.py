@@ -0,0 +1,192 @@
+"""
+Instrumentation des requêtes SQL: nombre, durée totale et requêtes répétées.
+
+Une Mesure est active dans un contexte (contextvars: suit les sync_to_async
+des vues asynchrones); toutes les connexions y enregistrent leurs requêtes
+via un execute_wrapper posé à leur création. Sans mesure active, le coût est
+une lecture de variable de contexte par requête SQL.
+
+    with Mesure('tableau_bord') as mesure:
+        ...
+    mesure.nombre, mesure.duree_ms, mesure.doublons()
+
+BudgetRequetesMiddleware mesure chaque requête HTTP, compare le nombre de
+requêtes SQL au budget de la vue (attribut `budget_requetes`, sinon
+REQUETES_BUDGET_DEFAUT) et journalise les dépassements; en DEBUG, les
+mesures sont renvoyées dans les en-têtes X-Requetes-*.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Dict, List, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger('hospyflow.requetes')
+
+_mesure_courante: ContextVar[Optional['Mesure']] = ContextVar('mesure_requetes', default=None)
+
+# Listes de paramètres (IN (%s, %s, ...)) et littéraux ramenés à une même empreinte
+_LISTE_PARAMETRES = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+_LITTERAUX = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def empreinte(sql: str) -> str:
+    """Forme normalisée d'une requête, indépendante de ses paramètres."""
+    return _LITTERAUX.sub('?', _LISTE_PARAMETRES.sub('(...)', sql))
+
+
+class Mesure:
+    """Requêtes SQL exécutées pendant un bloc (imbricable: les mesures parentes comptent aussi)."""
+
+    def __init__(self, nom: str):
+        self.nom = nom
+        self.nombre = 0
+        self.duree_ms = 0.0
+        self.empreintes: Counter = Counter()
+        self._parente: Optional[Mesure] = None
+        self._jeton = None
+
+    def __enter__(self) -> 'Mesure':
+        self._parente = _mesure_courante.get()
+        self._jeton = _mesure_courante.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        _mesure_courante.reset(self._jeton)
+
+    def enregistrer(self, sql: str, duree_ms: float):
+        mesure = self
+        while mesure is not None:
+            mesure.nombre += 1
+            mesure.duree_ms += duree_ms
+            mesure.empreintes[empreinte(sql)] += 1
+            mesure = mesure._parente
+
+    def doublons(self) -> Dict[str, int]:
+        """Empreintes exécutées plusieurs fois (signe d'un N+1), les plus fréquentes d'abord."""
+        return {sql: n for sql, n in self.empreintes.most_common() if n > 1}
+
+
+def _enregistrer_requete(execute, sql, params, many, context):
+    mesure = _mesure_courante.get()
+    if mesure is None:
+        return execute(sql, params, many, context)
+    debut = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        mesure.enregistrer(sql, (time.perf_counter() - debut) * 1000)
+
+
+def _instrumenter_connexion(sender, connection, **kwargs):
+    if _enregistrer_requete not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_enregistrer_requete)
+
+
+connection_created.connect(_instrumenter_connexion, dispatch_uid='hospyflow.instrumentation')
+
+
+def mesurer(nom: str) -> Callable:
+    """
+    Décorateur de méthode de service: mesure chaque appel et journalise
+    (DEBUG) le nombre de requêtes, leur durée et les requêtes répétées.
+    """
+    def decorateur(fonction):
+        def journaliser(mesure: Mesure):
+            logger.debug(
+                "service=%s requetes=%d duree_ms=%.1f doublons=%d",
+                nom, mesure.nombre, mesure.duree_ms, len(mesure.doublons())
+            )
+
+        if iscoroutinefunction(fonction):
+            @wraps(fonction)
+            async def appel_async(*args, **kwargs):
+                with Mesure(nom) as mesure:
+                    resultat = await fonction(*args, **kwargs)
+                journaliser(mesure)
+                return resultat
+            return appel_async
+
+        @wraps(fonction)
+        def appel(*args, **kwargs):
+            with Mesure(nom) as mesure:
+                resultat = fonction(*args, **kwargs)
+            journaliser(mesure)
+            return resultat
+        return appel
+    return decorateur
+
+
+# Observateurs des dépassements de budget (fixture pytest budget_requetes)
+observateurs_depassement: List[Callable[[str, Mesure, int], None]] = []
+
+
+class BudgetRequetesMiddleware:
+    """
+    Mesure les requêtes SQL de chaque requête HTTP et vérifie le budget de la vue.
+
+    Actif si REQUETES_INSTRUMENTATION (par défaut: DEBUG) ou si un observateur
+    est enregistré.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self._actif():
+            return self.get_response(request)
+        with Mesure(request.path) as mesure:
+            response = self.get_response(request)
+        return self._verifier(request, response, mesure)
+
+    async def __acall__(self, request):
+        if not self._actif():
+            return await self.get_response(request)
+        with Mesure(request.path) as mesure:
+            response = await self.get_response(request)
+        return self._verifier(request, response, mesure)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Classe de la vue (APIView, ViewSet ou vue Django) pour son budget
+        request.vue_budget = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None)
+
+    @staticmethod
+    def _actif() -> bool:
+        return getattr(settings, 'REQUETES_INSTRUMENTATION', settings.DEBUG) or bool(observateurs_depassement)
+
+    def _verifier(self, request, response, mesure: Mesure):
+        vue = getattr(request, 'vue_budget', None)
+        budget = getattr(vue, 'budget_requetes', None)
+        if budget is None:
+            budget = getattr(settings, 'REQUETES_BUDGET_DEFAUT', 50)
+        endpoint = f"{request.method} {request.path}"
+
+        if mesure.nombre > budget:
+            doublons = mesure.doublons()
+            logger.warning(
+                "endpoint=%r vue=%s requetes=%d budget=%d duree_ms=%.1f doublons=%d requete_repetee=%r",
+                endpoint, getattr(vue, '__name__', None), mesure.nombre, budget, mesure.duree_ms,
+                len(doublons), next(iter(doublons), None)
+            )
+            for observateur in observateurs_depassement:
+                observateur(endpoint, mesure, budget)
+
+        if settings.DEBUG:
+            response['X-Requetes-Nombre'] = str(mesure.nombre)
+            response['X-Requetes-Duree-Ms'] = f"{mesure.duree_ms:.1f}"
+            response['X-Requetes-Doublons'] = str(sum(n - 1 for n in mesure.doublons().values()))
+            response['X-Requetes-Budget'] = str(budget)
+        return response
@@ -0,0 +1,81 @@
+"""
+Sérialisation rapide des listes, en lecture seule, à partir de values().
+
+Les vues de liste à fort volume (événements, workflows) lisent exactement les
+colonnes utiles avec values() et construisent leurs dictionnaires directement,
+sans instancier les modèles ni parcourir les champs DRF ligne par ligne. La
+sortie est celle du ModelSerializer de la ressource, qui reste utilisé pour
+le détail, les écritures et la documentation de l'API:
+
+- mêmes clés, dans le même ordre;
+- dates au format de DateTimeField (fuseau courant, « Z » pour UTC);
+- libellés des choix traduits une fois par liste (libelles);
+- un champ `source='relation.attribut'` sans allow_null est omis lorsque la
+  relation est nulle, comme le fait DRF.
+"""
+from datetime import datetime
+from typing import Dict, Optional, Sequence, Type
+
+from django.db.models import Choices
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.response import Response
+
+
+def libelles(choix: Type[Choices]) -> Dict[str, str]:
+    """Libellés traduits (langue active) des valeurs d'un TextChoices."""
+    return {valeur: str(libelle) for valeur, libelle in choix.choices}
+
+
+def date_iso(valeur: Optional[datetime], fuseau) -> Optional[str]:
+    """Date rendue comme DateTimeField.to_representation (ISO 8601)."""
+    if not valeur:
+        return None
+    texte = valeur.astimezone(fuseau).isoformat()
+    if texte.endswith('+00:00'):
+        texte = texte[:-6] + 'Z'
+    return texte
+
+
+class LigneSerializer(serializers.BaseSerializer):
+    """
+    Serializer en lecture seule de lignes values().
+
+    Les sous-classes déclarent `colonnes` (arguments de values()) et
+    implémentent `representer(ligne)`. Le fuseau courant est lu une fois
+    par serializer (une fois par liste avec many=True).
+    """
+    colonnes: Sequence[str] = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fuseau = timezone.get_current_timezone()
+
+    def to_representation(self, ligne):
+        return self.representer(ligne)
+
+    def representer(self, ligne: dict) -> dict:
+        raise NotImplementedError('`representer()` doit être implémentée.')
+
+
+class ListeRapideMixin:
+    """
+    Vue de liste (ListAPIView) servie par `serializer_liste_class`: filtres,
+    recherche, tri et pagination s'appliquent au queryset de get_queryset(),
+    réduit à values(*colonnes) avant la pagination.
+    """
+    serializer_liste_class: Type[LigneSerializer] = None
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.serializer_liste_class
+        lignes = self.filter_queryset(self.get_queryset()).values(*serializer_class.colonnes)
+
+        page = self.paginate_queryset(lignes)
+        serializer = serializer_class(
+            lignes if page is None else page,
+            many=True,
+            context=self.get_serializer_context()
+        )
+        if page is None:
+            return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
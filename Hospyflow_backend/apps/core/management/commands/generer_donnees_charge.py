@@ -0,0 +1,93 @@
+import time
+from datetime import datetime, time as heure
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from apps.core.donnees_charge import GenerationChargeService, GenerationChargeException
+
+
+class Command(BaseCommand):
+    help = 'Génère un jeu de données de charge reproductible (graine) à l\'échelle d\'un hôpital'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--graine', type=int, default=42, help='Graine des générateurs aléatoires')
+        parser.add_argument(
+            '--prefixe',
+            default='CHG',
+            help='Préfixe des codes et références générés (8 caractères au plus)'
+        )
+        parser.add_argument('--departements', type=int, default=200)
+        parser.add_argument('--personnel', type=int, default=25, help='Utilisateurs par département')
+        parser.add_argument('--types-workflow', type=int, default=12)
+        parser.add_argument(
+            '--workflows',
+            type=int,
+            default=1000000,
+            help='Instances de workflows (avec leurs transitions, environ 6 par instance)'
+        )
+        parser.add_argument('--evenements', type=int, default=2000000)
+        parser.add_argument('--alertes', type=int, default=200000)
+        parser.add_argument('--jours', type=int, default=90, help='Période couverte par les dates')
+        parser.add_argument(
+            '--date-fin',
+            default=None,
+            help='Fin de la période (AAAA-MM-JJ, défaut: maintenant), pour des dates reproductibles'
+        )
+        parser.add_argument('--taille-tranche', type=int, default=20000, help='Lignes par tranche')
+        parser.add_argument(
+            '--processus',
+            type=int,
+            default=None,
+            help='Processus d\'écriture des tranches (défaut: nombre de CPU, 1 sur SQLite)'
+        )
+
+    def handle(self, *args, **options):
+        fin = None
+        if options['date_fin']:
+            jour = parse_date(options['date_fin'])
+            if jour is None:
+                raise CommandError('--date-fin: date AAAA-MM-JJ attendue.')
+            fin = timezone.make_aware(datetime.combine(jour, heure.max.replace(microsecond=0)))
+
+        try:
+            service = GenerationChargeService(
+                graine=options['graine'],
+                prefixe=options['prefixe'],
+                jours=options['jours'],
+                fin=fin,
+                taille_tranche=options['taille_tranche'],
+                processus=options['processus']
+            )
+            self.stdout.write(
+                f'Génération (graine {service.graine}, préfixe {service.prefixe}, '
+                f'{service.processus} processus, {"COPY" if service.copy else "bulk_create"})...'
+            )
+            debut = time.perf_counter()
+
+            def progression(table, lignes):
+                self.stdout.write(f'  {table}: tranche de {lignes} ligne(s) écrite')
+
+            totaux = service.generer(
+                departements=options['departements'],
+                personnel=options['personnel'],
+                types_workflow=options['types_workflow'],
+                workflows=options['workflows'],
+                evenements=options['evenements'],
+                alertes=options['alertes'],
+                progression=progression
+            )
+        except GenerationChargeException as e:
+            raise CommandError(str(e))
+
+        duree = time.perf_counter() - debut
+        for table, nombre in totaux.items():
+            self.stdout.write(f'{table}: {nombre} ligne(s)')
+        total = sum(totaux.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} ligne(s) écrite(s) en {duree:.1f} s ({total / duree:.0f} lignes/s).'
+        ))
+        self.stdout.write(
+            'Tables dérivées à recalculer: reconstruire_files_attente, calculer_distributions_etapes.'
+        )
@@ -0,0 +1,106 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+
+from apps.core.models import TachePlanifiee
+from apps.core.planificateur import TACHES, PlanificateurService, PlanificationException
+
+
+class Command(BaseCommand):
+    help = 'Planificateur des tâches périodiques (statistiques, règles d\'alerte, goulots)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--intervalle',
+            type=float,
+            default=settings.PLANIFICATEUR_INTERVALLE_SECONDES,
+            help='Délai entre deux recherches de tâches dues (secondes)'
+        )
+        parser.add_argument(
+            '--une-fois',
+            action='store_true',
+            help='Exécuter les tâches dues puis quitter'
+        )
+        parser.add_argument(
+            '--executer',
+            metavar='TACHE',
+            help='Exécuter immédiatement une tâche (si aucune autre instance ne l\'exécute)'
+        )
+        parser.add_argument(
+            '--etat',
+            action='store_true',
+            help='Afficher les tâches, leurs prochaines exécutions et leurs durées'
+        )
+
+    def handle(self, *args, **options):
+        service = PlanificateurService()
+        service.synchroniser()
+
+        if options['etat']:
+            self.afficher_etat(service)
+            return
+
+        if options['executer']:
+            try:
+                tache = service.obtenir_tache(options['executer'])
+            except PlanificationException as e:
+                raise CommandError(f'{e} Tâches: {", ".join(sorted(TACHES))}')
+            service.demander_execution(tache.nom)
+            if not service.reclamer(tache, timezone.now()):
+                raise CommandError(f"Tâche '{tache.nom}' en cours sur une autre instance ou désactivée.")
+            self.rendre_compte(service.executer(tache))
+            return
+
+        # Arrêt propre (docker stop): la tâche en cours se termine
+        self.arret = False
+
+        def arreter(signum, frame):
+            self.arret = True
+        signal.signal(signal.SIGTERM, arreter)
+
+        self.stdout.write(
+            f'Planificateur démarré ({service.instance}, {len(TACHES)} tâche(s): '
+            f'{", ".join(sorted(TACHES))}).'
+        )
+        try:
+            while not self.arret:
+                close_old_connections()
+                executees = service.executer_dues()
+                if options['une_fois']:
+                    self.stdout.write(f'{executees} tâche(s) exécutée(s).')
+                    break
+                time.sleep(options['intervalle'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write('Arrêt du planificateur.')
+
+    def rendre_compte(self, execution):
+        if execution.erreur:
+            raise CommandError(f'{execution.tache.nom}: échec après {execution.duree_ms} ms\n{execution.erreur}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{execution.tache.nom}: {execution.resultat or "terminée"} '
+            f'({execution.duree_ms} ms, {execution.requetes} requête(s) SQL)'
+        ))
+
+    def afficher_etat(self, service):
+        metriques = service.metriques()
+        self.stdout.write(
+            f"{'tâche':<26} {'planification':<22} {'prochaine exécution':<20} {'dernier':<7} "
+            f"{'exéc.':>6} {'échecs':>6} {'moy. ms':>8} {'max ms':>8}"
+        )
+        for etat in TachePlanifiee.objects.filter(nom__in=TACHES):
+            m = metriques.get(etat.nom, {})
+            prochaine = timezone.localtime(etat.prochaine_execution).strftime('%Y-%m-%d %H:%M:%S')
+            if not etat.est_active:
+                prochaine = 'désactivée'
+            elif etat.verrouillee_par:
+                prochaine = f'en cours ({etat.verrouillee_par})'
+            self.stdout.write(
+                f"{etat.nom:<26} {etat.planification:<22} {prochaine:<20} {etat.dernier_statut or '-':<7} "
+                f"{m.get('executions', 0):>6} {m.get('echecs', 0):>6} "
+                f"{m.get('duree_moyenne_ms') or 0:>8.0f} {m.get('duree_max_ms') or 0:>8}"
+            )
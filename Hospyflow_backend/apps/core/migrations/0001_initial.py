@@ -0,0 +1,58 @@
+# Generated by Django 5.0.14 on 2026-10-19 01:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TachePlanifiee',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nom', models.CharField(max_length=100, unique=True, verbose_name='Nom')),
+                ('planification', models.CharField(help_text='Ex: cron:55 * * * * ou intervalle:300s', max_length=100, verbose_name='Planification')),
+                ('est_active', models.BooleanField(default=True, verbose_name='Active')),
+                ('prochaine_execution', models.DateTimeField(verbose_name='Prochaine exécution')),
+                ('verrouillee_par', models.CharField(blank=True, max_length=255, verbose_name='Verrouillée par')),
+                ('verrouillee_jusqua', models.DateTimeField(blank=True, null=True, verbose_name="Verrouillée jusqu'à")),
+                ('derniere_execution', models.DateTimeField(blank=True, null=True, verbose_name='Dernière exécution')),
+                ('dernier_statut', models.CharField(blank=True, choices=[('SUCCES', 'Succès'), ('ECHEC', 'Échec')], max_length=10, verbose_name='Dernier statut')),
+                ('derniere_duree_ms', models.PositiveIntegerField(blank=True, null=True, verbose_name='Dernière durée (ms)')),
+                ('nombre_executions', models.PositiveIntegerField(default=0, verbose_name="Nombre d'exécutions")),
+                ('nombre_echecs', models.PositiveIntegerField(default=0, verbose_name="Nombre d'échecs")),
+            ],
+            options={
+                'verbose_name': 'Tâche planifiée',
+                'verbose_name_plural': 'Tâches planifiées',
+                'ordering': ['nom'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ExecutionTache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('instance', models.CharField(max_length=255, verbose_name='Instance')),
+                ('statut', models.CharField(choices=[('EN_COURS', 'En cours'), ('SUCCES', 'Succès'), ('ECHEC', 'Échec')], default='EN_COURS', max_length=10, verbose_name='Statut')),
+                ('demarree_le', models.DateTimeField(verbose_name='Démarrée le')),
+                ('terminee_le', models.DateTimeField(blank=True, null=True, verbose_name='Terminée le')),
+                ('duree_ms', models.PositiveIntegerField(blank=True, null=True, verbose_name='Durée (ms)')),
+                ('requetes', models.PositiveIntegerField(blank=True, null=True, verbose_name='Requêtes SQL')),
+                ('resultat', models.TextField(blank=True, verbose_name='Résultat')),
+                ('erreur', models.TextField(blank=True, verbose_name='Erreur')),
+                ('tache', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='executions', to='core.tacheplanifiee', verbose_name='Tâche')),
+            ],
+            options={
+                'verbose_name': 'Exécution de tâche',
+                'verbose_name_plural': 'Exécutions de tâches',
+                'ordering': ['-demarree_le'],
+                'indexes': [models.Index(fields=['tache', 'demarree_le'], name='core_execut_tache_i_8ebbb2_idx')],
+            },
+        ),
+    ]
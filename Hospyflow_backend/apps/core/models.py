@@ -0,0 +1,87 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class TachePlanifiee(models.Model):
+    """
+    État partagé d'une tâche du planificateur (apps/core/planificateur.py).
+    Le verrou (instance et échéance du bail) garantit qu'une seule instance
+    du planificateur exécute la tâche à la fois.
+    """
+
+    class Statut(models.TextChoices):
+        SUCCES = 'SUCCES', _('Succès')
+        ECHEC = 'ECHEC', _('Échec')
+
+    nom = models.CharField(_('Nom'), max_length=100, unique=True)
+    planification = models.CharField(
+        _('Planification'),
+        max_length=100,
+        help_text=_('Ex: cron:55 * * * * ou intervalle:300s')
+    )
+    est_active = models.BooleanField(_('Active'), default=True)
+    prochaine_execution = models.DateTimeField(_('Prochaine exécution'))
+
+    # Verrou distribué: posé par une mise à jour conditionnelle
+    verrouillee_par = models.CharField(_('Verrouillée par'), max_length=255, blank=True)
+    verrouillee_jusqua = models.DateTimeField(_("Verrouillée jusqu'à"), null=True, blank=True)
+
+    # Métriques cumulées
+    derniere_execution = models.DateTimeField(_('Dernière exécution'), null=True, blank=True)
+    dernier_statut = models.CharField(
+        _('Dernier statut'),
+        max_length=10,
+        choices=Statut.choices,
+        blank=True
+    )
+    derniere_duree_ms = models.PositiveIntegerField(_('Dernière durée (ms)'), null=True, blank=True)
+    nombre_executions = models.PositiveIntegerField(_("Nombre d'exécutions"), default=0)
+    nombre_echecs = models.PositiveIntegerField(_("Nombre d'échecs"), default=0)
+
+    class Meta:
+        verbose_name = _('Tâche planifiée')
+        verbose_name_plural = _('Tâches planifiées')
+        ordering = ['nom']
+
+    def __str__(self):
+        return f"{self.nom} ({self.planification})"
+
+
+class ExecutionTache(models.Model):
+    """Historique des exécutions des tâches planifiées."""
+
+    class Statut(models.TextChoices):
+        EN_COURS = 'EN_COURS', _('En cours')
+        SUCCES = 'SUCCES', _('Succès')
+        ECHEC = 'ECHEC', _('Échec')
+
+    tache = models.ForeignKey(
+        TachePlanifiee,
+        on_delete=models.CASCADE,
+        related_name='executions',
+        verbose_name=_('Tâche')
+    )
+    instance = models.CharField(_('Instance'), max_length=255)
+    statut = models.CharField(
+        _('Statut'),
+        max_length=10,
+        choices=Statut.choices,
+        default=Statut.EN_COURS
+    )
+    demarree_le = models.DateTimeField(_('Démarrée le'))
+    terminee_le = models.DateTimeField(_('Terminée le'), null=True, blank=True)
+    duree_ms = models.PositiveIntegerField(_('Durée (ms)'), null=True, blank=True)
+    requetes = models.PositiveIntegerField(_('Requêtes SQL'), null=True, blank=True)
+    resultat = models.TextField(_('Résultat'), blank=True)
+    erreur = models.TextField(_('Erreur'), blank=True)
+
+    class Meta:
+        verbose_name = _('Exécution de tâche')
+        verbose_name_plural = _('Exécutions de tâches')
+        ordering = ['-demarree_le']
+        indexes = [
+            models.Index(fields=['tache', 'demarree_le']),
+        ]
+
+    def __str__(self):
+        return f"{self.tache.nom} - {self.demarree_le:%Y-%m-%d %H:%M} ({self.get_statut_display()})"
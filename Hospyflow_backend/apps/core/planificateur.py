@@ -0,0 +1,341 @@
+"""
+Service Pattern - Planificateur de tâches périodiques (commande planificateur).
+
+Les tâches sont déclarées dans le module `taches.py` de chaque application
+(chargé au démarrage), à intervalle fixe ou selon une expression cron:
+
+    @tache('evaluation_regles', intervalle=300, gigue=30)
+    def evaluer_regles():
+        ...
+        return '3 alerte(s) générée(s).'
+
+Plusieurs instances du planificateur peuvent tourner: une tâche due est
+réservée par une mise à jour conditionnelle de TachePlanifiee (verrou avec
+bail de `duree_max` secondes, repris si l'instance s'arrête), qui fixe aussi
+sa prochaine exécution. Chaque exécution est historisée (ExecutionTache:
+durée, requêtes SQL, résultat ou erreur) et journalisée.
+"""
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, FrozenSet, List, Optional
+
+from django.conf import settings
+from django.db.models import Avg, Count, F, Max, Q
+from django.utils import timezone
+
+from .instrumentation import Mesure
+from .models import ExecutionTache, TachePlanifiee
+
+logger = logging.getLogger('hospyflow.planificateur')
+
+
+class PlanificationException(Exception):
+    """Exception personnalisée pour les erreurs de planification."""
+    pass
+
+
+class Cron:
+    """
+    Expression cron à 5 champs (minute heure jour mois jour-de-semaine), en
+    heure locale: *, valeurs, listes (1,15), plages (1-5) et pas (*/10, 8-18/2).
+    Comme cron, si le jour du mois et le jour de semaine sont tous deux
+    restreints, l'un ou l'autre suffit.
+    """
+
+    BORNES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        champs = expression.split()
+        if len(champs) != 5:
+            raise PlanificationException(f"Expression cron à 5 champs attendue: '{expression}'.")
+
+        self.minutes, self.heures, self.jours, self.mois, jours_semaine = (
+            self._analyser(champ, *bornes) for champ, bornes in zip(champs, self.BORNES)
+        )
+        # 0 et 7: dimanche
+        self.jours_semaine = frozenset(j % 7 for j in jours_semaine)
+        self.jour_restreint = champs[2] != '*'
+        self.semaine_restreinte = champs[4] != '*'
+
+    def _analyser(self, champ: str, minimum: int, maximum: int) -> FrozenSet[int]:
+        valeurs = set()
+        try:
+            for element in champ.split(','):
+                plage, separateur, pas = element.partition('/')
+                pas = int(pas) if separateur else 1
+                if plage == '*':
+                    debut, fin = minimum, maximum
+                elif '-' in plage:
+                    debut, fin = (int(v) for v in plage.split('-', 1))
+                else:
+                    debut = int(plage)
+                    fin = maximum if separateur else debut
+                if pas < 1 or not minimum <= debut <= fin <= maximum:
+                    raise ValueError(element)
+                valeurs.update(range(debut, fin + 1, pas))
+        except ValueError:
+            raise PlanificationException(f"Champ cron invalide '{champ}' dans '{self.expression}'.")
+        return frozenset(valeurs)
+
+    def _jour_valide(self, jour: date) -> bool:
+        du_mois = jour.day in self.jours
+        de_semaine = jour.isoweekday() % 7 in self.jours_semaine
+        if self.jour_restreint and self.semaine_restreinte:
+            return du_mois or de_semaine
+        return du_mois and de_semaine
+
+    def suivante(self, apres: datetime) -> datetime:
+        """Première échéance strictement postérieure à `apres` (à la minute)."""
+        moment = timezone.localtime(apres).replace(tzinfo=None, second=0, microsecond=0)
+        moment += timedelta(minutes=1)
+        limite = moment + timedelta(days=366 * 4)
+
+        while moment < limite:
+            if moment.month not in self.mois:
+                annee, mois = divmod(moment.month, 12)
+                moment = datetime(moment.year + annee, mois + 1, 1)
+            elif not self._jour_valide(moment.date()):
+                moment = datetime.combine(moment.date() + timedelta(days=1), datetime.min.time())
+            elif moment.hour not in self.heures:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return timezone.make_aware(moment)
+        raise PlanificationException(f"Aucune échéance pour '{self.expression}'.")
+
+
+class Tache:
+    """Tâche déclarée: fonction sans argument, planifiée par intervalle ou par cron."""
+
+    def __init__(
+        self,
+        nom: str,
+        fonction: Callable[[], Optional[str]],
+        intervalle: Optional[int] = None,
+        cron: Optional[str] = None,
+        gigue: int = 0,
+        duree_max: int = 3600
+    ):
+        """
+        Args:
+            nom: Identifiant unique de la tâche
+            fonction: Appelée à chaque exécution; son retour est historisé
+            intervalle: Secondes entre deux exécutions
+            cron: Expression cron (heure locale), à la place de l'intervalle
+            gigue: Retard aléatoire ajouté à chaque échéance (0 à `gigue` secondes),
+                pour étaler les tâches de même échéance
+            duree_max: Bail du verrou (secondes): au-delà, une autre instance
+                peut reprendre la tâche
+        """
+        if (intervalle is None) == (cron is None):
+            raise PlanificationException(f"Tâche '{nom}': intervalle ou cron attendu (un seul).")
+        if intervalle is not None and intervalle <= 0:
+            raise PlanificationException(f"Tâche '{nom}': intervalle positif attendu.")
+        self.nom = nom
+        self.fonction = fonction
+        self.intervalle = intervalle
+        self.cron = Cron(cron) if cron else None
+        self.gigue = gigue
+        self.duree_max = duree_max
+
+    @property
+    def planification(self) -> str:
+        if self.cron:
+            return f'cron:{self.cron.expression}'
+        return f'intervalle:{self.intervalle}s'
+
+    def prochaine(self, apres: datetime) -> datetime:
+        """Prochaine échéance après `apres`, gigue comprise."""
+        if self.cron:
+            echeance = self.cron.suivante(apres)
+        else:
+            echeance = apres + timedelta(seconds=self.intervalle)
+        if self.gigue:
+            echeance += timedelta(seconds=random.uniform(0, self.gigue))
+        return echeance
+
+
+# Registre des tâches déclarées (modules taches.py des applications)
+TACHES: Dict[str, Tache] = {}
+
+
+def tache(nom: str, **options) -> Callable:
+    """Décorateur: déclare la fonction comme tâche planifiée (options de Tache)."""
+    def decorateur(fonction):
+        if nom in TACHES:
+            raise PlanificationException(f"Tâche '{nom}' déjà déclarée.")
+        TACHES[nom] = Tache(nom, fonction, **options)
+        return fonction
+    return decorateur
+
+
+class PlanificateurService:
+    """
+    Service d'exécution des tâches dues, partagé par les instances du
+    planificateur via la base.
+    """
+
+    def __init__(self, instance: Optional[str] = None):
+        self.instance = instance or f'{socket.gethostname()}:{os.getpid()}'
+
+    @staticmethod
+    def obtenir_tache(nom: str) -> Tache:
+        if nom not in TACHES:
+            raise PlanificationException(f"Tâche inconnue: '{nom}'.")
+        return TACHES[nom]
+
+    def synchroniser(self) -> List[TachePlanifiee]:
+        """
+        Crée l'état des tâches déclarées et replanifie celles dont la
+        planification a changé depuis le dernier déploiement.
+        """
+        maintenant = timezone.now()
+        etats = {etat.nom: etat for etat in TachePlanifiee.objects.filter(nom__in=TACHES)}
+        for nom, declaree in TACHES.items():
+            etat = etats.get(nom)
+            if etat is None:
+                etats[nom] = TachePlanifiee.objects.create(
+                    nom=nom,
+                    planification=declaree.planification,
+                    prochaine_execution=declaree.prochaine(maintenant)
+                )
+            elif etat.planification != declaree.planification:
+                etat.planification = declaree.planification
+                etat.prochaine_execution = declaree.prochaine(maintenant)
+                etat.save(update_fields=['planification', 'prochaine_execution'])
+        return list(etats.values())
+
+    def reclamer(self, declaree: Tache, maintenant: datetime) -> bool:
+        """
+        Réserve une tâche due pour cette instance (mise à jour conditionnelle):
+        verrou libre ou bail expiré, puis prochaine échéance fixée.
+        """
+        return TachePlanifiee.objects.filter(
+            nom=declaree.nom,
+            est_active=True,
+            prochaine_execution__lte=maintenant
+        ).filter(
+            Q(verrouillee_jusqua__isnull=True) | Q(verrouillee_jusqua__lt=maintenant)
+        ).update(
+            verrouillee_par=self.instance,
+            verrouillee_jusqua=maintenant + timedelta(seconds=declaree.duree_max),
+            prochaine_execution=declaree.prochaine(maintenant)
+        ) == 1
+
+    def executer_dues(self) -> int:
+        """
+        Exécute, l'une après l'autre, les tâches dues que cette instance a pu réserver.
+
+        Returns:
+            Nombre de tâches exécutées
+        """
+        maintenant = timezone.now()
+        dues = TachePlanifiee.objects.filter(
+            nom__in=TACHES,
+            est_active=True,
+            prochaine_execution__lte=maintenant
+        ).order_by('prochaine_execution').values_list('nom', flat=True)
+
+        executees = 0
+        for nom in list(dues):
+            if self.reclamer(TACHES[nom], timezone.now()):
+                self.executer(TACHES[nom])
+                executees += 1
+        return executees
+
+    def executer(self, declaree: Tache) -> ExecutionTache:
+        """Exécute une tâche réservée, historise le résultat et libère le verrou."""
+        etat = TachePlanifiee.objects.get(nom=declaree.nom)
+        demarree_le = timezone.now()
+        # Exécutions d'une instance arrêtée en cours de tâche (bail expiré)
+        etat.executions.filter(statut=ExecutionTache.Statut.EN_COURS).update(
+            statut=ExecutionTache.Statut.ECHEC,
+            terminee_le=demarree_le,
+            erreur='Interrompue: bail du verrou expiré.'
+        )
+        execution = ExecutionTache.objects.create(
+            tache=etat,
+            instance=self.instance,
+            demarree_le=demarree_le
+        )
+
+        debut = time.perf_counter()
+        with Mesure(f'tache:{declaree.nom}') as mesure:
+            try:
+                resultat = declaree.fonction()
+                execution.statut = ExecutionTache.Statut.SUCCES
+                execution.resultat = '' if resultat is None else str(resultat)
+            except Exception:
+                execution.statut = ExecutionTache.Statut.ECHEC
+                execution.erreur = traceback.format_exc()
+        execution.duree_ms = int((time.perf_counter() - debut) * 1000)
+        execution.requetes = mesure.nombre
+        execution.terminee_le = timezone.now()
+        execution.save(update_fields=[
+            'statut', 'resultat', 'erreur', 'duree_ms', 'requetes', 'terminee_le'
+        ])
+
+        echec = execution.statut == ExecutionTache.Statut.ECHEC
+        TachePlanifiee.objects.filter(pk=etat.pk, verrouillee_par=self.instance).update(
+            verrouillee_par='',
+            verrouillee_jusqua=None
+        )
+        TachePlanifiee.objects.filter(pk=etat.pk).update(
+            derniere_execution=demarree_le,
+            dernier_statut=execution.statut,
+            derniere_duree_ms=execution.duree_ms,
+            nombre_executions=F('nombre_executions') + 1,
+            nombre_echecs=F('nombre_echecs') + int(echec)
+        )
+
+        journaliser = logger.error if echec else logger.info
+        journaliser(
+            "tache=%s statut=%s duree_ms=%d requetes=%d instance=%s",
+            declaree.nom, execution.statut, execution.duree_ms, execution.requetes, self.instance
+        )
+        return execution
+
+    def demander_execution(self, nom: str) -> TachePlanifiee:
+        """Rend une tâche due immédiatement (exécutée au prochain passage du planificateur)."""
+        declaree = self.obtenir_tache(nom)
+        maintenant = timezone.now()
+        etat, cree = TachePlanifiee.objects.get_or_create(
+            nom=nom,
+            defaults={'planification': declaree.planification, 'prochaine_execution': maintenant}
+        )
+        if not cree and etat.prochaine_execution > maintenant:
+            etat.prochaine_execution = maintenant
+            etat.save(update_fields=['prochaine_execution'])
+        return etat
+
+    @staticmethod
+    def purger_historique(jours: Optional[int] = None) -> int:
+        """Supprime l'historique des exécutions de plus de `jours` (PLANIFICATEUR_HISTORIQUE_JOURS)."""
+        jours = settings.PLANIFICATEUR_HISTORIQUE_JOURS if jours is None else jours
+        supprimees, _ = ExecutionTache.objects.filter(
+            demarree_le__lt=timezone.now() - timedelta(days=jours)
+        ).exclude(statut=ExecutionTache.Statut.EN_COURS).delete()
+        return supprimees
+
+    @staticmethod
+    def metriques() -> Dict[str, Dict]:
+        """Durées par tâche sur l'historique conservé (une requête groupée)."""
+        return {
+            ligne['tache__nom']: ligne
+            for ligne in ExecutionTache.objects.exclude(
+                statut=ExecutionTache.Statut.EN_COURS
+            ).values('tache__nom').annotate(
+                executions=Count('id'),
+                echecs=Count('id', filter=Q(statut=ExecutionTache.Statut.ECHEC)),
+                duree_moyenne_ms=Avg('duree_ms'),
+                duree_max_ms=Max('duree_ms'),
+                requetes_moyenne=Avg('requetes')
+            ).order_by()
+        }
@@ -0,0 +1,9 @@
+"""
+Backend PostgreSQL avec pool de connexions par processus.
+
+ENGINE = 'apps.core.postgresql_pool' (activé par DB_POOL_TAILLE, voir
+config/settings.py): une connexion « fermée » par Django en fin de requête
+est rendue au pool au lieu d'être fermée, et la requête suivante la reprend
+sans nouvelle poignée de main. Utile pour les workers ASGI, où les
+connexions persistantes (CONN_MAX_AGE) ne sont pas recommandées.
+"""
@@ -0,0 +1,144 @@
+"""
+DatabaseWrapper PostgreSQL dont les connexions viennent d'un pool par processus.
+
+OPTIONS reconnues (retirées avant la connexion):
+    pool_taille: connexions simultanées maximales par processus
+    pool_attente: attente maximale (s) d'une connexion libre, puis OperationalError
+"""
+import os
+import threading
+import weakref
+from collections import deque
+from typing import Callable, Dict, Tuple
+
+from django.db.backends.postgresql import base, creation
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from django.utils.asyncio import async_unsafe
+
+# Statuts de transaction libpq (psycopg2 et psycopg renvoient les mêmes entiers)
+TRANSACTION_INACTIVE = 0
+TRANSACTION_INCONNUE = 4
+
+
+class PoolConnexions:
+    """
+    Pool borné de connexions DB-API, partagé par les threads d'un processus.
+
+    Les connexions libres sont réutilisées (la plus récente d'abord); au-delà
+    de `taille` connexions prêtées, prendre() attend `attente` secondes.
+    """
+
+    def __init__(self, taille: int, attente: float):
+        self.taille = taille
+        self.attente = attente
+        self._libres = deque()
+        self._places = threading.BoundedSemaphore(taille)
+        self._verrou = threading.Lock()
+
+    def prendre(self, ouvrir: Callable):
+        """Connexion libre et utilisable, sinon ouverte par `ouvrir`."""
+        if not self._places.acquire(timeout=self.attente):
+            raise base.Database.OperationalError(
+                f"pool de connexions épuisé ({self.taille} connexions, attente {self.attente}s)"
+            )
+        try:
+            while True:
+                with self._verrou:
+                    connexion = self._libres.pop() if self._libres else None
+                if connexion is None:
+                    return ouvrir()
+                # Vérification locale, sans aller-retour vers le serveur
+                if not connexion.closed and connexion.info.transaction_status != TRANSACTION_INCONNUE:
+                    return connexion
+                self._fermer(connexion)
+        except BaseException:
+            self._places.release()
+            raise
+
+    def rendre(self, connexion):
+        """Remet la connexion dans le pool (transaction en cours annulée)."""
+        try:
+            if not connexion.closed:
+                if connexion.info.transaction_status != TRANSACTION_INACTIVE:
+                    connexion.rollback()
+                with self._verrou:
+                    self._libres.append(connexion)
+        except base.Database.Error:
+            self._fermer(connexion)
+        finally:
+            self._places.release()
+
+    def vider(self):
+        """Ferme les connexions libres."""
+        with self._verrou:
+            libres, self._libres = list(self._libres), deque()
+        for connexion in libres:
+            self._fermer(connexion)
+
+    @staticmethod
+    def _fermer(connexion):
+        try:
+            connexion.close()
+        except base.Database.Error:
+            pass
+
+
+_pools: Dict[Tuple[str, int, str], PoolConnexions] = {}
+_pools_verrou = threading.Lock()
+
+
+def vider_pools(alias: str):
+    """Ferme les connexions libres des pools de l'alias (processus courant)."""
+    with _pools_verrou:
+        pools = [pool for cle, pool in _pools.items() if cle[:2] == (alias, os.getpid())]
+    for pool in pools:
+        pool.vider()
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def destroy_test_db(self, *args, **kwargs):
+        # Les connexions libres du pool empêcheraient le DROP DATABASE
+        self.connection.close()
+        vider_pools(self.connection.alias)
+        return super().destroy_test_db(*args, **kwargs)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def _pool(self, conn_params: dict) -> PoolConnexions:
+        # Un pool par alias, par processus (les workers gunicorn sont forkés) et
+        # par paramètres de connexion (base de test créée par le test runner)
+        cle = (self.alias, os.getpid(), repr(sorted(conn_params.items())))
+        with _pools_verrou:
+            if cle not in _pools:
+                options = self.settings_dict['OPTIONS']
+                _pools[cle] = PoolConnexions(
+                    int(options.get('pool_taille', 10)),
+                    float(options.get('pool_attente', 10))
+                )
+            return _pools[cle]
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool_taille', None)
+        params.pop('pool_attente', None)
+        return params
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        pool = self._pool(conn_params)
+        connexion = pool.prendre(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+        # Un DatabaseWrapper détruit sans avoir été fermé (thread d'une requête
+        # ASGI interrompue) rend tout de même sa connexion au pool
+        self._restitution = weakref.finalize(self, pool.rendre, connexion)
+        # Positionné par get_new_connection pour une nouvelle connexion
+        niveau = self.settings_dict['OPTIONS'].get('isolation_level')
+        self.isolation_level = IsolationLevel(niveau) if niveau is not None else IsolationLevel.READ_COMMITTED
+        return connexion
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self._restitution()
@@ -0,0 +1,36 @@
+"""
+Fixture pytest des budgets de requêtes SQL (plugin chargé par pytest.ini).
+
+Tout endpoint appelé pendant un test qui utilise `budget_requetes` et dépasse
+le budget de sa vue (attribut `budget_requetes`, sinon REQUETES_BUDGET_DEFAUT)
+fait échouer le test, avec les requêtes répétées en cause:
+
+    def test_liste_services(client, budget_requetes):
+        client.get('/api/services/')
+
+La fixture rend la liste des dépassements constatés (endpoint, mesure, budget).
+"""
+import pytest
+
+from apps.core.instrumentation import observateurs_depassement
+
+
+@pytest.fixture
+def budget_requetes():
+    depassements = []
+
+    def observer(endpoint, mesure, budget):
+        depassements.append((endpoint, mesure, budget))
+
+    observateurs_depassement.append(observer)
+    try:
+        yield depassements
+    finally:
+        observateurs_depassement.remove(observer)
+
+    if depassements:
+        lignes = []
+        for endpoint, mesure, budget in depassements:
+            lignes.append(f"{endpoint}: {mesure.nombre} requêtes SQL (budget {budget}, {mesure.duree_ms:.1f} ms)")
+            lignes.extend(f"    x{n} {sql[:200]}" for sql, n in list(mesure.doublons().items())[:5])
+        pytest.fail("Budget de requêtes dépassé:\n" + "\n".join(lignes), pytrace=False)
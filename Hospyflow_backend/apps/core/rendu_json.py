@@ -0,0 +1,69 @@
+"""
+Rendu et lecture JSON rapides pour DRF.
+
+JSONRapideRenderer encode avec orjson (dépendance optionnelle) le même JSON
+que JSONRenderer: UTF-8 compact, dates ISO 8601 en « Z » pour UTC, et, pour
+les types qu'orjson ne connaît pas (Decimal, chaînes traduites paresseuses,
+timedelta, QuerySet...), les conversions de l'encodeur de DRF. Écarts, à
+valeur égale: les flottants très petits ou très grands (0.00001 pour 1e-05,
+1e16 pour 1e+16); NaN et l'infini deviennent null au lieu d'une erreur.
+Sans orjson, ou pour un rendu indenté (API navigable,
+`Accept: application/json; indent=4`), le rendu est celui de JSONRenderer
+(module json de la bibliothèque standard).
+
+JSONRapideParser lit les corps JSON avec orjson, avec le même repli (seul
+écart: les entiers hors 64 bits sont lus comme des flottants).
+"""
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # Dépendance optionnelle: repli sur json
+    orjson = None
+
+# Séparateurs de ligne Unicode échappés comme JSONRenderer (sous-ensemble strict de JavaScript)
+_SEPARATEURS_LIGNE = (('\u2028'.encode(), b'\\u2028'), ('\u2029'.encode(), b'\\u2029'))
+
+# Dates UTC en « Z » et clés non textuelles converties, comme l'encodeur de DRF
+OPTIONS_ORJSON = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+
+class JSONRapideRenderer(JSONRenderer):
+    """JSONRenderer encodé par orjson lorsqu'il est installé."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            contenu = orjson.dumps(data, default=JSONEncoder().default, option=OPTIONS_ORJSON)
+        except orjson.JSONEncodeError:
+            # Entiers hors 64 bits, chaînes invalides...: le rendu standard tranche
+            return super().render(data, accepted_media_type, renderer_context)
+
+        for separateur, echappement in _SEPARATEURS_LIGNE:
+            if separateur in contenu:
+                contenu = contenu.replace(separateur, echappement)
+        return contenu
+
+
+class JSONRapideParser(JSONParser):
+    """JSONParser décodé par orjson lorsqu'il est installé (corps UTF-8)."""
+    renderer_class = JSONRapideRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encodage = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encodage.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
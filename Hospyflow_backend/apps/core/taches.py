@@ -0,0 +1,10 @@
+"""
+Tâches planifiées communes (commande planificateur).
+"""
+from .planificateur import PlanificateurService, tache
+
+
+@tache('purge_historique_taches', cron='30 3 * * *')
+def purger_historique_taches():
+    """Historique des exécutions au-delà de PLANIFICATEUR_HISTORIQUE_JOURS."""
+    return f'{PlanificateurService.purger_historique()} exécution(s) supprimée(s).'
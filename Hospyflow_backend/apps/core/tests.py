@@ -0,0 +1,528 @@
+"""
+Tests des utilitaires partagés: exports en flux, mesure des requêtes SQL et
+budgets par vue, données de charge, cache des lectures par étiquettes,
+planificateur, rendu JSON rapide, validateurs des lectures conditionnelles.
+"""
+import csv
+import gzip
+import io
+import json
+import threading
+import time
+import uuid
+from datetime import date, datetime, time as heure, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from apps.accounts.models import Department
+from apps.analytics.views import TableauBordView
+from apps.events.models import MicroEvenement
+from apps.workflows.models import InstanceWorkflow, TransitionEtape
+
+from . import exports, rendu_json
+from .cache import etiquette, etiquettes_ecriture, invalider, lire_ou_calculer, versions_etiquettes
+from .conditionnel import validateurs
+from .donnees_charge import GenerationChargeException, GenerationChargeService
+from .exports import ExportException, compresser_gzip, encoder_csv, encoder_ndjson, reponse_export
+from .instrumentation import Mesure, observateurs_depassement
+from .models import ExecutionTache, TachePlanifiee
+from .planificateur import TACHES, Cron, PlanificateurService, PlanificationException, Tache
+from .rendu_json import JSONRapideParser, JSONRapideRenderer
+
+
+# ----------------------------------------------------------------------
+# Exports en flux
+# ----------------------------------------------------------------------
+
+LIGNES = [(i, f'ligne {i}, "citée"', datetime(2024, 5, 6, 9, i)) for i in range(50)]
+
+
+def test_csv_par_blocs(monkeypatch):
+    monkeypatch.setattr(exports, 'TAILLE_BLOC', 256)
+    blocs = list(encoder_csv(['id', 'titre', 'horodatage'], iter(LIGNES)))
+
+    assert len(blocs) > 1
+    lignes = list(csv.reader(io.StringIO(b''.join(blocs).decode('utf-8'))))
+    assert lignes[0] == ['id', 'titre', 'horodatage']
+    assert lignes[1] == ['0', 'ligne 0, "citée"', '2024-05-06T09:00:00']
+    assert len(lignes) == len(LIGNES) + 1
+
+
+def test_ndjson_par_blocs(monkeypatch):
+    monkeypatch.setattr(exports, 'TAILLE_BLOC', 256)
+    blocs = list(encoder_ndjson(['id', 'titre', 'horodatage'], iter(LIGNES)))
+
+    assert len(blocs) > 1
+    assert all(bloc.endswith(b'\n') for bloc in blocs)
+    objets = [json.loads(ligne) for ligne in b''.join(blocs).decode('utf-8').splitlines()]
+    assert objets[49] == {'id': 49, 'titre': 'ligne 49, "citée"', 'horodatage': '2024-05-06T09:49:00'}
+    assert list(encoder_ndjson(['id'], iter([]))) == []
+
+
+def test_gzip_decompressible():
+    blocs = [f'{i};'.encode() * 100 for i in range(20)]
+    assert gzip.decompress(b''.join(compresser_gzip(iter(blocs)))) == b''.join(blocs)
+
+
+def test_format_inconnu():
+    with pytest.raises(ExportException):
+        reponse_export([], ['id'], 'export', format='xml')
+
+
+@pytest.mark.parametrize('parametres, valide', [
+    ({'debut': '2024-02-28', 'fin': '2024-02-29'}, True),
+    ({'fin': '2024-03-01'}, True),
+    ({'debut': '2024-02-30'}, False),
+    ({'debut': '2024-03-02', 'fin': '2024-03-01'}, False),
+])
+def test_periode_export(parametres, valide):
+    periode = exports.PeriodeExportSerializer(data=parametres)
+    assert periode.is_valid() == valide
+    if valide:
+        assert all(isinstance(v, date) for v in periode.validated_data.values())
+
+
+# ----------------------------------------------------------------------
+# Mesure des requêtes et budgets
+# ----------------------------------------------------------------------
+
+@pytest.mark.django_db
+def test_mesure_compte_les_requetes_imbriquees():
+    connection.ensure_connection()
+    with Mesure('externe') as externe:
+        Department.objects.count()
+        with Mesure('interne') as interne:
+            Department.objects.count()
+            Department.objects.count()
+
+    assert interne.nombre == 2
+    assert externe.nombre == 3
+    assert len(externe.doublons()) == 1
+
+
+@pytest.mark.django_db
+def test_depassement_de_budget_signale(client_admin, monkeypatch, settings):
+    settings.DEBUG = True
+    monkeypatch.setattr(TableauBordView, 'budget_requetes', 1)
+    depassements = []
+
+    def observer(*depassement):
+        depassements.append(depassement)
+
+    observateurs_depassement.append(observer)
+    try:
+        reponse = client_admin.get('/api/analytics/tableau-de-bord/')
+    finally:
+        observateurs_depassement.remove(observer)
+
+    assert reponse['X-Requetes-Budget'] == '1'
+    [(endpoint, mesure, budget)] = depassements
+    assert endpoint == 'GET /api/analytics/tableau-de-bord/'
+    assert budget == 1 and mesure.nombre == int(reponse['X-Requetes-Nombre']) > 1
+
+
+# ----------------------------------------------------------------------
+# Données de charge
+# ----------------------------------------------------------------------
+
+FIN_CHARGE = datetime(2025, 3, 14, 18, 0, tzinfo=dt_timezone.utc)
+VOLUMES = {
+    'departements': 3, 'personnel': 4, 'types_workflow': 2,
+    'workflows': 30, 'evenements': 40, 'alertes': 10,
+}
+
+
+def generer(prefixe, graine=7, **volumes):
+    service = GenerationChargeService(graine=graine, prefixe=prefixe, jours=10, fin=FIN_CHARGE, taille_tranche=16)
+    return service.generer(**{**VOLUMES, **volumes})
+
+
+def empreinte_evenements(prefixe):
+    return list(
+        MicroEvenement.objects.filter(departement__code__startswith=f'{prefixe}-').order_by('id')
+        .values_list('titre', 'severite', 'statut', 'survenu_le', 'signale_le', 'resolu_le')
+    )
+
+
+@pytest.mark.django_db
+def test_donnees_charge_generees_par_tranches():
+    tranches = []
+    service = GenerationChargeService(graine=7, prefixe='CHG', jours=10, fin=FIN_CHARGE, taille_tranche=16)
+    totaux = service.generer(**VOLUMES, progression=lambda table, lignes: tranches.append(table))
+
+    assert totaux['departements'] == 3 and totaux['utilisateurs'] == 12
+    assert totaux['evenements'] == 40 and totaux['alertes'] == 10
+    # Tranches de 16 lignes principales: 2 + 3 + 1
+    assert tranches == ['workflows'] * 2 + ['evenements'] * 3 + ['alertes']
+
+    instances = InstanceWorkflow.objects.filter(reference_patient__startswith='CHG-')
+    transitions = TransitionEtape.objects.filter(instance__in=instances)
+    assert instances.count() == 30
+    assert totaux['workflows'] == 30 + transitions.count()
+    # Historique complet: chaque instance a sa transition de démarrage
+    assert transitions.filter(etape_source=None).count() == 30
+    assert not MicroEvenement.objects.filter(signale_le__gt=FIN_CHARGE).exists()
+
+
+@pytest.mark.django_db
+def test_donnees_charge_reproductibles():
+    generer('A')
+    generer('B')
+    generer('C', graine=8)
+
+    assert empreinte_evenements('A') == empreinte_evenements('B')
+    assert empreinte_evenements('A') != empreinte_evenements('C')
+
+
+@pytest.mark.django_db
+def test_commande_generer_donnees_charge():
+    sortie = io.StringIO()
+    call_command(
+        'generer_donnees_charge', '--prefixe', 'cmd', '--departements', '2', '--personnel', '2',
+        '--types-workflow', '1', '--workflows', '5', '--evenements', '5', '--alertes', '5',
+        '--date-fin', '2025-03-14', stdout=sortie
+    )
+
+    assert 'evenements: 5 ligne(s)' in sortie.getvalue()
+    assert Department.objects.filter(code__startswith='CMD-').count() == 2
+    assert not MicroEvenement.objects.filter(signale_le__date__gt=date(2025, 3, 14)).exists()
+
+
+@pytest.mark.django_db
+def test_donnees_charge_invalident_les_lectures():
+    generer('A', workflows=0, alertes=0)
+    versions = versions_etiquettes(['evenements'])
+    generer('B', workflows=0, alertes=0)
+    assert versions_etiquettes(['evenements']) != versions
+
+
+@pytest.mark.django_db
+def test_donnees_charge_parametres_invalides():
+    with pytest.raises(GenerationChargeException):
+        GenerationChargeService(prefixe='CHG-1')
+    with pytest.raises(GenerationChargeException):
+        GenerationChargeService(taille_tranche=0)
+    generer('A', workflows=0, evenements=0, alertes=0)
+    with pytest.raises(GenerationChargeException, match='existent déjà'):
+        generer('A')
+    with pytest.raises(CommandError):
+        call_command('generer_donnees_charge', '--date-fin', '14/03/2025')
+
+
+# ----------------------------------------------------------------------
+# Cache des lectures
+# ----------------------------------------------------------------------
+
+class Compteur:
+    """Calcul qui compte ses appels."""
+
+    def __init__(self, valeur='valeur', attente=0):
+        self.valeur = valeur
+        self.attente = attente
+        self.appels = 0
+
+    def __call__(self):
+        self.appels += 1
+        time.sleep(self.attente)
+        return self.valeur
+
+
+def test_etiquettes_ecriture_couvrent_chaque_portee():
+    jour = date(2024, 5, 2)
+    assert etiquettes_ecriture('evenements', 3, jour) == [
+        'evenements',
+        'evenements:departement:3',
+        'evenements:jour:2024-05-02',
+        'evenements:departement:3:jour:2024-05-02',
+    ]
+    assert etiquettes_ecriture('evenements') == ['evenements']
+
+
+def test_lire_ou_calculer_sert_le_cache_jusqua_invalidation():
+    calcul = Compteur()
+    etiquettes = [etiquette('evenements', departement=1)]
+
+    assert lire_ou_calculer('test:lecture', calcul, etiquettes) == 'valeur'
+    assert lire_ou_calculer('test:lecture', calcul, etiquettes) == 'valeur'
+    assert calcul.appels == 1
+
+    invalider(*etiquettes_ecriture('evenements', 1))
+    lire_ou_calculer('test:lecture', calcul, etiquettes)
+    assert calcul.appels == 2
+
+
+def test_invalidation_limitee_a_sa_portee():
+    calcul = Compteur()
+    etiquettes = [etiquette('evenements', departement=1)]
+    lire_ou_calculer('test:portee', calcul, etiquettes)
+
+    # Écriture dans un autre département: la lecture du département 1 reste valide
+    invalider(*etiquettes_ecriture('evenements', 2))
+    lire_ou_calculer('test:portee', calcul, etiquettes)
+    assert calcul.appels == 1
+
+
+def test_duree_nulle_desactive_le_cache():
+    calcul = Compteur()
+    lire_ou_calculer('test:sans-cache', calcul, ['evenements'], duree=0)
+    lire_ou_calculer('test:sans-cache', calcul, ['evenements'], duree=0)
+    assert calcul.appels == 2
+
+
+def test_un_seul_calcul_pendant_une_ruee():
+    calcul = Compteur(attente=0.2)
+    resultats = []
+
+    def lire():
+        resultats.append(lire_ou_calculer('test:ruee', calcul, ['evenements']))
+
+    lecteurs = [threading.Thread(target=lire) for _ in range(5)]
+    for lecteur in lecteurs:
+        lecteur.start()
+    for lecteur in lecteurs:
+        lecteur.join()
+
+    assert resultats == ['valeur'] * 5
+    assert calcul.appels == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_ecriture_en_transaction_non_mise_en_cache():
+    calcul = Compteur()
+    with transaction.atomic():
+        invalider('evenements')
+        # Lecture d'une écriture non validée: jamais servie depuis le cache
+        lire_ou_calculer('test:transaction', calcul, ['evenements'])
+        lire_ou_calculer('test:transaction', calcul, ['evenements'])
+    assert calcul.appels == 2
+
+
+def test_versions_etiquettes_stables_sans_ecriture():
+    versions = versions_etiquettes(['alertes', 'evenements'])
+    assert versions_etiquettes(['evenements', 'alertes']) == versions
+    invalider('alertes')
+    assert versions_etiquettes(['alertes', 'evenements'])[1] == versions[1]
+    assert versions_etiquettes(['alertes', 'evenements'])[0] != versions[0]
+
+
+# ----------------------------------------------------------------------
+# Planificateur
+# ----------------------------------------------------------------------
+
+def local(*date_heure):
+    return timezone.make_aware(datetime(*date_heure))
+
+
+@pytest.mark.parametrize('expression, apres, attendue', [
+    ('*/15 * * * *', (2025, 3, 14, 10, 7, 30), (2025, 3, 14, 10, 15)),
+    ('55 * * * *', (2025, 3, 14, 10, 55), (2025, 3, 14, 11, 55)),
+    ('30 3 * * *', (2025, 12, 31, 4, 0), (2026, 1, 1, 3, 30)),
+    ('0 8-18/2 * * 1-5', (2025, 3, 14, 18, 30), (2025, 3, 17, 8, 0)),
+    # Jour du mois ou jour de semaine (dimanche: 0 ou 7)
+    ('0 0 1 * 7', (2025, 3, 14, 12, 0), (2025, 3, 16, 0, 0)),
+    ('0 12 29 2 *', (2025, 3, 1, 0, 0), (2028, 2, 29, 12, 0)),
+])
+def test_cron_echeance_suivante(expression, apres, attendue):
+    assert Cron(expression).suivante(local(*apres)) == local(*attendue)
+
+
+@pytest.mark.parametrize('expression', ['* * * *', '60 * * * *', '*/0 * * * *', '5-1 * * * *', 'a * * * *'])
+def test_cron_invalide(expression):
+    with pytest.raises(PlanificationException):
+        Cron(expression)
+
+
+def test_tache_intervalle_ou_cron():
+    with pytest.raises(PlanificationException):
+        Tache('t', lambda: None)
+    with pytest.raises(PlanificationException):
+        Tache('t', lambda: None, intervalle=60, cron='* * * * *')
+    with pytest.raises(PlanificationException):
+        Tache('t', lambda: None, intervalle=0)
+
+    moment = local(2025, 3, 14, 10, 0)
+    avec_gigue = Tache('t', lambda: None, intervalle=60, gigue=30)
+    assert all(
+        moment + timedelta(seconds=60) <= avec_gigue.prochaine(moment) <= moment + timedelta(seconds=90)
+        for _ in range(20)
+    )
+
+
+def test_taches_d_analyse_declarees():
+    assert {'statistiques_quotidiennes', 'evaluation_regles', 'detection_goulots'} <= set(TACHES)
+
+
+@pytest.fixture
+def tache_test():
+    """Tâche déclarée pour le test, retirée du registre ensuite."""
+    appels = []
+
+    def fonction():
+        appels.append(timezone.now())
+        if len(appels) > 1:
+            raise RuntimeError('échec simulé')
+        return 'ok'
+
+    declaree = Tache('test_planificateur', fonction, intervalle=60, duree_max=120)
+    TACHES[declaree.nom] = declaree
+    yield declaree
+    TACHES.pop(declaree.nom, None)
+
+
+@pytest.mark.django_db
+def test_une_seule_instance_reclame_une_tache_due(tache_test):
+    maintenant = timezone.now()
+    TachePlanifiee.objects.create(
+        nom=tache_test.nom,
+        planification=tache_test.planification,
+        prochaine_execution=maintenant - timedelta(seconds=1)
+    )
+    premiere, seconde = PlanificateurService('a'), PlanificateurService('b')
+
+    assert premiere.reclamer(tache_test, maintenant)
+    assert not seconde.reclamer(tache_test, maintenant)
+
+    # Bail expiré (instance arrêtée): la tâche peut être reprise
+    apres_bail = maintenant + timedelta(seconds=tache_test.duree_max + tache_test.intervalle + 1)
+    assert seconde.reclamer(tache_test, apres_bail)
+    assert TachePlanifiee.objects.get(nom=tache_test.nom).verrouillee_par == 'b'
+
+
+@pytest.mark.django_db
+def test_executer_historise_succes_et_echec(tache_test):
+    service = PlanificateurService('a')
+    TachePlanifiee.objects.create(
+        nom=tache_test.nom,
+        planification=tache_test.planification,
+        prochaine_execution=timezone.now() - timedelta(seconds=1)
+    )
+
+    assert service.reclamer(tache_test, timezone.now())
+    succes = service.executer(tache_test)
+    echec = service.executer(tache_test)
+
+    assert succes.statut == ExecutionTache.Statut.SUCCES
+    assert succes.resultat == 'ok'
+    assert echec.statut == ExecutionTache.Statut.ECHEC
+    assert 'échec simulé' in echec.erreur
+
+    etat = TachePlanifiee.objects.get(nom=tache_test.nom)
+    assert (etat.nombre_executions, etat.nombre_echecs) == (2, 1)
+    assert etat.verrouillee_par == '' and etat.verrouillee_jusqua is None
+    assert PlanificateurService.metriques()[tache_test.nom]['echecs'] == 1
+
+
+@pytest.mark.django_db
+def test_synchroniser_puis_demander_execution(tache_test):
+    service = PlanificateurService('a')
+    etats = {etat.nom: etat for etat in service.synchroniser()}
+    assert set(etats) == set(TACHES)
+    assert etats[tache_test.nom].prochaine_execution > timezone.now()
+
+    service.demander_execution(tache_test.nom)
+    assert service.executer_dues() == 1
+    assert ExecutionTache.objects.get(tache__nom=tache_test.nom).statut == ExecutionTache.Statut.SUCCES
+    with pytest.raises(PlanificationException):
+        service.demander_execution('inconnue')
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url, nom', [
+    ('/api/analytics/statistiques/generer/', 'statistiques_quotidiennes'),
+    ('/api/alerts/regles/evaluer/', 'evaluation_regles'),
+])
+def test_vues_planifient_sans_executer(client_admin, url, nom):
+    reponse = client_admin.post(url)
+
+    assert reponse.status_code == 202
+    assert reponse.json()['tache'] == nom
+    assert TachePlanifiee.objects.get(nom=nom).prochaine_execution <= timezone.now()
+    assert not ExecutionTache.objects.exists()
+
+
+# ----------------------------------------------------------------------
+# Rendu JSON
+# ----------------------------------------------------------------------
+
+DONNEES_JSON = {
+    'entier': 12,
+    'grand_entier': 2 ** 63 - 1,
+    'flottant': 0.1,
+    'decimal': Decimal('12.50'),
+    'texte': 'Réa\u2028née « Douala »\u2029',
+    'traduit': gettext_lazy('Urgences'),
+    'utc': datetime(2025, 3, 14, 9, 30, 5, 123456, tzinfo=dt_timezone.utc),
+    'douala': datetime(2025, 3, 14, 9, 30, tzinfo=ZoneInfo('Africa/Douala')),
+    'naif': datetime(2025, 3, 14, 9, 30, 0, 500),
+    'jour': date(2025, 3, 14),
+    'heure': heure(9, 30, 0, 250),
+    'duree': timedelta(minutes=90),
+    'identifiant': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'liste': [None, True, False, {'imbrique': []}],
+    3: 'clé entière',
+}
+
+
+@pytest.mark.parametrize('donnees', [DONNEES_JSON, [DONNEES_JSON] * 3, [], {}, 'texte'])
+def test_rendu_rapide_identique_a_drf(donnees):
+    assert rendu_json.orjson is not None
+    assert JSONRapideRenderer().render(donnees) == JSONRenderer().render(donnees)
+
+
+def test_rendu_rapide_replis(monkeypatch):
+    # Entier hors 64 bits et rendu indenté: rendu standard
+    assert JSONRapideRenderer().render({'n': 2 ** 70}) == JSONRenderer().render({'n': 2 ** 70})
+    contexte = {'indent': 2}
+    assert JSONRapideRenderer().render(DONNEES_JSON, renderer_context=contexte) == \
+        JSONRenderer().render(DONNEES_JSON, renderer_context=contexte)
+
+    monkeypatch.setattr(rendu_json, 'orjson', None)
+    assert JSONRapideRenderer().render(DONNEES_JSON) == JSONRenderer().render(DONNEES_JSON)
+
+
+def test_lecture_rapide():
+    corps = '{"titre": "Réanimation", "valeurs": [1, 2.5, null]}'.encode()
+    assert JSONRapideParser().parse(io.BytesIO(corps)) == {'titre': 'Réanimation', 'valeurs': [1, 2.5, None]}
+    with pytest.raises(ParseError):
+        JSONRapideParser().parse(io.BytesIO(b'{"titre": '))
+
+
+# ----------------------------------------------------------------------
+# Lectures conditionnelles
+# ----------------------------------------------------------------------
+
+@pytest.mark.django_db
+def test_validateurs_dependent_des_versions_et_de_l_utilisateur(medecin, administrateur):
+    requete = RequestFactory().get('/api/analytics/tableau-de-bord/')
+    etag_medecin, derniere_modification = validateurs(requete, medecin, ['evenements'])
+    etag_admin, _ = validateurs(requete, administrateur, ['evenements'])
+
+    assert etag_medecin != etag_admin
+    assert derniere_modification is not None
+    assert validateurs(requete, medecin, ['evenements'])[0] == etag_medecin
+
+    invalider('evenements')
+    assert validateurs(requete, medecin, ['evenements'])[0] != etag_medecin
+
+
+@pytest.mark.django_db
+def test_validateurs_periodiques(medecin, periode_etag_figee, monkeypatch):
+    requete = RequestFactory().get('/api/analytics/tableau-de-bord/')
+    etag = validateurs(requete, medecin, ['evenements'], periode=60)[0]
+    assert validateurs(requete, medecin, ['evenements'], periode=60)[0] == etag
+
+    # Minute suivante: indicateurs dépendant de l'heure à recalculer
+    plus_tard = time.time() + 60
+    monkeypatch.setattr('apps.core.conditionnel.time', SimpleNamespace(time=lambda: plus_tard))
+    assert validateurs(requete, medecin, ['evenements'], periode=60)[0] != etag
@@ -7,6 +7,8 @@ from .models import (
     PieceJointeEvenement,
     CommentaireEvenement
 )
+from apps.accounts.models import User
+from apps.core.lignes import LigneSerializer, date_iso, libelles
 
 
 class CategorieEvenementSerializer(serializers.ModelSerializer):
@@ -104,6 +106,63 @@ class MicroEvenementSerializer(serializers.ModelSerializer):
         ]
 
 
+class MicroEvenementListeSerializer(LigneSerializer):
+    """Sortie de MicroEvenementSerializer pour les listes, lue avec values()."""
+    
+    colonnes = (
+        'id', 'rapporteur', 'rapporteur__first_name', 'rapporteur__last_name', 'rapporteur__role',
+        'departement', 'departement__name', 'instance_workflow', 'categorie', 'categorie__nom',
+        'titre', 'description', 'severite', 'statut', 'delai_estime_minutes', 'lieu',
+        'survenu_le', 'signale_le', 'resolu_le', 'modifie_le',
+        'resolu_par', 'commentaire_resolution', 'est_recurrent'
+    )
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.roles = libelles(User.Role)
+        self.severites = libelles(MicroEvenement.Severite)
+        self.statuts = libelles(MicroEvenement.Statut)
+    
+    def representer(self, ligne):
+        fuseau = self.fuseau
+        donnees = {'id': ligne['id'], 'rapporteur': ligne['rapporteur']}
+        if ligne['rapporteur'] is not None:
+            donnees['rapporteur_nom'] = f"{ligne['rapporteur__first_name']} {ligne['rapporteur__last_name']}"
+            donnees['rapporteur_role'] = self.roles.get(ligne['rapporteur__role'], ligne['rapporteur__role'])
+        donnees['departement'] = ligne['departement']
+        if ligne['departement'] is not None:
+            donnees['departement_nom'] = ligne['departement__name']
+        donnees['instance_workflow'] = ligne['instance_workflow']
+        donnees['categorie'] = ligne['categorie']
+        if ligne['categorie'] is not None:
+            donnees['categorie_nom'] = ligne['categorie__nom']
+        
+        signale_le, resolu_le = ligne['signale_le'], ligne['resolu_le']
+        donnees.update({
+            'titre': ligne['titre'],
+            'description': ligne['description'],
+            'severite': ligne['severite'],
+            'severite_display': self.severites.get(ligne['severite'], ligne['severite']),
+            'statut': ligne['statut'],
+            'statut_display': self.statuts.get(ligne['statut'], ligne['statut']),
+            'delai_estime_minutes': ligne['delai_estime_minutes'],
+            'lieu': ligne['lieu'],
+            'survenu_le': date_iso(ligne['survenu_le'], fuseau),
+            'signale_le': date_iso(signale_le, fuseau),
+            'resolu_le': date_iso(resolu_le, fuseau),
+            'modifie_le': date_iso(ligne['modifie_le'], fuseau),
+            'resolu_par': ligne['resolu_par'],
+            'commentaire_resolution': ligne['commentaire_resolution'],
+            'est_recurrent': ligne['est_recurrent'],
+            'est_resolu': ligne['statut'] == MicroEvenement.Statut.RESOLU,
+            'duree_resolution_minutes': (
+                int((resolu_le - signale_le).total_seconds() / 60)
+                if resolu_le and signale_le else None
+            ),
+        })
+        return donnees
+
+
 class MicroEvenementDetailSerializer(MicroEvenementSerializer):
     """Serializer détaillé avec commentaires et pièces jointes."""
     
@@ -1,12 +1,16 @@
 """
 Service Pattern - Couche de logique métier pour les événements.
 """
+from datetime import date, datetime, time, timedelta
 from typing import Optional, Dict, Any, List
 from django.utils import timezone
 from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
 
 from .models import MicroEvenement, CategorieEvenement, CommentaireEvenement
 from .repositories import MicroEvenementRepository, CommentaireEvenementRepository
+from apps.core.cache import etiquette, lire_ou_calculer
 
 
 class EvenementException(Exception):
@@ -227,30 +231,51 @@ class GestionEvenementService:
     
     def obtenir_tendances(self, jours: int = 7) -> List[Dict[str, Any]]:
         """
-        Analyse les tendances sur les derniers jours.
+        Analyse les tendances sur les derniers jours (journées locales).
+        
+        Depuis le cache tant qu'aucun événement signalé pendant la période n'a
+        été écrit (étiquettes par jour, apps/core/cache.py).
         
         Returns:
             Liste de statistiques quotidiennes
         """
-        tendances = []
-        maintenant = timezone.now()
+        aujourdhui = timezone.localdate()
+        periode = [aujourdhui - timedelta(days=i) for i in range(jours - 1, -1, -1)]
+        if not periode:
+            return []
         
-        for i in range(jours):
-            date_debut = (maintenant - timezone.timedelta(days=i)).replace(
-                hour=0, minute=0, second=0, microsecond=0
-            )
-            date_fin = date_debut + timezone.timedelta(days=1)
-            
-            evenements_jour = MicroEvenement.objects.filter(
-                signale_le__gte=date_debut,
-                signale_le__lt=date_fin
-            )
-            
-            tendances.append({
-                'date': date_debut.date().isoformat(),
-                'total': evenements_jour.count(),
-                'critiques': evenements_jour.filter(severite='CRITIQUE').count(),
-                'resolus': evenements_jour.filter(statut='RESOLU').count()
-            })
+        return lire_ou_calculer(
+            f'evenements:tendances:{aujourdhui.isoformat()}:{jours}',
+            lambda: self._calculer_tendances(periode),
+            [etiquette('evenements', jour=jour) for jour in periode]
+        )
+    
+    @staticmethod
+    def _calculer_tendances(periode: List[date]) -> List[Dict[str, Any]]:
+        """Compteurs quotidiens de la période, en une requête regroupée par jour."""
+        debut = timezone.make_aware(datetime.combine(periode[0], time.min))
+        fin = timezone.make_aware(datetime.combine(periode[-1] + timedelta(days=1), time.min))
+        
+        compteurs = {
+            ligne['jour']: ligne
+            for ligne in MicroEvenement.objects.filter(
+                signale_le__gte=debut,
+                signale_le__lt=fin
+            ).annotate(
+                jour=TruncDate('signale_le', tzinfo=timezone.get_current_timezone())
+            ).values('jour').annotate(
+                total=Count('id'),
+                critiques=Count('id', filter=Q(severite='CRITIQUE')),
+                resolus=Count('id', filter=Q(statut='RESOLU'))
+            ).order_by()
+        }
         
-        return list(reversed(tendances))
+        return [
+            {
+                'date': jour.isoformat(),
+                'total': compteurs.get(jour, {}).get('total', 0),
+                'critiques': compteurs.get(jour, {}).get('critiques', 0),
+                'resolus': compteurs.get(jour, {}).get('resolus', 0)
+            }
+            for jour in periode
+        ]
@@ -0,0 +1,205 @@
+"""
+Tests des micro-événements: export brut en flux (WSGI et ASGI), tendances par
+journée locale, sérialisation rapide des listes, lectures conditionnelles.
+"""
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+import pytest
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from apps.core import exports
+
+from .models import MicroEvenement
+from .serializers import MicroEvenementListeSerializer, MicroEvenementSerializer
+from .services import GestionEvenementService
+
+pytestmark = pytest.mark.django_db
+
+URL_EVENEMENTS = '/api/events/'
+URL_EXPORT = '/api/events/export/'
+
+
+def contenu(reponse):
+    return b''.join(reponse.streaming_content)
+
+
+# ----------------------------------------------------------------------
+# Export
+# ----------------------------------------------------------------------
+
+@pytest.fixture
+def evenements(creer_evenement, autre_departement):
+    """Deux événements du département du médecin (hier, aujourd'hui), un d'un autre département."""
+    hier = creer_evenement(titre='Hier', severite=MicroEvenement.Severite.CRITIQUE)
+    MicroEvenement.objects.filter(pk=hier.pk).update(signale_le=timezone.now() - timedelta(days=1))
+    creer_evenement(titre="Aujourd'hui")
+    creer_evenement(titre='Cardiologie', departement=autre_departement)
+
+
+def test_export_csv_limite_au_departement(client_medecin, evenements):
+    reponse = client_medecin.get(URL_EXPORT)
+
+    assert reponse.status_code == 200
+    assert reponse['Content-Type'].startswith('text/csv')
+    assert reponse['Content-Disposition'] == 'attachment; filename="evenements.csv"'
+    lignes = list(csv.DictReader(io.StringIO(contenu(reponse).decode('utf-8'))))
+    assert [ligne['titre'] for ligne in lignes] == ['Hier', "Aujourd'hui"]
+    assert lignes[0]['departement_code'] == 'URG'
+    assert lignes[0]['rapporteur_email'] == 'medecin@hospyflow.test'
+
+
+def test_export_ndjson_gzip_et_filtres(client_admin, evenements):
+    reponse = client_admin.get(URL_EXPORT, {'sortie': 'ndjson', 'gzip': '1', 'severite': 'CRITIQUE'})
+
+    assert reponse['Content-Type'] == 'application/gzip'
+    assert reponse['Content-Disposition'] == 'attachment; filename="evenements.ndjson.gz"'
+    objets = [json.loads(ligne) for ligne in gzip.decompress(contenu(reponse)).splitlines()]
+    assert [objet['titre'] for objet in objets] == ['Hier']
+
+
+def test_export_par_periode(client_admin, evenements):
+    aujourdhui = timezone.localdate().isoformat()
+    reponse = client_admin.get(URL_EXPORT, {'sortie': 'ndjson', 'debut': aujourdhui, 'fin': aujourdhui})
+
+    titres = [json.loads(ligne)['titre'] for ligne in contenu(reponse).splitlines()]
+    assert sorted(titres) == ["Aujourd'hui", 'Cardiologie']
+
+
+@pytest.mark.parametrize('parametres', [
+    {'debut': '2024-02-30'},
+    {'fin': '2024-13-01'},
+    {'debut': '2024-03-02', 'fin': '2024-03-01'},
+    {'sortie': 'xml'},
+])
+def test_export_parametres_invalides(client_admin, parametres):
+    assert client_admin.get(URL_EXPORT, parametres).status_code == 400
+
+
+@pytest.mark.django_db(transaction=True)
+def test_export_envoye_au_fil_de_la_lecture_sous_asgi(client_admin, evenements, appel_asgi, monkeypatch, recwarn):
+    monkeypatch.setattr(exports, 'TAILLE_BLOC', 64)
+    journal = []
+    parcourir = exports.parcourir
+
+    def parcourir_journalise(requetes):
+        for ligne in parcourir(requetes):
+            journal.append('ligne lue')
+            yield ligne
+    monkeypatch.setattr(exports, 'parcourir', parcourir_journalise)
+
+    appel_asgi(client_admin, URL_EXPORT, journal=journal)
+
+    debut = next(message for message in journal if message != 'ligne lue')
+    assert debut['type'] == 'http.response.start' and debut['status'] == 200
+    envois = [
+        rang for rang, message in enumerate(journal)
+        if message != 'ligne lue' and message['type'] == 'http.response.body' and message.get('body')
+    ]
+    lectures = [rang for rang, message in enumerate(journal) if message == 'ligne lue']
+    # Premier bloc envoyé avant la lecture de la dernière ligne
+    assert len(lectures) == 3 and envois[0] < lectures[-1]
+    corps = b''.join(journal[rang]['body'] for rang in envois).decode('utf-8')
+    assert len(list(csv.DictReader(io.StringIO(corps)))) == 3
+    # Aucun itérateur synchrone lu d'un coup par Django
+    assert not [w for w in recwarn if 'synchronous iterators' in str(w.message)]
+
+
+# ----------------------------------------------------------------------
+# Tendances
+# ----------------------------------------------------------------------
+
+def signale_le(evenement, moment):
+    MicroEvenement.objects.filter(pk=evenement.pk).update(signale_le=moment)
+
+
+def test_tendances_par_journee_locale(creer_evenement):
+    aujourdhui = timezone.localdate()
+    hier = aujourdhui - timedelta(days=1)
+    minuit_hier = timezone.make_aware(datetime.combine(hier, time.min))
+
+    # Début et fin de la journée locale d'hier (la veille ou le jour même en UTC)
+    signale_le(creer_evenement(), minuit_hier + timedelta(minutes=30))
+    signale_le(
+        creer_evenement(severite=MicroEvenement.Severite.CRITIQUE),
+        minuit_hier + timedelta(hours=23, minutes=45)
+    )
+    signale_le(creer_evenement(), minuit_hier - timedelta(minutes=30))
+
+    tendances = GestionEvenementService().obtenir_tendances(jours=3)
+
+    assert [t['date'] for t in tendances] == [
+        (aujourdhui - timedelta(days=n)).isoformat() for n in (2, 1, 0)
+    ]
+    avant_hier, jour_hier, _ = tendances
+    assert (avant_hier['total'], avant_hier['critiques']) == (1, 0)
+    assert (jour_hier['total'], jour_hier['critiques']) == (2, 1)
+
+
+def test_tendances_invalidees_par_un_signalement(creer_evenement):
+    service = GestionEvenementService()
+    assert service.obtenir_tendances(jours=2)[-1]['total'] == 0
+
+    creer_evenement()
+    assert service.obtenir_tendances(jours=2)[-1]['total'] == 1
+
+
+# ----------------------------------------------------------------------
+# Sérialisation des listes
+# ----------------------------------------------------------------------
+
+@pytest.fixture
+def evenements_varies(creer_evenement, medecin):
+    """Un événement résolu complet et un sans rapporteur, département ni catégorie (microsecondes)."""
+    survenu_le = datetime(2025, 3, 14, 23, 40, 12, 345678, tzinfo=dt_timezone.utc)
+    resolu = creer_evenement(
+        survenu_le=survenu_le, statut=MicroEvenement.Statut.RESOLU, resolu_par=medecin,
+        resolu_le=survenu_le + timedelta(minutes=47, microseconds=1), delai_estime_minutes=15,
+        lieu='Box 3', commentaire_resolution='Brancardier arrivé', est_recurrent=True
+    )
+    orphelin = creer_evenement(
+        rapporteur=None, departement=None, categorie=None, survenu_le=survenu_le,
+        severite=MicroEvenement.Severite.CRITIQUE
+    )
+    MicroEvenement.objects.filter(pk=resolu.pk).update(signale_le=survenu_le + timedelta(microseconds=999))
+    MicroEvenement.objects.filter(pk=orphelin.pk).update(signale_le=survenu_le.replace(microsecond=0))
+    return MicroEvenement.objects.order_by('id')
+
+
+@pytest.mark.parametrize('fuseau', ['UTC', 'Africa/Douala', 'Asia/Kolkata', 'America/St_Johns'])
+def test_liste_rapide_identique_au_serializer(evenements_varies, fuseau):
+    with timezone.override(fuseau):
+        attendu = JSONRenderer().render(MicroEvenementSerializer(evenements_varies, many=True).data)
+        lignes = evenements_varies.values(*MicroEvenementListeSerializer.colonnes)
+        rapide = JSONRenderer().render(MicroEvenementListeSerializer(lignes, many=True).data)
+
+    assert rapide == attendu
+    assert b'"departement_nom"' in attendu and b'.345678' in attendu
+
+
+# ----------------------------------------------------------------------
+# Lectures conditionnelles
+# ----------------------------------------------------------------------
+
+def test_liste_304_puis_200_apres_signalement(client_medecin, creer_evenement):
+    creer_evenement()
+    etag = client_medecin.get(URL_EVENEMENTS).headers['ETag']
+    assert client_medecin.get(URL_EVENEMENTS, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    creer_evenement(titre='Lit indisponible')
+    reponse = client_medecin.get(URL_EVENEMENTS, HTTP_IF_NONE_MATCH=etag)
+    assert reponse.status_code == 200
+    assert reponse.headers['ETag'] != etag
+
+
+def test_liste_304_puis_200_apres_modification(client_medecin, creer_evenement):
+    evenement = creer_evenement()
+    etag = client_medecin.get(URL_EVENEMENTS).headers['ETag']
+
+    evenement.statut = MicroEvenement.Statut.RESOLU
+    evenement.save()
+    assert client_medecin.get(URL_EVENEMENTS, HTTP_IF_NONE_MATCH=etag).status_code == 200
@@ -13,7 +13,8 @@ from .views import (
     AjouterCommentaireView,
     MarquerRecurrentView,
     StatistiquesEvenementsView,
-    TendancesEvenementsView
+    TendancesEvenementsView,
+    ExportEvenementsView
 )
 
 urlpatterns = [
@@ -37,4 +38,7 @@ urlpatterns = [
     # Statistiques
     path('statistiques/', StatistiquesEvenementsView.as_view(), name='statistiques_evenements'),
     path('tendances/', TendancesEvenementsView.as_view(), name='tendances_evenements'),
+    
+    # Export brut
+    path('export/', ExportEvenementsView.as_view(), name='export_evenements'),
 ]
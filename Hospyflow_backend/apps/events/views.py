@@ -9,6 +9,7 @@ from .models import MicroEvenement, CategorieEvenement
 from .serializers import (
     CategorieEvenementSerializer,
     MicroEvenementSerializer,
+    MicroEvenementListeSerializer,
     MicroEvenementDetailSerializer,
     CommentaireEvenementSerializer,
     SignalerEvenementSerializer,
@@ -18,6 +19,14 @@ from .serializers import (
 from .services import GestionEvenementService, EvenementException
 from .repositories import MicroEvenementRepository, CategorieEvenementRepository
 from apps.accounts.permissions import IsAdminUser, IsMedicalStaff
+from apps.core.exports import (
+    reponse_export, filtrer_periode, servie_par_asgi, ExportException, PeriodeExportSerializer
+)
+from apps.core.conditionnel import LectureConditionnelleMixin
+from apps.core.lignes import ListeRapideMixin
+
+# Étiquettes des lectures d'événements (ETag des requêtes conditionnelles)
+ETIQUETTES_EVENEMENTS = ['evenements', 'categories', 'departements', 'personnel']
 
 
 class CategorieEvenementListView(generics.ListAPIView):
@@ -29,9 +38,11 @@ class CategorieEvenementListView(generics.ListAPIView):
         return CategorieEvenementRepository.obtenir_toutes_actives()
 
 
-class MicroEvenementListView(generics.ListAPIView):
+class MicroEvenementListView(LectureConditionnelleMixin, ListeRapideMixin, generics.ListAPIView):
     """Liste les micro-événements avec filtres."""
     serializer_class = MicroEvenementSerializer
+    serializer_liste_class = MicroEvenementListeSerializer
+    etiquettes_etag = ETIQUETTES_EVENEMENTS
     permission_classes = [permissions.AllowAny] # Temporaire pour migration
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['departement', 'categorie', 'severite', 'statut', 'est_recurrent']
@@ -59,9 +70,11 @@ class MicroEvenementDetailView(generics.RetrieveAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
 
-class MesEvenementsView(generics.ListAPIView):
+class MesEvenementsView(LectureConditionnelleMixin, ListeRapideMixin, generics.ListAPIView):
     """Liste les événements signalés par l'utilisateur connecté."""
     serializer_class = MicroEvenementSerializer
+    serializer_liste_class = MicroEvenementListeSerializer
+    etiquettes_etag = ETIQUETTES_EVENEMENTS
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
@@ -70,18 +83,23 @@ class MesEvenementsView(generics.ListAPIView):
         )
 
 
-class EvenementsCritiquesView(generics.ListAPIView):
+class EvenementsCritiquesView(LectureConditionnelleMixin, ListeRapideMixin, generics.ListAPIView):
     """Liste les événements critiques non résolus."""
     serializer_class = MicroEvenementSerializer
+    serializer_liste_class = MicroEvenementListeSerializer
+    etiquettes_etag = ETIQUETTES_EVENEMENTS
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
         return MicroEvenementRepository.obtenir_critiques()
 
 
-class EvenementsRecentsView(generics.ListAPIView):
+class EvenementsRecentsView(LectureConditionnelleMixin, ListeRapideMixin, generics.ListAPIView):
     """Liste les événements des dernières 24 heures."""
     serializer_class = MicroEvenementSerializer
+    serializer_liste_class = MicroEvenementListeSerializer
+    etiquettes_etag = ETIQUETTES_EVENEMENTS
+    periode_etag = 60  # Fenêtre glissante
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
@@ -227,9 +245,11 @@ class MarquerRecurrentView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
 
 
-class StatistiquesEvenementsView(APIView):
+class StatistiquesEvenementsView(LectureConditionnelleMixin, APIView):
     """Endpoint pour les statistiques d'événements par département."""
     permission_classes = [permissions.IsAuthenticated]
+    etiquettes_etag = ['evenements', 'personnel']
+    periode_etag = 60  # Résolutions des dernières 24 heures
     
     def get(self, request):
         departement_id = request.query_params.get('departement')
@@ -249,9 +269,11 @@ class StatistiquesEvenementsView(APIView):
         return Response(stats)
 
 
-class TendancesEvenementsView(APIView):
+class TendancesEvenementsView(LectureConditionnelleMixin, APIView):
     """Endpoint pour les tendances d'événements."""
     permission_classes = [permissions.IsAuthenticated]
+    etiquettes_etag = ['evenements']
+    periode_etag = 60  # Derniers jours jusqu'à aujourd'hui
     
     def get(self, request):
         jours = int(request.query_params.get('jours', 7))
@@ -263,3 +285,46 @@ class TendancesEvenementsView(APIView):
             'periode_jours': jours,
             'tendances': tendances
         })
+
+
+class ExportEvenementsView(MicroEvenementListView):
+    """
+    Export brut des micro-événements en flux (CSV ou NDJSON, gzip optionnel).
+    Mêmes filtres que la liste, plus la période de signalement.
+    
+    GET /api/events/export/?sortie=csv|ndjson&gzip=1&debut=AAAA-MM-JJ&fin=AAAA-MM-JJ
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    ordering = ['signale_le']
+    etiquettes_etag = ()
+    
+    COLONNES = [
+        'id', 'signale_le', 'survenu_le', 'titre', 'description',
+        'severite', 'statut', 'categorie__code', 'departement__code', 'lieu',
+        'rapporteur__email', 'instance_workflow_id', 'delai_estime_minutes',
+        'resolu_le', 'resolu_par__email', 'est_recurrent'
+    ]
+    
+    def get(self, request):
+        periode = PeriodeExportSerializer(data=request.query_params)
+        periode.is_valid(raise_exception=True)
+        queryset = filtrer_periode(
+            self.filter_queryset(self.get_queryset()),
+            'signale_le',
+            debut=periode.validated_data.get('debut'),
+            fin=periode.validated_data.get('fin')
+        )
+        
+        try:
+            return reponse_export(
+                [queryset.select_related(None)],
+                self.COLONNES,
+                nom_fichier='evenements',
+                format=request.query_params.get('sortie', 'csv'),
+                gzip=request.query_params.get('gzip') == '1',
+                asynchrone=servie_par_asgi(request)
+            )
+        except ExportException as e:
+            return Response({
+                'erreur': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
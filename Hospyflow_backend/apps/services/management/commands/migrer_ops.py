@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.services.migration_ops import MigrationOpsService, MigrationOpsException, TABLES
+
+
+class Command(BaseCommand):
+    help = 'Migre les données de l\'ancien backend ops/ vers apps.* (par lots, reprise possible)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base',
+            default='legacy',
+            help='Alias de la base ops/ (défaut: legacy, voir LEGACY_DATABASE_URL)'
+        )
+        parser.add_argument(
+            '--tables',
+            nargs='+',
+            choices=TABLES,
+            default=None,
+            help='Tables à migrer (défaut: toutes)'
+        )
+        parser.add_argument(
+            '--taille-lot',
+            type=int,
+            default=5000,
+            help='Lignes lues et insérées par lot'
+        )
+        parser.add_argument(
+            '--paralleles',
+            type=int,
+            default=3,
+            help='Tables migrées simultanément (1 sur SQLite)'
+        )
+        parser.add_argument(
+            '--verifier-seulement',
+            action='store_true',
+            help='Comparer nombres de lignes et empreintes sans rien migrer'
+        )
+        parser.add_argument(
+            '--sans-verification',
+            action='store_true',
+            help='Ne pas comparer les tables après la migration'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            service = MigrationOpsService(
+                base=options['base'],
+                taille_lot=options['taille_lot'],
+                paralleles=options['paralleles']
+            )
+            if not options['verifier_seulement']:
+                def progression(table, lignes):
+                    self.stdout.write(f'  {table}: lot de {lignes} ligne(s) migré')
+
+                totaux = service.migrer(tables=options['tables'], progression=progression)
+                for table, nombre in totaux.items():
+                    self.stdout.write(self.style.SUCCESS(f'{table}: {nombre} ligne(s) migrée(s).'))
+
+            if options['sans_verification']:
+                return
+            resultats = service.verifier(tables=options['tables'])
+        except MigrationOpsException as e:
+            raise CommandError(str(e))
+
+        for table, resultat in resultats.items():
+            ligne = (
+                f"{table}: {resultat['migrees']}/{resultat['source']} ligne(s), "
+                f"empreintes {resultat['empreinte_source']} / {resultat['empreinte_migrees']}"
+            )
+            self.stdout.write(self.style.SUCCESS(ligne) if resultat['ok'] else self.style.ERROR(ligne))
+        if not all(r['ok'] for r in resultats.values()):
+            raise CommandError('Vérification échouée: tables ops/ et migrées différentes.')
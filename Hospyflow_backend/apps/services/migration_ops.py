@@ -0,0 +1,433 @@
+"""
+Service Pattern - Migration de l'ancien backend ops/ vers apps.*
+
+Les tables de l'ancien backend sont lues sur la base 'legacy' par lots
+(pagination par identifiant, sans OFFSET), converties puis insérées par
+bulk_create. Chaque lot est écrit avec ses CorrespondanceMigration dans une
+même transaction: une exécution interrompue reprend après le dernier
+identifiant migré de chaque table. bulk_create n'émet pas de signal: chaque
+lot invalide lui-même les lectures en cache et les ETag qu'il périme.
+
+Les tables sont migrées en parallèle (un thread par table) en deux phases:
+utilisateurs, services et types de flux, puis événements et alertes qui en
+dépendent. verifier() compare, table par table, le nombre de lignes et une
+empreinte du contenu converti calculée des deux côtés.
+"""
+import enum
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone as dt_timezone
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import CorrespondanceMigration, ServiceHospitalier
+from apps.accounts.models import Department, User
+from apps.core.horodatages import horodatages_conserves
+from apps.analytics.signals import invalider_ecritures
+from apps.alerts.models import Alerte
+from apps.events.models import CategorieEvenement, MicroEvenement
+
+
+class MigrationOpsException(Exception):
+    """Exception pour les erreurs de migration depuis ops/."""
+    pass
+
+
+GRAVITE_SEVERITE = {
+    'LOW': MicroEvenement.Severite.FAIBLE,
+    'MEDIUM': MicroEvenement.Severite.MOYEN,
+    'HIGH': MicroEvenement.Severite.ELEVE,
+    'CRITICAL': MicroEvenement.Severite.CRITIQUE,
+}
+GRAVITE_PRIORITE = {
+    'LOW': Alerte.Priorite.BASSE,
+    'MEDIUM': Alerte.Priorite.NORMALE,
+    'HIGH': Alerte.Priorite.HAUTE,
+    'CRITICAL': Alerte.Priorite.URGENTE,
+}
+
+# Table logique -> (table ops/, colonnes lues)
+SOURCES = {
+    'utilisateurs': ('auth_user', [
+        'id', 'username', 'email', 'password', 'first_name', 'last_name',
+        'is_staff', 'is_superuser', 'is_active', 'date_joined', 'last_login',
+    ]),
+    'services': ('ops_service', ['id', 'nom', 'localisation', 'etat']),
+    'flux': ('ops_typeflux', ['id', 'nom', 'duree_standard']),
+    'evenements': ('ops_microevenement', [
+        'id', 'personnel_id', 'service_id', 'type_flux_id', 'horodatage',
+        'description', 'niveau_gravite', 'est_valide',
+    ]),
+    'alertes': ('ops_alerte', [
+        'id', 'service_id', 'message', 'niveau_gravite', 'genere_le', 'est_resolu',
+    ]),
+}
+PHASES = [['utilisateurs', 'services', 'flux'], ['evenements', 'alertes']]
+TABLES = [table for phase in PHASES for table in phase]
+
+# Champs horodatés automatiquement qui reçoivent les dates d'origine
+CHAMPS_HORODATES = [
+    (MicroEvenement, 'signale_le'),
+    (MicroEvenement, 'modifie_le'),
+    (Alerte, 'cree_le'),
+]
+
+DOMAINE_EMAIL_OPS = 'ops.hospyflow.local'
+
+
+def _horodatage(valeur) -> Optional[datetime]:
+    """Date lue sur la base ops/ (texte ou naïve en UTC) en date avec fuseau."""
+    if isinstance(valeur, str):
+        valeur = parse_datetime(valeur)
+    if valeur is not None and timezone.is_naive(valeur):
+        valeur = timezone.make_aware(valeur, dt_timezone.utc)
+    return valeur
+
+
+def _canonique(valeur):
+    """Représentation stable d'une valeur pour l'empreinte."""
+    if isinstance(valeur, datetime):
+        return valeur.astimezone(dt_timezone.utc).isoformat()
+    if isinstance(valeur, enum.Enum):
+        return valeur.value
+    return valeur
+
+
+def _hacher(ligne: tuple) -> int:
+    contenu = repr(tuple(_canonique(v) for v in ligne)).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(contenu, digest_size=8).digest(), 'big')
+
+
+class MigrationOpsService:
+    """
+    Service de migration des données de l'ancien backend ops/.
+    """
+
+    def __init__(self, base: str = 'legacy', taille_lot: int = 5000, paralleles: int = 3):
+        if base not in connections.databases:
+            raise MigrationOpsException(
+                f"Base '{base}' non configurée (définir LEGACY_DATABASE_URL)."
+            )
+        if taille_lot < 1:
+            raise MigrationOpsException("La taille de lot doit être positive.")
+        self.base = base
+        self.taille_lot = taille_lot
+        # SQLite n'accepte qu'un écrivain à la fois
+        self.paralleles = 1 if connection.vendor == 'sqlite' else max(paralleles, 1)
+        self._cache: Dict[str, Dict[int, int]] = {}
+
+    # Lecture de la base ops/
+
+    def lire(self, table: str, apres: int = 0) -> Iterator[List[dict]]:
+        """Lots de lignes de la table ops/ d'identifiant supérieur à `apres`."""
+        nom, colonnes = SOURCES[table]
+        base = connections[self.base]
+        q = base.ops.quote_name
+        requete = (
+            f"SELECT {', '.join(q(c) for c in colonnes)} FROM {q(nom)} "
+            f"WHERE {q('id')} > %s ORDER BY {q('id')} LIMIT %s"
+        )
+        while True:
+            with base.cursor() as curseur:
+                curseur.execute(requete, [apres, self.taille_lot])
+                lignes = [dict(zip(colonnes, ligne)) for ligne in curseur.fetchall()]
+            if not lignes:
+                return
+            yield lignes
+            apres = lignes[-1]['id']
+
+    def correspondances(self, table: str) -> Dict[int, int]:
+        """Ancien identifiant -> nouveau (tables de référence, gardées en mémoire)."""
+        if table not in self._cache:
+            self._cache[table] = dict(
+                CorrespondanceMigration.objects.filter(table=table).values_list('ancien_id', 'nouveau_id')
+            )
+        return self._cache[table]
+
+    def dernier_migre(self, table: str) -> int:
+        """Point de reprise: dernier identifiant ops/ migré de la table."""
+        return CorrespondanceMigration.objects.filter(table=table).aggregate(
+            dernier=Max('ancien_id')
+        )['dernier'] or 0
+
+    # Migration
+
+    def migrer(
+        self,
+        tables: Optional[List[str]] = None,
+        progression: Optional[Callable[[str, int], None]] = None
+    ) -> Dict[str, int]:
+        """
+        Migre les tables demandées (toutes par défaut), phase par phase.
+
+        Args:
+            tables: Sous-ensemble de TABLES
+            progression: Fonction appelée après chaque lot (table, lignes)
+
+        Returns:
+            Nombre de lignes migrées par table pendant cette exécution
+        """
+        tables = tables or TABLES
+        inconnues = set(tables) - set(TABLES)
+        if inconnues:
+            raise MigrationOpsException(f"Tables inconnues: {', '.join(sorted(inconnues))}")
+
+        totaux = {}
+        with horodatages_conserves(CHAMPS_HORODATES):
+            for phase in PHASES:
+                a_migrer = [t for t in phase if t in tables]
+                if not a_migrer:
+                    continue
+                if self.paralleles == 1:
+                    for table in a_migrer:
+                        totaux[table] = self.migrer_table(table, progression)
+                    continue
+                with ThreadPoolExecutor(max_workers=min(self.paralleles, len(a_migrer))) as pool:
+                    futures = {
+                        table: pool.submit(self._dans_thread, self.migrer_table, table, progression)
+                        for table in a_migrer
+                    }
+                    for table, future in futures.items():
+                        totaux[table] = future.result()
+        return totaux
+
+    @staticmethod
+    def _dans_thread(fonction, *args):
+        try:
+            return fonction(*args)
+        finally:
+            # Connexions propres au thread
+            connections.close_all()
+
+    def migrer_table(self, table: str, progression=None) -> int:
+        """Migre une table lot par lot depuis son point de reprise."""
+        convertir = getattr(self, f'_migrer_{table}')
+        total = 0
+        for lignes in self.lire(table, apres=self.dernier_migre(table)):
+            with transaction.atomic():
+                paires = convertir(lignes)
+                CorrespondanceMigration.objects.bulk_create([
+                    CorrespondanceMigration(table=table, ancien_id=ancien, nouveau_id=nouveau)
+                    for ancien, nouveau in paires
+                ], batch_size=self.taille_lot)
+            total += len(lignes)
+            if progression:
+                progression(table, len(lignes))
+        return total
+
+    def _migrer_utilisateurs(self, lignes: List[dict]) -> List[Tuple[int, int]]:
+        """auth_user -> accounts.User (comptes rapprochés par email)."""
+        emails = {
+            ligne['id']: User.objects.normalize_email(
+                ligne['email'] or f"{ligne['username']}@{DOMAINE_EMAIL_OPS}"
+            )
+            for ligne in lignes
+        }
+        existants = dict(User.objects.filter(email__in=emails.values()).values_list('email', 'pk'))
+
+        nouveaux: Dict[str, User] = {}
+        for ligne in lignes:
+            email = emails[ligne['id']]
+            if email in existants or email in nouveaux:
+                continue
+            nouveaux[email] = User(
+                email=email,
+                password=ligne['password'],
+                first_name=ligne['first_name'] or ligne['username'],
+                last_name=ligne['last_name'],
+                is_staff=ligne['is_staff'],
+                is_superuser=ligne['is_superuser'],
+                is_active=ligne['is_active'],
+                date_joined=_horodatage(ligne['date_joined']),
+                last_login=_horodatage(ligne['last_login']),
+                role=User.Role.ADMIN if ligne['is_staff'] or ligne['is_superuser'] else User.Role.NURSE,
+            )
+        User.objects.bulk_create(nouveaux.values(), batch_size=self.taille_lot)
+        invalider_ecritures(User, nouveaux.values())
+        existants.update({email: u.pk for email, u in nouveaux.items()})
+        return [(ligne['id'], existants[emails[ligne['id']]]) for ligne in lignes]
+
+    def _migrer_services(self, lignes: List[dict]) -> List[Tuple[int, int]]:
+        """ops_service -> Department + ServiceHospitalier (départements rapprochés par nom)."""
+        existants = dict(Department.objects.filter(
+            name__in=[ligne['nom'][:100] for ligne in lignes]
+        ).values_list('name', 'pk'))
+
+        nouveaux: Dict[str, Department] = {}
+        for ligne in lignes:
+            nom = ligne['nom'][:100]
+            if nom not in existants and nom not in nouveaux:
+                nouveaux[nom] = Department(
+                    name=nom,
+                    code=f"OPS-{ligne['id']}",
+                    building=(ligne['localisation'] or '')[:50],
+                )
+        Department.objects.bulk_create(nouveaux.values(), batch_size=self.taille_lot)
+        invalider_ecritures(Department, nouveaux.values())
+        existants.update({nom: d.pk for nom, d in nouveaux.items()})
+
+        # État repris seulement pour les départements sans ServiceHospitalier
+        avec_service = set(ServiceHospitalier.objects.filter(
+            department_id__in=existants.values()
+        ).values_list('department_id', flat=True))
+        etats = {}
+        for ligne in lignes:
+            departement_id = existants[ligne['nom'][:100]]
+            if departement_id not in avec_service:
+                etats.setdefault(departement_id, ligne['etat'])
+        services = ServiceHospitalier.objects.bulk_create([
+            ServiceHospitalier(department_id=departement_id, etat=etat)
+            for departement_id, etat in etats.items()
+        ], batch_size=self.taille_lot)
+        invalider_ecritures(ServiceHospitalier, services)
+
+        return [(ligne['id'], existants[ligne['nom'][:100]]) for ligne in lignes]
+
+    def _migrer_flux(self, lignes: List[dict]) -> List[Tuple[int, int]]:
+        """ops_typeflux -> CategorieEvenement."""
+        categories = [
+            CategorieEvenement(
+                nom=ligne['nom'][:100],
+                code=f"FLUX-{ligne['id']}",
+                type_categorie=CategorieEvenement.TypeCategorie.AUTRE,
+                description=f"Durée standard: {ligne['duree_standard']} s",
+            )
+            for ligne in lignes
+        ]
+        CategorieEvenement.objects.bulk_create(categories, batch_size=self.taille_lot)
+        invalider_ecritures(CategorieEvenement, categories)
+        return [(ligne['id'], c.pk) for ligne, c in zip(lignes, categories)]
+
+    def _evenement(self, ligne: dict) -> dict:
+        """Champs du MicroEvenement converti d'une ligne ops_microevenement."""
+        horodatage = _horodatage(ligne['horodatage'])
+        categorie_id = self.correspondances('flux').get(ligne['type_flux_id'])
+        return {
+            'rapporteur_id': self.correspondances('utilisateurs').get(ligne['personnel_id']),
+            'departement_id': self.correspondances('services').get(ligne['service_id']),
+            'categorie_id': categorie_id,
+            'titre': self._noms_flux().get(categorie_id, 'Événement ops')[:200],
+            'description': ligne['description'] or '',
+            'severite': GRAVITE_SEVERITE.get(ligne['niveau_gravite'], MicroEvenement.Severite.MOYEN),
+            'statut': MicroEvenement.Statut.SIGNALE if ligne['est_valide'] else MicroEvenement.Statut.IGNORE,
+            'survenu_le': horodatage,
+            'signale_le': horodatage,
+            'modifie_le': horodatage,
+        }
+
+    def _noms_flux(self) -> Dict[int, str]:
+        if '_noms_flux' not in self._cache:
+            self._cache['_noms_flux'] = dict(CategorieEvenement.objects.filter(
+                pk__in=self.correspondances('flux').values()
+            ).values_list('pk', 'nom'))
+        return self._cache['_noms_flux']
+
+    def _migrer_evenements(self, lignes: List[dict]) -> List[Tuple[int, int]]:
+        """ops_microevenement -> events.MicroEvenement."""
+        evenements = [MicroEvenement(**self._evenement(ligne)) for ligne in lignes]
+        MicroEvenement.objects.bulk_create(evenements, batch_size=self.taille_lot)
+        invalider_ecritures(MicroEvenement, evenements)
+        return [(ligne['id'], e.pk) for ligne, e in zip(lignes, evenements)]
+
+    def _alerte(self, ligne: dict) -> dict:
+        """Champs de l'Alerte convertie d'une ligne ops_alerte."""
+        message = ligne['message'] or ''
+        return {
+            'titre': (message.splitlines() or ['Alerte ops'])[0][:200],
+            'message': message,
+            'priorite': GRAVITE_PRIORITE.get(ligne['niveau_gravite'], Alerte.Priorite.HAUTE),
+            'statut': Alerte.Statut.RESOLUE if ligne['est_resolu'] else Alerte.Statut.NOUVELLE,
+            'departement_id': self.correspondances('services').get(ligne['service_id']),
+            'cree_le': _horodatage(ligne['genere_le']),
+        }
+
+    def _migrer_alertes(self, lignes: List[dict]) -> List[Tuple[int, int]]:
+        """ops_alerte -> alerts.Alerte."""
+        alertes = [
+            Alerte(donnees_contexte={'source': 'ops', 'ops_id': ligne['id']}, **self._alerte(ligne))
+            for ligne in lignes
+        ]
+        Alerte.objects.bulk_create(alertes, batch_size=self.taille_lot)
+        invalider_ecritures(Alerte, alertes)
+        return [(ligne['id'], a.pk) for ligne, a in zip(lignes, alertes)]
+
+    # Vérification
+
+    def _canonique_source(self, table: str, ligne: dict) -> tuple:
+        if table == 'utilisateurs':
+            return (ligne['id'], User.objects.normalize_email(
+                ligne['email'] or f"{ligne['username']}@{DOMAINE_EMAIL_OPS}"
+            ))
+        if table == 'services':
+            return (ligne['id'], ligne['nom'][:100])
+        if table == 'flux':
+            return (ligne['id'], ligne['nom'][:100])
+        if table == 'evenements':
+            e = self._evenement(ligne)
+            return (ligne['id'], e['rapporteur_id'], e['departement_id'], e['categorie_id'],
+                    e['severite'], e['statut'], e['survenu_le'], e['description'])
+        a = self._alerte(ligne)
+        return (ligne['id'], a['departement_id'], a['priorite'], a['statut'], a['message'], a['cree_le'])
+
+    CIBLES = {
+        'utilisateurs': (User, ['email']),
+        'services': (Department, ['name']),
+        'flux': (CategorieEvenement, ['nom']),
+        'evenements': (MicroEvenement, [
+            'rapporteur_id', 'departement_id', 'categorie_id',
+            'severite', 'statut', 'survenu_le', 'description',
+        ]),
+        'alertes': (Alerte, ['departement_id', 'priorite', 'statut', 'message', 'cree_le']),
+    }
+
+    def _lignes_cible(self, table: str) -> Iterator[tuple]:
+        """Lignes migrées de la table, lues par lots de correspondances."""
+        modele, champs = self.CIBLES[table]
+        dernier = 0
+        while True:
+            paires = list(CorrespondanceMigration.objects.filter(
+                table=table, ancien_id__gt=dernier
+            ).order_by('ancien_id').values_list('ancien_id', 'nouveau_id')[:self.taille_lot])
+            if not paires:
+                return
+            valeurs = {
+                ligne[0]: ligne[1:]
+                for ligne in modele.objects.filter(
+                    pk__in={nouveau for _, nouveau in paires}
+                ).values_list('pk', *champs)
+            }
+            for ancien, nouveau in paires:
+                if nouveau in valeurs:
+                    yield (ancien, *valeurs[nouveau])
+            dernier = paires[-1][0]
+
+    def verifier(self, tables: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """
+        Compare les tables ops/ et les lignes migrées.
+
+        Returns:
+            Par table: lignes source et migrées, empreintes et verdict 'ok'
+        """
+        resultats = {}
+        for table in tables or TABLES:
+            source = cible = 0
+            empreinte_source = empreinte_cible = 0
+            for lignes in self.lire(table):
+                for ligne in lignes:
+                    source += 1
+                    empreinte_source = (empreinte_source + _hacher(self._canonique_source(table, ligne))) % 2 ** 64
+            for ligne in self._lignes_cible(table):
+                cible += 1
+                empreinte_cible = (empreinte_cible + _hacher(ligne)) % 2 ** 64
+            resultats[table] = {
+                'source': source,
+                'migrees': cible,
+                'empreinte_source': f'{empreinte_source:016x}',
+                'empreinte_migrees': f'{empreinte_cible:016x}',
+                'ok': source == cible and empreinte_source == empreinte_cible,
+            }
+        return resultats
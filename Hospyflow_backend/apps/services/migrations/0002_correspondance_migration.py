@@ -0,0 +1,28 @@
+# Generated by Django 5.0.1 on 2026-10-19 00:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorrespondanceMigration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=30, verbose_name='Table source')),
+                ('ancien_id', models.BigIntegerField(verbose_name='Identifiant ops')),
+                ('nouveau_id', models.BigIntegerField(verbose_name='Nouvel identifiant')),
+                ('migre_le', models.DateTimeField(auto_now_add=True, verbose_name='Migré le')),
+            ],
+            options={
+                'verbose_name': 'Correspondance de migration',
+                'verbose_name_plural': 'Correspondances de migration',
+                'unique_together': {('table', 'ancien_id')},
+            },
+        ),
+    ]
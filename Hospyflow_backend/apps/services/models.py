@@ -88,3 +88,23 @@ class ServiceHospitalier(models.Model):
         
         self.save()
         return self.saturation
+
+
+class CorrespondanceMigration(models.Model):
+    """
+    Correspondance des identifiants de l'ancien backend ops/ vers apps.*
+    (écrite par la commande migrer_ops, lot par lot).
+    """
+    
+    table = models.CharField(_('Table source'), max_length=30)
+    ancien_id = models.BigIntegerField(_('Identifiant ops'))
+    nouveau_id = models.BigIntegerField(_('Nouvel identifiant'))
+    migre_le = models.DateTimeField(_('Migré le'), auto_now_add=True)
+    
+    class Meta:
+        verbose_name = _('Correspondance de migration')
+        verbose_name_plural = _('Correspondances de migration')
+        unique_together = ['table', 'ancien_id']
+    
+    def __str__(self):
+        return f"{self.table} {self.ancien_id} -> {self.nouveau_id}"
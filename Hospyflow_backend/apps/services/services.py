@@ -0,0 +1,126 @@
+"""
+Service Pattern - Résumé des services hospitaliers (tableau de bord).
+"""
+from datetime import timedelta
+from typing import Dict
+
+from asgiref.sync import sync_to_async
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Q
+from django.utils import timezone
+
+from .models import ServiceHospitalier
+from apps.core.cache import etiquettes_ecriture, invalider
+from apps.core.indicateurs import (
+    FENETRE_HEURES, aen_cache, en_cache, etat, resume_services, saturation
+)
+from apps.events.models import MicroEvenement
+from apps.workflows.models import InstanceWorkflow
+
+# Durée moyenne de prise en charge des workflows terminés
+DUREE_MOYENNE = Avg(
+    ExpressionWrapper(F('termine_le') - F('demarre_le'), output_field=DurationField())
+)
+
+# Écritures qui périment le résumé en cache (apps/core/cache.py)
+ETIQUETTES_RESUME = ['evenements', 'workflows', 'services', 'departements']
+
+
+class ResumeServicesService:
+    """
+    Service de calcul du résumé des services, en nombre de requêtes constant.
+    """
+
+    @staticmethod
+    def _requete_services(depuis):
+        fenetre = Q(department__evenements__signale_le__gte=depuis)
+        return ServiceHospitalier.objects.select_related('department').annotate(
+            actifs=Count('department__evenements', filter=fenetre & Q(
+                department__evenements__statut__in=[MicroEvenement.Statut.SIGNALE, MicroEvenement.Statut.EN_COURS]
+            )),
+            evenements=Count('department__evenements', filter=fenetre),
+            critiques=Count('department__evenements', filter=fenetre & Q(
+                department__evenements__severite=MicroEvenement.Severite.CRITIQUE
+            ))
+        ).order_by('department__name')  # Meta.ordering est ignoré avec annotate(Count)
+
+    @staticmethod
+    def _services_modifies(services) -> list:
+        """Services dont la saturation ou l'état a changé (mis à jour en mémoire)."""
+        maintenant = timezone.now()
+        modifies = []
+        for service in services:
+            nouvelle = saturation(service.actifs)
+            if (service.saturation, service.etat) != (nouvelle, etat(nouvelle)):
+                service.saturation, service.etat = nouvelle, etat(nouvelle)
+                service.derniere_maj = maintenant
+                modifies.append(service)
+        return modifies
+
+    @staticmethod
+    def _invalider(modifies):
+        """bulk_update n'émet pas de signal: invalidation explicite des lectures."""
+        etiquettes = set()
+        for service in modifies:
+            etiquettes.update(etiquettes_ecriture('services', service.department_id))
+        invalider(*etiquettes)
+
+    @staticmethod
+    def _requete_duree(depuis):
+        return InstanceWorkflow.objects.filter(
+            statut='TERMINE',
+            termine_le__gte=depuis
+        )
+
+    @staticmethod
+    def _resume(services, duree) -> Dict:
+        return resume_services(
+            [
+                {
+                    'id': service.department.id,
+                    'nom': service.department.name,
+                    'etat': service.etat,
+                    'actifs': service.actifs,
+                    'evenements': service.evenements,
+                    'critiques': service.critiques,
+                }
+                for service in services
+            ],
+            duree.total_seconds() / 60 if duree else None
+        )
+
+    @classmethod
+    def calculer(cls) -> Dict:
+        """Compteurs par service (une requête annotée) et durée moyenne des workflows."""
+        depuis = timezone.now() - timedelta(hours=FENETRE_HEURES)
+        services = list(cls._requete_services(depuis))
+
+        # Saturation et état persistés en une requête, pour les services modifiés
+        modifies = cls._services_modifies(services)
+        ServiceHospitalier.objects.bulk_update(modifies, ['saturation', 'etat', 'derniere_maj'])
+        cls._invalider(modifies)
+
+        duree = cls._requete_duree(depuis).aggregate(moyenne=DUREE_MOYENNE)['moyenne']
+        return cls._resume(services, duree)
+
+    @classmethod
+    async def acalculer(cls) -> Dict:
+        """Version asynchrone (ORM async) de calculer, mêmes requêtes."""
+        depuis = timezone.now() - timedelta(hours=FENETRE_HEURES)
+        services = [service async for service in cls._requete_services(depuis)]
+
+        modifies = cls._services_modifies(services)
+        await ServiceHospitalier.objects.abulk_update(modifies, ['saturation', 'etat', 'derniere_maj'])
+        await sync_to_async(cls._invalider)(modifies)
+
+        duree = (await cls._requete_duree(depuis).aaggregate(moyenne=DUREE_MOYENNE))['moyenne']
+        return cls._resume(services, duree)
+
+    @classmethod
+    def resume(cls) -> Dict:
+        """Résumé des services, depuis le cache s'il est encore valide."""
+        return en_cache('services', cls.calculer, etiquettes=ETIQUETTES_RESUME)
+
+    @classmethod
+    async def aresume(cls) -> Dict:
+        """Version asynchrone de resume (même entrée de cache)."""
+        return await aen_cache('services', cls.acalculer, etiquettes=ETIQUETTES_RESUME)
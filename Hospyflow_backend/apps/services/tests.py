@@ -0,0 +1,220 @@
+"""
+Tests des services hospitaliers: résumé du tableau de bord (budget de
+requêtes, ordre, indicateurs, invalidation après la mise à jour en masse des
+saturations, lectures conditionnelles) et migration des données de l'ancien backend ops/.
+"""
+from datetime import datetime, timezone as dt_timezone
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import Client
+
+from apps.accounts.models import Department, User
+from apps.alerts.models import Alerte
+from apps.core.cache import versions_etiquettes
+from apps.events.models import CategorieEvenement, MicroEvenement
+
+from .migration_ops import MigrationOpsException, MigrationOpsService
+from .models import CorrespondanceMigration, ServiceHospitalier
+from .services import ResumeServicesService
+
+pytestmark = pytest.mark.django_db
+
+URL_RESUME = '/api/services/summary/'
+
+
+# ----------------------------------------------------------------------
+# Résumé des services
+# ----------------------------------------------------------------------
+
+@pytest.fixture
+def services(departement, autre_departement):
+    """Trois services, créés dans un ordre différent de celui de leurs noms."""
+    pediatrie = Department.objects.create(name='Pédiatrie', code='PED')
+    return [
+        ServiceHospitalier.objects.create(department=d)
+        for d in (departement, pediatrie, autre_departement)
+    ]
+
+
+@pytest.mark.parametrize('url', [URL_RESUME, URL_RESUME + 'async/'])
+def test_resume_dans_son_budget(services, creer_evenement, budget_requetes, url):
+    for _ in range(3):
+        creer_evenement()
+    assert Client().get(url).status_code == 200
+
+
+def test_resume_ordonne_par_nom_de_departement(services):
+    noms = [service['nom'] for service in ResumeServicesService.calculer()['services']]
+    assert noms == ['Cardiologie', 'Pédiatrie', 'Urgences']
+
+
+def test_indicateurs_du_resume(services, creer_evenement):
+    for severite in ['CRITIQUE'] + ['MOYEN'] * 7:
+        creer_evenement(severite=severite)
+
+    resume = ResumeServicesService.calculer()
+    urgences = resume['services'][-1]
+    assert (urgences['saturation'], urgences['etat'], urgences['event_count']) == (80, 'TENSION', 8)
+    # (1/8 critiques + 1/3 services en tension) / 2, sur 10
+    assert resume['kpis']['risk_score'] == f"{10 * (1 / 8 + 1 / 3) / 2:.1f}"
+    assert resume['kpis']['flux_hour'] == 0
+
+
+def test_changement_de_saturation_invalide_les_lectures(services, creer_evenement, departement):
+    ResumeServicesService.calculer()
+    versions = versions_etiquettes(['services'])
+
+    # Sans changement de saturation, pas d'invalidation
+    ResumeServicesService.calculer()
+    assert versions_etiquettes(['services']) == versions
+
+    creer_evenement()
+    ResumeServicesService.calculer()
+    assert versions_etiquettes(['services']) != versions
+    assert ServiceHospitalier.objects.get(department=departement).saturation > 0
+
+
+@pytest.mark.parametrize('url', [URL_RESUME, URL_RESUME + 'async/'])
+def test_resume_304_puis_200_apres_ecriture(services, creer_evenement, periode_etag_figee, url):
+    client = Client()
+    etag = client.get(url).headers['ETag']
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    creer_evenement()
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+# ----------------------------------------------------------------------
+# Migration depuis ops/
+# ----------------------------------------------------------------------
+
+TABLES_OPS = [
+    """CREATE TABLE auth_user (
+        id integer PRIMARY KEY, username varchar(150), email varchar(254), password varchar(128),
+        first_name varchar(150), last_name varchar(150), is_staff bool, is_superuser bool,
+        is_active bool, date_joined datetime, last_login datetime NULL)""",
+    "CREATE TABLE ops_service (id integer PRIMARY KEY, nom varchar(100), localisation varchar(200), etat varchar(20))",
+    "CREATE TABLE ops_typeflux (id integer PRIMARY KEY, nom varchar(100), duree_standard integer)",
+    """CREATE TABLE ops_microevenement (
+        id integer PRIMARY KEY, personnel_id integer, service_id integer, type_flux_id integer,
+        horodatage datetime, description text NULL, niveau_gravite varchar(20), est_valide bool)""",
+    """CREATE TABLE ops_alerte (
+        id integer PRIMARY KEY, service_id integer, message text, niveau_gravite varchar(20),
+        genere_le datetime, est_resolu bool)""",
+]
+
+HORODATAGE_OPS = datetime(2025, 11, 3, 8, 30, tzinfo=dt_timezone.utc)
+
+
+@pytest.fixture
+def base_ops(departement):
+    """
+    Tables ops/ créées dans la base de test (alias 'default' passé au service):
+    le département Urgences existe déjà côté apps.*.
+    """
+    if connection.vendor != 'sqlite':
+        pytest.skip('Tables ops/ de test écrites pour SQLite')
+    horodatage = HORODATAGE_OPS.strftime('%Y-%m-%d %H:%M:%S')
+    with connection.cursor() as curseur:
+        for requete in TABLES_OPS:
+            curseur.execute(requete)
+        curseur.executemany(
+            'INSERT INTO auth_user VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 1, %s, NULL)', [
+                (1, 'admin', 'Admin@Hopital.test', 'pbkdf2$x', '', '', 1, 1, horodatage),
+                (2, 'infirmiere', '', 'pbkdf2$y', 'Awa', 'Diallo', 0, 0, horodatage),
+            ]
+        )
+        curseur.executemany('INSERT INTO ops_service VALUES (%s, %s, %s, %s)', [
+            (1, 'Urgences', 'RDC', 'TENSION'),
+            (2, 'Pédiatrie', 'Bâtiment B', 'NORMAL'),
+        ])
+        curseur.execute("INSERT INTO ops_typeflux VALUES (1, 'Transfert patient', 600)")
+        curseur.executemany('INSERT INTO ops_microevenement VALUES (%s, %s, %s, 1, %s, %s, %s, %s)', [
+            (numero, 1 + numero % 2, 1 + numero % 2, horodatage, f'Événement {numero}',
+             ['LOW', 'MEDIUM', 'HIGH', 'CRITICAL'][numero % 4], int(numero != 5))
+            for numero in range(1, 8)
+        ])
+        curseur.executemany('INSERT INTO ops_alerte VALUES (%s, %s, %s, %s, %s, %s)', [
+            (1, 1, 'Engorgement\nDétail', 'CRITICAL', horodatage, 0),
+            (2, 2, 'Retards répétés', 'MEDIUM', horodatage, 1),
+        ])
+
+
+def test_migration_et_correspondances(base_ops, departement):
+    service = MigrationOpsService(base='default', taille_lot=3)
+    totaux = service.migrer()
+
+    assert totaux == {'utilisateurs': 2, 'services': 2, 'flux': 1, 'evenements': 7, 'alertes': 2}
+    assert CorrespondanceMigration.objects.count() == 14
+
+    admin = User.objects.get(email='Admin@hopital.test')
+    assert admin.role == User.Role.ADMIN and admin.password == 'pbkdf2$x'
+    infirmiere = User.objects.get(email='infirmiere@ops.hospyflow.local')
+    assert infirmiere.role == User.Role.NURSE
+
+    # Département existant rapproché par nom, l'autre créé avec son état
+    assert service.correspondances('services')[1] == departement.pk
+    pediatrie = Department.objects.get(name='Pédiatrie')
+    assert pediatrie.code == 'OPS-2'
+    assert ServiceHospitalier.objects.get(department=pediatrie).etat == 'NORMAL'
+
+    categorie = CategorieEvenement.objects.get(code='FLUX-1')
+    assert categorie.description == 'Durée standard: 600 s'
+
+    evenement = MicroEvenement.objects.get(description='Événement 3')
+    assert evenement.severite == MicroEvenement.Severite.CRITIQUE
+    assert evenement.titre == 'Transfert patient'
+    assert evenement.departement == pediatrie
+    assert evenement.rapporteur == infirmiere
+    # Dates d'origine conservées malgré auto_now_add
+    assert evenement.signale_le == HORODATAGE_OPS
+    assert MicroEvenement.objects.get(description='Événement 5').statut == MicroEvenement.Statut.IGNORE
+
+    alerte = Alerte.objects.get(priorite=Alerte.Priorite.URGENTE)
+    assert alerte.titre == 'Engorgement'
+    assert alerte.statut == Alerte.Statut.NOUVELLE
+    assert alerte.cree_le == HORODATAGE_OPS
+    assert alerte.donnees_contexte == {'source': 'ops', 'ops_id': 1}
+
+    assert all(resultat['ok'] for resultat in service.verifier().values())
+
+
+def test_migration_reprise_apres_interruption(base_ops):
+    def interrompre(table, lignes):
+        if table == 'evenements':
+            raise RuntimeError('connexion perdue')
+
+    with pytest.raises(RuntimeError):
+        MigrationOpsService(base='default', taille_lot=3).migrer(progression=interrompre)
+    assert MicroEvenement.objects.count() == 3
+
+    # Reprise après le dernier lot validé: aucune ligne en double
+    totaux = MigrationOpsService(base='default', taille_lot=3).migrer()
+    assert totaux == {'utilisateurs': 0, 'services': 0, 'flux': 0, 'evenements': 4, 'alertes': 2}
+    assert MicroEvenement.objects.count() == 7
+    assert User.objects.filter(email__endswith='@ops.hospyflow.local').count() == 1
+
+
+def test_verification_detecte_une_ligne_modifiee(base_ops):
+    call_command('migrer_ops', '--base', 'default', '--sans-verification')
+    MicroEvenement.objects.filter(description='Événement 1').update(severite=MicroEvenement.Severite.ELEVE)
+
+    resultats = MigrationOpsService(base='default').verifier()
+    assert not resultats['evenements']['ok']
+    assert resultats['evenements']['source'] == resultats['evenements']['migrees'] == 7
+    assert resultats['alertes']['ok']
+
+    with pytest.raises(CommandError, match='Vérification échouée'):
+        call_command('migrer_ops', '--base', 'default', '--verifier-seulement')
+
+
+def test_migration_parametres_invalides():
+    with pytest.raises(MigrationOpsException):
+        MigrationOpsService(base='inconnue')
+    with pytest.raises(MigrationOpsException):
+        MigrationOpsService(base='default', taille_lot=0)
+    with pytest.raises(MigrationOpsException):
+        MigrationOpsService(base='default').migrer(tables=['patients'])
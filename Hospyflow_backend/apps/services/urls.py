@@ -3,11 +3,12 @@ URL configuration pour l'app services.
 """
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ServiceViewSet
+from .views import ServiceViewSet, ServiceSummaryAsyncView
 
 router = DefaultRouter()
 router.register(r'', ServiceViewSet, basename='service')
 
 urlpatterns = [
+    path('summary/async/', ServiceSummaryAsyncView.as_view(), name='service-summary-async'),
     path('', include(router.urls)),
 ]
@@ -5,23 +5,37 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from django.db.models import Prefetch
 from django.utils.translation import gettext_lazy as _
 
 from .models import ServiceHospitalier
 from .serializers import ServiceHospitalierSerializer, ServiceSummarySerializer
+from .services import ETIQUETTES_RESUME, ResumeServicesService
+from apps.accounts.models import User
+from apps.core.asynchrone import VueAsync, reponse_json
+from apps.core.conditionnel import LectureConditionnelleMixin
 
 
-class ServiceViewSet(viewsets.ModelViewSet):
+class ServiceViewSet(LectureConditionnelleMixin, viewsets.ModelViewSet):
     """
     ViewSet pour les services hospitaliers.
     Compatible avec l'ancien backend ops/.
     """
-    queryset = ServiceHospitalier.objects.select_related('department').all()
+    queryset = ServiceHospitalier.objects.select_related('department').prefetch_related(
+        Prefetch('department__staff', queryset=User.objects.filter(role='DOCTOR'), to_attr='medecins')
+    )
     serializer_class = ServiceHospitalierSerializer
+    budget_requetes = 6
     
     # Temporairement sans authentification pour faciliter la migration
     permission_classes = [AllowAny]
     
+    # Résumé: requêtes conditionnelles (fenêtre glissante, à la minute)
+    periode_etag = 60
+    
+    def get_etiquettes_etag(self):
+        return ETIQUETTES_RESUME if self.action == 'summary' else ()
+    
     def list(self, request, *args, **kwargs):
         """
         Liste tous les services hospitaliers.
@@ -39,8 +53,7 @@ class ServiceViewSet(viewsets.ModelViewSet):
         
         Compatible avec l'ancien endpoint du backend ops/.
         """
-        # Utiliser un objet vide car le serializer calcule tout dynamiquement
-        serializer = ServiceSummarySerializer({})
+        serializer = ServiceSummarySerializer(ResumeServicesService.resume())
         return Response(serializer.data)
     
     @action(detail=True, methods=['post'])
@@ -57,3 +70,17 @@ class ServiceViewSet(viewsets.ModelViewSet):
             'saturation': saturation,
             'etat': service.etat
         })
+
+
+class ServiceSummaryAsyncView(VueAsync):
+    """
+    Résumé des services avec KPIs, version asynchrone (ASGI).
+    GET /api/services/summary/async/
+    """
+    authentification_requise = False
+    etiquettes_etag = ETIQUETTES_RESUME
+    periode_etag = 60
+
+    async def get(self, request):
+        serializer = ServiceSummarySerializer(await ResumeServicesService.aresume())
+        return reponse_json(serializer.data)
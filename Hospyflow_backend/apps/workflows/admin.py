@@ -1,5 +1,13 @@
 from django.contrib import admin
-from .models import TypeWorkflow, EtapeWorkflow, InstanceWorkflow, TransitionEtape
+from .models import (
+    TypeWorkflow,
+    EtapeWorkflow,
+    InstanceWorkflow,
+    TransitionEtape,
+    DistributionDureeEtape,
+    InstanceWorkflowArchive,
+    TransitionEtapeArchive
+)
 
 
 class EtapeWorkflowInline(admin.TabularInline):
@@ -40,7 +48,10 @@ class InstanceWorkflowAdmin(admin.ModelAdmin):
     ]
     list_filter = ['statut', 'priorite', 'type_workflow', 'departement']
     search_fields = ['reference_patient', 'notes']
-    readonly_fields = ['demarre_le', 'termine_le', 'modifie_le']
+    readonly_fields = [
+        'demarre_le', 'termine_le', 'modifie_le',
+        'eta_minutes_restantes', 'eta_fin_prevue', 'eta_calculee_le'
+    ]
     ordering = ['-demarre_le']
     inlines = [TransitionEtapeInline]
 
@@ -52,3 +63,44 @@ class TransitionEtapeAdmin(admin.ModelAdmin):
     search_fields = ['instance__reference_patient', 'commentaire']
     readonly_fields = ['horodatage']
     ordering = ['-horodatage']
+
+
+@admin.register(DistributionDureeEtape)
+class DistributionDureeEtapeAdmin(admin.ModelAdmin):
+    list_display = [
+        'etape', 'departement', 'heure_semaine', 'nombre_observations',
+        'duree_mediane_minutes', 'duree_p90_minutes', 'calcule_le'
+    ]
+    list_filter = ['etape__type_workflow', 'departement']
+    readonly_fields = ['calcule_le']
+    ordering = ['etape', 'departement', 'heure_semaine']
+
+
+@admin.register(InstanceWorkflowArchive)
+class InstanceWorkflowArchiveAdmin(admin.ModelAdmin):
+    list_display = [
+        'id', 'reference_patient', 'type_workflow', 'statut',
+        'departement', 'demarre_le', 'termine_le', 'mois_archive'
+    ]
+    list_filter = ['statut', 'mois_archive', 'type_workflow']
+    search_fields = ['reference_patient']
+    ordering = ['-demarre_le']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(TransitionEtapeArchive)
+class TransitionEtapeArchiveAdmin(admin.ModelAdmin):
+    list_display = ['instance_id', 'etape_source', 'etape_destination', 'horodatage', 'duree_etape_minutes']
+    list_filter = ['mois_archive']
+    ordering = ['-horodatage']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
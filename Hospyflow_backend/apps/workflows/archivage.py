@@ -0,0 +1,190 @@
+"""
+Service Pattern - Archivage des workflows terminés.
+
+Les instances terminées ou abandonnées depuis plus de WORKFLOW_ARCHIVAGE_JOURS
+sont déplacées, avec leurs transitions, vers InstanceWorkflowArchive et
+TransitionEtapeArchive. Chaque lot est copié puis supprimé dans une même
+transaction: une exécution interrompue reprend simplement au lot suivant.
+
+Les requêtes analytiques passent par sources_instances / sources_transitions,
+qui n'ajoutent les tables d'archive que si la période demandée les concerne.
+"""
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, QuerySet
+from django.utils import timezone
+
+from .models import (
+    InstanceWorkflow,
+    TransitionEtape,
+    InstanceWorkflowArchive,
+    TransitionEtapeArchive
+)
+from apps.alerts.models import Alerte
+from apps.core.cache import etiquettes_ecriture, invalider
+from apps.events.models import MicroEvenement
+
+
+class ArchivageException(Exception):
+    """Exception pour les erreurs d'archivage."""
+    pass
+
+
+CHAMPS_INSTANCE = [
+    'id', 'type_workflow_id', 'reference_patient', 'etape_actuelle_id',
+    'statut', 'priorite', 'departement_id', 'initie_par_id', 'notes',
+    'demarre_le', 'termine_le', 'modifie_le',
+]
+CHAMPS_TRANSITION = [
+    'id', 'instance_id', 'etape_source_id', 'etape_destination_id',
+    'effectuee_par_id', 'horodatage', 'duree_etape_minutes', 'commentaire',
+]
+
+
+def mois_archive(moment: datetime) -> date:
+    """Premier jour du mois local du moment."""
+    return timezone.localtime(moment).date().replace(day=1)
+
+
+def sources_instances(depuis: Optional[datetime] = None) -> List[QuerySet]:
+    """
+    Tables d'instances à interroger pour une période commençant à `depuis`
+    (filtrée sur demarre_le). Les champs ont les mêmes noms dans les deux tables.
+    """
+    sources = [InstanceWorkflow.objects.all()]
+    archives = InstanceWorkflowArchive.objects.all()
+    if depuis is not None:
+        archives = archives.filter(demarre_le__gte=depuis)
+    if archives.exists():
+        sources.insert(0, InstanceWorkflowArchive.objects.all())
+    return sources
+
+
+def sources_transitions(depuis: Optional[datetime] = None) -> List[QuerySet]:
+    """
+    Tables de transitions à interroger pour une période commençant à `depuis`
+    (filtrée sur horodatage). Les champs ont les mêmes noms dans les deux tables.
+    """
+    sources = [TransitionEtape.objects.all()]
+    archives = TransitionEtapeArchive.objects.all()
+    if depuis is not None:
+        archives = archives.filter(horodatage__gte=depuis)
+    if archives.exists():
+        sources.insert(0, TransitionEtapeArchive.objects.all())
+    return sources
+
+
+class ArchivageWorkflowService:
+    """
+    Service d'archivage par lots des workflows terminés.
+    """
+
+    # Les tableaux de bord lisent au plus 30 jours: ils restent sur les tables actives
+    JOURS_MINIMUM = 31
+
+    def __init__(self, jours: Optional[int] = None, taille_lot: Optional[int] = None):
+        self.jours = jours or settings.WORKFLOW_ARCHIVAGE_JOURS
+        self.taille_lot = taille_lot or settings.WORKFLOW_ARCHIVAGE_TAILLE_LOT
+        if self.jours < self.JOURS_MINIMUM:
+            raise ArchivageException(
+                f"L'horizon d'archivage doit être d'au moins {self.JOURS_MINIMUM} jours."
+            )
+
+    def instances_archivables(self) -> QuerySet[InstanceWorkflow]:
+        """
+        Instances terminées ou abandonnées avant l'horizon.
+        Celles encore liées à un événement ou une alerte restent actives pour
+        ne pas perdre ce lien.
+        """
+        seuil = timezone.now() - timedelta(days=self.jours)
+        return InstanceWorkflow.objects.filter(
+            statut__in=[InstanceWorkflow.Statut.TERMINE, InstanceWorkflow.Statut.ABANDONNE],
+            termine_le__lt=seuil
+        ).filter(
+            ~Exists(MicroEvenement.objects.filter(instance_workflow_id=OuterRef('pk'))),
+            ~Exists(Alerte.objects.filter(workflow_id=OuterRef('pk')))
+        )
+
+    def archiver(
+        self,
+        max_lots: Optional[int] = None,
+        progression: Optional[Callable[[int, int], None]] = None
+    ) -> Dict[str, int]:
+        """
+        Archive les instances éligibles par lots.
+
+        Args:
+            max_lots: Nombre maximal de lots traités (tous si None)
+            progression: Fonction appelée après chaque lot (instances, transitions)
+
+        Returns:
+            Nombre total d'instances et de transitions archivées
+        """
+        totaux = {'lots': 0, 'instances': 0, 'transitions': 0}
+        dernier_id = 0
+
+        while max_lots is None or totaux['lots'] < max_lots:
+            ids = list(self.instances_archivables().filter(
+                pk__gt=dernier_id
+            ).order_by('pk').values_list('pk', flat=True)[:self.taille_lot])
+            if not ids:
+                break
+
+            instances, transitions = self._archiver_lot(ids)
+            dernier_id = ids[-1]
+            totaux['lots'] += 1
+            totaux['instances'] += instances
+            totaux['transitions'] += transitions
+            if progression:
+                progression(instances, transitions)
+
+        return totaux
+
+    @transaction.atomic
+    def _archiver_lot(self, ids: List[int]) -> tuple:
+        """
+        Copie puis supprime un lot d'instances et leurs transitions.
+
+        Les instances sont supprimées en une requête, sans charger les lignes
+        ni émettre post_delete pour chacune: les lectures des workflows sont
+        invalidées une fois pour tout le lot.
+        """
+        instances = list(
+            self.instances_archivables().select_for_update().filter(pk__in=ids).values(*CHAMPS_INSTANCE)
+        )
+        # Instances redevenues liées à un événement ou une alerte: laissées actives
+        ids = [i['id'] for i in instances]
+        mois = {i['id']: mois_archive(i['termine_le']) for i in instances}
+
+        InstanceWorkflowArchive.objects.bulk_create(
+            [InstanceWorkflowArchive(mois_archive=mois[i['id']], **i) for i in instances],
+            batch_size=self.taille_lot,
+            ignore_conflicts=True
+        )
+
+        transitions = [
+            TransitionEtapeArchive(mois_archive=mois[t['instance_id']], **t)
+            for t in TransitionEtape.objects.filter(
+                instance_id__in=ids
+            ).values(*CHAMPS_TRANSITION).iterator(chunk_size=self.taille_lot)
+        ]
+        TransitionEtapeArchive.objects.bulk_create(
+            transitions,
+            batch_size=self.taille_lot,
+            ignore_conflicts=True
+        )
+
+        TransitionEtape.objects.filter(instance_id__in=ids).delete()
+        supprimees = InstanceWorkflow.objects.filter(pk__in=ids)
+        supprimees._raw_delete(supprimees.db)
+
+        etiquettes = set()
+        for instance in instances:
+            etiquettes.update(etiquettes_ecriture(
+                'workflows', instance['departement_id'], timezone.localdate(instance['demarre_le'])
+            ))
+        invalider(*etiquettes)
+        return len(instances), len(transitions)
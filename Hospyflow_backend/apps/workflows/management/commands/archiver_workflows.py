@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.workflows.archivage import ArchivageWorkflowService, ArchivageException
+
+
+class Command(BaseCommand):
+    help = 'Déplace les workflows terminés au-delà de l\'horizon vers les tables d\'archive (par lots, reprise possible)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--jours',
+            type=int,
+            default=None,
+            help='Horizon en jours (défaut: WORKFLOW_ARCHIVAGE_JOURS)'
+        )
+        parser.add_argument(
+            '--taille-lot',
+            type=int,
+            default=None,
+            help='Instances par lot (défaut: WORKFLOW_ARCHIVAGE_TAILLE_LOT)'
+        )
+        parser.add_argument(
+            '--max-lots',
+            type=int,
+            default=None,
+            help='Arrêter après ce nombre de lots (la prochaine exécution reprend)'
+        )
+        parser.add_argument(
+            '--simulation',
+            action='store_true',
+            help='Compter les instances éligibles sans rien déplacer'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            service = ArchivageWorkflowService(
+                jours=options['jours'],
+                taille_lot=options['taille_lot']
+            )
+        except ArchivageException as e:
+            raise CommandError(str(e))
+
+        if options['simulation']:
+            nombre = service.instances_archivables().count()
+            self.stdout.write(f'{nombre} instance(s) éligible(s) à l\'archivage.')
+            return
+
+        def progression(instances, transitions):
+            self.stdout.write(f'  lot archivé: {instances} instance(s), {transitions} transition(s)')
+
+        totaux = service.archiver(max_lots=options['max_lots'], progression=progression)
+        self.stdout.write(self.style.SUCCESS(
+            f"{totaux['instances']} instance(s) et {totaux['transitions']} transition(s) "
+            f"archivée(s) en {totaux['lots']} lot(s)."
+        ))
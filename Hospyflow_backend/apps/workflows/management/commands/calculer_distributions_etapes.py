@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from apps.workflows.prediction import PredictionETAService
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les distributions de durées par étape et les ETA des workflows actifs (lot nocturne)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--jours',
+            type=int,
+            default=PredictionETAService.HORIZON_JOURS,
+            help="Profondeur d'historique analysée (jours)"
+        )
+
+    def handle(self, *args, **options):
+        service = PredictionETAService()
+
+        nombre = service.calculer_distributions(jours=options['jours'])
+        self.stdout.write(f'{nombre} distribution(s) calculée(s).')
+
+        instances = service.rafraichir_instances_actives()
+        self.stdout.write(self.style.SUCCESS(f'ETA rafraîchie pour {instances} workflow(s) actif(s).'))
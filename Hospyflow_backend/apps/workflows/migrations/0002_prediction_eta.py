@@ -0,0 +1,50 @@
+# Generated by Django 5.0.1 on 2026-10-18 23:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('workflows', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='instanceworkflow',
+            name='eta_calculee_le',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='ETA calculée le'),
+        ),
+        migrations.AddField(
+            model_name='instanceworkflow',
+            name='eta_fin_prevue',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Fin prévue'),
+        ),
+        migrations.AddField(
+            model_name='instanceworkflow',
+            name='eta_minutes_restantes',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Temps restant estimé (minutes)'),
+        ),
+        migrations.CreateModel(
+            name='DistributionDureeEtape',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('heure_semaine', models.PositiveSmallIntegerField(blank=True, help_text='0 = lundi 0h, 167 = dimanche 23h. Vide pour toutes les heures', null=True, verbose_name='Heure de la semaine')),
+                ('nombre_observations', models.PositiveIntegerField(default=0, verbose_name="Nombre d'observations")),
+                ('duree_moyenne_minutes', models.FloatField(verbose_name='Durée moyenne (minutes)')),
+                ('duree_mediane_minutes', models.FloatField(verbose_name='Durée médiane (minutes)')),
+                ('duree_p90_minutes', models.FloatField(verbose_name='Durée 90e percentile (minutes)')),
+                ('calcule_le', models.DateTimeField(auto_now=True, verbose_name='Calculé le')),
+                ('departement', models.ForeignKey(blank=True, help_text='Vide pour la distribution tous départements confondus', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='distributions_durees_etapes', to='accounts.department', verbose_name='Département')),
+                ('etape', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='distributions_durees', to='workflows.etapeworkflow', verbose_name='Étape')),
+            ],
+            options={
+                'verbose_name': "Distribution de durée d'étape",
+                'verbose_name_plural': "Distributions de durées d'étapes",
+                'ordering': ['etape', 'departement', 'heure_semaine'],
+                'unique_together': {('etape', 'departement', 'heure_semaine')},
+            },
+        ),
+    ]
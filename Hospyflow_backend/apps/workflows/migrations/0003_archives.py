@@ -0,0 +1,80 @@
+# Generated by Django 5.0.1 on 2026-10-18 23:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('workflows', '0002_prediction_eta'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InstanceWorkflowArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('reference_patient', models.CharField(max_length=50, verbose_name='Référence patient')),
+                ('statut', models.CharField(choices=[('INITIE', 'Initié'), ('EN_COURS', 'En cours'), ('EN_PAUSE', 'En pause'), ('TERMINE', 'Terminé'), ('ABANDONNE', 'Abandonné')], max_length=20, verbose_name='Statut')),
+                ('priorite', models.CharField(choices=[('BASSE', 'Basse'), ('NORMALE', 'Normale'), ('HAUTE', 'Haute'), ('URGENTE', 'Urgente'), ('CRITIQUE', 'Critique')], max_length=20, verbose_name='Priorité')),
+                ('notes', models.TextField(blank=True, verbose_name='Notes')),
+                ('demarre_le', models.DateTimeField(verbose_name='Démarré le')),
+                ('termine_le', models.DateTimeField(null=True, verbose_name='Terminé le')),
+                ('modifie_le', models.DateTimeField(verbose_name='Modifié le')),
+                ('mois_archive', models.DateField(help_text='Premier jour du mois de fin du workflow', verbose_name="Mois d'archive")),
+                ('archive_le', models.DateTimeField(auto_now_add=True, verbose_name='Archivé le')),
+                ('departement', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='accounts.department', verbose_name='Département')),
+                ('etape_actuelle', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='workflows.etapeworkflow', verbose_name='Dernière étape')),
+                ('initie_par', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Initié par')),
+                ('type_workflow', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='workflows.typeworkflow', verbose_name='Type de workflow')),
+            ],
+            options={
+                'verbose_name': 'Instance de workflow archivée',
+                'verbose_name_plural': 'Instances de workflows archivées',
+                'ordering': ['-demarre_le'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TransitionEtapeArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('horodatage', models.DateTimeField(verbose_name='Horodatage')),
+                ('duree_etape_minutes', models.PositiveIntegerField(blank=True, null=True, verbose_name="Durée de l'étape (minutes)")),
+                ('commentaire', models.TextField(blank=True, verbose_name='Commentaire')),
+                ('mois_archive', models.DateField(verbose_name="Mois d'archive")),
+                ('effectuee_par', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Effectuée par')),
+                ('etape_destination', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='workflows.etapeworkflow', verbose_name='Étape destination')),
+                ('etape_source', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='workflows.etapeworkflow', verbose_name='Étape source')),
+                ('instance', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='transitions', to='workflows.instanceworkflowarchive', verbose_name='Instance archivée')),
+            ],
+            options={
+                'verbose_name': 'Transition archivée',
+                'verbose_name_plural': 'Transitions archivées',
+                'ordering': ['instance', 'horodatage'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='instanceworkflowarchive',
+            index=models.Index(fields=['mois_archive'], name='workflows_i_mois_ar_94031f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='instanceworkflowarchive',
+            index=models.Index(fields=['demarre_le'], name='workflows_i_demarre_b36772_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transitionetapearchive',
+            index=models.Index(fields=['mois_archive'], name='workflows_t_mois_ar_98c16d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transitionetapearchive',
+            index=models.Index(fields=['horodatage'], name='workflows_t_horodat_bceb50_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transitionetapearchive',
+            index=models.Index(fields=['instance', 'horodatage'], name='workflows_t_instanc_ff1744_idx'),
+        ),
+    ]
@@ -169,6 +169,15 @@ class InstanceWorkflow(models.Model):
     termine_le = models.DateTimeField(_('Terminé le'), null=True, blank=True)
     modifie_le = models.DateTimeField(_('Modifié le'), auto_now=True)
     
+    # Prédiction du temps restant (voir PredictionETAService)
+    eta_minutes_restantes = models.PositiveIntegerField(
+        _('Temps restant estimé (minutes)'),
+        null=True,
+        blank=True
+    )
+    eta_fin_prevue = models.DateTimeField(_('Fin prévue'), null=True, blank=True)
+    eta_calculee_le = models.DateTimeField(_('ETA calculée le'), null=True, blank=True)
+    
     class Meta:
         verbose_name = _('Instance de workflow')
         verbose_name_plural = _('Instances de workflows')
@@ -245,3 +254,181 @@ class TransitionEtape(models.Model):
         source = self.etape_source.nom if self.etape_source else "Début"
         dest = self.etape_destination.nom if self.etape_destination else "Fin"
         return f"{source} → {dest}"
+
+
+class DistributionDureeEtape(models.Model):
+    """
+    Distribution des durées observées d'une étape.
+    Précalculée chaque nuit par département et heure de la semaine
+    à partir des TransitionEtape, pour la prédiction des ETA.
+    """
+    
+    etape = models.ForeignKey(
+        EtapeWorkflow,
+        on_delete=models.CASCADE,
+        related_name='distributions_durees',
+        verbose_name=_('Étape')
+    )
+    departement = models.ForeignKey(
+        'accounts.Department',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='distributions_durees_etapes',
+        verbose_name=_('Département'),
+        help_text=_('Vide pour la distribution tous départements confondus')
+    )
+    heure_semaine = models.PositiveSmallIntegerField(
+        _('Heure de la semaine'),
+        null=True,
+        blank=True,
+        help_text=_('0 = lundi 0h, 167 = dimanche 23h. Vide pour toutes les heures')
+    )
+    nombre_observations = models.PositiveIntegerField(_('Nombre d\'observations'), default=0)
+    duree_moyenne_minutes = models.FloatField(_('Durée moyenne (minutes)'))
+    duree_mediane_minutes = models.FloatField(_('Durée médiane (minutes)'))
+    duree_p90_minutes = models.FloatField(_('Durée 90e percentile (minutes)'))
+    calcule_le = models.DateTimeField(_('Calculé le'), auto_now=True)
+    
+    class Meta:
+        verbose_name = _('Distribution de durée d\'étape')
+        verbose_name_plural = _('Distributions de durées d\'étapes')
+        ordering = ['etape', 'departement', 'heure_semaine']
+        unique_together = ['etape', 'departement', 'heure_semaine']
+    
+    def __str__(self):
+        return f"{self.etape.nom} - h{self.heure_semaine} ({self.duree_mediane_minutes:.0f} min)"
+
+
+class InstanceWorkflowArchive(models.Model):
+    """
+    Instance terminée ou abandonnée déplacée hors de la table active.
+    Conserve l'identifiant d'origine; partitionnée logiquement par mois de fin.
+    """
+    
+    id = models.BigIntegerField(primary_key=True)
+    type_workflow = models.ForeignKey(
+        TypeWorkflow,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name=_('Type de workflow')
+    )
+    reference_patient = models.CharField(_('Référence patient'), max_length=50)
+    etape_actuelle = models.ForeignKey(
+        EtapeWorkflow,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        related_name='+',
+        verbose_name=_('Dernière étape')
+    )
+    statut = models.CharField(
+        _('Statut'),
+        max_length=20,
+        choices=InstanceWorkflow.Statut.choices
+    )
+    priorite = models.CharField(
+        _('Priorité'),
+        max_length=20,
+        choices=InstanceWorkflow.Priorite.choices
+    )
+    departement = models.ForeignKey(
+        'accounts.Department',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        related_name='+',
+        verbose_name=_('Département')
+    )
+    initie_par = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        related_name='+',
+        verbose_name=_('Initié par')
+    )
+    notes = models.TextField(_('Notes'), blank=True)
+    demarre_le = models.DateTimeField(_('Démarré le'))
+    termine_le = models.DateTimeField(_('Terminé le'), null=True)
+    modifie_le = models.DateTimeField(_('Modifié le'))
+    
+    mois_archive = models.DateField(
+        _('Mois d\'archive'),
+        help_text=_('Premier jour du mois de fin du workflow')
+    )
+    archive_le = models.DateTimeField(_('Archivé le'), auto_now_add=True)
+    
+    class Meta:
+        verbose_name = _('Instance de workflow archivée')
+        verbose_name_plural = _('Instances de workflows archivées')
+        ordering = ['-demarre_le']
+        indexes = [
+            models.Index(fields=['mois_archive']),
+            models.Index(fields=['demarre_le']),
+        ]
+    
+    def __str__(self):
+        return f"{self.reference_patient} ({self.get_statut_display()}, archivé)"
+
+
+class TransitionEtapeArchive(models.Model):
+    """
+    Transition d'une instance archivée.
+    Mêmes noms de champs que TransitionEtape pour réutiliser les mêmes filtres.
+    """
+    
+    id = models.BigIntegerField(primary_key=True)
+    instance = models.ForeignKey(
+        InstanceWorkflowArchive,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='transitions',
+        verbose_name=_('Instance archivée')
+    )
+    etape_source = models.ForeignKey(
+        EtapeWorkflow,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        related_name='+',
+        verbose_name=_('Étape source')
+    )
+    etape_destination = models.ForeignKey(
+        EtapeWorkflow,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        related_name='+',
+        verbose_name=_('Étape destination')
+    )
+    effectuee_par = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        related_name='+',
+        verbose_name=_('Effectuée par')
+    )
+    horodatage = models.DateTimeField(_('Horodatage'))
+    duree_etape_minutes = models.PositiveIntegerField(
+        _('Durée de l\'étape (minutes)'),
+        null=True,
+        blank=True
+    )
+    commentaire = models.TextField(_('Commentaire'), blank=True)
+    mois_archive = models.DateField(_('Mois d\'archive'))
+    
+    class Meta:
+        verbose_name = _('Transition archivée')
+        verbose_name_plural = _('Transitions archivées')
+        ordering = ['instance', 'horodatage']
+        indexes = [
+            models.Index(fields=['mois_archive']),
+            models.Index(fields=['horodatage']),
+            models.Index(fields=['instance', 'horodatage']),
+        ]
+    
+    def __str__(self):
+        return f"{self.instance_id}: {self.etape_source_id} → {self.etape_destination_id} (archivé)"
@@ -0,0 +1,367 @@
+"""
+Service Pattern - Prédiction du temps restant (ETA) des workflows.
+Les distributions de durées sont précalculées en lot chaque nuit ;
+l'estimation d'une instance ne fait ensuite que des lectures en mémoire.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime, timedelta
+from itertools import chain
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from apps.core.cache import invalider
+
+from .models import (
+    EtapeWorkflow,
+    InstanceWorkflow,
+    DistributionDureeEtape
+)
+from .archivage import sources_transitions
+
+
+# Clé de distribution: (etape_id, departement_id, heure_semaine)
+CleDistribution = Tuple[int, Optional[int], Optional[int]]
+
+HEURES_SEMAINE = 168
+# Le 1er janvier 1970 est un jeudi: décalage pour que 0 = lundi 0h
+DECALAGE_EPOCH_HEURES = 72
+
+
+def heure_semaine(moment: datetime) -> int:
+    """Retourne l'heure de la semaine locale (0 = lundi 0h, 167 = dimanche 23h)."""
+    local = timezone.localtime(moment)
+    return local.weekday() * 24 + local.hour
+
+
+class PredictionETAService:
+    """
+    Service de prédiction du temps restant des workflows actifs.
+
+    Les durées médianes sont recherchées du plus précis au plus général:
+    (étape, département, heure) → (étape, département) → (étape) → durée estimée.
+    """
+
+    HORIZON_JOURS = 90
+    MIN_OBSERVATIONS = 5
+    TAILLE_LOT = 500
+
+    # ------------------------------------------------------------------
+    # Lot nocturne
+    # ------------------------------------------------------------------
+
+    def calculer_distributions(self, jours: int = HORIZON_JOURS) -> int:
+        """
+        Recalcule toutes les distributions de durées sur la période.
+
+        Args:
+            jours: Profondeur d'historique analysée
+
+        Returns:
+            Nombre de distributions enregistrées
+        """
+        depuis = timezone.now() - timedelta(days=jours)
+        lignes = chain.from_iterable(
+            source.filter(
+                horodatage__gte=depuis,
+                etape_source__isnull=False,
+                duree_etape_minutes__isnull=False
+            ).values_list(
+                'etape_source_id', 'instance__departement_id',
+                'horodatage', 'duree_etape_minutes'
+            ).iterator(chunk_size=5000)
+            for source in sources_transitions(depuis)
+        )
+
+        etapes, departements, heures, durees = self._charger_observations(lignes)
+
+        distributions = []
+        if len(durees):
+            distributions.extend(self._agreger(etapes, departements, heures, durees))
+            distributions.extend(self._agreger(etapes, departements, None, durees))
+            distributions.extend(self._agreger(etapes, None, None, durees))
+
+        with transaction.atomic():
+            DistributionDureeEtape.objects.all().delete()
+            DistributionDureeEtape.objects.bulk_create(
+                distributions, batch_size=self.TAILLE_LOT
+            )
+
+        return len(distributions)
+
+    def _charger_observations(self, lignes) -> Tuple[np.ndarray, ...]:
+        """
+        Convertit les lignes de transitions en tableaux NumPy. L'étape a commencé
+        à (horodatage - durée): c'est l'heure locale de ce début qui compte, avec
+        le décalage du fuseau à cette date (heure d'été ou d'hiver).
+        """
+        fuseau = timezone.get_current_timezone()
+        decalages: Dict[int, float] = {}
+        etapes, departements, debuts_heures, durees = [], [], [], []
+        for etape_id, departement_id, horodatage, duree in lignes:
+            debut = horodatage.timestamp() - duree * 60
+            # Décalage constant sur une heure UTC: un calcul de fuseau par heure
+            heure_utc = int(debut // 3600)
+            decalage = decalages.get(heure_utc)
+            if decalage is None:
+                decalage = datetime.fromtimestamp(heure_utc * 3600, fuseau).utcoffset().total_seconds()
+                decalages[heure_utc] = decalage
+            etapes.append(etape_id)
+            departements.append(departement_id if departement_id is not None else -1)
+            debuts_heures.append((debut + decalage) // 3600)
+            durees.append(duree)
+
+        heures = (np.asarray(debuts_heures, dtype=np.int64) + DECALAGE_EPOCH_HEURES) % HEURES_SEMAINE
+        return (
+            np.asarray(etapes, dtype=np.int64),
+            np.asarray(departements, dtype=np.int64),
+            heures,
+            np.asarray(durees, dtype=np.float64),
+        )
+
+    def _agreger(
+        self,
+        etapes: np.ndarray,
+        departements: Optional[np.ndarray],
+        heures: Optional[np.ndarray],
+        durees: np.ndarray
+    ) -> List[DistributionDureeEtape]:
+        """
+        Calcule moyenne, médiane et 90e percentile par groupe, sans boucle Python
+        sur les observations: tri lexicographique puis réductions par segment.
+        """
+        cles = [etapes]
+        if departements is not None:
+            cles.append(departements)
+        if heures is not None:
+            cles.append(heures)
+
+        # np.lexsort trie sur la dernière clé en premier: durées en clé secondaire
+        ordre = np.lexsort([durees] + cles[::-1])
+        cles_triees = [c[ordre] for c in cles]
+        durees_triees = durees[ordre]
+
+        rupture = np.zeros(len(durees_triees), dtype=bool)
+        rupture[0] = True
+        for cle in cles_triees:
+            rupture[1:] |= cle[1:] != cle[:-1]
+        debuts = np.flatnonzero(rupture)
+        tailles = np.diff(np.append(debuts, len(durees_triees)))
+        sommes = np.add.reduceat(durees_triees, debuts)
+
+        garder = tailles >= self.MIN_OBSERVATIONS
+        debuts, tailles, sommes = debuts[garder], tailles[garder], sommes[garder]
+        if not len(debuts):
+            return []
+
+        moyennes = sommes / tailles
+        medianes = self._quantile_segments(durees_triees, debuts, tailles, 0.5)
+        p90 = self._quantile_segments(durees_triees, debuts, tailles, 0.9)
+
+        distributions = []
+        for i, debut in enumerate(debuts):
+            departement = int(cles_triees[1][debut]) if departements is not None else None
+            if departement == -1:
+                # Instances sans département: couvertes par le niveau (étape)
+                continue
+            distributions.append(DistributionDureeEtape(
+                etape_id=int(cles_triees[0][debut]),
+                departement_id=departement,
+                heure_semaine=int(cles_triees[2][debut]) if heures is not None else None,
+                nombre_observations=int(tailles[i]),
+                duree_moyenne_minutes=float(moyennes[i]),
+                duree_mediane_minutes=float(medianes[i]),
+                duree_p90_minutes=float(p90[i])
+            ))
+        return distributions
+
+    @staticmethod
+    def _quantile_segments(
+        valeurs: np.ndarray,
+        debuts: np.ndarray,
+        tailles: np.ndarray,
+        q: float
+    ) -> np.ndarray:
+        """Quantile (interpolation linéaire) de segments déjà triés."""
+        position = debuts + q * (tailles - 1)
+        bas = np.floor(position).astype(np.int64)
+        haut = np.ceil(position).astype(np.int64)
+        return valeurs[bas] + (valeurs[haut] - valeurs[bas]) * (position - bas)
+
+    # ------------------------------------------------------------------
+    # Estimation
+    # ------------------------------------------------------------------
+
+    def charger_distributions(
+        self,
+        etape_ids: Optional[Iterable[int]] = None
+    ) -> Dict[CleDistribution, float]:
+        """Charge les durées médianes indexées par (étape, département, heure)."""
+        queryset = DistributionDureeEtape.objects.all()
+        if etape_ids is not None:
+            queryset = queryset.filter(etape_id__in=list(etape_ids))
+
+        return {
+            (etape_id, departement_id, heure): mediane
+            for etape_id, departement_id, heure, mediane in queryset.values_list(
+                'etape_id', 'departement_id', 'heure_semaine', 'duree_mediane_minutes'
+            )
+        }
+
+    def estimer_minutes_restantes(
+        self,
+        etapes_restantes: List[Tuple[int, int]],
+        departement_id: Optional[int],
+        debut_etape_actuelle: datetime,
+        distributions: Dict[CleDistribution, float],
+        maintenant: Optional[datetime] = None
+    ) -> int:
+        """
+        Somme les durées attendues des étapes restantes.
+
+        Args:
+            etapes_restantes: (id, durée estimée) de l'étape actuelle puis des suivantes
+            departement_id: Département de l'instance
+            debut_etape_actuelle: Entrée dans l'étape actuelle
+            distributions: Durées médianes chargées par charger_distributions
+            maintenant: Instant de référence (défaut: maintenant)
+
+        Returns:
+            Temps restant estimé en minutes
+        """
+        maintenant = maintenant or timezone.now()
+        curseur = debut_etape_actuelle
+
+        for etape_id, duree_estimee in etapes_restantes:
+            duree = self._duree_attendue(
+                etape_id, departement_id, heure_semaine(curseur),
+                duree_estimee, distributions
+            )
+            curseur = curseur + timedelta(minutes=duree)
+
+        # L'étape actuelle a pu déjà dépasser sa durée attendue
+        return max(int(round((curseur - maintenant).total_seconds() / 60)), 0)
+
+    @staticmethod
+    def _duree_attendue(
+        etape_id: int,
+        departement_id: Optional[int],
+        heure: int,
+        duree_estimee: int,
+        distributions: Dict[CleDistribution, float]
+    ) -> float:
+        """Durée médiane la plus précise disponible pour une étape."""
+        for cle in (
+            (etape_id, departement_id, heure),
+            (etape_id, departement_id, None),
+            (etape_id, None, None),
+        ):
+            if cle in distributions:
+                return distributions[cle]
+        return float(duree_estimee)
+
+    def appliquer_eta(
+        self,
+        instance: InstanceWorkflow,
+        debut_etape_actuelle: datetime,
+        distributions: Optional[Dict[CleDistribution, float]] = None,
+        etapes: Optional[List[Tuple[int, int, int]]] = None
+    ) -> InstanceWorkflow:
+        """
+        Calcule l'ETA et la place sur l'instance (sans sauvegarder).
+
+        Args:
+            instance: Instance de workflow
+            debut_etape_actuelle: Entrée dans l'étape actuelle
+            distributions: Durées préchargées (sinon chargées pour ce type)
+            etapes: (id, ordre, durée estimée) des étapes du type (sinon chargées)
+        """
+        maintenant = timezone.now()
+
+        if instance.statut in [InstanceWorkflow.Statut.TERMINE, InstanceWorkflow.Statut.ABANDONNE] \
+                or instance.etape_actuelle_id is None:
+            instance.eta_minutes_restantes = None
+            instance.eta_fin_prevue = None
+            instance.eta_calculee_le = maintenant
+            return instance
+
+        if etapes is None:
+            etapes = list(EtapeWorkflow.objects.filter(
+                type_workflow_id=instance.type_workflow_id
+            ).order_by('ordre').values_list('id', 'ordre', 'duree_estimee_minutes'))
+        if distributions is None:
+            distributions = self.charger_distributions(e[0] for e in etapes)
+
+        # Étape actuelle puis étapes suivantes (même règle que obtenir_etape_suivante)
+        ordre_actuel = next(
+            (ordre for etape_id, ordre, _ in etapes if etape_id == instance.etape_actuelle_id),
+            None
+        )
+        restantes = [
+            (etape_id, duree) for etape_id, ordre, duree in etapes
+            if ordre_actuel is not None and (
+                etape_id == instance.etape_actuelle_id or ordre > ordre_actuel
+            )
+        ]
+
+        minutes = self.estimer_minutes_restantes(
+            restantes, instance.departement_id, debut_etape_actuelle,
+            distributions, maintenant
+        )
+        instance.eta_minutes_restantes = minutes
+        instance.eta_fin_prevue = maintenant + timedelta(minutes=minutes)
+        instance.eta_calculee_le = maintenant
+        return instance
+
+    def rafraichir_instances_actives(self) -> int:
+        """
+        Recalcule l'ETA de toutes les instances actives (après le lot nocturne).
+
+        Returns:
+            Nombre d'instances mises à jour
+        """
+        distributions = self.charger_distributions()
+        etapes_par_type: Dict[int, List[Tuple[int, int, int]]] = {}
+        for type_id, etape_id, ordre, duree in EtapeWorkflow.objects.order_by(
+            'type_workflow_id', 'ordre'
+        ).values_list('type_workflow_id', 'id', 'ordre', 'duree_estimee_minutes'):
+            etapes_par_type.setdefault(type_id, []).append((etape_id, ordre, duree))
+
+        instances = InstanceWorkflow.objects.filter(
+            statut__in=['INITIE', 'EN_COURS', 'EN_PAUSE']
+        ).annotate(
+            derniere_transition=Max('transitions__horodatage')
+        ).only(
+            'id', 'type_workflow_id', 'etape_actuelle_id', 'departement_id',
+            'statut', 'demarre_le'
+        )
+
+        lot = []
+        total = 0
+        for instance in instances.iterator(chunk_size=self.TAILLE_LOT):
+            self.appliquer_eta(
+                instance,
+                instance.derniere_transition or instance.demarre_le,
+                distributions=distributions,
+                etapes=etapes_par_type.get(instance.type_workflow_id, [])
+            )
+            lot.append(instance)
+            if len(lot) >= self.TAILLE_LOT:
+                total += self._sauvegarder_eta(lot)
+                lot = []
+        if lot:
+            total += self._sauvegarder_eta(lot)
+
+        return total
+
+    @staticmethod
+    def _sauvegarder_eta(instances: List[InstanceWorkflow]) -> int:
+        InstanceWorkflow.objects.bulk_update(
+            instances,
+            ['eta_minutes_restantes', 'eta_fin_prevue', 'eta_calculee_le']
+        )
+        # bulk_update n'émet pas de signal: invalidation explicite des lectures
+        invalider('workflows')
+        return len(instances)
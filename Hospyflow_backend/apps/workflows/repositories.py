@@ -3,11 +3,12 @@ Repository Pattern - Couche d'accès aux données pour les workflows.
 Centralise toutes les requêtes à la base de données.
 """
 from typing import List, Optional
-from django.db.models import QuerySet, Count, Avg, F
+from django.db.models import QuerySet, Count, Avg, F, Q
 from django.utils import timezone
 from datetime import timedelta
 
 from .models import TypeWorkflow, EtapeWorkflow, InstanceWorkflow, TransitionEtape
+from .archivage import sources_instances
 
 
 class TypeWorkflowRepository:
@@ -126,17 +127,21 @@ class InstanceWorkflowRepository:
     
     @staticmethod
     def obtenir_statistiques_periode(debut: timezone, fin: timezone) -> dict:
-        """Retourne les statistiques sur une période."""
-        instances = InstanceWorkflow.objects.filter(
-            demarre_le__gte=debut,
-            demarre_le__lte=fin
-        )
-        return {
-            'total': instances.count(),
-            'terminees': instances.filter(statut='TERMINE').count(),
-            'en_cours': instances.filter(statut='EN_COURS').count(),
-            'abandonnees': instances.filter(statut='ABANDONNE').count(),
-        }
+        """Retourne les statistiques sur une période (archives incluses si besoin)."""
+        statistiques = {'total': 0, 'terminees': 0, 'en_cours': 0, 'abandonnees': 0}
+        for source in sources_instances(debut):
+            resultat = source.filter(
+                demarre_le__gte=debut,
+                demarre_le__lte=fin
+            ).aggregate(
+                total=Count('id'),
+                terminees=Count('id', filter=Q(statut='TERMINE')),
+                en_cours=Count('id', filter=Q(statut='EN_COURS')),
+                abandonnees=Count('id', filter=Q(statut='ABANDONNE')),
+            )
+            for cle, valeur in resultat.items():
+                statistiques[cle] += valeur
+        return statistiques
 
 
 class TransitionEtapeRepository:
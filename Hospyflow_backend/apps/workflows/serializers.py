@@ -1,6 +1,8 @@
 from rest_framework import serializers
+from django.utils import timezone
 
 from .models import TypeWorkflow, EtapeWorkflow, InstanceWorkflow, TransitionEtape
+from apps.core.lignes import LigneSerializer, date_iso, libelles
 
 
 class EtapeWorkflowSerializer(serializers.ModelSerializer):
@@ -40,6 +42,9 @@ class TypeWorkflowSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'cree_le', 'modifie_le']
     
     def get_nombre_etapes(self, obj):
+        # Annoté par les listes (TypeWorkflowListView), sinon une requête
+        if hasattr(obj, 'nombre_etapes'):
+            return obj.nombre_etapes
         return obj.etapes.count()
 
 
@@ -121,13 +126,72 @@ class InstanceWorkflowSerializer(serializers.ModelSerializer):
             'departement', 'departement_nom',
             'initie_par', 'initie_par_nom',
             'notes', 'demarre_le', 'termine_le', 'modifie_le',
-            'est_en_retard', 'duree_ecoulee_minutes'
+            'est_en_retard', 'duree_ecoulee_minutes',
+            'eta_minutes_restantes', 'eta_fin_prevue'
         ]
         read_only_fields = [
-            'id', 'initie_par', 'demarre_le', 'termine_le', 'modifie_le'
+            'id', 'initie_par', 'demarre_le', 'termine_le', 'modifie_le',
+            'eta_minutes_restantes', 'eta_fin_prevue'
         ]
 
 
+class InstanceWorkflowListeSerializer(LigneSerializer):
+    """Sortie de InstanceWorkflowSerializer pour les listes, lue avec values()."""
+    
+    colonnes = (
+        'id', 'type_workflow', 'type_workflow__nom', 'type_workflow__seuil_alerte_minutes',
+        'reference_patient', 'etape_actuelle', 'etape_actuelle__nom',
+        'statut', 'priorite', 'departement', 'departement__name',
+        'initie_par', 'initie_par__first_name', 'initie_par__last_name',
+        'notes', 'demarre_le', 'termine_le', 'modifie_le',
+        'eta_minutes_restantes', 'eta_fin_prevue'
+    )
+    termines = (InstanceWorkflow.Statut.TERMINE, InstanceWorkflow.Statut.ABANDONNE)
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statuts = libelles(InstanceWorkflow.Statut)
+        self.priorites = libelles(InstanceWorkflow.Priorite)
+    
+    def representer(self, ligne):
+        fuseau = self.fuseau
+        maintenant = timezone.now()
+        demarre_le, termine_le = ligne['demarre_le'], ligne['termine_le']
+        
+        donnees = {
+            'id': ligne['id'],
+            'type_workflow': ligne['type_workflow'],
+            'type_workflow_nom': ligne['type_workflow__nom'],
+            'reference_patient': ligne['reference_patient'],
+            'etape_actuelle': ligne['etape_actuelle'],
+            'etape_actuelle_nom': ligne['etape_actuelle__nom'],
+            'statut': ligne['statut'],
+            'statut_display': self.statuts.get(ligne['statut'], ligne['statut']),
+            'priorite': ligne['priorite'],
+            'priorite_display': self.priorites.get(ligne['priorite'], ligne['priorite']),
+            'departement': ligne['departement'],
+        }
+        if ligne['departement'] is not None:
+            donnees['departement_nom'] = ligne['departement__name']
+        donnees['initie_par'] = ligne['initie_par']
+        if ligne['initie_par'] is not None:
+            donnees['initie_par_nom'] = f"{ligne['initie_par__first_name']} {ligne['initie_par__last_name']}"
+        donnees.update({
+            'notes': ligne['notes'],
+            'demarre_le': date_iso(demarre_le, fuseau),
+            'termine_le': date_iso(termine_le, fuseau),
+            'modifie_le': date_iso(ligne['modifie_le'], fuseau),
+            'est_en_retard': (
+                ligne['statut'] not in self.termines
+                and (maintenant - demarre_le).total_seconds() / 60 > ligne['type_workflow__seuil_alerte_minutes']
+            ),
+            'duree_ecoulee_minutes': int(((termine_le or maintenant) - demarre_le).total_seconds() / 60),
+            'eta_minutes_restantes': ligne['eta_minutes_restantes'],
+            'eta_fin_prevue': date_iso(ligne['eta_fin_prevue'], fuseau),
+        })
+        return donnees
+
+
 class InstanceWorkflowDetailSerializer(InstanceWorkflowSerializer):
     """Serializer détaillé avec l'historique des transitions."""
     
@@ -184,3 +248,9 @@ class AbandonnerWorkflowSerializer(serializers.Serializer):
         required=True,
         help_text="Raison de l'abandon du workflow"
     )
+
+
+class ETAWorkflowsParametresSerializer(serializers.Serializer):
+    """Paramètres de requête des ETA des workflows actifs."""
+    
+    departement = serializers.IntegerField(min_value=1, required=False)
@@ -13,6 +13,7 @@ from .repositories import (
     InstanceWorkflowRepository,
     TransitionEtapeRepository
 )
+from .prediction import PredictionETAService
 
 
 class WorkflowException(Exception):
@@ -31,6 +32,7 @@ class GestionWorkflowService:
         self.etape_repo = EtapeWorkflowRepository()
         self.instance_repo = InstanceWorkflowRepository()
         self.transition_repo = TransitionEtapeRepository()
+        self.prediction = PredictionETAService()
     
     @transaction.atomic
     def demarrer_workflow(
@@ -89,6 +91,12 @@ class GestionWorkflowService:
                 'commentaire': 'Démarrage du workflow'
             })
         
+        # Mettre en cache l'ETA initiale
+        self.prediction.appliquer_eta(instance, debut_etape_actuelle=instance.demarre_le)
+        instance.save(update_fields=[
+            'eta_minutes_restantes', 'eta_fin_prevue', 'eta_calculee_le'
+        ])
+        
         return instance
     
     @transaction.atomic
@@ -153,6 +161,9 @@ class GestionWorkflowService:
             instance.termine_le = timezone.now()
             instance.etape_actuelle = None
         
+        # Rafraîchir l'ETA: l'étape suivante commence maintenant
+        self.prediction.appliquer_eta(instance, debut_etape_actuelle=timezone.now())
+        
         instance.save()
         return instance
     
@@ -189,6 +200,7 @@ class GestionWorkflowService:
         
         instance.statut = InstanceWorkflow.Statut.ABANDONNE
         instance.termine_le = timezone.now()
+        self.prediction.appliquer_eta(instance, debut_etape_actuelle=instance.termine_le)
         instance.save()
         
         return instance
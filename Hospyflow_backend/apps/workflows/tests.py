@@ -0,0 +1,303 @@
+"""
+Tests des workflows: prédiction de l'ETA (repli des distributions, heure
+locale des observations, vues), archivage par lots, export des transitions et
+sérialisation rapide des listes.
+"""
+import csv
+import io
+from datetime import datetime, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+from django.db.models.signals import post_delete
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from .archivage import ArchivageException, ArchivageWorkflowService, sources_transitions
+from .models import (
+    DistributionDureeEtape,
+    InstanceWorkflow,
+    InstanceWorkflowArchive,
+    TransitionEtape,
+    TransitionEtapeArchive
+)
+from .prediction import PredictionETAService, heure_semaine
+from .serializers import InstanceWorkflowListeSerializer, InstanceWorkflowSerializer
+
+
+# ----------------------------------------------------------------------
+# Prédiction de l'ETA
+# ----------------------------------------------------------------------
+
+def test_duree_attendue_du_plus_precis_au_plus_general():
+    service = PredictionETAService()
+    lundi_9h = timezone.make_aware(datetime(2024, 5, 6, 9, 0))
+    heure = heure_semaine(lundi_9h)
+    distributions = {
+        (1, 7, heure): 12.0,
+        (1, 7, None): 20.0,
+        (2, None, None): 40.0,
+    }
+
+    # Heure connue, puis département, puis étape, puis durée estimée de l'étape
+    assert service.estimer_minutes_restantes([(1, 99)], 7, lundi_9h, distributions, lundi_9h) == 12
+    assert service.estimer_minutes_restantes(
+        [(1, 99)], 7, lundi_9h + timedelta(hours=1), distributions, lundi_9h + timedelta(hours=1)
+    ) == 20
+    assert service.estimer_minutes_restantes([(2, 99)], 7, lundi_9h, distributions, lundi_9h) == 40
+    assert service.estimer_minutes_restantes([(3, 25)], 7, lundi_9h, distributions, lundi_9h) == 25
+
+
+def test_temps_deja_ecoule_deduit_et_jamais_negatif():
+    service = PredictionETAService()
+    debut = timezone.now() - timedelta(minutes=50)
+    restantes = [(1, 30), (2, 40)]
+
+    assert service.estimer_minutes_restantes(restantes, None, debut, {}, debut + timedelta(minutes=50)) == 20
+    assert service.estimer_minutes_restantes(restantes, None, debut, {}, debut + timedelta(hours=3)) == 0
+
+
+@pytest.mark.django_db
+def test_appliquer_eta_sur_les_etapes_restantes(type_workflow, departement):
+    accueil, examen, sortie = type_workflow.etapes.order_by('ordre')
+    instance = InstanceWorkflow.objects.create(
+        type_workflow=type_workflow,
+        reference_patient='PAT-1',
+        statut=InstanceWorkflow.Statut.EN_COURS,
+        etape_actuelle=examen,
+        departement=departement
+    )
+
+    PredictionETAService().appliquer_eta(instance, debut_etape_actuelle=timezone.now())
+    # Examen (30) + Sortie (15), sans distribution calculée
+    assert instance.eta_minutes_restantes == 45
+
+    instance.statut = InstanceWorkflow.Statut.TERMINE
+    PredictionETAService().appliquer_eta(instance, debut_etape_actuelle=timezone.now())
+    assert instance.eta_minutes_restantes is None
+
+
+@pytest.mark.django_db
+def test_distributions_calculees_depuis_l_historique(type_workflow, creer_parcours, departement):
+    etapes = list(type_workflow.etapes.order_by('ordre'))
+    debut = timezone.now() - timedelta(days=2)
+    for i in range(PredictionETAService.MIN_OBSERVATIONS + 1):
+        creer_parcours(type_workflow, etapes, debut + timedelta(hours=i), duree=20)
+
+    service = PredictionETAService()
+    assert service.calculer_distributions() > 0
+    examen = etapes[1]
+    distribution = DistributionDureeEtape.objects.get(
+        etape=examen, departement=departement, heure_semaine__isnull=True
+    )
+    assert distribution.nombre_observations == PredictionETAService.MIN_OBSERVATIONS + 1
+    assert distribution.duree_mediane_minutes == 20
+
+    # Médianes observées (20 min) plutôt que durées estimées (30 + 15)
+    instance = InstanceWorkflow.objects.create(
+        type_workflow=type_workflow,
+        reference_patient='PAT-EN-COURS',
+        statut=InstanceWorkflow.Statut.EN_COURS,
+        etape_actuelle=examen,
+        departement=departement
+    )
+    service.appliquer_eta(instance, debut_etape_actuelle=timezone.now())
+    assert instance.eta_minutes_restantes == 40
+
+
+def test_observations_en_heure_locale_autour_du_changement_d_heure():
+    # Nuit du passage à l'heure d'été (31 mars 2024, 2h -> 3h à Paris)
+    paris = ZoneInfo('Europe/Paris')
+    fin_observations = [
+        datetime(2024, 3, 30, 23, 0, tzinfo=dt_timezone.utc) + timedelta(minutes=20 * i)
+        for i in range(12)
+    ]
+    lignes = [(1, 2, horodatage, 25) for horodatage in fin_observations]
+
+    with timezone.override(paris):
+        _, _, heures, _ = PredictionETAService()._charger_observations(lignes)
+        attendues = [heure_semaine(horodatage - timedelta(minutes=25)) for horodatage in fin_observations]
+
+    assert heures.tolist() == attendues
+    assert len(set(attendues)) > 2
+
+
+@pytest.mark.django_db
+def test_vue_eta_restreinte_au_departement_et_sans_ecriture(
+    type_workflow, autre_departement, client_medecin, client_admin
+):
+    instance = InstanceWorkflow.objects.create(
+        type_workflow=type_workflow,
+        reference_patient='PAT-1',
+        statut=InstanceWorkflow.Statut.EN_COURS,
+        etape_actuelle=type_workflow.etapes.order_by('ordre').first(),
+        departement=autre_departement
+    )
+    url = f'/api/workflows/instances/{instance.pk}/eta/'
+
+    assert client_medecin.get(url).status_code == 404
+
+    reponse = client_admin.get(url)
+    assert reponse.status_code == 200
+    assert reponse.json()['eta_minutes_restantes'] is not None
+    instance.refresh_from_db()
+    assert instance.eta_calculee_le is None
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('departement', ['abc', '0'])
+def test_eta_workflows_actifs_departement_invalide(client_admin, departement):
+    assert client_admin.get(f'/api/workflows/eta/?departement={departement}').status_code == 400
+
+
+@pytest.mark.django_db
+def test_eta_workflows_actifs_filtre_par_departement(client_admin, type_workflow, departement, autre_departement):
+    for numero, service in enumerate([departement, autre_departement]):
+        InstanceWorkflow.objects.create(
+            type_workflow=type_workflow,
+            reference_patient=f'PAT-{numero}',
+            statut=InstanceWorkflow.Statut.EN_COURS,
+            etape_actuelle=type_workflow.etapes.first(),
+            departement=service
+        )
+
+    reponse = client_admin.get(f'/api/workflows/eta/?departement={departement.pk}')
+    assert reponse.status_code == 200
+    assert [w['departement'] for w in reponse.json()['workflows']] == [departement.pk]
+
+
+# ----------------------------------------------------------------------
+# Archivage
+# ----------------------------------------------------------------------
+
+@pytest.fixture
+def parcours_anciens(type_workflow, creer_parcours):
+    """Cinq parcours terminés il y a deux mois et un parcours récent."""
+    etapes = list(type_workflow.etapes.order_by('ordre'))
+    ancien = timezone.now() - timedelta(days=60)
+    for i in range(5):
+        creer_parcours(type_workflow, etapes, ancien + timedelta(hours=i))
+    return creer_parcours(type_workflow, etapes, timezone.now() - timedelta(days=1))
+
+
+@pytest.mark.django_db
+def test_archivage_par_lots_invalide_une_fois_par_lot(parcours_anciens, monkeypatch):
+    invalidations = []
+    monkeypatch.setattr(
+        'apps.workflows.archivage.invalider', lambda *etiquettes: invalidations.append(set(etiquettes))
+    )
+    suppressions = []
+
+    def compter_suppression(sender, **kwargs):
+        suppressions.append(kwargs['instance'].pk)
+    post_delete.connect(compter_suppression, sender=InstanceWorkflow)
+    try:
+        totaux = ArchivageWorkflowService(jours=31, taille_lot=2).archiver()
+    finally:
+        post_delete.disconnect(compter_suppression, sender=InstanceWorkflow)
+
+    assert totaux == {'lots': 3, 'instances': 5, 'transitions': 20}
+    assert len(invalidations) == 3
+    assert all('workflows' in etiquettes for etiquettes in invalidations)
+    assert suppressions == []
+
+    assert list(InstanceWorkflow.objects.values_list('pk', flat=True)) == [parcours_anciens.pk]
+    assert InstanceWorkflowArchive.objects.count() == 5
+    assert TransitionEtapeArchive.objects.count() == 20
+    assert TransitionEtape.objects.count() == 4
+
+
+@pytest.mark.django_db
+def test_archivage_reprend_apres_interruption(parcours_anciens):
+    service = ArchivageWorkflowService(jours=31, taille_lot=2)
+
+    assert service.archiver(max_lots=1) == {'lots': 1, 'instances': 2, 'transitions': 8}
+    assert service.archiver() == {'lots': 2, 'instances': 3, 'transitions': 12}
+    assert service.archiver()['lots'] == 0
+
+    # Les lectures historiques parcourent l'archive puis la table active
+    assert sum(source.count() for source in sources_transitions()) == 24
+
+
+def test_horizon_d_archivage_minimum():
+    with pytest.raises(ArchivageException):
+        ArchivageWorkflowService(jours=ArchivageWorkflowService.JOURS_MINIMUM - 1)
+
+
+# ----------------------------------------------------------------------
+# Export des transitions
+# ----------------------------------------------------------------------
+
+URL_EXPORT = '/api/workflows/transitions/export/'
+
+
+@pytest.mark.django_db
+def test_export_transitions_archives_comprises(client_admin, type_workflow, creer_parcours):
+    etapes = list(type_workflow.etapes.order_by('ordre'))
+    creer_parcours(type_workflow, etapes, timezone.now() - timedelta(days=60))
+    creer_parcours(type_workflow, etapes, timezone.now() - timedelta(days=1))
+    ArchivageWorkflowService(jours=31).archiver()
+
+    reponse = client_admin.get(URL_EXPORT)
+    assert reponse.status_code == 200
+    lignes = list(csv.DictReader(io.StringIO(b''.join(reponse.streaming_content).decode('utf-8'))))
+    assert len(lignes) == 8
+    # Archive puis table active, chacune dans l'ordre chronologique
+    assert [ligne['horodatage'] for ligne in lignes] == sorted(ligne['horodatage'] for ligne in lignes)
+    assert lignes[0]['etape_destination_nom'] == 'Accueil'
+    assert lignes[0]['instance_type_workflow_code'] == 'ADM'
+
+    hier = (timezone.localdate() - timedelta(days=1)).isoformat()
+    reponse = client_admin.get(URL_EXPORT, {'debut': hier})
+    assert len(b''.join(reponse.streaming_content).decode('utf-8').splitlines()) == 1 + 4
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('parametres', [
+    {'debut': '2024-02-30'},
+    {'debut': '2024-03-02', 'fin': '2024-03-01'},
+    {'sortie': 'xml'},
+])
+def test_export_transitions_parametres_invalides(client_admin, parametres):
+    assert client_admin.get(URL_EXPORT, parametres).status_code == 400
+
+
+# ----------------------------------------------------------------------
+# Sérialisation des listes
+# ----------------------------------------------------------------------
+
+MAINTENANT = datetime(2025, 3, 14, 12, 0, 0, 654321, tzinfo=dt_timezone.utc)
+
+
+@pytest.fixture
+def instances_variees(type_workflow, creer_parcours, monkeypatch):
+    """
+    Un parcours terminé complet, un parcours en retard sans étape, département
+    ni initiateur, avec ETA (microsecondes); horloge figée.
+    """
+    monkeypatch.setattr(timezone, 'now', lambda: MAINTENANT)
+    etapes = list(type_workflow.etapes.order_by('ordre'))
+    creer_parcours(type_workflow, etapes, MAINTENANT - timedelta(hours=3, microseconds=7))
+    en_cours = InstanceWorkflow.objects.create(
+        type_workflow=type_workflow, reference_patient='PAT-ORPHELIN', priorite=InstanceWorkflow.Priorite.URGENTE
+    )
+    InstanceWorkflow.objects.filter(pk=en_cours.pk).update(
+        demarre_le=MAINTENANT - timedelta(hours=2, microseconds=123456),
+        modifie_le=MAINTENANT.replace(microsecond=0),
+        eta_minutes_restantes=25,
+        eta_fin_prevue=MAINTENANT + timedelta(minutes=25, microseconds=1)
+    )
+    return InstanceWorkflow.objects.select_related('type_workflow').order_by('id')
+
+
+@pytest.mark.parametrize('fuseau', ['UTC', 'Africa/Douala', 'Asia/Kolkata', 'America/St_Johns'])
+def test_liste_rapide_identique_au_serializer(instances_variees, fuseau):
+    with timezone.override(fuseau):
+        attendu = JSONRenderer().render(InstanceWorkflowSerializer(instances_variees, many=True).data)
+        lignes = instances_variees.values(*InstanceWorkflowListeSerializer.colonnes)
+        rapide = JSONRenderer().render(InstanceWorkflowListeSerializer(lignes, many=True).data)
+
+    assert rapide == attendu
+    donnees = InstanceWorkflowSerializer(instances_variees, many=True).data
+    assert [d['est_en_retard'] for d in donnees] == [False, True]
+    assert donnees[1]['etape_actuelle_nom'] is None and 'departement_nom' not in donnees[1]
@@ -12,7 +12,10 @@ from .views import (
     AbandonnerWorkflowView,
     PauseRepriseWorkflowView,
     ProgressionWorkflowView,
-    WorkflowsEnRetardView
+    WorkflowsEnRetardView,
+    ETAWorkflowsActifsView,
+    ETAInstanceView,
+    ExportTransitionsView
 )
 
 urlpatterns = [
@@ -27,6 +30,7 @@ urlpatterns = [
     path('instances/', InstanceWorkflowListView.as_view(), name='instance_workflow_list'),
     path('instances/<int:pk>/', InstanceWorkflowDetailView.as_view(), name='instance_workflow_detail'),
     path('instances/<int:pk>/progression/', ProgressionWorkflowView.as_view(), name='progression_workflow'),
+    path('instances/<int:pk>/eta/', ETAInstanceView.as_view(), name='eta_instance'),
     
     # Actions sur les workflows
     path('demarrer/', DemarrerWorkflowView.as_view(), name='demarrer_workflow'),
@@ -36,4 +40,8 @@ urlpatterns = [
     
     # Surveillance
     path('en-retard/', WorkflowsEnRetardView.as_view(), name='workflows_en_retard'),
+    path('eta/', ETAWorkflowsActifsView.as_view(), name='eta_workflows_actifs'),
+    
+    # Export brut
+    path('transitions/export/', ExportTransitionsView.as_view(), name='export_transitions'),
 ]
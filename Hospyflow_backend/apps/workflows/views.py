@@ -1,7 +1,11 @@
+from datetime import datetime, time
+
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.db.models import Count
+from django.utils import timezone
 
 from .models import TypeWorkflow, EtapeWorkflow, InstanceWorkflow
 from .serializers import (
@@ -9,15 +13,27 @@ from .serializers import (
     TypeWorkflowDetailSerializer,
     EtapeWorkflowSerializer,
     InstanceWorkflowSerializer,
+    InstanceWorkflowListeSerializer,
     InstanceWorkflowDetailSerializer,
     TransitionEtapeSerializer,
     DemarrerWorkflowSerializer,
     AvancerEtapeSerializer,
-    AbandonnerWorkflowSerializer
+    AbandonnerWorkflowSerializer,
+    ETAWorkflowsParametresSerializer
 )
 from .services import GestionWorkflowService, WorkflowException
 from .repositories import TypeWorkflowRepository, InstanceWorkflowRepository
+from .prediction import PredictionETAService
+from .archivage import sources_transitions
 from apps.accounts.permissions import IsAdminUser, IsMedicalStaff
+from apps.core.exports import (
+    reponse_export, filtrer_periode, servie_par_asgi, ExportException, PeriodeExportSerializer
+)
+from apps.core.conditionnel import LectureConditionnelleMixin
+from apps.core.lignes import ListeRapideMixin
+
+# Étiquettes des lectures d'instances (ETag des requêtes conditionnelles)
+ETIQUETTES_INSTANCES = ['workflows', 'types_workflow', 'departements', 'personnel']
 
 
 class TypeWorkflowListView(generics.ListAPIView):
@@ -27,8 +43,10 @@ class TypeWorkflowListView(generics.ListAPIView):
     filterset_fields = ['categorie', 'est_actif']
     search_fields = ['nom', 'code', 'description']
     
+    budget_requetes = 5
+    
     def get_queryset(self):
-        return TypeWorkflowRepository.obtenir_tous_actifs()
+        return TypeWorkflowRepository.obtenir_tous_actifs().annotate(nombre_etapes=Count('etapes'))
 
 
 class TypeWorkflowDetailView(generics.RetrieveAPIView):
@@ -57,9 +75,12 @@ class EtapeWorkflowListView(generics.ListAPIView):
         ).order_by('ordre')
 
 
-class InstanceWorkflowListView(generics.ListAPIView):
+class InstanceWorkflowListView(LectureConditionnelleMixin, ListeRapideMixin, generics.ListAPIView):
     """Liste les instances de workflows."""
     serializer_class = InstanceWorkflowSerializer
+    serializer_liste_class = InstanceWorkflowListeSerializer
+    etiquettes_etag = ETIQUETTES_INSTANCES
+    periode_etag = 60  # Durées écoulées et retards, à la minute
     permission_classes = [permissions.IsAuthenticated]
     filterset_fields = ['type_workflow', 'statut', 'priorite', 'departement']
     search_fields = ['reference_patient', 'notes']
@@ -229,9 +250,11 @@ class ProgressionWorkflowView(APIView):
             }, status=status.HTTP_404_NOT_FOUND)
 
 
-class WorkflowsEnRetardView(APIView):
+class WorkflowsEnRetardView(LectureConditionnelleMixin, APIView):
     """Endpoint pour lister les workflows en retard."""
     permission_classes = [permissions.IsAuthenticated]
+    etiquettes_etag = ETIQUETTES_INSTANCES
+    periode_etag = 60
     
     def get(self, request):
         service = GestionWorkflowService()
@@ -241,3 +264,135 @@ class WorkflowsEnRetardView(APIView):
             'nombre': len(instances),
             'workflows': InstanceWorkflowSerializer(instances, many=True).data
         })
+
+
+class ETAWorkflowsActifsView(APIView):
+    """
+    Endpoint pour les ETA de tous les workflows actifs.
+    Lecture pure des prédictions mises en cache sur les instances.
+    
+    GET /api/workflows/eta/?departement=<id>
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request):
+        parametres = ETAWorkflowsParametresSerializer(data=request.query_params)
+        parametres.is_valid(raise_exception=True)
+        queryset = InstanceWorkflowRepository.obtenir_en_cours()
+        
+        departement_id = parametres.validated_data.get('departement')
+        if departement_id:
+            queryset = queryset.filter(departement_id=departement_id)
+        
+        utilisateur = request.user
+        if utilisateur.is_medical_staff and utilisateur.department:
+            queryset = queryset.filter(departement=utilisateur.department)
+        
+        workflows = list(queryset.order_by('eta_fin_prevue').values(
+            'id', 'reference_patient', 'statut', 'priorite',
+            'type_workflow', 'type_workflow__nom',
+            'etape_actuelle', 'etape_actuelle__nom',
+            'departement', 'departement__name',
+            'eta_minutes_restantes', 'eta_fin_prevue', 'eta_calculee_le'
+        ))
+        
+        return Response({
+            'nombre': len(workflows),
+            'workflows': workflows
+        })
+
+
+class ETAInstanceView(APIView):
+    """
+    Endpoint pour l'ETA d'une instance. Si elle n'a pas encore été calculée,
+    elle est estimée à la volée sans être enregistrée (lecture pure).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request, pk):
+        instance = InstanceWorkflowRepository.obtenir_par_id(pk)
+        
+        utilisateur = request.user
+        if instance and utilisateur.is_medical_staff and utilisateur.department \
+                and instance.departement_id != utilisateur.department_id:
+            instance = None
+        
+        if not instance:
+            return Response({
+                'erreur': 'Instance de workflow introuvable.'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        if instance.eta_calculee_le is None:
+            derniere_transition = instance.transitions.order_by('-horodatage').first()
+            PredictionETAService().appliquer_eta(
+                instance,
+                debut_etape_actuelle=(
+                    derniere_transition.horodatage if derniere_transition
+                    else instance.demarre_le
+                )
+            )
+        
+        return Response({
+            'instance_id': instance.id,
+            'statut': instance.statut,
+            'etape_actuelle': instance.etape_actuelle.nom if instance.etape_actuelle else None,
+            'eta_minutes_restantes': instance.eta_minutes_restantes,
+            'eta_fin_prevue': instance.eta_fin_prevue,
+            'eta_calculee_le': instance.eta_calculee_le
+        })
+
+
+class ExportTransitionsView(APIView):
+    """
+    Export brut des transitions d'étapes en flux (CSV ou NDJSON, gzip optionnel),
+    archives comprises. Filtres de la liste des instances, plus la période.
+    
+    GET /api/workflows/transitions/export/?sortie=csv|ndjson&gzip=1&debut=AAAA-MM-JJ&fin=AAAA-MM-JJ
+        &type_workflow=<id>&departement=<id>&statut=<statut>&priorite=<priorite>
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    FILTRES = ['type_workflow', 'statut', 'priorite', 'departement']
+    COLONNES = [
+        'id', 'horodatage', 'instance_id', 'instance__reference_patient',
+        'instance__type_workflow__code', 'instance__departement__code',
+        'instance__statut', 'instance__priorite',
+        'etape_source__nom', 'etape_destination__nom',
+        'effectuee_par__email', 'duree_etape_minutes', 'commentaire'
+    ]
+    
+    def get(self, request):
+        periode = PeriodeExportSerializer(data=request.query_params)
+        periode.is_valid(raise_exception=True)
+        debut = periode.validated_data.get('debut')
+        fin = periode.validated_data.get('fin')
+        filtres = {
+            f'instance__{champ}': request.query_params[champ]
+            for champ in self.FILTRES
+            if request.query_params.get(champ)
+        }
+        
+        # Filtrer par département de l'utilisateur si personnel médical
+        utilisateur = request.user
+        if utilisateur.is_medical_staff and utilisateur.department:
+            filtres['instance__departement'] = utilisateur.department.id
+        
+        depuis = timezone.make_aware(datetime.combine(debut, time.min)) if debut else None
+        sources = [
+            filtrer_periode(source.filter(**filtres), 'horodatage', debut, fin).order_by('horodatage')
+            for source in sources_transitions(depuis)
+        ]
+        
+        try:
+            return reponse_export(
+                sources,
+                self.COLONNES,
+                nom_fichier='transitions',
+                format=request.query_params.get('sortie', 'csv'),
+                gzip=request.query_params.get('gzip') == '1',
+                asynchrone=servie_par_asgi(request)
+            )
+        except ExportException as e:
+            return Response({
+                'erreur': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,389 @@
+"""
+Benchmark de bout en bout des chemins chauds de l'API: rejoue un mélange
+pondéré du trafic de l'application mobile (tableau de bord, liste des
+événements, signalement d'un événement, avancement d'un workflow, mes
+alertes, résumé des services) au nom du personnel médical de la base,
+idéalement peuplée par generer_donnees_charge.
+
+Deux modes:
+- client (défaut, sans réseau): client de test Django dans le processus.
+  Chaque requête est mesurée: durée, requêtes SQL (apps.core.instrumentation)
+  et, sur un second passage de --echantillon-memoire requêtes par endpoint,
+  pic de mémoire Python (tracemalloc). Les écritures sont annulées en fin de
+  mesure, sauf --conserver.
+- serveur: gunicorn + uvicorn local (benchmark_asgi.demarrer), --concurrence
+  clients HTTP keep-alive; débit et latences seulement, les écritures sont
+  conservées.
+
+Les résultats (débit, latences p50/p95/p99, requêtes SQL et mémoire par
+endpoint) sont écrits en JSON avec le commit courant dans benchmarks/resultats/;
+--comparer affiche l'écart entre deux fichiers.
+
+Usage:
+    python benchmarks/benchmark_api.py --requetes 2000
+    python benchmarks/benchmark_api.py --mode serveur --concurrence 16 --workers 2
+    python benchmarks/benchmark_api.py --comparer resultats/api_a1b2c3d_client.json resultats/api_e4f5a6b_client.json
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_asgi import RACINE, demarrer, port_libre  # noqa: E402
+from django.conf import settings  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from django.test import Client  # noqa: E402
+from rest_framework_simplejwt.tokens import RefreshToken  # noqa: E402
+
+from apps.accounts.models import User  # noqa: E402
+from apps.alerts.models import Alerte  # noqa: E402
+from apps.core.instrumentation import Mesure  # noqa: E402
+from apps.events.models import CategorieEvenement, MicroEvenement  # noqa: E402
+from apps.workflows.models import InstanceWorkflow, TransitionEtape  # noqa: E402
+
+# Endpoint -> poids dans le trafic de l'application mobile
+MELANGE = {
+    'tableau_bord': 10,
+    'liste_evenements': 25,
+    'signaler_evenement': 10,
+    'avancer_workflow': 15,
+    'mes_alertes': 25,
+    'resume_services': 15,
+}
+
+SEVERITES = [MicroEvenement.Severite.FAIBLE, MicroEvenement.Severite.MOYEN, MicroEvenement.Severite.ELEVE]
+
+
+class Scenario:
+    """Personnel, catégories et workflows à faire avancer, partagés par les clients."""
+
+    def __init__(self, utilisateurs: int, graine: int):
+        rng = random.Random(graine)
+        personnel = list(User.objects.filter(
+            is_active=True, role__in=[User.Role.NURSE, User.Role.DOCTOR], department__isnull=False
+        ).order_by('pk'))
+        if not personnel:
+            raise SystemExit("aucun personnel médical avec département: lancez generer_donnees_charge")
+        self.utilisateurs = [
+            (str(RefreshToken.for_user(u).access_token), u.department_id)
+            for u in rng.sample(personnel, min(utilisateurs, len(personnel)))
+        ]
+        self.categories = list(CategorieEvenement.objects.filter(est_actif=True).values_list('pk', flat=True))
+        instances = list(InstanceWorkflow.objects.filter(
+            statut=InstanceWorkflow.Statut.EN_COURS, etape_actuelle__isnull=False
+        ).values_list('pk', flat=True)[:20000])
+        rng.shuffle(instances)
+        self.instances = deque(instances)
+        self.verrou = threading.Lock()
+
+    def requete(self, nom: str, rng: random.Random):
+        """(jeton, méthode, chemin, corps JSON) de l'endpoint, None s'il n'est pas jouable."""
+        jeton, departement_id = rng.choice(self.utilisateurs)
+        if nom == 'tableau_bord':
+            return jeton, 'GET', '/api/analytics/tableau-de-bord/', None
+        if nom == 'liste_evenements':
+            return jeton, 'GET', '/api/events/', None
+        if nom == 'mes_alertes':
+            return jeton, 'GET', '/api/alerts/mes-alertes/', None
+        if nom == 'resume_services':
+            return jeton, 'GET', '/api/services/summary/', None
+        if nom == 'signaler_evenement':
+            if not self.categories:
+                return None
+            return jeton, 'POST', '/api/events/signaler/', {
+                'titre': 'Retard de prise en charge',
+                'description': 'Signalé par le benchmark',
+                'departement': departement_id,
+                'categorie': rng.choice(self.categories),
+                'severite': rng.choice(SEVERITES),
+            }
+        # avancer_workflow: une instance en cours, remise en file par reponse() tant qu'elle n'est pas terminée
+        with self.verrou:
+            if not self.instances:
+                return None
+            instance_id = self.instances.popleft()
+        return jeton, 'POST', f'/api/workflows/instances/{instance_id}/avancer/', {'commentaire': ''}
+
+    def reponse(self, nom: str, requete, statut: int, contenu: bytes):
+        if nom == 'avancer_workflow' and statut == 200 and b'"statut":"TERMINE"' not in contenu:
+            instance_id = int(requete[2].split('/')[-3])
+            with self.verrou:
+                self.instances.append(instance_id)
+
+
+def _percentile(valeurs, p: float) -> float:
+    valeurs = sorted(valeurs)
+    return valeurs[min(len(valeurs) - 1, int(len(valeurs) * p))]
+
+
+def _tirage(rng: random.Random) -> str:
+    return rng.choices(list(MELANGE), weights=list(MELANGE.values()))[0]
+
+
+# ----------------------------------------------------------------------
+# Mode client (processus courant)
+# ----------------------------------------------------------------------
+
+def _appeler(client: Client, requete):
+    jeton, methode, chemin, corps = requete
+    entetes = {'HTTP_AUTHORIZATION': f'Bearer {jeton}'}
+    if methode == 'GET':
+        return client.get(chemin, **entetes)
+    return client.post(chemin, data=corps, content_type='application/json', **entetes)
+
+
+def executer_client(scenario: Scenario, requetes: int, prechauffage: int, echantillon_memoire: int, graine: int):
+    client = Client()
+    rng = random.Random(graine)
+    mesures = {nom: {'latences': [], 'sql': [], 'memoire': [], 'erreurs': 0} for nom in MELANGE}
+
+    for nom in MELANGE:
+        for _ in range(prechauffage):
+            requete = scenario.requete(nom, rng)
+            if requete:
+                reponse = _appeler(client, requete)
+                scenario.reponse(nom, requete, reponse.status_code, reponse.content)
+
+    debut = time.perf_counter()
+    for _ in range(requetes):
+        nom = _tirage(rng)
+        requete = scenario.requete(nom, rng)
+        if requete is None:
+            continue
+        with Mesure(nom) as mesure:
+            t0 = time.perf_counter()
+            reponse = _appeler(client, requete)
+            duree = time.perf_counter() - t0
+        scenario.reponse(nom, requete, reponse.status_code, reponse.content)
+        mesures[nom]['latences'].append(duree * 1000)
+        mesures[nom]['sql'].append(mesure.nombre)
+        mesures[nom]['erreurs'] += reponse.status_code >= 400
+    duree_totale = time.perf_counter() - debut
+
+    # Mémoire sur un passage séparé: tracemalloc ralentit les requêtes mesurées
+    tracemalloc.start()
+    try:
+        for nom in MELANGE:
+            for _ in range(echantillon_memoire):
+                requete = scenario.requete(nom, rng)
+                if requete is None:
+                    break
+                tracemalloc.reset_peak()
+                avant = tracemalloc.get_traced_memory()[0]
+                reponse = _appeler(client, requete)
+                scenario.reponse(nom, requete, reponse.status_code, reponse.content)
+                mesures[nom]['memoire'].append((tracemalloc.get_traced_memory()[1] - avant) / 1024)
+    finally:
+        tracemalloc.stop()
+    return mesures, duree_totale
+
+
+# ----------------------------------------------------------------------
+# Mode serveur (gunicorn + uvicorn local)
+# ----------------------------------------------------------------------
+
+def executer_serveur(scenario: Scenario, port: int, concurrence: int, requetes: int, graine: int):
+    mesures = {nom: {'latences': [], 'sql': [], 'memoire': [], 'erreurs': 0} for nom in MELANGE}
+    verrou = threading.Lock()
+
+    def client(numero: int):
+        rng = random.Random(f'{graine}:{numero}')
+        connexion = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        locales = []
+        for _ in range(requetes):
+            nom = _tirage(rng)
+            requete = scenario.requete(nom, rng)
+            if requete is None:
+                continue
+            jeton, methode, chemin, corps = requete
+            entetes = {'Authorization': f'Bearer {jeton}', 'Content-Type': 'application/json'}
+            t0 = time.perf_counter()
+            connexion.request(methode, chemin, body=json.dumps(corps) if corps else None, headers=entetes)
+            reponse = connexion.getresponse()
+            scenario.reponse(nom, requete, reponse.status, reponse.read())
+            locales.append((nom, (time.perf_counter() - t0) * 1000, reponse.status,
+                            reponse.getheader('X-Requetes-Nombre')))
+            if reponse.getheader('Connection', '').lower() == 'close':
+                connexion.close()
+                connexion = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        connexion.close()
+        with verrou:
+            for nom, latence, statut, sql in locales:
+                mesures[nom]['latences'].append(latence)
+                mesures[nom]['erreurs'] += statut >= 400
+                if sql is not None:
+                    mesures[nom]['sql'].append(int(sql))
+
+    clients = [threading.Thread(target=client, args=(n,)) for n in range(concurrence)]
+    debut = time.perf_counter()
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    return mesures, time.perf_counter() - debut
+
+
+# ----------------------------------------------------------------------
+# Résultats
+# ----------------------------------------------------------------------
+
+def _git(*args) -> str:
+    try:
+        return subprocess.run(
+            ['git', *args], cwd=RACINE, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def resultats(mesures: dict, duree: float, parametres: dict) -> dict:
+    endpoints = {}
+    for nom, m in mesures.items():
+        if not m['latences']:
+            continue
+        endpoints[nom] = {
+            'requetes': len(m['latences']),
+            'erreurs': m['erreurs'],
+            # Débit de l'endpoint servi seul (temps cumulé de ses requêtes)
+            'debit': round(len(m['latences']) / (sum(m['latences']) / 1000), 1),
+            'latence_ms': {
+                'moyenne': round(sum(m['latences']) / len(m['latences']), 2),
+                'p50': round(_percentile(m['latences'], 0.50), 2),
+                'p95': round(_percentile(m['latences'], 0.95), 2),
+                'p99': round(_percentile(m['latences'], 0.99), 2),
+                'max': round(max(m['latences']), 2),
+            },
+            'requetes_sql': {
+                'moyenne': round(sum(m['sql']) / len(m['sql']), 1),
+                'max': max(m['sql']),
+            } if m['sql'] else None,
+            'memoire_ko': {
+                'moyenne': round(sum(m['memoire']) / len(m['memoire']), 1),
+                'max': round(max(m['memoire']), 1),
+            } if m['memoire'] else None,
+        }
+    total = sum(e['requetes'] for e in endpoints.values())
+    return {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git('rev-parse', '--short', 'HEAD') or None,
+        'arbre_modifie': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'base': connection.vendor,
+        'volumes': {
+            'workflows': InstanceWorkflow.objects.count(),
+            'transitions': TransitionEtape.objects.count(),
+            'evenements': MicroEvenement.objects.count(),
+            'alertes': Alerte.objects.count(),
+        },
+        'parametres': parametres,
+        'global': {'requetes': total, 'duree_s': round(duree, 2), 'debit': round(total / duree, 1)},
+        'endpoints': endpoints,
+    }
+
+
+def afficher(donnees: dict):
+    print(f"{'endpoint':<20} {'requêtes':>8} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} "
+          f"{'SQL moy':>8} {'mém. Ko':>8} {'erreurs':>7}")
+    for nom, e in donnees['endpoints'].items():
+        sql = e['requetes_sql']['moyenne'] if e['requetes_sql'] else '-'
+        memoire = e['memoire_ko']['moyenne'] if e['memoire_ko'] else '-'
+        latence = e['latence_ms']
+        print(f"{nom:<20} {e['requetes']:>8} {e['debit']:>8} {latence['p50']:>8} {latence['p95']:>8} "
+              f"{latence['p99']:>8} {sql:>8} {memoire:>8} {e['erreurs']:>7}")
+    g = donnees['global']
+    print(f"total: {g['requetes']} requêtes en {g['duree_s']} s ({g['debit']} req/s)")
+
+
+def comparer(chemin_avant: str, chemin_apres: str):
+    with open(chemin_avant, encoding='utf-8') as f:
+        avant = json.load(f)
+    with open(chemin_apres, encoding='utf-8') as f:
+        apres = json.load(f)
+
+    def ecart(a, b):
+        return f"{(b - a) / a * 100:+.0f}%" if a else '-'
+
+    print(f"{avant.get('commit')} -> {apres.get('commit')}")
+    print(f"{'endpoint':<20} {'req/s':>16} {'p50 (ms)':>18} {'p99 (ms)':>18} {'SQL moy':>14}")
+    for nom, b in apres['endpoints'].items():
+        a = avant['endpoints'].get(nom)
+        if a is None:
+            continue
+        sql_a = (a['requetes_sql'] or {}).get('moyenne', 0)
+        sql_b = (b['requetes_sql'] or {}).get('moyenne', 0)
+        print(f"{nom:<20} {b['debit']:>9} {ecart(a['debit'], b['debit']):>6} "
+              f"{b['latence_ms']['p50']:>11} {ecart(a['latence_ms']['p50'], b['latence_ms']['p50']):>6} "
+              f"{b['latence_ms']['p99']:>11} {ecart(a['latence_ms']['p99'], b['latence_ms']['p99']):>6} "
+              f"{sql_b:>7} {ecart(sql_a, sql_b):>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--mode', choices=['client', 'serveur'], default='client')
+    parser.add_argument('--requetes', type=int, default=1000, help='Requêtes (par client en mode serveur)')
+    parser.add_argument('--concurrence', type=int, default=8, help='Clients HTTP (mode serveur)')
+    parser.add_argument('--workers', type=int, default=2, help='Workers gunicorn (mode serveur)')
+    parser.add_argument('--utilisateurs', type=int, default=50, help='Membres du personnel simulés')
+    parser.add_argument('--prechauffage', type=int, default=5, help='Requêtes non mesurées par endpoint')
+    parser.add_argument('--echantillon-memoire', type=int, default=20, help='Requêtes par endpoint (mode client)')
+    parser.add_argument('--sans-cache', action='store_true', help='Désactiver le cache des indicateurs et des lectures')
+    parser.add_argument('--conserver', action='store_true', help='Conserver les écritures (mode client)')
+    parser.add_argument('--graine', type=int, default=42)
+    parser.add_argument('--sortie', default=None, help='Fichier JSON (défaut: benchmarks/resultats/api_<commit>_<mode>.json)')
+    parser.add_argument('--comparer', nargs=2, metavar=('AVANT', 'APRES'), help='Comparer deux fichiers de résultats')
+    args = parser.parse_args()
+
+    if args.comparer:
+        comparer(*args.comparer)
+        return
+
+    parametres = {k: v for k, v in vars(args).items() if k not in ('sortie', 'comparer')}
+    parametres['melange'] = MELANGE
+    scenario = Scenario(args.utilisateurs, args.graine)
+
+    if args.mode == 'client':
+        if args.sans_cache:
+            settings.INDICATEURS_CACHE_SECONDES = 0
+            settings.LECTURES_CACHE_SECONDES = 0
+        settings.ALLOWED_HOSTS = ['*']
+        with transaction.atomic():
+            mesures, duree = executer_client(
+                scenario, args.requetes, args.prechauffage, args.echantillon_memoire, args.graine
+            )
+            if not args.conserver:
+                transaction.set_rollback(True)
+    else:
+        port = port_libre()
+        env = {} if args.sans_cache else {
+            'INDICATEURS_CACHE_SECONDES': str(getattr(settings, 'INDICATEURS_CACHE_SECONDES', 30)),
+            'LECTURES_CACHE_SECONDES': str(getattr(settings, 'LECTURES_CACHE_SECONDES', 60))
+        }
+        processus = demarrer('gunicorn+uvicorn', port, args.workers, env)
+        try:
+            mesures, duree = executer_serveur(scenario, port, args.concurrence, args.requetes, args.graine)
+        finally:
+            processus.terminate()
+            processus.wait()
+
+    donnees = resultats(mesures, duree, parametres)
+    afficher(donnees)
+    sortie = args.sortie or os.path.join(
+        RACINE, 'benchmarks', 'resultats', f"api_{donnees['commit'] or 'inconnu'}_{args.mode}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(sortie)), exist_ok=True)
+    with open(sortie, 'w', encoding='utf-8') as f:
+        json.dump(donnees, f, ensure_ascii=False, indent=2)
+    print(f"résultats: {sortie}")
+
+
+if __name__ == '__main__':
+    main()
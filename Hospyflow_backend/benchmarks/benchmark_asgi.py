@@ -0,0 +1,147 @@
+"""
+Benchmark de charge local: runserver (WSGI, développement) contre gunicorn +
+uvicorn (ASGI, gunicorn.conf.py), sur les vues synchrones et leurs versions
+asynchrones (/async/): tableau de bord, résumé des services, mes alertes.
+
+Chaque serveur est démarré sur un port libre avec la base configurée, puis
+chargé par des clients HTTP keep-alive concurrents (authentifiés par JWT).
+Le cache des indicateurs et des lectures est désactivé pour mesurer les
+requêtes réelles.
+
+Usage:
+    python benchmarks/benchmark_asgi.py --concurrence 1 16 --requetes 200 --workers 2
+"""
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from rest_framework_simplejwt.tokens import RefreshToken  # noqa: E402
+
+from apps.accounts.models import User  # noqa: E402
+
+ENDPOINTS = [
+    ('tableau de bord', '/api/analytics/tableau-de-bord/'),
+    ('résumé services', '/api/services/summary/'),
+    ('mes alertes', '/api/alerts/mes-alertes/'),
+]
+
+
+def port_libre() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def demarrer(serveur: str, port: int, workers: int, env_sup: dict = None) -> subprocess.Popen:
+    env = dict(
+        os.environ, DEBUG='False', ALLOWED_HOSTS='127.0.0.1',
+        INDICATEURS_CACHE_SECONDES='0', LECTURES_CACHE_SECONDES='0', GUNICORN_BIND=f'127.0.0.1:{port}',
+        GUNICORN_WORKERS=str(workers), GUNICORN_LOGLEVEL='warning',
+        # Pas de recyclage des workers pendant la mesure (connexions keep-alive coupées)
+        GUNICORN_MAX_REQUESTS='0'
+    )
+    env.update(env_sup or {})
+    if serveur == 'runserver':
+        commande = [sys.executable, 'manage.py', 'runserver', f'127.0.0.1:{port}', '--noreload']
+    else:
+        commande = [
+            sys.executable, '-m', 'gunicorn', 'config.asgi:application',
+            '-c', 'gunicorn.conf.py', '--access-logfile', '/dev/null'
+        ]
+    processus = subprocess.Popen(
+        commande, cwd=RACINE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return processus
+        except OSError:
+            time.sleep(0.2)
+    processus.terminate()
+    raise RuntimeError(f"{serveur} n'a pas démarré sur le port {port}")
+
+
+def charger(port: int, chemin: str, jeton: str, concurrence: int, requetes: int):
+    """Débit (req/s) et latence p99 (ms) de `requetes` GET par client."""
+    latences, erreurs = [], []
+    verrou = threading.Lock()
+    entetes = {'Authorization': f'Bearer {jeton}'}
+
+    def client():
+        connexion = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        mesures = []
+        for _ in range(requetes):
+            debut = time.perf_counter()
+            connexion.request('GET', chemin, headers=entetes)
+            reponse = connexion.getresponse()
+            reponse.read()
+            mesures.append(time.perf_counter() - debut)
+            if reponse.status != 200:
+                erreurs.append(reponse.status)
+            if reponse.getheader('Connection', '').lower() == 'close':
+                connexion.close()
+                connexion = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        connexion.close()
+        with verrou:
+            latences.extend(mesures)
+
+    clients = [threading.Thread(target=client) for _ in range(concurrence)]
+    debut = time.perf_counter()
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    duree = time.perf_counter() - debut
+
+    latences.sort()
+    p99 = latences[min(len(latences) - 1, int(len(latences) * 0.99))]
+    return len(latences) / duree, p99 * 1000, len(erreurs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--concurrence', type=int, nargs='+', default=[1, 16])
+    parser.add_argument('--requetes', type=int, default=200, help='Requêtes par client')
+    parser.add_argument('--workers', type=int, default=2, help='Workers gunicorn')
+    args = parser.parse_args()
+
+    utilisateur = User.objects.filter(is_active=True, is_superuser=True).first()
+    if utilisateur is None:
+        parser.error("aucun superutilisateur actif: créez-en un (createsuperuser)")
+    jeton = str(RefreshToken.for_user(utilisateur).access_token)
+
+    print(f"{'serveur':<18} {'endpoint':<26} {'clients':>7} {'req/s':>8} {'p99 (ms)':>9} {'erreurs':>7}")
+    for serveur in ('runserver', 'gunicorn+uvicorn'):
+        port = port_libre()
+        processus = demarrer(serveur, port, args.workers)
+        try:
+            for libelle, chemin in ENDPOINTS:
+                variantes = [('sync', chemin)]
+                if serveur != 'runserver':
+                    variantes.append(('async', chemin + 'async/'))
+                for mode, url in variantes:
+                    charger(port, url, jeton, 1, 5)  # préchauffage
+                    for concurrence in args.concurrence:
+                        debit, p99, erreurs = charger(port, url, jeton, concurrence, args.requetes)
+                        print(f"{serveur:<18} {f'{libelle} ({mode})':<26} {concurrence:>7} "
+                              f"{debit:>8.1f} {p99:>9.1f} {erreurs:>7}")
+        finally:
+            processus.terminate()
+            processus.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark des connexions PostgreSQL sous gunicorn + uvicorn: une connexion
+par requête (DB_POOL_TAILLE=0) contre le pool par processus, sur des
+endpoints à petites requêtes. Les connexions persistantes (DB_CONN_MAX_AGE)
+ne sont pas mesurées: gunicorn.conf.py les désactive sous ASGI, où chaque
+requête a son propre thread.
+
+Nécessite USE_POSTGRES=True et une base peuplée. Pour chaque configuration,
+le nombre de connexions tenues par l'application en fin de charge est relevé
+dans pg_stat_activity.
+
+Usage:
+    USE_POSTGRES=True python benchmarks/benchmark_connexions.py --concurrence 1 16 --workers 2
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_asgi import charger, demarrer, port_libre  # noqa: E402
+from django.db import connection  # noqa: E402
+from rest_framework_simplejwt.tokens import RefreshToken  # noqa: E402
+
+from apps.accounts.models import User  # noqa: E402
+
+CONFIGURATIONS = [
+    ('sans pool', {'DB_POOL_TAILLE': '0'}),
+    ('pool 4 / worker', {'DB_POOL_TAILLE': '4'}),
+]
+
+ENDPOINTS = [
+    ('mes alertes (sync)', '/api/alerts/mes-alertes/'),
+    ('mes alertes (async)', '/api/alerts/mes-alertes/async/'),
+    ('résumé services (async)', '/api/services/summary/async/'),
+]
+
+
+def connexions_tenues() -> int:
+    """Connexions de l'application ouvertes sur le serveur (hors ce processus)."""
+    with connection.cursor() as curseur:
+        curseur.execute(
+            "SELECT count(*) FROM pg_stat_activity WHERE application_name = 'hospyflow' "
+            "AND pid <> pg_backend_pid()"
+        )
+        return curseur.fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--concurrence', type=int, nargs='+', default=[1, 16])
+    parser.add_argument('--requetes', type=int, default=200, help='Requêtes par client')
+    parser.add_argument('--workers', type=int, default=2, help='Workers gunicorn')
+    args = parser.parse_args()
+
+    if connection.vendor != 'postgresql':
+        parser.error("base PostgreSQL requise (USE_POSTGRES=True, DATABASE_URL)")
+    utilisateur = User.objects.filter(is_active=True, is_superuser=True).first()
+    if utilisateur is None:
+        parser.error("aucun superutilisateur actif: créez-en un (createsuperuser)")
+    jeton = str(RefreshToken.for_user(utilisateur).access_token)
+
+    print(f"{'configuration':<19} {'endpoint':<25} {'clients':>7} {'req/s':>8} "
+          f"{'p99 (ms)':>9} {'erreurs':>7} {'connexions':>10}")
+    for libelle_configuration, env in CONFIGURATIONS:
+        port = port_libre()
+        processus = demarrer('gunicorn+uvicorn', port, args.workers, env)
+        try:
+            for libelle, chemin in ENDPOINTS:
+                charger(port, chemin, jeton, 1, 5)  # préchauffage
+                for concurrence in args.concurrence:
+                    debit, p99, erreurs = charger(port, chemin, jeton, concurrence, args.requetes)
+                    print(f"{libelle_configuration:<19} {libelle:<25} {concurrence:>7} {debit:>8.1f} "
+                          f"{p99:>9.1f} {erreurs:>7} {connexions_tenues():>10}")
+        finally:
+            processus.terminate()
+            processus.wait()
+
+
+if __name__ == '__main__':
+    main()
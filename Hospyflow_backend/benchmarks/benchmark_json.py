@@ -0,0 +1,162 @@
+"""
+Benchmark du rendu JSON des pages de liste: JSONRenderer de DRF (module json)
+contre JSONRapideRenderer (orjson, apps/core/rendu_json.py) et son repli sans
+orjson, sur des pages de 1 000 événements, workflows et transitions.
+Pour les listes servies par values() (apps/core/lignes.py), la sérialisation
+rapide est comparée à celle du ModelSerializer.
+
+Les lignes sont lues dans la base (idéalement peuplée par
+generer_donnees_charge) et répétées si elle en contient moins que --taille.
+La sérialisation (serializer.data) est mesurée à part: elle est commune aux
+rendus. Les rendus doivent produire des octets identiques.
+
+Usage:
+    python benchmarks/benchmark_json.py --taille 1000 --repetitions 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from itertools import cycle, islice
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from apps.core import rendu_json  # noqa: E402
+from apps.core.rendu_json import JSONRapideRenderer  # noqa: E402
+from apps.events.models import MicroEvenement  # noqa: E402
+from apps.events.serializers import MicroEvenementListeSerializer, MicroEvenementSerializer  # noqa: E402
+from apps.workflows.models import InstanceWorkflow, TransitionEtape  # noqa: E402
+from apps.workflows.serializers import (  # noqa: E402
+    InstanceWorkflowListeSerializer, InstanceWorkflowSerializer, TransitionEtapeSerializer
+)
+
+# Liste -> (requête des vues de liste, serializer, serializer de liste rapide)
+LISTES = {
+    'evenements': (
+        lambda: MicroEvenement.objects.select_related('rapporteur', 'departement', 'categorie')
+        .order_by('-signale_le'),
+        MicroEvenementSerializer,
+        MicroEvenementListeSerializer,
+    ),
+    'workflows': (
+        lambda: InstanceWorkflow.objects.select_related(
+            'type_workflow', 'etape_actuelle', 'departement', 'initie_par'
+        ).order_by('-demarre_le'),
+        InstanceWorkflowSerializer,
+        InstanceWorkflowListeSerializer,
+    ),
+    'transitions': (
+        lambda: TransitionEtape.objects.select_related(
+            'etape_source', 'etape_destination', 'effectuee_par'
+        ).order_by('-horodatage'),
+        TransitionEtapeSerializer,
+        None,
+    ),
+}
+
+
+class RenduRepli(JSONRapideRenderer):
+    """JSONRapideRenderer tel qu'il s'exécute sans orjson installé."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        module_orjson, rendu_json.orjson = rendu_json.orjson, None
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            rendu_json.orjson = module_orjson
+
+
+RENDUS = {
+    'JSONRenderer (json)': JSONRenderer,
+    'JSONRapideRenderer': JSONRapideRenderer,
+    'JSONRapideRenderer (repli)': RenduRepli,
+}
+
+
+def chronometrer(fonction, repetitions: int):
+    """Résultat du dernier appel et durée médiane (ms)."""
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        resultat = fonction()
+        durees.append((time.perf_counter() - debut) * 1000)
+    return resultat, statistics.median(durees)
+
+
+def page(liste: str, taille: int):
+    """
+    Sérialisations (ModelSerializer, puis values() si la liste en a une) d'une
+    page paginée de `taille` éléments, et nombre de lignes distinctes.
+    """
+    requete, serializer_class, liste_class = LISTES[liste]
+    lignes = list(requete()[:taille])
+    if not lignes:
+        return {}, 0
+    distinctes = len(lignes)
+    lignes = list(islice(cycle(lignes), taille))
+
+    def paginee(resultats):
+        return {'count': taille, 'next': None, 'previous': None, 'results': resultats}
+
+    serialisations = {'serializer.data': lambda: paginee(serializer_class(lignes, many=True).data)}
+    if liste_class is not None:
+        valeurs = list(islice(cycle(requete().values(*liste_class.colonnes)[:taille]), taille))
+        serialisations['values() (liste rapide)'] = lambda: paginee(liste_class(valeurs, many=True).data)
+    return serialisations, distinctes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--taille', type=int, default=1000, help='Éléments par page')
+    parser.add_argument('--repetitions', type=int, default=20)
+    parser.add_argument('--listes', nargs='+', choices=sorted(LISTES), default=list(LISTES))
+    args = parser.parse_args()
+
+    if rendu_json.orjson is None:
+        print('orjson non installé: JSONRapideRenderer utilise le repli (module json).\n')
+
+    print(f"{'liste':<12} {'étape':<28} {'ms/page':>9} {'Mo/s':>8} {'taille (Ko)':>11} {'identique':>9}")
+    for liste in args.listes:
+        serialisations, distinctes = page(liste, args.taille)
+        if not serialisations:
+            print(f"{liste:<12} aucune ligne en base (manage.py generer_donnees_charge)")
+            continue
+
+        reference_donnees = None
+        for nom, serialiser in serialisations.items():
+            donnees, duree = chronometrer(serialiser, args.repetitions)
+            identique = ''
+            if reference_donnees is None:
+                reference_donnees, reference_duree = donnees, duree
+            else:
+                identique = JSONRenderer().render(donnees) == JSONRenderer().render(reference_donnees)
+                identique = 'oui' if identique else 'NON'
+                nom = f'{nom} x{reference_duree / duree:.0f}'
+            print(f"{liste:<12} {nom:<28} {duree:>9.1f} {'':>8} {'':>11} {identique:>9}")
+        donnees = reference_donnees
+
+        reference = None
+        for nom, renderer_class in RENDUS.items():
+            renderer = renderer_class()
+            contenu, duree = chronometrer(lambda: renderer.render(donnees), args.repetitions)
+            reference = contenu if reference is None else reference
+            debit = len(contenu) / 1024 / 1024 / (duree / 1000)
+            print(
+                f"{'':<12} {nom:<28} {duree:>9.1f} {debit:>8.0f} {len(contenu) / 1024:>11.0f} "
+                f"{'oui' if contenu == reference else 'NON':>9}"
+            )
+        if distinctes < args.taille:
+            print(f"{'':<12} ({distinctes} ligne(s) distincte(s) répétée(s))")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""
+Benchmark du rendu PDF des rapports: ancien rendu canvas (PDFExportStrategy
+de HospyFlow_core avant pagination: toutes les métriques sur une page, y
+décrémenté) contre ExportPDF (platypus paginé, sections par département,
+graphiques en cache) et ExportPDFParallele (sections rendues par un pool de
+processus puis fusionnées).
+
+Aucune base de données n'est utilisée: les données sont synthétiques.
+
+Usage:
+    python benchmarks/benchmark_rapports_pdf.py --departements 10 50 100 --jours 31
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+
+from apps.analytics.models import Rapport  # noqa: E402
+from apps.analytics.rapports import (  # noqa: E402
+    COLONNES_JOUR, LIBELLES_RESUME, SERIES_GRAPHIQUE, ExportPDF, ExportPDFParallele
+)
+
+
+def donnees_synthetiques(departements: int, jours: int) -> dict:
+    """donnees_metriques d'un rapport de `jours` jours sur `departements` départements."""
+    rng = random.Random(0)
+    debut = date(2026, 1, 1)
+    sections = []
+    for index in range(departements):
+        series = {c: [rng.randint(0, 40) for _ in range(jours)] for c in COLONNES_JOUR[1:]}
+        resume = {cle: sum(series.get(cle, [0])) for cle in LIBELLES_RESUME}
+        sections.append({
+            'id': index,
+            'nom': f"Département {index:03d}",
+            'resume': resume,
+            'series': {c: series[c] for c in SERIES_GRAPHIQUE},
+        })
+    par_jour = [
+        dict(
+            {c: sum(s['series'].get(c, [0] * jours)[i] for s in sections) for c in COLONNES_JOUR[1:]},
+            date=(debut + timedelta(days=i)).isoformat()
+        )
+        for i in range(jours)
+    ]
+    return {
+        'periode': {'debut': debut.isoformat(), 'fin': (debut + timedelta(days=jours - 1)).isoformat()},
+        'perimetre': 'Tous les départements',
+        'resume': {cle: sum(s['resume'][cle] for s in sections) for cle in LIBELLES_RESUME},
+        'par_jour': par_jour,
+        'departements': sections,
+    }
+
+
+def rendu_canvas_une_page(data: dict, chemin: str) -> str:
+    """Reproduction de l'ancien PDFExportStrategy.export (référence)."""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    c = canvas.Canvas(chemin, pagesize=letter)
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(100, 750, "Rapport ClinicFlow Analytics")
+    c.setFont("Helvetica", 12)
+    c.drawString(100, 730, f"Plage de dates: {data['plage_date']}")
+    c.drawString(100, 710, "Métriques clés:")
+
+    y = 690
+    for key, value in data['metrics'].items():
+        c.drawString(120, y, f"- {key}: {value}")
+        y -= 20
+
+    c.save()
+    return chemin
+
+
+def mesurer(fonction):
+    """Durée (s) et pic mémoire Python (Mo) d'un appel (processus courant seulement)."""
+    tracemalloc.start()
+    debut = time.perf_counter()
+    resultat = fonction()
+    duree = time.perf_counter() - debut
+    _, pic = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultat, duree, pic / 1024 / 1024
+
+
+def pages(chemin: str) -> int:
+    with open(chemin, 'rb') as fichier:
+        return len(re.findall(rb'/Type /Page\b', fichier.read()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--departements', type=int, nargs='+', default=[10, 50, 100])
+    parser.add_argument('--jours', type=int, default=31)
+    args = parser.parse_args()
+
+    settings.MEDIA_ROOT = tempfile.mkdtemp(prefix='benchmark_rapports_')
+    rapport = Rapport(id=0, plage_date='benchmark', format=Rapport.Format.PDF)
+
+    print(f"{'départements':>12} {'rendu':<22} {'durée (s)':>10} {'pic (Mo)':>9} {'pages':>6} {'taille (Ko)':>11}")
+    for departements in args.departements:
+        donnees = donnees_synthetiques(departements, args.jours)
+
+        # Ancien rendu: métriques aplaties, dessinées sur une seule page
+        # (au-delà d'une trentaine de lignes, elles sortent de la page)
+        metriques = {
+            f"{s['nom']} - {LIBELLES_RESUME[cle]}": valeur
+            for s in donnees['departements'] for cle, valeur in s['resume'].items()
+        }
+        chemin, duree, pic = mesurer(lambda: rendu_canvas_une_page(
+            {'plage_date': 'benchmark', 'metrics': metriques},
+            os.path.join(settings.MEDIA_ROOT, f'ancien_{departements}.pdf')
+        ))
+        print(f"{departements:>12} {'canvas (avant)':<22} {duree:>10.2f} {pic:>9.1f} "
+              f"{pages(chemin):>6} {os.path.getsize(chemin) / 1024:>11.0f}")
+
+        # Nouveau rendu: premier passage (graphiques dessinés) puis cache chaud,
+        # puis rendu parallèle (processus du pool déjà démarrés)
+        for libelle, strategie in (
+            ('platypus (cache froid)', ExportPDF),
+            ('platypus (cache chaud)', ExportPDF),
+            ('parallèle', ExportPDFParallele),
+        ):
+            chemin = os.path.join(settings.MEDIA_ROOT, f'nouveau_{departements}.pdf')
+            if strategie is ExportPDFParallele:
+                with open(os.devnull, 'wb') as fichier:
+                    strategie().exporter(rapport, donnees, fichier, lambda p: None)
+
+            def rendre():
+                with open(chemin, 'wb') as fichier:
+                    strategie().exporter(rapport, donnees, fichier, lambda p: None)
+
+            _, duree, pic = mesurer(rendre)
+            print(f"{departements:>12} {libelle:<22} {duree:>10.2f} {pic:>9.1f} "
+                  f"{pages(chemin):>6} {os.path.getsize(chemin) / 1024:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
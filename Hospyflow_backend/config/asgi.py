@@ -0,0 +1,10 @@
+"""
+ASGI config for HospyFlow project (production: gunicorn + uvicorn, voir gunicorn.conf.py).
+"""
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+application = get_asgi_application()
@@ -49,6 +49,10 @@ urlpatterns = [
     path('api/services/', include('apps.services.urls')),
 ]
 
+if settings.DEBUG:
+    from django.conf.urls.static import static
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
 # Admin site customization
 admin.site.site_header = "HospyFlow Administration"
 admin.site.site_title = "HospyFlow Admin"
@@ -0,0 +1,210 @@
+"""
+Fixtures pytest partagées par les tests des applications (apps/*/tests.py).
+"""
+import asyncio
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.test import Client
+from django.utils import timezone
+
+from apps.accounts.models import Department, User
+from apps.events.models import CategorieEvenement, MicroEvenement
+from apps.workflows.models import EtapeWorkflow, InstanceWorkflow, TransitionEtape, TypeWorkflow
+
+
+@pytest.fixture(autouse=True)
+def cache_lectures(settings):
+    """Cache mémoire vide et lectures conditionnelles actives pour chaque test."""
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'hospyflow-tests',
+        }
+    }
+    settings.LECTURES_CONDITIONNELLES = True
+    settings.LECTURES_CACHE_SECONDES = 60
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def departement(db):
+    return Department.objects.create(name='Urgences', code='URG')
+
+
+@pytest.fixture
+def autre_departement(db):
+    return Department.objects.create(name='Cardiologie', code='CARDIO')
+
+
+@pytest.fixture
+def medecin(departement):
+    return User.objects.create_user(
+        email='medecin@hospyflow.test',
+        password='motdepasse',
+        first_name='Anne',
+        last_name='Martin',
+        role=User.Role.DOCTOR,
+        department=departement
+    )
+
+
+@pytest.fixture
+def administrateur(db):
+    return User.objects.create_user(
+        email='admin@hospyflow.test',
+        password='motdepasse',
+        first_name='Paul',
+        last_name='Durand',
+        role=User.Role.ADMIN
+    )
+
+
+@pytest.fixture
+def client_medecin(medecin):
+    client = Client()
+    client.force_login(medecin)
+    return client
+
+
+@pytest.fixture
+def client_admin(administrateur):
+    client = Client()
+    client.force_login(administrateur)
+    return client
+
+
+@pytest.fixture
+def type_workflow(departement):
+    """Type de workflow à trois étapes (Accueil, Examen, Sortie)."""
+    type_workflow = TypeWorkflow.objects.create(
+        nom='Admission', code='ADM', categorie=TypeWorkflow.Categorie.ADMISSION
+    )
+    for ordre, (nom, duree) in enumerate([('Accueil', 10), ('Examen', 30), ('Sortie', 15)], start=1):
+        EtapeWorkflow.objects.create(
+            type_workflow=type_workflow,
+            nom=nom,
+            code=nom.upper(),
+            ordre=ordre,
+            duree_estimee_minutes=duree,
+            departement_responsable=departement
+        )
+    return type_workflow
+
+
+@pytest.fixture
+def creer_parcours(medecin, departement):
+    """
+    Fabrique d'instances terminées (ou abandonnées) ayant parcouru `etapes`
+    depuis `debut`, chaque étape durant `duree` minutes.
+    """
+    def creer(type_workflow, etapes, debut, duree=10, statut=InstanceWorkflow.Statut.TERMINE):
+        instance = InstanceWorkflow.objects.create(
+            type_workflow=type_workflow,
+            reference_patient=f'PAT-{InstanceWorkflow.objects.count() + 1}',
+            statut=statut,
+            departement=departement,
+            initie_par=medecin
+        )
+        fin = debut + timedelta(minutes=duree * len(etapes))
+        InstanceWorkflow.objects.filter(pk=instance.pk).update(demarre_le=debut, termine_le=fin)
+
+        sources = [None] + list(etapes)
+        destinations = list(etapes) + [None]
+        for rang, (source, destination) in enumerate(zip(sources, destinations)):
+            transition = TransitionEtape.objects.create(
+                instance=instance,
+                etape_source=source,
+                etape_destination=destination,
+                effectuee_par=medecin,
+                duree_etape_minutes=duree if source else None
+            )
+            TransitionEtape.objects.filter(pk=transition.pk).update(
+                horodatage=debut + timedelta(minutes=duree * rang)
+            )
+        instance.refresh_from_db()
+        return instance
+    return creer
+
+
+@pytest.fixture
+def categorie(db):
+    return CategorieEvenement.objects.create(
+        nom='Retard', code='RETARD', type_categorie=CategorieEvenement.TypeCategorie.RETARD
+    )
+
+
+@pytest.fixture
+def creer_evenement(medecin, departement, categorie):
+    """Fabrique de micro-événements signalés par le médecin dans son département."""
+    def creer(**champs):
+        valeurs = {
+            'rapporteur': medecin,
+            'departement': departement,
+            'categorie': categorie,
+            'titre': 'Attente brancardier',
+            'description': 'Patient en attente de transfert.',
+            'severite': MicroEvenement.Severite.MOYEN,
+            'survenu_le': timezone.now(),
+        }
+        valeurs.update(champs)
+        return MicroEvenement.objects.create(**valeurs)
+    return creer
+
+
+@pytest.fixture
+def appel_asgi():
+    """
+    Appelle une URL par le handler ASGI (comme le worker uvicorn), avec la
+    session d'un Client de test. Les messages envoyés au serveur sont ajoutés
+    à `journal`, qui est renvoyé.
+
+    Les vues synchrones s'exécutent alors dans un autre thread que le test:
+    les tests qui l'utilisent sont marqués django_db(transaction=True).
+    """
+    def appeler(client, chemin, parametres='', journal=None):
+        journal = [] if journal is None else journal
+        corps_lu = False
+
+        async def recevoir():
+            nonlocal corps_lu
+            if corps_lu:
+                # Pas de déconnexion du client
+                await asyncio.Future()
+            corps_lu = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def envoyer(message):
+            journal.append(message)
+
+        cookies = '; '.join(f'{nom}={morsel.value}' for nom, morsel in client.cookies.items())
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': chemin,
+            'raw_path': chemin.encode(),
+            'query_string': parametres.encode(),
+            'headers': [(b'host', b'testserver'), (b'cookie', cookies.encode())],
+            'client': ('127.0.0.1', 50000),
+            'server': ('testserver', 80),
+        }
+        async_to_sync(ASGIHandler())(scope, recevoir, envoyer)
+        return journal
+    return appeler
+
+
+@pytest.fixture
+def periode_etag_figee(monkeypatch):
+    """Fige la période des ETags qui dépendent de l'heure (pas de changement de minute en cours de test)."""
+    instant = time.time()
+    monkeypatch.setattr('apps.core.conditionnel.time', SimpleNamespace(time=lambda: instant))
@@ -0,0 +1,41 @@
+"""
+Configuration gunicorn de production: workers uvicorn servant config.asgi.
+
+    gunicorn config.asgi:application -c gunicorn.conf.py
+
+Les vues synchrones (DRF) restent servies; les vues des routes .../async/ de
+chaque application (par exemple /api/analytics/tableau-de-bord/async/)
+s'exécutent sur la boucle d'événements du worker.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'uvicorn.workers.UvicornWorker'
+
+# Sous ASGI chaque requête s'exécute dans son propre thread: une connexion
+# persistante n'y serait jamais réutilisée ni fermée. Les workers utilisent le
+# pool de connexions par processus (DB_POOL_TAILLE) à la place
+os.environ['DB_CONN_MAX_AGE'] = '0'
+os.environ.setdefault('DB_POOL_TAILLE', '4')
+
+# Budget de connexions PostgreSQL de l'instance (0: sans limite): le nombre
+# de workers est réduit pour que workers x DB_POOL_TAILLE le respecte
+db_connexions_max = int(os.environ.get('DB_CONNEXIONS_MAX', 0))
+if db_connexions_max:
+    connexions_par_worker = int(os.environ['DB_POOL_TAILLE']) or 1
+    workers = max(1, min(workers, db_connexions_max // connexions_par_worker))
+
+# Requêtes longues (exports, rapports PDF à la demande)
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+
+# Recyclage des workers (fuites mémoire éventuelles)
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = 200
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', 'info')
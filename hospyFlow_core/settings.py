@@ -84,3 +84,44 @@ REST_FRAMEWORK = {
 # Media files (for reports)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+
+# Cache duration of the services summary (ops/indicateurs.py)
+INDICATEURS_CACHE_SECONDES = 30
+
+# Frequency-based bottleneck detection (MoteurAnalyse)
+# Recent window compared against the per-minute baseline of the reference window
+ANALYSE_FREQUENCE_FENETRE_MINUTES = 15
+ANALYSE_FREQUENCE_REFERENCE_MINUTES = 24 * 60
+# TENSION when the recent rate exceeds MULTIPLE x baseline...
+ANALYSE_FREQUENCE_MULTIPLE = 3.0
+# ...and the window holds at least this many events
+ANALYSE_FREQUENCE_MINIMUM = 5
+
+# Observer notifications (analysis engine and asynchronous observers)
+NOTIFICATIONS_THREADS = 4
+# Pending tasks beyond the busy threads before submitters wait...
+NOTIFICATIONS_FILE_MAX = 200
+# ...at most this long, then run the task themselves
+NOTIFICATIONS_ATTENTE_SECONDES = 2
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'structure': {
+            'format': 'ts=%(asctime)s level=%(levelname)s logger=%(name)s thread=%(threadName)s msg="%(message)s"',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'structure',
+        },
+    },
+    'loggers': {
+        'hospyflow': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
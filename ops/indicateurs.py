@@ -0,0 +1,71 @@
+"""
+Dashboard KPIs of the services summary (GET /api/services/summary/).
+
+Same formulas as the new backend's apps/core/indicateurs.py (saturation,
+state, hourly flow, risk score), kept here so that this project does not
+import the new backend. Keep both in sync.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+# Observation window of the events
+FENETRE_HEURES = 24
+# Saturation: 10 % per active event, capped at 100 %
+SATURATION_PAR_EVENEMENT = 10
+SEUIL_TENSION = 70
+
+
+def saturation(actifs):
+    """Saturation (%) of a service from its active events."""
+    return min(actifs * SATURATION_PAR_EVENEMENT, 100)
+
+
+def etat(saturation_service):
+    """NORMAL / TENSION state matching a saturation."""
+    return 'TENSION' if saturation_service >= SEUIL_TENSION else 'NORMAL'
+
+
+def resume_services(lignes, attente_minutes, fenetre_heures=FENETRE_HEURES):
+    """
+    Dashboard summary.
+
+    Args:
+        lignes: Per service: id, nom, etat, actifs, evenements, critiques
+            (counters over the window)
+        attente_minutes: Average handling duration over the window
+        fenetre_heures: Length of the counters' window
+    """
+    services = []
+    evenements = critiques = tension = 0
+    for ligne in lignes:
+        services.append({
+            'id': ligne['id'],
+            'nom': ligne['nom'],
+            'etat': ligne['etat'],
+            'saturation': saturation(ligne['actifs']),
+            'event_count': ligne['evenements'],
+        })
+        evenements += ligne['evenements']
+        critiques += ligne['critiques']
+        tension += ligne['etat'] == 'TENSION'
+
+    # Score out of 10: share of critical events and share of services in tension
+    part_critiques = critiques / evenements if evenements else 0
+    part_tension = tension / len(services) if services else 0
+    risque = 10 * (part_critiques + part_tension) / 2
+
+    return {
+        'services': services,
+        'kpis': {
+            'waiting_avg': f"{int(attente_minutes)}m" if attente_minutes else '--',
+            'flux_hour': round(evenements / fenetre_heures),
+            'risk_score': f"{risque:.1f}",
+        },
+    }
+
+
+def en_cache(cle, calculer, duree=None):
+    """Cached summary, recomputed by `calculer` every INDICATEURS_CACHE_SECONDES seconds."""
+    if duree is None:
+        duree = getattr(settings, 'INDICATEURS_CACHE_SECONDES', 30)
+    return cache.get_or_set(f'indicateurs:{cle}', calculer, duree)
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 00:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ops', '0002_alerte_niveau_gravite'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alerte',
+            name='cle_idempotence',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
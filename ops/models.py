@@ -63,6 +63,8 @@ class Alerte(models.Model):
     niveau_gravite = models.CharField(max_length=20, choices=GRAVITY_CHOICES, default='HIGH')
     genere_le = models.DateTimeField(auto_now_add=True)
     est_resolu = models.BooleanField(default=False)
+    # Identifies the analysed event: one alert per event at most
+    cle_idempotence = models.CharField(max_length=64, unique=True, null=True, blank=True)
 
     def __str__(self):
         return f"Alert for {self.service.nom} ({self.niveau_gravite}) - {self.genere_le}"
@@ -7,6 +7,7 @@ from hospyFlow_core.analytics_service import moteur_analyse
 def trigger_analysis(sender, instance, created, **kwargs):
     """
     Automatically triggers the analytics engine when a new micro-event is saved.
+    The analysis runs once the transaction commits, not inside the save.
     """
     if created:
-        moteur_analyse.analyser_evenement(instance)
+        moteur_analyse.planifier(instance)
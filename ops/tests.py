@@ -1,3 +1,347 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from hospyFlow_core.alert_service import Dispatcher, Observer, Subject, dispatcher
+from hospyFlow_core.analytics_service import (
+    DetecteurFrequence, FenetreGlissante, _LotAnalyse, cle_idempotence, moteur_analyse
+)
+from .models import Alerte, MicroEvenement, Service, TypeFlux
+
+
+def executer_sur_place(nom, fonction, *args):
+    """Runs dispatcher tasks on the test thread (and its transaction)."""
+    dispatcher.executer(nom, fonction, *args)
+
+
+class AnalyseTestCase(TestCase):
+    def setUp(self):
+        self.personnel = User.objects.create_user('infirmier', password='motdepasse')
+        self.service = Service.objects.create(nom='Urgences', localisation='RDC')
+        self.type_flux = TypeFlux.objects.create(nom='Transfert', duree_standard=600)
+        # The engine is a singleton: fresh detection state for each test
+        moteur_analyse.detecteur = DetecteurFrequence()
+        moteur_analyse._frequences_signalees = {}
+        patcher = mock.patch.object(dispatcher, 'soumettre', side_effect=executer_sur_place)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def creer_evenement(self, gravite='LOW', **champs):
+        valeurs = {
+            'personnel': self.personnel,
+            'service': self.service,
+            'type_flux': self.type_flux,
+            'description': 'Brancard indisponible',
+            'niveau_gravite': gravite,
+        }
+        valeurs.update(champs)
+        return MicroEvenement.objects.create(**valeurs)
+
+
+class MoteurAnalyseTests(AnalyseTestCase):
+    def test_analyse_planifiee_une_fois_par_transaction(self):
+        with self.captureOnCommitCallbacks() as rappels:
+            with transaction.atomic():
+                evenements = [self.creer_evenement() for _ in range(3)]
+
+        lots = [rappel for rappel in rappels if isinstance(rappel, _LotAnalyse)]
+        self.assertEqual(len(lots), 1)
+        self.assertEqual(lots[0].ids, [e.pk for e in evenements])
+
+    def test_evenement_critique_alerte_et_bascule_en_tension(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                critique = self.creer_evenement('CRITICAL')
+                self.creer_evenement('LOW')
+
+        alerte = Alerte.objects.get()
+        self.assertEqual(alerte.cle_idempotence, cle_idempotence(critique.pk))
+        self.assertEqual(alerte.niveau_gravite, 'CRITICAL')
+        self.service.refresh_from_db()
+        self.assertEqual(self.service.etat, 'TENSION')
+
+    def test_lot_analyse_en_requetes_constantes(self):
+        with self.captureOnCommitCallbacks() as rappels:
+            with transaction.atomic():
+                evenements = [self.creer_evenement('CRITICAL') for _ in range(20)]
+        # Gravity only: no frequency alert for this burst
+        moteur_analyse.detecteur.minimum = 10 ** 6
+        moteur_analyse.detecteur._initialiser()
+
+        lot = MicroEvenement.objects.select_related('service', 'type_flux').filter(
+            pk__in=[e.pk for e in evenements]
+        )
+        # Events, already alerted keys, then on commit: services, alerts, state switch
+        with self.assertNumQueries(5):
+            with self.captureOnCommitCallbacks(execute=True):
+                etats = moteur_analyse.analyser_lot(lot)
+
+        self.assertEqual(set(etats.values()), {'TENSION'})
+        self.assertEqual(Alerte.objects.count(), 20)
+        self.assertEqual(len(rappels), 1)
+
+    def test_evenement_deja_analyse_sans_seconde_alerte(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            critique = self.creer_evenement('CRITICAL')
+
+        with self.captureOnCommitCallbacks(execute=True) as rappels:
+            etat = moteur_analyse.analyser_evenement(critique)
+
+        self.assertEqual(etat, 'TENSION')
+        self.assertEqual(rappels, [])
+        self.assertEqual(Alerte.objects.count(), 1)
+
+
+class FenetreGlissanteTests(SimpleTestCase):
+    def test_taux_recent_et_de_reference(self):
+        fenetre = FenetreGlissante(fenetre=2, reference=10)
+        for minute in range(10):
+            fenetre.ajouter(minute)
+        fenetre.ajouter(9, nombre=5)
+
+        # Recent window: minutes 8 and 9; baseline: minutes 0 to 7
+        self.assertEqual(fenetre.total_fenetre, 7)
+        self.assertEqual(fenetre.total_reference, 15)
+        self.assertEqual(fenetre.taux(), (3.5, 1.0))
+
+    def test_minutes_sorties_des_fenetres(self):
+        fenetre = FenetreGlissante(fenetre=2, reference=10)
+        fenetre.ajouter(0, nombre=4)
+        fenetre.ajouter(1)
+
+        fenetre.ajouter(3)
+        self.assertEqual((fenetre.total_fenetre, fenetre.total_reference), (1, 6))
+        fenetre.ajouter(10)
+        self.assertEqual((fenetre.total_fenetre, fenetre.total_reference), (1, 3))
+        # Gap longer than the reference window: everything is dropped
+        fenetre.ajouter(30)
+        self.assertEqual((fenetre.total_fenetre, fenetre.total_reference), (1, 1))
+
+    def test_evenements_en_retard(self):
+        fenetre = FenetreGlissante(fenetre=2, reference=10)
+        fenetre.ajouter(20)
+        fenetre.ajouter(19)
+        fenetre.ajouter(15)
+        fenetre.ajouter(5)
+
+        self.assertEqual(fenetre.minute, 20)
+        self.assertEqual((fenetre.total_fenetre, fenetre.total_reference), (2, 3))
+
+
+@override_settings(
+    ANALYSE_FREQUENCE_FENETRE_MINUTES=15,
+    ANALYSE_FREQUENCE_REFERENCE_MINUTES=24 * 60,
+    ANALYSE_FREQUENCE_MULTIPLE=3.0,
+    ANALYSE_FREQUENCE_MINIMUM=5
+)
+class DetectionFrequenceTests(AnalyseTestCase):
+    def test_fenetres_initialisees_depuis_la_base(self):
+        # Baseline: one event per hour over the last day
+        for heures in range(1, 24):
+            evenement = self.creer_evenement()
+            MicroEvenement.objects.filter(pk=evenement.pk).update(
+                horodatage=timezone.now() - timedelta(hours=heures)
+            )
+        recents = [self.creer_evenement() for _ in range(4)]
+        detecteur = DetecteurFrequence()
+
+        # Seeded events are not counted twice
+        for evenement in recents:
+            self.assertIsNone(detecteur.evaluer(evenement))
+        fenetre = detecteur._fenetres[(self.service.pk, self.type_flux.pk)]
+        self.assertEqual((fenetre.total_fenetre, fenetre.total_reference), (4, 27))
+
+        nombre, recent, base = detecteur.evaluer(self.creer_evenement())
+        self.assertEqual(nombre, 5)
+        self.assertGreater(recent, 3 * base)
+
+    def test_une_alerte_de_frequence_par_periode(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                for _ in range(8):
+                    self.creer_evenement()
+
+        alerte = Alerte.objects.get()
+        self.assertTrue(alerte.cle_idempotence.startswith(
+            f"ops.frequence:{self.service.pk}:{self.type_flux.pk}:"
+        ))
+        self.assertEqual(alerte.niveau_gravite, 'HIGH')
+
+        # Same window period: the pair stays in TENSION without a new alert
+        with self.captureOnCommitCallbacks(execute=True):
+            evenement = self.creer_evenement()
+        self.assertEqual(moteur_analyse.analyser_lot([evenement])[evenement.pk], 'TENSION')
+        self.assertEqual(Alerte.objects.count(), 1)
+
+    def test_frequence_par_service_et_type_de_flux(self):
+        autre_flux = TypeFlux.objects.create(nom='Résultat labo', duree_standard=300)
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                for numero in range(8):
+                    self.creer_evenement(type_flux=self.type_flux if numero % 2 else autre_flux)
+
+        self.assertEqual(Alerte.objects.count(), 0)
+
+
+class DispatcherTests(SimpleTestCase):
+    def setUp(self):
+        self.dispatcher = Dispatcher(threads=2, file_max=2, attente=0.05)
+
+    def test_taches_executees_sur_le_pool(self):
+        threads = []
+        for _ in range(4):
+            self.dispatcher.soumettre('tache', lambda: threads.append(threading.current_thread().name))
+
+        self.assertTrue(self.dispatcher.attendre(timeout=5))
+        self.assertEqual(len(threads), 4)
+        self.assertTrue(all(nom.startswith('notifications') for nom in threads))
+
+    def test_erreur_isolee_et_journalisee(self):
+        executees = []
+
+        def echouer():
+            raise RuntimeError('SMTP indisponible')
+
+        with self.assertLogs('hospyflow.notifications', level='ERROR') as journaux:
+            self.dispatcher.soumettre('echec', echouer)
+            self.dispatcher.soumettre('suivante', executees.append, 1)
+            self.assertTrue(self.dispatcher.attendre(timeout=5))
+
+        self.assertEqual(executees, [1])
+        self.assertIn('task=echec', journaux.output[0])
+
+    def test_file_pleine_execution_par_l_appelant(self):
+        dispatcher_sature = Dispatcher(threads=1, file_max=0, attente=0.01)
+        liberation = threading.Event()
+        threads = []
+        dispatcher_sature.soumettre('bloquante', liberation.wait, 5)
+
+        with self.assertLogs('hospyflow.notifications', level='WARNING'):
+            dispatcher_sature.soumettre('en_ligne', lambda: threads.append(threading.current_thread()))
+        liberation.set()
+
+        self.assertEqual(threads, [threading.current_thread()])
+        self.assertTrue(dispatcher_sature.attendre(timeout=5))
+
+    def test_attente_des_taches_soumises_par_des_taches(self):
+        executees = []
+
+        def parente():
+            self.dispatcher.soumettre('enfant', executees.append, 'enfant')
+            executees.append('parente')
+
+        self.dispatcher.soumettre('parente', parente)
+        self.assertTrue(self.dispatcher.attendre(timeout=5))
+        self.assertEqual(sorted(executees), ['enfant', 'parente'])
+
+
+class Collecteur(Observer):
+    def __init__(self, asynchronous=False, erreur=False):
+        self.asynchronous = asynchronous
+        self.erreur = erreur
+        self.lots = []
+
+    def update(self, alert_data):
+        pass
+
+    def update_batch(self, alerts):
+        if self.erreur:
+            raise RuntimeError('observateur en panne')
+        self.lots.append(alerts)
+
+
+class SujetTest(Subject):
+    pass
+
+
+class ObservateursTests(AnalyseTestCase):
+    def test_notification_apres_commit_en_un_lot(self):
+        sujet = SujetTest()
+        synchrone, asynchrone = Collecteur(), Collecteur(asynchronous=True)
+        sujet.attach(synchrone)
+        sujet.attach(asynchrone)
+
+        with self.captureOnCommitCallbacks() as rappels:
+            sujet.notify_batch([{'cle': 'a'}, {'cle': 'b'}])
+            self.assertEqual(synchrone.lots, [])
+        for rappel in rappels:
+            rappel()
+
+        self.assertEqual(synchrone.lots, [[{'cle': 'a'}, {'cle': 'b'}]])
+        self.assertEqual(asynchrone.lots, synchrone.lots)
+        # Only the asynchronous observer goes through the pool
+        self.assertEqual(
+            [appel.args[0] for appel in dispatcher.soumettre.call_args_list], ['Collecteur']
+        )
+
+    def test_observateur_en_erreur_sans_effet_sur_les_autres(self):
+        sujet = SujetTest()
+        suivant = Collecteur()
+        sujet.attach(Collecteur(erreur=True))
+        sujet.attach(suivant)
+
+        with self.assertLogs('hospyflow.notifications', level='ERROR'):
+            with self.captureOnCommitCallbacks(execute=True):
+                sujet.notify({'cle': 'a'})
+
+        self.assertEqual(suivant.lots, [[{'cle': 'a'}]])
+
+    def test_aucune_notification_apres_rollback(self):
+        sujet = SujetTest()
+        collecteur = Collecteur()
+        sujet.attach(collecteur)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    sujet.notify({'cle': 'a'})
+                    raise RuntimeError('annulation')
+            except RuntimeError:
+                pass
+
+        self.assertEqual(collecteur.lots, [])
+
+    def test_analyse_soumise_au_pool(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.creer_evenement()
+
+        self.assertEqual(dispatcher.soumettre.call_args_list[0].args[0], 'analyse')
+
+
+class ResumeServicesTests(AnalyseTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_resume_en_requetes_constantes_puis_en_cache(self):
+        Service.objects.create(nom='Cardiologie', localisation='Étage 2', etat='TENSION')
+        for gravite in ['CRITICAL'] + ['LOW'] * 3:
+            self.creer_evenement(gravite)
+        ancien = self.creer_evenement()
+        MicroEvenement.objects.filter(pk=ancien.pk).update(horodatage=timezone.now() - timedelta(days=2))
+        client = APIClient()
+
+        with self.assertNumQueries(2):
+            resume = client.get('/api/services/summary/').json()
+        with self.assertNumQueries(0):
+            self.assertEqual(client.get('/api/services/summary/').json(), resume)
+
+        self.assertEqual(
+            [(s['nom'], s['saturation'], s['event_count']) for s in resume['services']],
+            [('Cardiologie', 0, 0), ('Urgences', 40, 4)]
+        )
+        self.assertEqual(resume['kpis'], {
+            # Standard duration of the reported flows: 600 s
+            'waiting_avg': '10m',
+            'flux_hour': 0,
+            # (1/4 critical + 1/2 services in tension) / 2, out of 10
+            'risk_score': '3.8',
+        })
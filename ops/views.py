@@ -1,3 +1,7 @@
+from datetime import timedelta
+
+from django.db.models import Avg, Count, Q
+from django.utils import timezone
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from .models import Service, TypeFlux, MicroEvenement, Alerte, Rapport
@@ -5,7 +9,7 @@ from .serializers import (
     ServiceSerializer, TypeFluxSerializer, MicroEvenementSerializer, 
     AlerteSerializer, RapportSerializer
 )
-from hospyFlow_core.analytics_service import moteur_analyse
+from .indicateurs import FENETRE_HEURES, en_cache, resume_services
 from hospyFlow_core.report_service import ReportGenerator, PDFExportStrategy, CSVExportStrategy
 
 class ServiceViewSet(viewsets.ModelViewSet):
@@ -16,36 +20,43 @@ class ServiceViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def summary(self, request):
         """
-        Returns a summary of all services with their current state and event counts.
+        Returns a summary of all services with their current state and event
+        counts, computed like the new backend's /api/services/summary/.
         """
-        from django.db.models import Count
-        services = Service.objects.all()
-        data = []
-        for s in services:
-            # Simple saturation calculation for the demo
-            # In a real app, this would be based on active events vs capacity
-            event_count = s.events.count()
-            saturation = min(event_count * 10, 100) # Mock logic
-            
-            data.append({
+        return Response(en_cache('ops.services', resume_ops))
+
+
+def resume_ops():
+    """
+    Dashboard summary in constant queries: one annotated query for the
+    per-service counters over the window, one for the average expected duration.
+    """
+    depuis = timezone.now() - timedelta(hours=FENETRE_HEURES)
+    fenetre = Q(events__horodatage__gte=depuis, events__est_valide=True)
+    services = Service.objects.annotate(
+        evenements=Count('events', filter=fenetre),
+        critiques=Count('events', filter=fenetre & Q(events__niveau_gravite='CRITICAL'))
+    ).order_by('nom')
+
+    # Legacy events have no start/end: standard duration of the reported flows
+    duree = MicroEvenement.objects.filter(
+        horodatage__gte=depuis, est_valide=True
+    ).aggregate(moyenne=Avg('type_flux__duree_standard'))['moyenne']
+
+    return resume_services(
+        [
+            {
                 'id': s.id,
                 'nom': s.nom,
                 'etat': s.etat,
-                'saturation': saturation,
-                'event_count': event_count
-            })
-        
-        # Add global KPIs
-        kpis = {
-            'waiting_avg': '24m',
-            'flux_hour': sum(d['event_count'] for d in data),
-            'risk_score': '5.8' if any(d['etat'] == 'TENSION' for d in data) else '2.1'
-        }
-        
-        return Response({
-            'services': data,
-            'kpis': kpis
-        })
+                'actifs': s.evenements,
+                'evenements': s.evenements,
+                'critiques': s.critiques,
+            }
+            for s in services
+        ],
+        duree / 60 if duree else None
+    )
 
 class TypeFluxViewSet(viewsets.ModelViewSet):
     queryset = TypeFlux.objects.all()
@@ -54,26 +65,7 @@ class TypeFluxViewSet(viewsets.ModelViewSet):
 class MicroEvenementViewSet(viewsets.ModelViewSet):
     queryset = MicroEvenement.objects.all()
     serializer_class = MicroEvenementSerializer
-
-    def perform_create(self, serializer):
-        # Save the event first
-        instance = serializer.save()
-        
-        # Trigger the Singleton Analysis Engine
-        # We pass the full object or enough data for the engine to decide
-        nouvel_etat = moteur_analyse.analyser_evenement(instance)
-        
-        # Update service state if needed (State Pattern foundation)
-        # Note: AdminNotifier (Observer) also handles this, but here we can 
-        # explicitly ensure the service reflects the analysis result immediately
-        if nouvel_etat == "TENSION" and instance.service.etat != "TENSION":
-            instance.service.etat = "TENSION"
-            instance.service.save()
-            print(f"[API] Service {instance.service.nom} switched to TENSION via API")
-        elif nouvel_etat == "NORMAL" and instance.service.etat == "TENSION":
-            # Optional: logic to return to normal if analysis says so
-            # For now, we manually reset or depend on another trigger
-            pass
+    # Analysis is triggered once per event by ops.signals (on commit)
 
 class AlerteViewSet(viewsets.ModelViewSet):
     queryset = Alerte.objects.all()
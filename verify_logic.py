@@ -5,6 +5,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hospyFlow_core.settings')
 django.setup()
 
 from ops.models import Service, MicroEvenement, TypeFlux, Alerte, User
+from hospyFlow_core.alert_service import dispatcher
 
 def verify():
     print("--- Verification of Analytics & Alerts ---")
@@ -30,6 +31,8 @@ def verify():
         description="Tout va bien",
         niveau_gravite='LOW'
     )
+    # Analysis and alerts run on the notification pool
+    dispatcher.attendre()
     
     service.refresh_from_db()
     alerts_count = Alerte.objects.count()
@@ -45,6 +48,8 @@ def verify():
         description="Goulot d'étranglement majeur !",
         niveau_gravite='CRITICAL'
     )
+    # Analysis and alerts run on the notification pool
+    dispatcher.attendre()
     
     service.refresh_from_db()
     alerts = Alerte.objects.all()
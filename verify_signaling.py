@@ -9,7 +9,7 @@ django.setup()
 
 from ops.models import Service, TypeFlux, MicroEvenement
 from django.contrib.auth.models import User
-from hospyFlow_core.analytics_service import moteur_analyse
+from hospyFlow_core.alert_service import dispatcher
 
 def test_signaling_flow():
     print("--- Testing Hospital Signaling Flow ---")
@@ -34,17 +34,9 @@ def test_signaling_flow():
         niveau_gravite='CRITICAL'
     )
     
-    # 3. Manually call the analysis if we want to test the analytical logic directly
-    # But perform_create in views.py already does this. 
-    # Since we are using models.create here, it doesn't trigger view logic.
-    # Let's call the engine directly as views.py would.
-    nouvel_etat = moteur_analyse.analyser_evenement(event)
-    print(f"Analysis Result: {nouvel_etat}")
-    
-    # In views.py, we update the state:
-    if nouvel_etat == "TENSION":
-        service.etat = "TENSION"
-        service.save()
+    # 3. The post_save signal queues the analysis, run on the notification
+    # pool once committed: wait for it
+    dispatcher.attendre()
     
     # 4. Verify results
     updated_service = Service.objects.get(id=service.id)